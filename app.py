@@ -15,9 +15,25 @@ import tempfile
 import math
 import gzip
 import csv
+import hashlib
+import inspect
+import shutil
 import statistics
+import threading
 from collections import defaultdict
+from bisect import bisect_right
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
 from entity_resolution import EntityResolver
+from response_cache import VersionedCache, LRUDict
+from geo_service import SQLiteRateLimiter, LookupQueue, QueueFull
+from rl_store import RLPriceStore
+from pricing_engine import PricingEngine
+from name_matcher import AliasMatcher, CustomerNames, name_key, fuzzy_key
+from startup import StartupTracker, RunOnce, process_lock
+from scheduler import SQLiteLease, JobScheduler
+from db_pool import ConnectionPool, resolve_profile, effective_pragmas
+from write_queue import WriteQueue, WriteQueueFull
+from intake_jobs import IntakeJobQueue
 
 
 def business_day_cutoff(biz_days):
@@ -37,20 +53,35 @@ app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024  # 10MB max upload
 # --- CORS: allow all origins for local development ---
 CORS(app)
 
+# Startup phases for this worker (see the STARTUP section at the end of this file)
+_startup = StartupTracker()
+
 
 def get_current_user():
     """Get current user (single-user local mode)."""
     return 'Ian P'
 
 # CRM Database Setup
-CRM_DB_PATH = os.path.join(os.path.dirname(__file__), 'crm.db')
+CRM_DB_PATH = os.environ.get('CRM_DB_PATH') or os.path.join(os.path.dirname(__file__), 'crm.db')
 
-def get_crm_db():
-    conn = sqlite3.connect(CRM_DB_PATH, timeout=10)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA foreign_keys=ON")
-    return conn
+# One pool for both databases: each thread keeps its connections open between requests,
+# so WAL / foreign_keys run once per connection instead of once per get_*_db() call.
+# The performance profile of each database (load_db_profiles) is applied by the pool too.
+_db_profiles = {}
+
+def _pool_profile(path):
+    return _db_profiles.get('crm' if path == CRM_DB_PATH else 'mi' if path == MI_DB_PATH else None)
+
+_db_pool = ConnectionPool(max_idle=8, timeout=10, profile=_pool_profile)
+
+def get_crm_db(readonly=False):
+    """Pooled CRM connection; close() returns it to the pool. readonly=True (mode=ro, query_only)
+    for handlers that only read, so they never wait on the write lock."""
+    return _db_pool.connect(CRM_DB_PATH, readonly)
+
+def crm_transaction(immediate=False):
+    """with crm_transaction() as conn: commits on success, rolls back on error."""
+    return _db_pool.transaction(CRM_DB_PATH, immediate)
 
 def db_execute_with_retry(conn, sql, params=(), max_retries=3):
     """Execute SQL with retry on database locked errors."""
@@ -170,6 +201,7 @@ def init_crm_db():
         CREATE INDEX IF NOT EXISTS idx_customers_trader ON customers(trader);
         CREATE INDEX IF NOT EXISTS idx_mills_trader ON mills(trader);
         CREATE INDEX IF NOT EXISTS idx_mills_name ON mills(name);
+        CREATE INDEX IF NOT EXISTS idx_mills_upper_name ON mills(UPPER(name));
         CREATE INDEX IF NOT EXISTS idx_mills_region ON mills(region);
 
         -- Audit trail
@@ -310,6 +342,66 @@ def init_crm_db():
             created_at DATETIME DEFAULT CURRENT_TIMESTAMP
         );
     ''')
+
+    # Change counters for CRM mills, customer names and entities, bumped by triggers so every
+    # write path (API, seeds, merges, direct SQL) invalidates the mill origin index / customer
+    # matcher / entity candidate index
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        );
+        INSERT OR IGNORE INTO data_versions (name, version) VALUES ('mills', 0);
+        CREATE TRIGGER IF NOT EXISTS trg_mills_version_insert AFTER INSERT ON mills
+        BEGIN UPDATE data_versions SET version = version + 1 WHERE name = 'mills'; END;
+        CREATE TRIGGER IF NOT EXISTS trg_mills_version_update AFTER UPDATE ON mills
+        BEGIN UPDATE data_versions SET version = version + 1 WHERE name = 'mills'; END;
+        CREATE TRIGGER IF NOT EXISTS trg_mills_version_delete AFTER DELETE ON mills
+        BEGIN UPDATE data_versions SET version = version + 1 WHERE name = 'mills'; END;
+        INSERT OR IGNORE INTO data_versions (name, version) VALUES ('customers', 0);
+        CREATE TRIGGER IF NOT EXISTS trg_customers_version_insert AFTER INSERT ON customers
+        BEGIN UPDATE data_versions SET version = version + 1 WHERE name = 'customers'; END;
+        CREATE TRIGGER IF NOT EXISTS trg_customers_version_update AFTER UPDATE OF name ON customers
+        BEGIN UPDATE data_versions SET version = version + 1 WHERE name = 'customers'; END;
+        CREATE TRIGGER IF NOT EXISTS trg_customers_version_delete AFTER DELETE ON customers
+        BEGIN UPDATE data_versions SET version = version + 1 WHERE name = 'customers'; END;
+        INSERT OR IGNORE INTO data_versions (name, version) VALUES ('entities', 0);
+        CREATE TRIGGER IF NOT EXISTS trg_entity_canonical_version_insert AFTER INSERT ON entity_canonical
+        BEGIN UPDATE data_versions SET version = version + 1 WHERE name = 'entities'; END;
+        CREATE TRIGGER IF NOT EXISTS trg_entity_canonical_version_delete AFTER DELETE ON entity_canonical
+        BEGIN UPDATE data_versions SET version = version + 1 WHERE name = 'entities'; END;
+        CREATE TRIGGER IF NOT EXISTS trg_entity_alias_version_insert AFTER INSERT ON entity_alias
+        BEGIN UPDATE data_versions SET version = version + 1 WHERE name = 'entities'; END;
+        CREATE TRIGGER IF NOT EXISTS trg_entity_alias_version_delete AFTER DELETE ON entity_alias
+        BEGIN UPDATE data_versions SET version = version + 1 WHERE name = 'entities'; END;
+    ''')
+
+    # Job scheduler: leader lease and persistent runs (scheduler.py)
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS scheduler_leases (
+            name TEXT PRIMARY KEY,
+            holder TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            acquired_at REAL
+        );
+        CREATE TABLE IF NOT EXISTS job_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job TEXT NOT NULL,
+            trigger TEXT NOT NULL,
+            status TEXT NOT NULL,
+            params TEXT,
+            scheduled_for TEXT,
+            holder TEXT,
+            queued_at REAL,
+            started_at REAL,
+            finished_at REAL,
+            duration_s REAL,
+            result TEXT,
+            error TEXT
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_job_runs_slot ON job_runs(job, scheduled_for);
+        CREATE INDEX IF NOT EXISTS idx_job_runs_status ON job_runs(status, id);
+    ''')
     # Add canonical_id columns to existing tables (migration-safe)
     for tbl in ('customers', 'mills'):
         try:
@@ -319,23 +411,20 @@ def init_crm_db():
     conn.commit()
     conn.close()
 
-# Initialize CRM database on startup
-init_crm_db()
-
 def find_or_create_crm_mill(name, city='', state='', region='', lat=None, lon=None, trader=''):
-    """Find mill by company name, or create. Adds location to locations array if new."""
+    """Find mill by company name, or create. Adds location to locations array if new.
+    Runs on the CRM writer so concurrent intakes cannot both create the same company."""
     company = extract_company_name(name)
-    conn = get_crm_db()
-    try:
+    city_clean = city.split(',')[0].strip() if city else ''
+    if not state and city:
+        state = mi_extract_state(city)
+    if not region and state:
+        region = MI_STATE_REGIONS.get(state.upper(), 'central')
+
+    def find_or_create(conn):
         # Look up by company name (case-insensitive)
         mill = conn.execute("SELECT * FROM mills WHERE UPPER(name)=?", (company.upper(),)).fetchone()
 
-        city_clean = city.split(',')[0].strip() if city else ''
-        if not state and city:
-            state = mi_extract_state(city)
-        if not region and state:
-            region = MI_STATE_REGIONS.get(state.upper(), 'central')
-
         if mill:
             # Add location to locations array if not already present
             try:
@@ -369,7 +458,6 @@ def find_or_create_crm_mill(name, city='', state='', region='', lat=None, lon=No
             if updates:
                 vals.append(mill['id'])
                 conn.execute(f"UPDATE mills SET {', '.join(updates)}, updated_at=CURRENT_TIMESTAMP WHERE id=?", vals)
-                conn.commit()
                 mill = conn.execute("SELECT * FROM mills WHERE id=?", (mill['id'],)).fetchone()
             return dict(mill)
 
@@ -379,44 +467,18 @@ def find_or_create_crm_mill(name, city='', state='', region='', lat=None, lon=No
         if city_clean:
             locations.append({'city': city_clean, 'state': state or '', 'lat': lat, 'lon': lon, 'name': name})
 
-        conn.execute(
+        new_id = conn.execute(
             """INSERT INTO mills (name, location, city, state, region, lat, lon, locations, products, notes, trader)
                VALUES (?,?,?,?,?,?,?,?,?,?,?)""",
             (company, location_str, city_clean, state, region, lat, lon,
              json.dumps(locations), '[]', '', trader)
-        )
-        conn.commit()
-        mill = conn.execute("SELECT * FROM mills WHERE id=?", (conn.execute("SELECT last_insert_rowid()").fetchone()[0],)).fetchone()
-        return dict(mill)
-    finally:
-        conn.close()
+        ).lastrowid
+        return dict(conn.execute("SELECT * FROM mills WHERE id=?", (new_id,)).fetchone())
 
-def sync_mill_to_mi(crm_mill, mi_conn=None):
-    """Ensure a CRM mill exists in the MI mills table (for JOINs). Uses same ID."""
-    own_conn = mi_conn is None
-    conn = mi_conn or get_mi_db()
-    existing = conn.execute("SELECT id FROM mills WHERE id=?", (crm_mill['id'],)).fetchone()
-    if not existing:
-        conn.execute(
-            "INSERT OR REPLACE INTO mills (id, name, city, state, lat, lon, region, locations, products, notes) VALUES (?,?,?,?,?,?,?,?,?,?)",
-            (crm_mill['id'], crm_mill['name'], crm_mill.get('city', ''), crm_mill.get('state', ''),
-             crm_mill.get('lat'), crm_mill.get('lon'), crm_mill.get('region', ''),
-             crm_mill.get('locations', '[]'), crm_mill.get('products', '[]'), crm_mill.get('notes', ''))
-        )
-    else:
-        conn.execute(
-            "UPDATE mills SET name=?, city=?, state=?, lat=?, lon=?, region=?, locations=?, products=?, notes=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
-            (crm_mill['name'], crm_mill.get('city', ''), crm_mill.get('state', ''),
-             crm_mill.get('lat'), crm_mill.get('lon'), crm_mill.get('region', ''),
-             crm_mill.get('locations', '[]'), crm_mill.get('products', '[]'), crm_mill.get('notes', ''),
-             crm_mill['id'])
-        )
-    if own_conn:
-        conn.commit()
-        conn.close()
+    return _crm_writer.execute(find_or_create)
 
 # ===== MILL INTEL DATABASE =====
-MI_DB_PATH = os.path.join(os.path.dirname(__file__), 'mill-intel', 'mill_intel.db')
+MI_DB_PATH = os.environ.get('MI_DB_PATH') or os.path.join(os.path.dirname(__file__), 'mill-intel', 'mill_intel.db')
 
 MI_STATE_REGIONS = {
     'TX':'west','LA':'west','AR':'west','OK':'west',
@@ -601,6 +663,7 @@ MILL_COMPANY_ALIASES = {
     # Jordan Lumber
     'jordan': 'Jordan Lumber', 'jordan lumber': 'Jordan Lumber',
 }
+_mill_aliases = AliasMatcher(MILL_COMPANY_ALIASES)
 
 def extract_company_name(mill_name):
     """Extract company name from 'Company - City' format or via alias lookup.
@@ -615,18 +678,10 @@ def extract_company_name(mill_name):
         return name.split(' \u2013 ')[0].strip()
     if ' \u2014 ' in name:  # em-dash
         return name.split(' \u2014 ')[0].strip()
-    # Alias lookup (longest-first for greedy match)
-    # Normalize dashes/underscores to spaces (mirrors frontend behavior)
-    lower = re.sub(r'[_\-\u2013\u2014]+', ' ', name.lower()).strip()
-    lower = re.sub(r'\s+', ' ', lower)
-    for alias, canonical in sorted(MILL_COMPANY_ALIASES.items(), key=lambda x: -len(x[0])):
-        if lower == alias:
-            return canonical
-    # Partial prefix match (require word boundary to avoid false positives)
-    for alias, canonical in sorted(MILL_COMPANY_ALIASES.items(), key=lambda x: -len(x[0])):
-        if lower.startswith(alias + ' '):
-            return canonical
-    return name
+    # Alias lookup on the normalized key (dashes/underscores to spaces, mirrors frontend behavior),
+    # then the longest alias prefixing it on a word boundary
+    lower = name_key(name)
+    return _mill_aliases.match(lower) or _mill_aliases.prefix(lower) or name
 
 def normalize_mill_name(name):
     """Title-case mill names while preserving known abbreviations."""
@@ -672,6 +727,22 @@ _CORP_SUFFIXES_RE = re.compile(
     r'group|holdings|lumber|timber|forest products|building products|distribution|supply)\s*\.?\s*$',
     re.IGNORECASE
 )
+_customer_aliases = AliasMatcher(CUSTOMER_ALIASES)
+_customer_names = None
+
+def get_customer_names(conn):
+    """CustomerNames for the CRM customers on conn, rebuilt only when their version moves
+    (a connection without an integer version is never cached)."""
+    global _customer_names
+    version = get_data_version('customers', conn)
+    cached = _customer_names
+    if cached is not None and isinstance(version, int) and cached.version == version:
+        return cached
+    rows = conn.execute('SELECT DISTINCT name FROM customers').fetchall()
+    names = CustomerNames((row['name'] for row in rows), _customer_aliases, _CORP_SUFFIXES_RE, version)
+    if isinstance(version, int):
+        _customer_names = names
+    return names
 
 def normalize_customer_name(name):
     """Normalize a customer name by stripping common suffixes and matching aliases."""
@@ -681,59 +752,100 @@ def normalize_customer_name(name):
     if not trimmed:
         return trimmed
 
-    # Fetch customer names once from a single DB connection
+    # Existing customers' matching forms, precomputed per CRM customers version
     try:
         conn = get_crm_db()
-        rows = conn.execute('SELECT DISTINCT name FROM customers').fetchall()
-        conn.close()
+        try:
+            customers = get_customer_names(conn)
+        finally:
+            conn.close()
     except Exception:
-        rows = []
+        customers = CustomerNames((), _customer_aliases, _CORP_SUFFIXES_RE)
 
-    # 1. Alias dictionary lookup
-    lower = re.sub(r'[_\-\u2013\u2014]+', ' ', trimmed.lower()).strip()
-    lower = re.sub(r'\s+', ' ', lower)
-    sorted_aliases = sorted(CUSTOMER_ALIASES.items(), key=lambda x: -len(x[0]))
-    for alias, canonical in sorted_aliases:
-        if lower == alias:
-            # Check if an existing customer maps to this same canonical form
-            for row in rows:
-                if row['name']:
-                    row_lower = re.sub(r'[_\-\u2013\u2014]+', ' ', row['name'].lower()).strip()
-                    row_lower = re.sub(r'\s+', ' ', row_lower)
-                    for a2, can2 in sorted_aliases:
-                        if row_lower == a2 and can2 == canonical:
-                            return row['name']
-            return canonical
+    # 1. Alias dictionary lookup; prefer an existing customer with the same canonical form
+    lower = name_key(trimmed)
+    canonical = _customer_aliases.match(lower)
+    if canonical is not None:
+        return customers.by_canonical.get(canonical, canonical)
 
     # 2. Fuzzy match: normalize "&" <-> "and" and check existing customers
-    fuzzy_lower = re.sub(r'\s*&\s*', ' and ', lower)
-    fuzzy_lower = re.sub(r'\s+', ' ', fuzzy_lower).strip()
-    for row in rows:
-        if row['name']:
-            row_fuzzy = re.sub(r'[_\-\u2013\u2014]+', ' ', row['name'].lower()).strip()
-            row_fuzzy = re.sub(r'\s*&\s*', ' and ', row_fuzzy)
-            row_fuzzy = re.sub(r'\s+', ' ', row_fuzzy).strip()
-            if fuzzy_lower == row_fuzzy:
-                return row['name']
+    existing = customers.by_fuzzy.get(fuzzy_key(lower))
+    if existing:
+        return existing
 
     # 3. Check existing customers in DB for suffix-stripped match
     stripped = _CORP_SUFFIXES_RE.sub('', lower).strip()
-    if stripped:
-        for row in rows:
-            if row['name']:
-                db_stripped = _CORP_SUFFIXES_RE.sub('', row['name'].lower()).strip()
-                if stripped == db_stripped:
-                    return row['name']
+    if stripped and stripped in customers.by_stripped:
+        return customers.by_stripped[stripped]
 
     # 4. No match - return trimmed original
     return trimmed
 
-def get_mi_db():
-    conn = sqlite3.connect(MI_DB_PATH, timeout=10)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA foreign_keys=ON")
-    return conn
+def get_mi_db(readonly=False):
+    """Pooled MI connection; see get_crm_db. The CRM database is attached as schema 'crm', so MI
+    queries can join crm.mills directly (unqualified names still resolve to the MI tables)."""
+    return _db_pool.connect(MI_DB_PATH, readonly, attach=(('crm', CRM_DB_PATH),))
+
+def mi_transaction(immediate=False):
+    return _db_pool.transaction(MI_DB_PATH, immediate, attach=(('crm', CRM_DB_PATH),))
+
+# Hot write paths (quote intake, audit log, trade status, offerings) go through one writer thread
+# per database in each worker: request threads queue write units instead of racing for the
+# SQLite write lock, and the writer group-commits whatever has queued up.
+WRITE_QUEUE_MAX = int(os.environ.get('WRITE_QUEUE_MAX', 1000))
+_crm_writer = WriteQueue(lambda: get_crm_db(), 'crm', max_pending=WRITE_QUEUE_MAX)
+_mi_writer = WriteQueue(lambda: get_mi_db(), 'mi', max_pending=WRITE_QUEUE_MAX)
+
+# Reference definition of latest_quotes: rank-1 row per series by window function
+_LATEST_QUOTES_SQL = """
+    SELECT id, mill_name, product, LOWER(REPLACE(product, ' ', '')), length, date, price FROM (
+        SELECT id, mill_name, product, length, date, price, ROW_NUMBER() OVER (
+            PARTITION BY mill_name, product, length
+            ORDER BY date DESC, price ASC, id DESC
+        ) AS rn
+        FROM mill_quotes
+    ) WHERE rn = 1
+"""
+
+def rebuild_latest_quotes(conn):
+    """Repopulate latest_quotes from mill_quotes (caller commits)."""
+    conn.execute("DELETE FROM latest_quotes")
+    conn.execute("INSERT INTO latest_quotes (quote_id, mill_name, product, norm_product, length, date, price) "
+                 + _LATEST_QUOTES_SQL)
+
+_version_conns = threading.local()
+
+def _version_conn(db='mi'):
+    """This thread's connection for version reads on the MI (or 'crm') database, reopened if its path changes."""
+    path = CRM_DB_PATH if db == 'crm' else MI_DB_PATH
+    cached = getattr(_version_conns, db, None)
+    if cached is None or cached[0] != path:
+        if cached is not None:
+            cached[1].close()
+        cached = (path, _db_pool.connect(path, readonly=True))
+        setattr(_version_conns, db, cached)
+    return cached[1]
+
+def get_data_version(name, conn=None):
+    """Current version counter for a data namespace ('quotes', 'rl'; 'mills' lives in the CRM database).
+    Read on every cache lookup, so each thread keeps one open connection for it."""
+    conn = conn or _version_conn()
+    row = conn.execute("SELECT version FROM data_versions WHERE name=?", (name,)).fetchone()
+    return row[0] if row else 0
+
+def bump_data_version(name, conn=None):
+    """Advance a data namespace's version; pass conn to bump inside the caller's transaction."""
+    sql = ("INSERT INTO data_versions (name, version) VALUES (?, 1) "
+           "ON CONFLICT(name) DO UPDATE SET version = version + 1")
+    if conn is not None:
+        conn.execute(sql, (name,))
+        return
+    conn = get_mi_db()
+    try:
+        conn.execute(sql, (name,))
+        conn.commit()
+    finally:
+        conn.close()
 
 def init_mi_db():
     conn = get_mi_db()
@@ -778,6 +890,10 @@ def init_mi_db():
         CREATE INDEX IF NOT EXISTS idx_mq_trader ON mill_quotes(trader);
         CREATE INDEX IF NOT EXISTS idx_mq_composite ON mill_quotes(mill_name, product, date);
         CREATE INDEX IF NOT EXISTS idx_mq_matrix ON mill_quotes(mill_name, product, length, id DESC);
+        -- Case-insensitive series keys used by intake, replace/wipe and price-change maintenance
+        CREATE INDEX IF NOT EXISTS idx_mq_keys ON mill_quotes(UPPER(mill_name), UPPER(product), UPPER(COALESCE(length,'RL')), date);
+        -- Space-insensitive product key used by the latest-quotes ranking
+        CREATE INDEX IF NOT EXISTS idx_mq_product_norm ON mill_quotes(LOWER(REPLACE(product, ' ', '')), date);
 
         CREATE TABLE IF NOT EXISTS customers (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -811,11 +927,45 @@ def init_mi_db():
             UNIQUE(origin, dest)
         );
 
+        -- Persistent geocode / route-distance lookups shared by all workers (see geo_lookup)
+        CREATE TABLE IF NOT EXISTS geo_cache (
+            key TEXT PRIMARY KEY,
+            lat REAL NOT NULL,
+            lon REAL NOT NULL,
+            source TEXT DEFAULT 'nominatim',
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
+        -- State of lanes handed to the background resolver, visible to every worker
+        CREATE TABLE IF NOT EXISTS lane_lookups (
+            origin TEXT NOT NULL,
+            dest TEXT NOT NULL,
+            status TEXT NOT NULL,
+            miles INTEGER,
+            error TEXT,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (origin, dest)
+        );
+        CREATE TABLE IF NOT EXISTS distance_cache (
+            o_lat REAL NOT NULL,
+            o_lon REAL NOT NULL,
+            d_lat REAL NOT NULL,
+            d_lon REAL NOT NULL,
+            miles INTEGER NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (o_lat, o_lon, d_lat, d_lon)
+        ) WITHOUT ROWID;
+
         CREATE TABLE IF NOT EXISTS settings (
             key TEXT PRIMARY KEY,
             value TEXT
         );
 
+        -- Per-namespace data versions; bumped on writes so every worker drops stale cached responses
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        );
+
         CREATE TABLE IF NOT EXISTS mill_price_changes (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             mill_id INTEGER NOT NULL,
@@ -835,7 +985,113 @@ def init_mi_db():
         );
         CREATE INDEX IF NOT EXISTS idx_mpc_mill_product ON mill_price_changes(mill_name, product);
         CREATE INDEX IF NOT EXISTS idx_mpc_date ON mill_price_changes(date);
+        CREATE INDEX IF NOT EXISTS idx_mpc_dedupe ON mill_price_changes(mill_id, product, length, date);
+        CREATE INDEX IF NOT EXISTS idx_mpc_keys ON mill_price_changes(UPPER(mill_name), UPPER(product), UPPER(COALESCE(length,'RL')), date);
+
+        -- Series touched since the last price-change refresh (drained by refresh_price_changes)
+        CREATE TABLE IF NOT EXISTS mill_quote_touches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            mk TEXT NOT NULL,
+            pk TEXT NOT NULL,
+            lk TEXT NOT NULL,
+            date TEXT NOT NULL
+        );
+        CREATE TRIGGER IF NOT EXISTS trg_mq_touch_ins AFTER INSERT ON mill_quotes BEGIN
+            INSERT INTO mill_quote_touches (mk, pk, lk, date)
+            VALUES (UPPER(NEW.mill_name), UPPER(NEW.product), UPPER(COALESCE(NEW.length,'RL')), NEW.date);
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_mq_touch_del AFTER DELETE ON mill_quotes BEGIN
+            INSERT INTO mill_quote_touches (mk, pk, lk, date)
+            VALUES (UPPER(OLD.mill_name), UPPER(OLD.product), UPPER(COALESCE(OLD.length,'RL')), OLD.date);
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_mq_touch_upd AFTER UPDATE OF mill_name, product, length, price, date ON mill_quotes BEGIN
+            INSERT INTO mill_quote_touches (mk, pk, lk, date)
+            VALUES (UPPER(OLD.mill_name), UPPER(OLD.product), UPPER(COALESCE(OLD.length,'RL')), OLD.date);
+            INSERT INTO mill_quote_touches (mk, pk, lk, date)
+            VALUES (UPPER(NEW.mill_name), UPPER(NEW.product), UPPER(COALESCE(NEW.length,'RL')), NEW.date);
+        END;
+
+        -- Quote intake jobs (intake_jobs.py): one row per POST /api/mi/quotes batch, plus the
+        -- mill companies each unfinished job touches, so jobs for a mill apply in order
+        CREATE TABLE IF NOT EXISTS intake_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            status TEXT NOT NULL,
+            stage TEXT,
+            payload TEXT NOT NULL,
+            total INTEGER DEFAULT 0,
+            processed INTEGER DEFAULT 0,
+            attempts INTEGER DEFAULT 0,
+            holder TEXT,
+            result TEXT,
+            error TEXT,
+            queued_at REAL NOT NULL,
+            started_at REAL,
+            heartbeat_at REAL,
+            finished_at REAL,
+            duration_s REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_intake_jobs_status ON intake_jobs(status, id);
+        CREATE TABLE IF NOT EXISTS intake_job_keys (
+            key TEXT NOT NULL,
+            job_id INTEGER NOT NULL,
+            PRIMARY KEY (key, job_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_intake_job_keys_job ON intake_job_keys(job_id);
+
+        -- Newest quote per (mill_name, product, length) series, ranked like the matrix:
+        -- date DESC, price ASC, id DESC. Kept current by the triggers below, so every write
+        -- path updates it in the same transaction as the quote change.
+        CREATE TABLE IF NOT EXISTS latest_quotes (
+            quote_id INTEGER PRIMARY KEY,
+            mill_name TEXT NOT NULL,
+            product TEXT NOT NULL,
+            norm_product TEXT NOT NULL,
+            length TEXT,
+            date TEXT NOT NULL,
+            price REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_lq_series ON latest_quotes(mill_name, product, length);
+        CREATE INDEX IF NOT EXISTS idx_lq_date ON latest_quotes(date);
+        CREATE INDEX IF NOT EXISTS idx_lq_norm ON latest_quotes(norm_product, date);
+        -- Series winner lookup when the current latest quote is deleted or edited
+        CREATE INDEX IF NOT EXISTS idx_mq_latest ON mill_quotes(mill_name, product, length, date DESC, price, id DESC);
+        CREATE TRIGGER IF NOT EXISTS trg_lq_ins AFTER INSERT ON mill_quotes BEGIN
+            DELETE FROM latest_quotes
+            WHERE mill_name = NEW.mill_name AND product = NEW.product AND length IS NEW.length
+              AND (date < NEW.date OR (date = NEW.date AND (price > NEW.price OR (price = NEW.price AND quote_id < NEW.id))));
+            INSERT INTO latest_quotes (quote_id, mill_name, product, norm_product, length, date, price)
+            SELECT NEW.id, NEW.mill_name, NEW.product, LOWER(REPLACE(NEW.product, ' ', '')), NEW.length, NEW.date, NEW.price
+            WHERE NOT EXISTS (SELECT 1 FROM latest_quotes
+                              WHERE mill_name = NEW.mill_name AND product = NEW.product AND length IS NEW.length);
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_lq_del AFTER DELETE ON mill_quotes
+        WHEN EXISTS (SELECT 1 FROM latest_quotes WHERE quote_id = OLD.id) BEGIN
+            DELETE FROM latest_quotes WHERE quote_id = OLD.id;
+            INSERT INTO latest_quotes (quote_id, mill_name, product, norm_product, length, date, price)
+            SELECT id, mill_name, product, LOWER(REPLACE(product, ' ', '')), length, date, price FROM mill_quotes
+            WHERE mill_name = OLD.mill_name AND product = OLD.product AND length IS OLD.length
+            ORDER BY date DESC, price ASC, id DESC LIMIT 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_lq_upd AFTER UPDATE OF mill_name, product, length, price, date ON mill_quotes BEGIN
+            DELETE FROM latest_quotes WHERE quote_id = OLD.id;
+            INSERT INTO latest_quotes (quote_id, mill_name, product, norm_product, length, date, price)
+            SELECT id, mill_name, product, LOWER(REPLACE(product, ' ', '')), length, date, price FROM mill_quotes
+            WHERE mill_name = OLD.mill_name AND product = OLD.product AND length IS OLD.length
+              AND NOT EXISTS (SELECT 1 FROM latest_quotes
+                              WHERE mill_name = OLD.mill_name AND product = OLD.product AND length IS OLD.length)
+            ORDER BY date DESC, price ASC, id DESC LIMIT 1;
+            DELETE FROM latest_quotes
+            WHERE mill_name = NEW.mill_name AND product = NEW.product AND length IS NEW.length
+              AND (date < NEW.date OR (date = NEW.date AND (price > NEW.price OR (price = NEW.price AND quote_id < NEW.id))));
+            INSERT INTO latest_quotes (quote_id, mill_name, product, norm_product, length, date, price)
+            SELECT NEW.id, NEW.mill_name, NEW.product, LOWER(REPLACE(NEW.product, ' ', '')), NEW.length, NEW.date, NEW.price
+            WHERE NOT EXISTS (SELECT 1 FROM latest_quotes
+                              WHERE mill_name = NEW.mill_name AND product = NEW.product AND length IS NEW.length);
+        END;
     ''')
+    # Backfill latest_quotes on first start after the table was added
+    if conn.execute("SELECT NOT EXISTS (SELECT 1 FROM latest_quotes) AND EXISTS (SELECT 1 FROM mill_quotes)").fetchone()[0]:
+        rebuild_latest_quotes(conn)
     # Add locations column if missing (migration)
     try:
         conn.execute("ALTER TABLE mills ADD COLUMN locations TEXT DEFAULT '[]'")
@@ -863,41 +1119,110 @@ def init_mi_db():
     conn.commit()
     conn.close()
 
-init_mi_db()
+# ----- RL snapshot -----
+# Optional prebuilt MI database holding the seeded rl_prices (scripts/build_rl_snapshot.py).
+# It records the SHA-1 of the CSV it was built from and is only used while that still matches.
+RL_CSV_PATH = os.path.join(os.path.dirname(__file__), 'data', 'rl_prices.csv.gz')
+RL_SNAPSHOT_PATH = os.environ.get('RL_SNAPSHOT_PATH') or os.path.join(os.path.dirname(__file__), 'data', 'rl_prices.sqlite')
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def rl_snapshot_path():
+    """RL_SNAPSHOT_PATH if it exists and was built from the current CSV, else None."""
+    if not os.path.exists(RL_SNAPSHOT_PATH):
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{RL_SNAPSHOT_PATH}?mode=ro", uri=True)
+        row = conn.execute("SELECT csv_sha1 FROM rl_snapshot").fetchone()
+        conn.close()
+    except sqlite3.Error as e:
+        print(f"RL snapshot unreadable ({e}) -- ignoring")
+        return None
+    if os.path.exists(RL_CSV_PATH) and (row is None or row[0] != file_sha1(RL_CSV_PATH)):
+        print("RL snapshot is stale (CSV changed) -- ignoring")
+        return None
+    return RL_SNAPSHOT_PATH
+
+def restore_mi_from_snapshot():
+    """Fresh deploy: start the MI database as a copy of the RL snapshot instead of re-parsing the CSV.
+    The copy is linked into place only if no database exists yet, so concurrent workers can't clobber it."""
+    if os.path.exists(MI_DB_PATH):
+        return False
+    snap = rl_snapshot_path()
+    if not snap:
+        return False
+    tmp = f"{MI_DB_PATH}.{os.getpid()}.tmp"
+    try:
+        shutil.copyfile(snap, tmp)
+        os.link(tmp, MI_DB_PATH)
+    except FileExistsError:
+        return False
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    print(f"MI database restored from RL snapshot {snap}")
+    return True
 
 # ââ Entity Resolution engine ââââââââââââââââââââââââââââââââââââââ
-_entity_resolver = EntityResolver(CRM_DB_PATH, MILL_COMPANY_ALIASES)
-
-# Sync CRM mills â MI mills table on startup (keeps JOINs working)
-def sync_crm_mills_to_mi():
-    crm_conn = get_crm_db()
-    crm_mills = crm_conn.execute("SELECT * FROM mills").fetchall()
-    crm_conn.close()
-    mi_conn = get_mi_db()
-    for m in crm_mills:
-        md = dict(m)
-        existing = mi_conn.execute("SELECT id FROM mills WHERE id=?", (md['id'],)).fetchone()
-        existing_name = mi_conn.execute("SELECT id FROM mills WHERE name=? AND id!=?", (md['name'], md['id'])).fetchone() if not existing else None
-        if existing_name:
-            # Name exists with different ID â delete old entry to avoid UNIQUE conflict
-            mi_conn.execute("DELETE FROM mills WHERE id=?", (existing_name['id'],))
-        if existing:
-            mi_conn.execute(
-                "UPDATE mills SET name=?, city=?, state=?, lat=?, lon=?, region=?, locations=?, products=?, notes=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
-                (md['name'], md.get('city', ''), md.get('state', ''),
-                 md.get('lat'), md.get('lon'), md.get('region', ''),
-                 md.get('locations', '[]'), md.get('products', '[]'), md.get('notes', ''),
-                 md['id'])
-            )
-        else:
-            mi_conn.execute(
-                "INSERT INTO mills (id, name, city, state, lat, lon, region, locations, products, notes) VALUES (?,?,?,?,?,?,?,?,?,?)",
-                (md['id'], md['name'], md.get('city', ''), md.get('state', ''),
-                 md.get('lat'), md.get('lon'), md.get('region', ''),
-                 md.get('locations', '[]'), md.get('products', '[]'), md.get('notes', ''))
-            )
-    mi_conn.commit()
-    mi_conn.close()
+_entity_resolver = EntityResolver(CRM_DB_PATH, MILL_COMPANY_ALIASES, pool=_db_pool)
+
+# Mirror CRM mills into the MI mills table: mill_quotes.mill_id references it. Reads join crm.mills
+# directly; the mirror only has to follow CRM writes, which bump the CRM 'mills' change counter.
+_MILL_MIRROR_COLS = ('name', 'city', 'state', 'lat', 'lon', 'region', 'locations', 'products', 'notes')
+
+def sync_crm_mills_to_mi(conn=None, force=False):
+    """Bring the MI mills mirror up to date with CRM in two set-based statements over the attached
+    CRM database. Does nothing while CRM's 'mills' counter matches the one recorded by the last run
+    ('mills_mirror' in MI data_versions), so callers can run it before every quote write.
+    Pass conn (an MI connection) to run inside the caller's transaction.
+    Returns the number of mirror rows written, or None when it was already current."""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_mi_db()
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT version FROM crm.data_versions WHERE name='mills'").fetchone()
+        crm_version = row[0] if row else 0
+        mirrored = conn.execute("SELECT version FROM data_versions WHERE name='mills_mirror'").fetchone()
+        if mirrored and mirrored[0] == crm_version and not force:
+            return None
+        # Duplicate CRM names: the newest row wins, as the per-mill sync used to leave it
+        winners = "SELECT MAX(id) FROM crm.mills GROUP BY name"
+        # A CRM mill re-created under a new id: its old mirror row holds the (UNIQUE) name and may
+        # still be referenced by quotes. Free the name now; children move to the new id below.
+        moves = conn.execute(f"""SELECT mm.id, c.id FROM main.mills mm
+                                 JOIN crm.mills c ON c.name = mm.name AND c.id != mm.id
+                                 WHERE c.id IN ({winners})""").fetchall()
+        conn.executemany("UPDATE main.mills SET name = '#' || id || ' ' || name WHERE id=?",
+                         [(old,) for old, _ in moves])
+        cols = ', '.join(_MILL_MIRROR_COLS)
+        written = conn.execute(f"""
+            INSERT INTO main.mills (id, {cols})
+            SELECT id, {cols} FROM crm.mills WHERE id IN ({winners})
+            ON CONFLICT(id) DO UPDATE SET {', '.join(f'{c}=excluded.{c}' for c in _MILL_MIRROR_COLS)},
+                updated_at=CURRENT_TIMESTAMP
+            WHERE {' OR '.join(f'mills.{c} IS NOT excluded.{c}' for c in _MILL_MIRROR_COLS)}
+        """).rowcount
+        for table in ('mill_quotes', 'mill_price_changes'):
+            conn.executemany(f"UPDATE {table} SET mill_id=? WHERE mill_id=?", [(new, old) for old, new in moves])
+        conn.executemany("DELETE FROM main.mills WHERE id=?", [(old,) for old, _ in moves])
+        conn.execute("INSERT INTO data_versions (name, version) VALUES ('mills_mirror', ?) "
+                     "ON CONFLICT(name) DO UPDATE SET version=excluded.version", (crm_version,))
+        if own_conn:
+            conn.commit()
+        return written
+    except Exception:
+        if own_conn:
+            conn.rollback()
+        raise
+    finally:
+        if own_conn:
+            conn.close()
 
 # Seed CRM mills from MILL_DIRECTORY, grouped by company
 def seed_crm_mills():
@@ -931,9 +1256,6 @@ def seed_crm_mills():
         print(f"Seeded {added} company mills from MILL_DIRECTORY into CRM")
     conn.close()
 
-seed_crm_mills()
-sync_crm_mills_to_mi()
-
 # Seed Mill Intel SQLite from Supabase cloud data on startup
 # This ensures Railway (ephemeral filesystem) always has mill quotes after deploy
 def seed_mi_from_supabase():
@@ -1043,9 +1365,9 @@ def seed_mi_from_supabase():
                     )
                     crm_conn.commit()
                     mill_row = crm_conn.execute("SELECT id FROM mills WHERE UPPER(name)=?", (mill_name.upper(),)).fetchone()
-                    # Sync new mill to MI
-                    new_mill = crm_conn.execute("SELECT * FROM mills WHERE id=?", (mill_row['id'],)).fetchone()
-                    sync_mill_to_mi(dict(new_mill), mi_conn=mi_conn)
+                    # Sync new mill to MI; commit first so the mirror reads CRM in a fresh transaction
+                    mi_conn.commit()
+                    sync_crm_mills_to_mi(mi_conn)
 
                 mill_id = mill_row['id']
                 length = q.get('length', 'RL') or 'RL'
@@ -1096,8 +1418,8 @@ def seed_mi_from_supabase():
                 print(f"  Seeded {added} customers from cloud")
             crm_conn.close()
 
-        # Recompute price changes from the seeded quotes
-        recompute_price_changes()
+        # Bring price changes up to date for the seeded quotes
+        refresh_price_changes()
 
         print("Cloud seed complete!")
     except requests.exceptions.Timeout:
@@ -1107,60 +1429,189 @@ def seed_mi_from_supabase():
     except Exception as e:
         print(f"Cloud seed error: {type(e).__name__}: {e}")
 
+def _derive_price_changes(rows):
+    """Walk deduplicated quote rows (ordered by series, then date) and yield a
+    mill_price_changes tuple wherever the price moved between consecutive dates."""
+    prev = None
+    for r in rows:
+        key = (r['mill_name'].upper(), r['product'].upper(), (r['length'] or 'RL').upper())
+        curr_price = r['price']
+
+        if prev and prev['key'] == key and prev['date'] != r['date'] and abs(curr_price - prev['price']) > 0.001:
+            change_val = round(curr_price - prev['price'], 2)
+            pct_val = round((change_val / prev['price']) * 100, 2) if prev['price'] else None
+            yield (r['mill_id'], r['mill_name'], r['product'], r['length'] or 'RL',
+                   prev['price'], curr_price, change_val, pct_val,
+                   r['date'], prev['date'], r['source'] or 'recompute', r['trader'] or '')
+
+        prev = {'key': key, 'price': curr_price, 'date': r['date']}
+
+_MPC_INSERT_SQL = """INSERT INTO mill_price_changes (mill_id, mill_name, product, length,
+    old_price, new_price, change, pct_change, date, prev_date, source, trader)
+    VALUES (?,?,?,?,?,?,?,?,?,?,?,?)"""
+
+_MPC_FULL_ROWS_SQL = """SELECT mill_id, mill_name, product, length, price, date, trader, source
+    FROM mill_quotes
+    WHERE id IN (
+        SELECT MAX(id) FROM mill_quotes
+        GROUP BY UPPER(mill_name), UPPER(product), UPPER(COALESCE(length,'RL')), date
+    )
+    ORDER BY UPPER(mill_name), UPPER(product), UPPER(COALESCE(length,'RL')), date ASC"""
+
+def _set_mpc_watermark(conn, touch_id):
+    """Mark mill_quote_touches up to touch_id as applied and prune them."""
+    conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('mpc_watermark', ?)", (str(touch_id),))
+    conn.execute("DELETE FROM mill_quote_touches WHERE id <= ?", (touch_id,))
+
 def recompute_price_changes():
     """Recompute mill_price_changes from mill_quotes data.
     Deduplicates by taking one price per mill+product+length+date (latest entry wins),
     then generates change records wherever price differs between consecutive dates.
-    Called after seed_mi_from_supabase() and syncMillQuotesToMillIntel().
+    Full rebuild; refresh_price_changes() is the incremental path, and
+    verify_price_changes() checks the table against this result.
     """
     conn = get_mi_db()
     try:
+        conn.execute("BEGIN IMMEDIATE")
+        touch_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM mill_quote_touches").fetchone()[0]
+
         # Clear existing price changes (will rebuild from scratch)
         conn.execute("DELETE FROM mill_price_changes")
 
         # Get deduplicated quotes: one price per mill+product+length+date (latest id wins)
+        rows = conn.execute(_MPC_FULL_ROWS_SQL).fetchall()
+        changes = list(_derive_price_changes(rows))
+        conn.executemany(_MPC_INSERT_SQL, changes)
+        _set_mpc_watermark(conn, touch_id)
+
+        conn.commit()
+        conn.close()
+        print(f"  Recomputed {len(changes)} mill price changes from {len(rows)} quotes")
+    except Exception as e:
+        conn.close()
+        print(f"  Price change recomputation error: {e}")
+
+def refresh_price_changes():
+    """Incrementally maintain mill_price_changes.
+    Only the (mill, product, length) series touched since the persisted watermark are
+    rebuilt, starting from the earliest touched date. Falls back to a full recompute
+    when no watermark exists yet (fresh DB or first run after upgrade)."""
+    conn = get_mi_db()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        wm = conn.execute("SELECT value FROM settings WHERE key='mpc_watermark'").fetchone()
+        if wm is None:
+            conn.rollback()
+            conn.close()
+            recompute_price_changes()
+            return {'mode': 'full'}
+        watermark = int(wm['value'])
+        touch_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM mill_quote_touches").fetchone()[0]
+        if touch_id <= watermark:
+            conn.rollback()
+            conn.close()
+            return {'mode': 'incremental', 'series': 0, 'changes': 0}
+
+        # Untyped key columns so the joins below can use idx_mq_keys / idx_mpc_keys
+        conn.execute("CREATE TEMP TABLE _mpc_dirty (mk, pk, lk, since TEXT, PRIMARY KEY (mk, pk, lk))")
+        conn.execute(
+            """INSERT INTO temp._mpc_dirty (mk, pk, lk, since)
+               SELECT mk, pk, lk, MIN(date) FROM mill_quote_touches
+               WHERE id > ? AND id <= ? GROUP BY mk, pk, lk""",
+            (watermark, touch_id)
+        )
+        since = {(r['mk'], r['pk'], r['lk']): r['since']
+                 for r in conn.execute("SELECT * FROM temp._mpc_dirty").fetchall()}
+
+        # Deduplicated rows for dirty series only, same ordering as the full rebuild
         rows = conn.execute(
-            """SELECT mill_id, mill_name, product, length, price, date, trader, source
+            """SELECT mill_id, mill_name, product, length, price, date, trader, source,
+                      UPPER(mill_name) AS mk, UPPER(product) AS pk, UPPER(COALESCE(length,'RL')) AS lk
                FROM mill_quotes
                WHERE id IN (
-                   SELECT MAX(id) FROM mill_quotes
-                   GROUP BY UPPER(mill_name), UPPER(product), UPPER(COALESCE(length,'RL')), date
+                   SELECT MAX(q.id) FROM temp._mpc_dirty d CROSS JOIN mill_quotes q
+                   WHERE UPPER(q.mill_name)=d.mk AND UPPER(q.product)=d.pk AND UPPER(COALESCE(q.length,'RL'))=d.lk
+                   GROUP BY d.mk, d.pk, d.lk, q.date
                )
                ORDER BY UPPER(mill_name), UPPER(product), UPPER(COALESCE(length,'RL')), date ASC"""
         ).fetchall()
 
-        if not rows:
-            conn.commit()
-            conn.close()
-            return
-
-        changes_added = 0
-        prev = None
+        # Keep the last row before the touched date as the anchor; everything after is re-derived
+        kept = []
+        anchor = None
         for r in rows:
-            key = (r['mill_name'].upper(), r['product'].upper(), (r['length'] or 'RL').upper())
-            curr_price = r['price']
-
-            if prev and prev['key'] == key and prev['date'] != r['date'] and abs(curr_price - prev['price']) > 0.001:
-                change_val = round(curr_price - prev['price'], 2)
-                pct_val = round((change_val / prev['price']) * 100, 2) if prev['price'] else None
-                conn.execute(
-                    """INSERT INTO mill_price_changes (mill_id, mill_name, product, length,
-                       old_price, new_price, change, pct_change, date, prev_date, source, trader)
-                       VALUES (?,?,?,?,?,?,?,?,?,?,?,?)""",
-                    (r['mill_id'], r['mill_name'], r['product'], r['length'] or 'RL',
-                     prev['price'], curr_price, change_val, pct_val,
-                     r['date'], prev['date'], r['source'] or 'recompute', r['trader'] or '')
-                )
-                changes_added += 1
-
-            prev = {'key': key, 'price': curr_price, 'date': r['date']}
+            key = (r['mk'], r['pk'], r['lk'])
+            if r['date'] < since[key]:
+                anchor = r
+                continue
+            if anchor is not None and (anchor['mk'], anchor['pk'], anchor['lk']) == key:
+                kept.append(anchor)
+            anchor = None
+            kept.append(r)
+        changes = list(_derive_price_changes(kept))
 
+        conn.execute(
+            """DELETE FROM mill_price_changes WHERE id IN (
+                   SELECT p.id FROM temp._mpc_dirty d CROSS JOIN mill_price_changes p
+                   WHERE UPPER(p.mill_name)=d.mk AND UPPER(p.product)=d.pk
+                     AND UPPER(COALESCE(p.length,'RL'))=d.lk AND p.date >= d.since)"""
+        )
+        conn.executemany(_MPC_INSERT_SQL, changes)
+        _set_mpc_watermark(conn, touch_id)
         conn.commit()
+        conn.execute("DROP TABLE IF EXISTS temp._mpc_dirty")
         conn.close()
-        print(f"  Recomputed {changes_added} mill price changes from {len(rows)} quotes")
+        return {'mode': 'incremental', 'series': len(since), 'changes': len(changes)}
     except Exception as e:
         conn.close()
-        print(f"  Price change recomputation error: {e}")
+        print(f"  Price change refresh error: {e}")
+        return {'mode': 'incremental', 'error': str(e)}
+
+def verify_price_changes():
+    """Compare mill_price_changes against a full in-memory recompute (no writes)."""
+    from collections import Counter
+    conn = get_mi_db()
+    try:
+        expected = Counter(_derive_price_changes(conn.execute(_MPC_FULL_ROWS_SQL).fetchall()))
+        actual = Counter(tuple(r) for r in conn.execute(
+            """SELECT mill_id, mill_name, product, length, old_price, new_price, change, pct_change,
+                      date, prev_date, source, trader FROM mill_price_changes"""
+        ).fetchall())
+    finally:
+        conn.close()
+    missing = expected - actual
+    extra = actual - expected
+    return {
+        'ok': not missing and not extra,
+        'expected': sum(expected.values()),
+        'actual': sum(actual.values()),
+        'missing': sum(missing.values()),
+        'extra': sum(extra.values()),
+        'sample_missing': [list(t) for t in list(missing)[:5]],
+        'sample_extra': [list(t) for t in list(extra)[:5]],
+    }
+
+def verify_latest_quotes():
+    """Compare latest_quotes against the window-function ranking over mill_quotes (no writes)."""
+    conn = get_mi_db()
+    try:
+        expected = set(tuple(r) for r in conn.execute(_LATEST_QUOTES_SQL).fetchall())
+        actual = set(tuple(r) for r in conn.execute(
+            "SELECT quote_id, mill_name, product, norm_product, length, date, price FROM latest_quotes"
+        ).fetchall())
+    finally:
+        conn.close()
+    missing = expected - actual
+    extra = actual - expected
+    return {
+        'ok': not missing and not extra,
+        'expected': len(expected),
+        'actual': len(actual),
+        'missing': len(missing),
+        'extra': len(extra),
+        'sample_missing': [list(t) for t in list(missing)[:5]],
+        'sample_extra': [list(t) for t in list(extra)[:5]],
+    }
 
 def mi_extract_state(location):
     if not location:
@@ -1177,47 +1628,120 @@ def mi_get_region(state_code):
 
 
 # ----- Seed rl_prices from gzipped CSV (historical Random Lengths data) -----
+# Bulk loads run on their own connection with relaxed pragmas (synchronous=NORMAL is safe
+# under WAL), in one transaction. Loading into an empty table drops the secondary indexes
+# first and rebuilds them once at the end, which beats maintaining them row by row.
+
+RL_LOAD_CHUNK = 50000
+RL_INDEXES = [
+    ('idx_rl_date', "CREATE INDEX IF NOT EXISTS idx_rl_date ON rl_prices(date)"),
+    ('idx_rl_product_region', "CREATE INDEX IF NOT EXISTS idx_rl_product_region ON rl_prices(product, region)"),
+    ('idx_rl_unique', "CREATE UNIQUE INDEX IF NOT EXISTS idx_rl_unique ON rl_prices(date, region, product, length)"),
+]
+
+def iter_rl_csv(path, chunk_size=RL_LOAD_CHUNK):
+    """Stream (date, region, product, length, price) rows from the gzipped RL CSV in chunks."""
+    with gzip.open(path, 'rt', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            return
+        cols = [header.index(c) for c in ('date', 'region', 'product', 'length', 'price')]
+        i_date, i_region, i_product, i_length, i_price = cols
+        chunk = []
+        for row in reader:
+            try:
+                price = float(row[i_price])
+                if price <= 0:
+                    continue
+                chunk.append((row[i_date], row[i_region], row[i_product], row[i_length], price))
+            except (ValueError, IndexError):
+                continue
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+def get_rl_load_db():
+    """MI connection tuned for one large write transaction (kept out of the pool: the pragmas stick)."""
+    conn = get_mi_db().detach()
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+def bulk_load_rl(conn, chunks=None, attach=None):
+    """Insert RL rows with INSERT OR IGNORE semantics (first row per key wins) in one transaction.
+    Rows come from chunks (lists of tuples) or from the rl_prices table of an attached database.
+    Returns the number of rows added."""
+    before = conn.execute("SELECT COUNT(*) FROM rl_prices").fetchone()[0]
+    defer = before == 0
+    if attach:
+        conn.execute("ATTACH DATABASE ? AS rl_src", (attach,))
+    try:
+        conn.execute("BEGIN")   # explicit, so the index drops roll back with the rows
+        if defer:
+            for name, _ in RL_INDEXES:
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+        verb = "INSERT" if defer else "INSERT OR IGNORE"
+        if attach:
+            conn.execute(f"""{verb} INTO rl_prices (date, region, product, length, price)
+                             SELECT date, region, product, length, price FROM rl_src.rl_prices ORDER BY id""")
+        for chunk in chunks or []:
+            conn.executemany(f"{verb} INTO rl_prices (date, region, product, length, price) VALUES (?,?,?,?,?)", chunk)
+        if defer:
+            try:
+                for _, sql in RL_INDEXES:
+                    conn.execute(sql)
+            except sqlite3.IntegrityError:
+                # Duplicate keys in the source: keep the first of each, as INSERT OR IGNORE would have
+                conn.execute("""DELETE FROM rl_prices WHERE id NOT IN (
+                                    SELECT MIN(id) FROM rl_prices GROUP BY date, region, product, length)""")
+                for _, sql in RL_INDEXES:
+                    conn.execute(sql)
+        added = conn.execute("SELECT COUNT(*) FROM rl_prices").fetchone()[0] - before
+        if added:
+            bump_data_version('rl', conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if attach:
+            conn.execute("DETACH DATABASE rl_src")
+    return added
 
 def seed_rl_from_csv():
-    """Seed rl_prices table from data/rl_prices.csv.gz on startup if empty."""
-    csv_path = os.path.join(os.path.dirname(__file__), 'data', 'rl_prices.csv.gz')
-    if not os.path.exists(csv_path):
-        print("RL CSV not found â skipping historical seed")
+    """Seed rl_prices table from data/rl_prices.csv.gz on startup if empty (or from the RL snapshot)."""
+    csv_path = RL_CSV_PATH
+    snap = rl_snapshot_path()
+    if not os.path.exists(csv_path) and not snap:
+        print("RL CSV not found â skipping historical seed")
         return
 
     conn = get_mi_db()
     count = conn.execute("SELECT COUNT(*) FROM rl_prices").fetchone()[0]
     if count > 0:
         conn.close()
-        print(f"RL already has {count} prices â skipping CSV seed")
+        print(f"RL already has {count} prices â skipping CSV seed")
         return
     conn.close()
 
-    print(f"Seeding rl_prices from {csv_path}...")
+    t0 = time.time()
+    conn = get_rl_load_db()
     try:
-        rows = []
-        with gzip.open(csv_path, 'rt') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                try:
-                    price = float(row['price'])
-                    if price <= 0:
-                        continue
-                    rows.append((row['date'], row['region'], row['product'], row['length'], price))
-                except (ValueError, KeyError):
-                    continue
-
-        if rows:
-            conn = get_mi_db()
-            conn.executemany(
-                "INSERT OR IGNORE INTO rl_prices (date, region, product, length, price) VALUES (?,?,?,?,?)",
-                rows
-            )
-            conn.commit()
-            conn.close()
-            print(f"  Seeded {len(rows)} RL prices from CSV")
+        if snap:
+            print(f"Seeding rl_prices from snapshot {snap}...")
+            added = bulk_load_rl(conn, attach=snap)
+        else:
+            print(f"Seeding rl_prices from {csv_path}...")
+            added = bulk_load_rl(conn, iter_rl_csv(csv_path))
+        print(f"  Seeded {added} RL prices in {time.time() - t0:.1f}s")
     except Exception as e:
         print(f"RL CSV seed error: {type(e).__name__}: {e}")
+    finally:
+        conn.close()
 
 def seed_rl_from_supabase():
     """Backfill recent RL entries from Supabase cloud (captures weekly uploads since CSV was committed)."""
@@ -1263,28 +1787,24 @@ def seed_rl_from_supabase():
                             rows.append((date, region, product, str(length), float(price)))
 
         if rows:
-            conn = get_mi_db()
-            conn.executemany(
-                "INSERT OR IGNORE INTO rl_prices (date, region, product, length, price) VALUES (?,?,?,?,?)",
-                rows
-            )
-            conn.commit()
-            inserted = conn.total_changes
-            conn.close()
+            conn = get_rl_load_db()
+            try:
+                inserted = bulk_load_rl(conn, [rows[i:i + RL_LOAD_CHUNK] for i in range(0, len(rows), RL_LOAD_CHUNK)])
+            finally:
+                conn.close()
             if inserted:
                 print(f"  Backfilled {inserted} RL prices from Supabase cloud")
     except Exception as e:
         print(f"RL Supabase seed error: {type(e).__name__}: {e}")
 
-seed_rl_from_csv()
-
 def mi_geocode_location(location):
     """Geocode using shared geo_cache, with DB fallback then Nominatim."""
     if not location:
         return None
     cache_key = location.lower().strip()
-    if cache_key in geo_cache:
-        return geo_cache[cache_key]
+    coords = geo_lookup(cache_key)
+    if coords:
+        return coords
     # Check DB for stored coords
     try:
         conn = get_mi_db()
@@ -1292,7 +1812,7 @@ def mi_geocode_location(location):
         conn.close()
         if row:
             coords = {'lat': row['lat'], 'lon': row['lon']}
-            geo_cache[cache_key] = coords
+            geo_store(cache_key, coords, 'mills')
             return coords
     except:
         pass
@@ -1302,97 +1822,348 @@ def mi_get_distance(origin_coords, dest_coords):
     """Delegate to shared get_distance (with caching)."""
     return get_distance(origin_coords, dest_coords)
 
-# Shared geocode + distance caches (populated from CRM mills on startup)
-geo_cache = {}
-distance_cache = {}
+# Shared geocode + distance caches. The geo_cache / distance_cache tables in the MI database
+# are the shared store (all workers, survives restarts); these bounded LRUs are the
+# per-process tier in front of them, filled lazily on lookup.
+GEO_CACHE_MAX = 5000
+DISTANCE_CACHE_MAX = 20000
+geo_cache = LRUDict('geo', GEO_CACHE_MAX)
+distance_cache = LRUDict('distance', DISTANCE_CACHE_MAX)
+_lookup_stats = {
+    'geo': {'db_hits': 0, 'db_misses': 0, 'writes': 0},
+    'distance': {'db_hits': 0, 'db_misses': 0, 'writes': 0},
+    'lanes': {'hits': 0, 'misses': 0, 'writes': 0},
+}
+_lookup_stats_lock = threading.Lock()
+
+def _count_lookup(kind, **deltas):
+    """Add to _lookup_stats[kind]; request threads and the lookup workers all count here."""
+    with _lookup_stats_lock:
+        for name, delta in deltas.items():
+            _lookup_stats[kind][name] += delta
+
+def _lookup_counts(kind):
+    with _lookup_stats_lock:
+        return dict(_lookup_stats[kind])
+
+def geo_lookup(cache_key):
+    """Cached coords for a normalized location key (memory, then SQLite), or None."""
+    coords = geo_cache.get(cache_key)
+    if coords is not None:
+        return coords
+    try:
+        conn = get_mi_db()
+        row = conn.execute("SELECT lat, lon FROM geo_cache WHERE key=?", (cache_key,)).fetchone()
+        conn.close()
+    except sqlite3.Error:
+        return None
+    if row is None:
+        if _geo_warm():
+            return geo_lookup(cache_key)
+        _count_lookup('geo', db_misses=1)
+        return None
+    _count_lookup('geo', db_hits=1)
+    coords = {'lat': row['lat'], 'lon': row['lon']}
+    geo_cache[cache_key] = coords
+    return coords
+
+def geo_store(cache_key, coords, source='nominatim'):
+    """Remember resolved coords in memory and in the shared table."""
+    geo_cache[cache_key] = coords
+    try:
+        conn = get_mi_db()
+        conn.execute("INSERT OR REPLACE INTO geo_cache (key, lat, lon, source) VALUES (?,?,?,?)",
+                     (cache_key, coords['lat'], coords['lon'], source))
+        conn.commit()
+        conn.close()
+        _count_lookup('geo', writes=1)
+    except sqlite3.Error as e:
+        print(f"geo_cache write failed for {cache_key}: {e}")
+
+def distance_lookup(cache_key):
+    """Cached miles for a rounded (o_lat, o_lon, d_lat, d_lon) key (memory, then SQLite), or None."""
+    miles = distance_cache.get(cache_key)
+    if miles is not None:
+        return miles
+    try:
+        conn = get_mi_db()
+        row = conn.execute("SELECT miles FROM distance_cache WHERE o_lat=? AND o_lon=? AND d_lat=? AND d_lon=?",
+                           cache_key).fetchone()
+        conn.close()
+    except sqlite3.Error:
+        return None
+    if row is None:
+        _count_lookup('distance', db_misses=1)
+        return None
+    _count_lookup('distance', db_hits=1)
+    distance_cache[cache_key] = row['miles']
+    return row['miles']
+
+def distance_store(cache_key, miles):
+    distance_cache[cache_key] = miles
+    try:
+        conn = get_mi_db()
+        conn.execute("INSERT OR REPLACE INTO distance_cache (o_lat, o_lon, d_lat, d_lon, miles) VALUES (?,?,?,?,?)",
+                     cache_key + (miles,))
+        conn.commit()
+        conn.close()
+        _count_lookup('distance', writes=1)
+    except sqlite3.Error as e:
+        print(f"distance_cache write failed: {e}")
+
+def distance_lookup_many(keys):
+    """Cached miles for many distance keys (memory, then one SQLite connection): {key: miles}."""
+    found = {}
+    missing = []
+    for key in set(keys):
+        miles = distance_cache.get(key)
+        if miles is not None:
+            found[key] = miles
+        else:
+            missing.append(key)
+    if not missing:
+        return found
+    try:
+        conn = get_mi_db()
+        for key in missing:
+            row = conn.execute("SELECT miles FROM distance_cache WHERE o_lat=? AND o_lon=? AND d_lat=? AND d_lon=?",
+                               key).fetchone()
+            if row is not None:
+                found[key] = row['miles']
+                distance_cache[key] = row['miles']
+        conn.close()
+    except sqlite3.Error:
+        return found
+    hits = sum(1 for key in missing if key in found)
+    _count_lookup('distance', db_hits=hits, db_misses=len(missing) - hits)
+    return found
+
+def distance_store_many(miles_by_key):
+    """distance_store for a batch, in one transaction."""
+    if not miles_by_key:
+        return
+    for key, miles in miles_by_key.items():
+        distance_cache[key] = miles
+    try:
+        conn = get_mi_db()
+        conn.executemany("INSERT OR REPLACE INTO distance_cache (o_lat, o_lon, d_lat, d_lon, miles) VALUES (?,?,?,?,?)",
+                         [key + (miles,) for key, miles in miles_by_key.items()])
+        conn.commit()
+        conn.close()
+        _count_lookup('distance', writes=len(miles_by_key))
+    except sqlite3.Error as e:
+        print(f"distance_cache write failed: {e}")
+
+def lookup_lane_miles(pairs):
+    """Known miles from the lanes table for (origin, dest) pairs, in one query: {(origin, dest): miles}."""
+    pairs = list(set(pairs))
+    found = {}
+    if not pairs:
+        return found
+    conn = get_mi_db()
+    try:
+        for i in range(0, len(pairs), 400):
+            chunk = pairs[i:i + 400]
+            where = ' OR '.join(['(origin=? AND dest=?)'] * len(chunk))
+            params = [v for pair in chunk for v in pair]
+            for r in conn.execute(f"SELECT origin, dest, miles FROM lanes WHERE {where}", params).fetchall():
+                found[(r['origin'], r['dest'])] = r['miles']
+    finally:
+        conn.close()
+    _count_lookup('lanes', hits=len(found), misses=len(pairs) - len(found))
+    return found
+
+def store_lane_miles(origin, dest, miles):
+    """Record a computed lane so later lookups skip geocoding and routing."""
+    try:
+        conn = get_mi_db()
+        conn.execute("INSERT OR IGNORE INTO lanes (origin, dest, miles) VALUES (?,?,?)", (origin, dest, miles))
+        conn.commit()
+        conn.close()
+        _count_lookup('lanes', writes=1)
+    except sqlite3.Error as e:
+        print(f"lane write failed for {origin} -> {dest}: {e}")
+
+def store_lanes_many(rows):
+    """store_lane_miles for a batch of (origin, dest, miles), in one transaction."""
+    if not rows:
+        return
+    try:
+        conn = get_mi_db()
+        conn.executemany("INSERT OR IGNORE INTO lanes (origin, dest, miles) VALUES (?,?,?)", rows)
+        conn.commit()
+        conn.close()
+        _count_lookup('lanes', writes=len(rows))
+    except sqlite3.Error as e:
+        print(f"lane write failed: {e}")
+
+def resolve_lane_miles(origin, dest):
+    """Miles between two locations: lanes table first, then geocode + route (written back)."""
+    known = lookup_lane_miles([(origin, dest)])
+    if known:
+        return float(known[(origin, dest)])
+    coords_o = geocode_location(origin)
+    coords_d = geocode_location(dest)
+    if not coords_o or not coords_d:
+        return None
+    miles = get_distance(coords_o, coords_d)
+    if miles:
+        store_lane_miles(origin, dest, miles)
+    return miles
+
+# ----- Response caches -----
+# LRU + TTL caches tagged with a data version kept in the MI database (data_versions, see
+# bump_data_version), so a write handled by one gunicorn worker invalidates the cached
+# responses of all of them.
 
 # Matrix response cache (short TTL to handle concurrent requests)
-_matrix_cache = {}
-_matrix_cache_ttl = 120  # seconds (increased from 30 â data only covers 2 days, cache invalidated on every POST)
+_matrix_cache = VersionedCache('matrix', maxsize=20, ttl=120, version_fn=lambda: get_data_version('quotes'))
+
+# RL price cache (data changes weekly, so 1-hour TTL is fine)
+_rl_cache = VersionedCache('rl', maxsize=50, ttl=3600, version_fn=lambda: get_data_version('rl'))
+
+_response_caches = {c.name: c for c in (_matrix_cache, _rl_cache)}
 
 def get_cached_matrix(cache_key):
     """Get cached matrix response if still valid."""
-    if cache_key in _matrix_cache:
-        data, timestamp = _matrix_cache[cache_key]
-        if time.time() - timestamp < _matrix_cache_ttl:
-            return data
-        del _matrix_cache[cache_key]
-    return None
+    return _matrix_cache.get(cache_key)
 
 def set_cached_matrix(cache_key, data):
     """Cache matrix response."""
-    _matrix_cache[cache_key] = (data, time.time())
-    # Cleanup old entries (keep cache size reasonable)
-    if len(_matrix_cache) > 20:
-        oldest_key = min(_matrix_cache.keys(), key=lambda k: _matrix_cache[k][1])
-        del _matrix_cache[oldest_key]
+    _matrix_cache.set(cache_key, data)
 
 def invalidate_matrix_cache():
-    """Clear matrix cache (call when quotes are added/updated)."""
-    global _matrix_cache
-    _matrix_cache = {}
-
-# RL price cache (data changes weekly, so 1-hour TTL is fine)
-_rl_cache = {}
-_rl_cache_ttl = 3600  # 1 hour
+    """Invalidate matrix responses in every worker (call when quotes are added/updated)."""
+    bump_data_version('quotes')
+    _matrix_cache.clear()
 
 def get_rl_cached(cache_key):
     """Get cached RL response if still valid."""
-    if cache_key in _rl_cache:
-        data, timestamp = _rl_cache[cache_key]
-        if time.time() - timestamp < _rl_cache_ttl:
-            return data
-        del _rl_cache[cache_key]
-    return None
+    return _rl_cache.get(cache_key)
 
 def set_rl_cache(cache_key, data):
     """Cache RL response."""
-    _rl_cache[cache_key] = (data, time.time())
-    if len(_rl_cache) > 50:
-        oldest_key = min(_rl_cache.keys(), key=lambda k: _rl_cache[k][1])
-        del _rl_cache[oldest_key]
+    _rl_cache.set(cache_key, data)
 
 def invalidate_rl_cache():
-    """Clear RL cache (call when new RL data is saved)."""
-    global _rl_cache
-    _rl_cache = {}
+    """Invalidate RL responses in every worker (call when new RL data is saved)."""
+    bump_data_version('rl')
+    _rl_cache.clear()
+
+# ----- RL price store -----
+# rl_prices (~323k rows, new prints weekly) held in memory as one RLPriceStore per process.
+# Its version is the 'rl' data version plus MAX(id), so rl_save / backfill bumps and direct
+# inserts both trigger a reload; readers keep whichever store they fetched.
+_rl_store = None
+_rl_store_lock = threading.Lock()
+
+def _rl_store_version(conn=None):
+    conn = conn or _version_conn()
+    max_id = conn.execute("SELECT MAX(id) FROM rl_prices").fetchone()[0]
+    return (MI_DB_PATH, get_data_version('rl', conn), max_id)
+
+def get_rl_store():
+    """Current RLPriceStore, reloaded (and swapped in whole) when rl_prices has changed."""
+    global _rl_store
+    version = _rl_store_version()
+    store = _rl_store
+    if store is not None and store.version == version:
+        return store
+    with _rl_store_lock:
+        if _rl_store is None or _rl_store.version != _rl_store_version():
+            conn = get_mi_db()
+            try:
+                _rl_store = RLPriceStore.from_db(conn, _rl_store_version)
+            finally:
+                conn.close()
+        return _rl_store
 
 def warm_geo_cache():
-    """Pre-load geo_cache from CRM mills that have lat/lon stored."""
+    """Copy CRM mill coordinates into the persistent geo_cache table (memory fills lazily)."""
     try:
         conn = get_crm_db()
         rows = conn.execute("SELECT city, state, location, lat, lon FROM mills WHERE lat IS NOT NULL AND lon IS NOT NULL").fetchall()
         conn.close()
+        entries = {}
         for r in rows:
-            coords = {'lat': r['lat'], 'lon': r['lon']}
             # Cache by "city, state" and by "location" field
             if r['city'] and r['state']:
-                geo_cache[f"{r['city']}, {r['state']}".lower().strip()] = coords
+                entries[f"{r['city']}, {r['state']}".lower().strip()] = (r['lat'], r['lon'])
             if r['location']:
-                geo_cache[r['location'].lower().strip()] = coords
-        print(f"Geo cache warmed: {len(geo_cache)} entries from CRM mills")
+                entries[r['location'].lower().strip()] = (r['lat'], r['lon'])
+        mi_conn = get_mi_db()
+        mi_conn.executemany("INSERT OR REPLACE INTO geo_cache (key, lat, lon, source) VALUES (?,?,?,'crm')",
+                            [(k, lat, lon) for k, (lat, lon) in entries.items()])
+        mi_conn.commit()
+        total = mi_conn.execute("SELECT COUNT(*) FROM geo_cache").fetchone()[0]
+        mi_conn.close()
+        print(f"Geo cache warmed: {len(entries)} entries from CRM mills ({total} persisted)")
     except Exception as e:
         print(f"Geo cache warm failed: {e}")
 
-warm_geo_cache()
+# Deferred: runs on the first geo_cache miss in this process instead of at import
+_geo_warm = RunOnce(lambda: _startup.run('warm_geo_cache', warm_geo_cache))
 
 # Serve main app
 @app.route('/')
 def index():
     return send_from_directory('.', 'index.html')
 
-def geocode_location(location):
-    """Convert city, state to coordinates - prefers cities over counties"""
+# ----- Geocoding service -----
+# Nominatim allows 1 req/s; the limit is enforced by a token bucket shared by all threads and
+# workers. Cache misses are resolved by background threads (geo_service.LookupQueue), so request
+# threads never sleep for the limit, and concurrent lookups of the same place share one call.
+NOMINATIM_RATE = 1.0       # requests per second, all workers combined
+OSRM_RATE = 4.0
+GEO_QUEUE_MAX = 500
+GEOCODE_WAIT_SECONDS = 30
+MILEAGE_WAIT_SECONDS = 20  # /api/mileage/bulk (unless async=true) and /api/mileage?wait=true
+MILEAGE_BULK_MAX = 5000
+OSRM_TABLE_MAX_COORDS = 100  # public OSRM /table limit per request
+OSRM_TABLE_WORKERS = 4
+NOMINATIM_URL = os.environ.get('NOMINATIM_URL', 'https://nominatim.openstreetmap.org').rstrip('/')
+OSRM_URL = os.environ.get('OSRM_URL', 'https://router.project-osrm.org').rstrip('/')
+
+def get_rate_limit_db():
+    """Token buckets (geo_service.SQLiteRateLimiter) live in a small file of their own next to the
+    MI database, so taking a token never contends for the MI write lock."""
+    return sqlite3.connect(f"{MI_DB_PATH}.rate_limits.db", timeout=10)
+
+_nominatim_limiter = SQLiteRateLimiter(get_rate_limit_db, 'nominatim', NOMINATIM_RATE)
+_osrm_limiter = SQLiteRateLimiter(get_rate_limit_db, 'osrm', OSRM_RATE, capacity=4)
+
+def geocode_location(location, timeout=GEOCODE_WAIT_SECONDS):
+    """Convert city, state to coordinates - prefers cities over counties.
+    Cache misses are fetched by the rate-limited background geocoder; this waits up to timeout
+    seconds for the result (timeout=0: queue the lookup and return None unless already done)."""
     if not location:
         return None
 
     # Check cache first
     cache_key = location.lower().strip()
-    if cache_key in geo_cache:
-        return geo_cache[cache_key]
+    coords = geo_lookup(cache_key)
+    if coords:
+        return coords
+
+    try:
+        fut = _geocode_jobs.submit(cache_key, location)
+        if not timeout and not fut.done():
+            return None
+        return fut.result(timeout=timeout)
+    except Exception as e:
+        print(f"Geocode error for {location}: {type(e).__name__}: {e}")
+        return None
+
+def _nominatim_geocode(location):
+    """Nominatim lookup (background geocoder thread): waits for a shared token, stores the result."""
+    cache_key = location.lower().strip()
+    coords = geo_lookup(cache_key)  # another worker may have resolved it while this was queued
+    if coords:
+        return coords
 
     try:
-        url = "https://nominatim.openstreetmap.org/search"
+        _nominatim_limiter.acquire()
+        url = f"{NOMINATIM_URL}/search"
         params = {
             'q': location,
             'format': 'json',
@@ -1419,23 +2190,28 @@ def geocode_location(location):
                 'lat': float(best['lat']),
                 'lon': float(best['lon'])
             }
-            geo_cache[cache_key] = coords
+            geo_store(cache_key, coords)
             return coords
         return None
     except Exception as e:
         print(f"Geocode error for {location}: {e}")
         return None
 
+def _distance_key(origin_coords, dest_coords):
+    # Round coords to 3 decimals for cache key (~100m precision, plenty for cities)
+    return (round(origin_coords['lat'],3), round(origin_coords['lon'],3),
+            round(dest_coords['lat'],3), round(dest_coords['lon'],3))
+
 def get_distance(origin_coords, dest_coords):
     """Get driving distance in miles between two coordinate pairs (cached)."""
-    # Round coords to 3 decimals for cache key (~100m precision, plenty for cities)
-    cache_key = (round(origin_coords['lat'],3), round(origin_coords['lon'],3),
-                 round(dest_coords['lat'],3), round(dest_coords['lon'],3))
-    if cache_key in distance_cache:
-        return distance_cache[cache_key]
+    cache_key = _distance_key(origin_coords, dest_coords)
+    cached = distance_lookup(cache_key)
+    if cached is not None:
+        return cached
     try:
+        _osrm_limiter.acquire()
         coords_str = f"{origin_coords['lon']},{origin_coords['lat']};{dest_coords['lon']},{dest_coords['lat']}"
-        url = f"https://router.project-osrm.org/route/v1/driving/{coords_str}"
+        url = f"{OSRM_URL}/route/v1/driving/{coords_str}"
         params = {'overview': 'false'}
 
         resp = requests.get(url, params=params, timeout=10)
@@ -1444,43 +2220,244 @@ def get_distance(origin_coords, dest_coords):
         if data.get('code') == 'Ok' and data.get('routes'):
             meters = data['routes'][0]['distance']
             miles = round(meters / 1609.34)
-            distance_cache[cache_key] = miles
+            distance_store(cache_key, miles)
             return miles
         return None
     except Exception as e:
         print(f"Distance error: {e}")
         return None
 
-# Single mileage lookup
-@app.route('/api/mileage', methods=['POST'])
-def mileage_lookup():
-    data = request.get_json() or {}
-    origin = data.get('origin', '')
-    dest = data.get('dest', '')
-    
-    if not origin or not dest:
-        return jsonify({'error': 'Missing origin or dest'}), 400
-    
-    # Geocode both locations
-    origin_coords = geocode_location(origin)
-    if not origin_coords:
-        return jsonify({'error': f'Could not geocode origin: {origin}'}), 404
-    
-    # Rate limit for Nominatim's 1 req/s policy. This blocks the worker thread;
-    # acceptable for low-traffic internal tool. For high concurrency, consider
-    # a token-bucket rate limiter or async approach.
-    time.sleep(0.5)
-
-    dest_coords = geocode_location(dest)
-    if not dest_coords:
-        return jsonify({'error': f'Could not geocode destination: {dest}'}), 404
-    
-    # Get distance
-    miles = get_distance(origin_coords, dest_coords)
-    if miles is None:
-        return jsonify({'error': 'Could not calculate route'}), 404
+def _set_lane_status(lanes, status, miles=None, error=None):
+    conn = get_mi_db()
+    try:
+        conn.executemany(
+            "INSERT OR REPLACE INTO lane_lookups (origin, dest, status, miles, error, updated_at) VALUES (?,?,?,?,?,?)",
+            [(o, d, status, miles, error, time.time()) for o, d in lanes])
+        conn.commit()
+    finally:
+        conn.close()
+
+def _osrm_table_chunk(origins, dests):
+    """One OSRM /table call over (lat, lon) points: {(origin, dest): miles} for every origin x dest."""
+    points = list(origins) + list(dests)
+    coords_str = ';'.join(f"{lon},{lat}" for lat, lon in points)
+    params = {
+        'sources': ';'.join(str(i) for i in range(len(origins))),
+        'destinations': ';'.join(str(i) for i in range(len(origins), len(points))),
+        'annotations': 'distance',
+    }
+    _osrm_limiter.acquire()
+    resp = requests.get(f"{OSRM_URL}/table/v1/driving/{coords_str}", params=params, timeout=30)
+    data = resp.json()
+    if data.get('code') != 'Ok':
+        raise LookupError(f"OSRM table: {data.get('code')}")
+    found = {}
+    for o, row in zip(origins, data.get('distances') or []):
+        for d, meters in zip(dests, row):
+            if meters is not None:
+                found[(o, d)] = round(meters / 1609.34)
+    return found
+
+def osrm_table_distances(lanes):
+    """Miles via OSRM /table for {distance key: (origin (lat, lon), dest (lat, lon))}.
+    Origins and destinations are deduplicated and split into chunks that fit the per-request
+    coordinate limit; only chunk pairs that contain a wanted lane are requested, in parallel."""
+    wanted = set(lanes.values())
+    origins = sorted({o for o, d in wanted})
+    dests = sorted({d for o, d in wanted})
+    d_size = min(len(dests), OSRM_TABLE_MAX_COORDS // 2)
+    o_size = OSRM_TABLE_MAX_COORDS - d_size
+    jobs = []
+    for i in range(0, len(dests), d_size):
+        d_chunk = dests[i:i + d_size]
+        d_set = set(d_chunk)
+        for j in range(0, len(origins), o_size):
+            o_chunk = origins[j:j + o_size]
+            o_set = set(o_chunk)
+            if any(o in o_set and d in d_set for o, d in wanted):
+                jobs.append((o_chunk, d_chunk))
+    found = {}
+    with ThreadPoolExecutor(max_workers=OSRM_TABLE_WORKERS) as pool:
+        for fut in [pool.submit(_osrm_table_chunk, o, d) for o, d in jobs]:
+            try:
+                found.update(fut.result())
+            except Exception as e:
+                print(f"Distance table error: {e}")
+    miles = {key: found[lane] for key, lane in lanes.items() if lane in found}
+    distance_store_many(miles)
+    return miles
+
+def resolve_lanes_bulk(pairs, timeout=GEOCODE_WAIT_SECONDS):
+    """Miles for many (origin, dest) pairs: {pair: miles, LookupError, or None while pending}.
+    Places are deduplicated and only cache misses are geocoded; distances come from
+    distance_cache, then OSRM /table. New lanes are written to the lanes table.
+    Geocodes still queued after timeout seconds (all of them together) leave their lanes
+    pending (None) and handed to the background resolver; timeout=None waits for all."""
+    pairs = list(dict.fromkeys(pairs))
+    coords = {}
+    misses = {}
+    for place in dict.fromkeys(p for pair in pairs for p in pair):
+        cached = geo_lookup(place.lower().strip())
+        if cached:
+            coords[place] = cached
+        else:
+            try:
+                misses[place] = _geocode_jobs.submit(place.lower().strip(), place)
+            except QueueFull:
+                coords[place] = None
+    wait_futures(list(misses.values()), timeout=timeout)
+    unresolved = set()
+    for place, fut in misses.items():
+        if not fut.done():
+            unresolved.add(place)
+            continue
+        try:
+            coords[place] = fut.result()
+        except Exception:
+            coords[place] = None
+
+    outcome = {}
+    need = {}
+    pending = []
+    for origin, dest in pairs:
+        if origin in unresolved or dest in unresolved:
+            outcome[(origin, dest)] = None
+            pending.append((origin, dest))
+        elif not coords.get(origin):
+            outcome[(origin, dest)] = LookupError(f'Could not geocode: {origin}')
+        elif not coords.get(dest):
+            outcome[(origin, dest)] = LookupError(f'Could not geocode: {dest}')
+        else:
+            need[(origin, dest)] = _distance_key(coords[origin], coords[dest])
+    miles_by_key = distance_lookup_many(need.values())
+    todo = {key: ((coords[o]['lat'], coords[o]['lon']), (coords[d]['lat'], coords[d]['lon']))
+            for (o, d), key in need.items() if key not in miles_by_key}
+    if todo:
+        miles_by_key.update(osrm_table_distances(todo))
+    new_lanes = []
+    for pair, key in need.items():
+        miles = miles_by_key.get(key)
+        if miles:
+            outcome[pair] = miles
+            new_lanes.append((pair[0], pair[1], miles))
+        else:
+            outcome[pair] = LookupError('Route not found')
+    store_lanes_many(new_lanes)
+    if pending:
+        submit_lanes(pending)
+    return outcome
+
+def _resolve_lanes_job(pairs):
+    """Background batch: resolve lanes and record each outcome in lane_lookups."""
+    outcome = resolve_lanes_bulk(pairs, timeout=None)
+    now = time.time()
+    conn = get_mi_db()
+    try:
+        conn.executemany(
+            "INSERT OR REPLACE INTO lane_lookups (origin, dest, status, miles, error, updated_at) VALUES (?,?,?,?,?,?)",
+            [(o, d, 'error', None, str(r), now) if isinstance(r, Exception) else (o, d, 'done', r, None, now)
+             for (o, d), r in outcome.items()])
+        conn.commit()
+    finally:
+        conn.close()
+    return outcome
+
+_geocode_jobs = LookupQueue('geocode', _nominatim_geocode, maxsize=GEO_QUEUE_MAX, workers=1)
+_lane_jobs = LookupQueue('lanes', _resolve_lanes_job, maxsize=GEO_QUEUE_MAX, workers=4)
+_lanes_inflight = set()
+_lanes_inflight_lock = threading.Lock()
+
+def lane_pending(pair):
+    """True if this process has the lane in a queued or running batch."""
+    with _lanes_inflight_lock:
+        return pair in _lanes_inflight
+
+def submit_lanes(pairs):
+    """Queue unresolved (origin, dest) lanes as one background batch: {pair: Future}.
+    An identical batch already in flight is shared; a full queue yields failed Futures."""
+    pairs = list(dict.fromkeys(pairs))
+    futures = {pair: Future() for pair in pairs}
+    if not pairs:
+        return futures
+    _set_lane_status(pairs, 'pending')
+    try:
+        batch = _lane_jobs.submit(tuple(sorted(pairs)), pairs)
+    except QueueFull as e:
+        for fut in futures.values():
+            fut.set_exception(e)
+        return futures
+    with _lanes_inflight_lock:
+        _lanes_inflight.update(pairs)
+
+    def fan_out(batch):
+        with _lanes_inflight_lock:
+            _lanes_inflight.difference_update(pairs)
+        err = batch.exception()
+        outcome = {} if err is not None else batch.result()
+        for pair, fut in futures.items():
+            r = err if err is not None else outcome.get(pair, LookupError('Route not found'))
+            if isinstance(r, Exception):
+                fut.set_exception(r)
+            else:
+                fut.set_result(r)
+    batch.add_done_callback(fan_out)
+    return futures
+
+def _lane_result(origin, dest, fut):
+    """Bulk-mileage result row for a lane handed to the background resolver."""
+    if not fut.done():
+        return {'origin': origin, 'dest': dest, 'miles': None, 'pending': True}
+    err = fut.exception()
+    if err is not None:
+        return {'origin': origin, 'dest': dest, 'miles': None, 'error': str(err)}
+    return {'origin': origin, 'dest': dest, 'miles': fut.result()}
+
+# ----- Pricing engine -----
+# Landed-cost pipeline shared by /api/forecast/pricing, offering generation and the
+# scheduled offering job (pricing_engine.py).
+
+def _crm_mill_origins():
+    conn = get_crm_db()
+    rows = [dict(r) for r in conn.execute("SELECT name, city, state, lat, lon, locations FROM mills").fetchall()]
+    conn.close()
+    return rows
+
+_pricing = PricingEngine(get_mi_db, _crm_mill_origins, MILL_DIRECTORY, lookup_lane_miles, resolve_lanes_bulk,
+                         get_rl_store, origins_version=lambda: get_data_version('mills', _version_conn('crm')),
+                         geo=geo_lookup)
+
+def get_origin_index():
+    """Mill origin index (pricing_engine.OriginIndex), rebuilt only after CRM mills change."""
+    return _pricing.origin_index()
+
+# Single mileage lookup
+@app.route('/api/mileage', methods=['POST'])
+def mileage_lookup():
+    """Miles for one lane. Known lanes answer at once; a new lane is handed to the background
+    resolver and comes back pending (202) - poll /api/mileage/status, or pass wait=true to block
+    up to MILEAGE_WAIT_SECONDS."""
+    data = request.get_json() or {}
+    origin = data.get('origin', '')
+    dest = data.get('dest', '')
     
-    return jsonify({'miles': miles, 'origin': origin, 'dest': dest})
+    if not origin or not dest:
+        return jsonify({'error': 'Missing origin or dest'}), 400
+
+    known = lookup_lane_miles([(origin, dest)])
+    if known:
+        return jsonify({'miles': known[(origin, dest)], 'origin': origin, 'dest': dest})
+
+    # Geocoding (Nominatim's 1 req/s) and routing run on the background resolver
+    fut = submit_lanes([(origin, dest)])[(origin, dest)]
+    if bool(data.get('wait')) or request.args.get('wait') == 'true':
+        wait_futures([fut], timeout=MILEAGE_WAIT_SECONDS)
+    result = _lane_result(origin, dest, fut)
+    if result.get('pending'):
+        result['status_url'] = '/api/mileage/status'
+        return jsonify(result), 202
+    if 'error' in result:
+        return jsonify(result), 503 if isinstance(fut.exception(), QueueFull) else 404
+    return jsonify(result)
 
 # Bulk mileage lookup
 @app.route('/api/mileage/bulk', methods=['POST'])
@@ -1490,54 +2467,70 @@ def mileage_bulk():
 
     if not lanes:
         return jsonify({'error': 'No lanes provided'}), 400
-    if len(lanes) > 50:
-        return jsonify({'error': 'Maximum 50 lanes per request'}), 400
+    if len(lanes) > MILEAGE_BULK_MAX:
+        return jsonify({'error': f'Maximum {MILEAGE_BULK_MAX} lanes per request'}), 400
 
-    results = []
-    # Pre-geocode shared destination (all lanes in a quote typically share the same dest)
-    dest_cache = {}
-    need_nominatim = False
+    run_async = bool(data.get('async')) or request.args.get('async') == 'true'
 
-    for lane in lanes:
-        origin = lane.get('origin', '')
-        dest = lane.get('dest', '')
+    # Lanes seen before (any worker, any earlier run) need no geocoding or routing
+    pairs = [(lane.get('origin', ''), lane.get('dest', '')) for lane in lanes]
+    known = lookup_lane_miles(p for p in pairs if p[0] and p[1])
+    # The rest go to the background resolver; duplicates share one lookup
+    futures = submit_lanes([p for p in pairs if p[0] and p[1] and p not in known])
+    if futures and not run_async:
+        wait_futures(list(futures.values()), timeout=MILEAGE_WAIT_SECONDS)
 
+    results = []
+    for origin, dest in pairs:
         if not origin or not dest:
             results.append({'origin': origin, 'dest': dest, 'miles': None, 'error': 'Missing data'})
-            continue
+        elif (origin, dest) in known:
+            results.append({'origin': origin, 'dest': dest, 'miles': known[(origin, dest)]})
+        else:
+            results.append(_lane_result(origin, dest, futures[(origin, dest)]))
 
-        # Geocode origin (only hit Nominatim rate limit if not cached)
-        origin_cached = origin.lower().strip() in geo_cache
-        if need_nominatim and not origin_cached:
-            time.sleep(0.3)  # Nominatim 1 req/s; blocking is acceptable for internal tool
-        origin_coords = geocode_location(origin)
-        if not origin_coords:
-            results.append({'origin': origin, 'dest': dest, 'miles': None, 'error': f'Could not geocode: {origin}'})
-            continue
-        if not origin_cached:
-            need_nominatim = True
-
-        # Geocode dest (cache across lanes â usually the same destination)
-        if dest not in dest_cache:
-            dest_cached = dest.lower().strip() in geo_cache
-            if need_nominatim and not dest_cached:
-                time.sleep(0.3)  # Nominatim 1 req/s; blocking is acceptable for internal tool
-            dest_cache[dest] = geocode_location(dest)
-            if not dest_cached:
-                need_nominatim = True
-        dest_coords = dest_cache[dest]
-        if not dest_coords:
-            results.append({'origin': origin, 'dest': dest, 'miles': None, 'error': f'Could not geocode: {dest}'})
-            continue
+    pending = sum(1 for r in results if r.get('pending'))
+    return jsonify({'results': results, 'pending': pending})
 
-        # Get distance (also cached)
-        miles = get_distance(origin_coords, dest_coords)
-        if miles:
-            results.append({'origin': origin, 'dest': dest, 'miles': miles})
-        else:
-            results.append({'origin': origin, 'dest': dest, 'miles': None, 'error': 'Route not found'})
+@app.route('/api/mileage/status', methods=['POST'])
+def mileage_status():
+    """Poll lanes submitted to /api/mileage/bulk (any worker): miles, error, or still pending."""
+    data = request.get_json() or {}
+    lanes = data.get('lanes', [])
+    if not lanes:
+        return jsonify({'error': 'No lanes provided'}), 400
+    pairs = [(lane.get('origin', ''), lane.get('dest', '')) for lane in lanes]
+    known = lookup_lane_miles(p for p in pairs if p[0] and p[1])
+    state = {}
+    conn = get_mi_db()
+    try:
+        for origin, dest in set(pairs) - set(known):
+            row = conn.execute("SELECT status, error, updated_at FROM lane_lookups WHERE origin=? AND dest=?",
+                               (origin, dest)).fetchone()
+            if row:
+                state[(origin, dest)] = row
+    finally:
+        conn.close()
+    # A lane left pending by a worker that went away is picked up again here
+    stale = [p for p, row in state.items()
+             if row['status'] == 'pending' and not lane_pending(p)
+             and time.time() - row['updated_at'] > MILEAGE_WAIT_SECONDS * 3]
+    if stale:
+        submit_lanes(stale)
 
-    return jsonify({'results': results})
+    results = []
+    for origin, dest in pairs:
+        row = state.get((origin, dest))
+        if (origin, dest) in known:
+            results.append({'origin': origin, 'dest': dest, 'miles': known[(origin, dest)]})
+        elif row is not None and row['status'] == 'error':
+            results.append({'origin': origin, 'dest': dest, 'miles': None, 'error': row['error']})
+        elif row is not None:
+            results.append({'origin': origin, 'dest': dest, 'miles': None, 'pending': True})
+        else:
+            results.append({'origin': origin, 'dest': dest, 'miles': None, 'error': 'Not requested'})
+    pending = sum(1 for r in results if r.get('pending'))
+    return jsonify({'results': results, 'pending': pending})
 
 # Geocode endpoint (for debugging)
 @app.route('/api/geocode', methods=['POST'])
@@ -1548,7 +2541,13 @@ def geocode():
     if not location:
         return jsonify({'error': 'Missing location'}), 400
     
-    coords = geocode_location(location)
+    # Cache misses are queued for the background geocoder; wait=true blocks for the result
+    wait = bool(data.get('wait')) or request.args.get('wait') == 'true'
+    coords = geocode_location(location, timeout=GEOCODE_WAIT_SECONDS if wait else 0)
+    if not coords and not wait:
+        if _geocode_jobs.pending(location.lower().strip()):
+            return jsonify({'location': location, 'pending': True}), 202
+        coords = geo_lookup(location.lower().strip())  # finished just now
     if coords:
         return jsonify(coords)
     return jsonify({'error': 'Location not found'}), 404
@@ -1559,7 +2558,7 @@ def geocode():
 @app.route('/api/crm/prospects', methods=['GET'])
 def list_prospects():
     try:
-        conn = get_crm_db()
+        conn = get_crm_db(readonly=True)
         status = request.args.get('status')
         trader = request.args.get('trader')
         search = request.args.get('search')
@@ -1588,7 +2587,7 @@ def list_prospects():
 @app.route('/api/crm/prospects/<int:id>', methods=['GET'])
 def get_prospect(id):
     try:
-        conn = get_crm_db()
+        conn = get_crm_db(readonly=True)
         prospect = conn.execute('SELECT * FROM prospects WHERE id = ?', (id,)).fetchone()
         if not prospect:
             conn.close()
@@ -1771,7 +2770,7 @@ def create_touch():
 @app.route('/api/crm/touches', methods=['GET'])
 def list_touches():
     try:
-        conn = get_crm_db()
+        conn = get_crm_db(readonly=True)
         prospect_id = request.args.get('prospect_id')
         follow_up = request.args.get('follow_up')
 
@@ -1851,7 +2850,7 @@ def remove_interest(id):
 @app.route('/api/crm/dashboard', methods=['GET'])
 def crm_dashboard():
     try:
-        conn = get_crm_db()
+        conn = get_crm_db(readonly=True)
         trader = request.args.get('trader')
 
         # Build trader filter fragments for prospect-only and joined queries
@@ -2151,7 +3150,7 @@ def cleanup_non_ian():
 @app.route('/api/crm/customers', methods=['GET'])
 def list_customers():
     try:
-        conn = get_crm_db()
+        conn = get_crm_db(readonly=True)
         trader = request.args.get('trader')
         query = 'SELECT * FROM customers WHERE 1=1'
         params = []
@@ -2269,32 +3268,33 @@ def delete_customer(id):
 @app.route('/api/crm/mills', methods=['GET'])
 def list_mills():
     try:
-        conn = get_crm_db()
         trader = request.args.get('trader')
-        query = 'SELECT * FROM mills WHERE 1=1'
+        where = ''
         params = []
         if trader and trader != 'Admin':
-            query += ' AND trader = ?'
+            where = ' WHERE m.trader = ?'
             params.append(trader)
-        query += ' ORDER BY name ASC'
-        mills = conn.execute(query, params).fetchall()
-        conn.close()
-        # Enrich with last_quoted date from MI quotes
-        mill_list = [dict(m) for m in mills]
+        # One query over the MI connection's attached CRM database, enriched with the
+        # last_quoted date and quote count from MI quotes
+        conn = get_mi_db(readonly=True)
         try:
-            mi_conn = get_mi_db()
-            last_dates = mi_conn.execute(
-                "SELECT mill_id, MAX(date) as last_date, COUNT(*) as quote_count FROM mill_quotes GROUP BY mill_id"
-            ).fetchall()
-            mi_conn.close()
-            date_map = {r['mill_id']: {'last_quoted': r['last_date'], 'quote_count': r['quote_count']} for r in last_dates}
-            for m in mill_list:
-                info = date_map.get(m['id'], {})
-                m['last_quoted'] = info.get('last_quoted')
-                m['quote_count'] = info.get('quote_count', 0)
-        except Exception:
-            pass  # MI db may not exist yet
-        return jsonify(mill_list)
+            mills = conn.execute(f"""
+                SELECT m.*, s.last_date AS last_quoted, COALESCE(s.quote_count, 0) AS quote_count
+                FROM crm.mills m
+                LEFT JOIN (SELECT mill_id, MAX(date) AS last_date, COUNT(*) AS quote_count
+                           FROM mill_quotes GROUP BY mill_id) s ON s.mill_id = m.id{where}
+                ORDER BY m.name ASC
+            """, params).fetchall()
+        except sqlite3.OperationalError:
+            # MI db may not exist yet
+            mills = None
+        finally:
+            conn.close()
+        if mills is None:
+            conn = get_crm_db(readonly=True)
+            mills = conn.execute(f"SELECT * FROM mills m{where} ORDER BY name ASC", params).fetchall()
+            conn.close()
+        return jsonify([dict(m) for m in mills])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -2337,7 +3337,7 @@ def create_mill():
         conn.close()
         # Sync to MI
         if mill:
-            sync_mill_to_mi(dict(mill))
+            _mi_writer.execute(sync_crm_mills_to_mi)
         _log_audit(
             get_current_user(),
             'mill_create', 'mill', cursor.lastrowid, company,
@@ -2385,13 +3385,14 @@ def update_mill(id):
 
         # Sync to Mill Intel database
         mill_dict = dict(mill)
-        sync_mill_to_mi(mill_dict)
+        _mi_writer.execute(sync_crm_mills_to_mi)
 
         # If name changed, update mill_quotes.mill_name in MI database
         new_name = mill_dict.get('name', '')
         if old_name and new_name and old_name != new_name:
             mi_conn = get_mi_db()
             mi_conn.execute('UPDATE mill_quotes SET mill_name = ? WHERE mill_id = ?', (new_name, id))
+            bump_data_version('quotes', mi_conn)
             mi_conn.commit()
             mi_conn.close()
 
@@ -2425,6 +3426,7 @@ def delete_mill(id):
             mi_conn = get_mi_db()
             mi_conn.execute('DELETE FROM mill_quotes WHERE mill_id = ?', (id,))
             mi_conn.execute('DELETE FROM mills WHERE id = ?', (id,))
+            bump_data_version('quotes', mi_conn)
             mi_conn.commit()
             mi_conn.close()
         except Exception:
@@ -2486,6 +3488,7 @@ def rename_mill(id):
             mi_conn = get_mi_db()
             mi_conn.execute('UPDATE mills SET name = ? WHERE id = ?', (new_name, id))
             mi_conn.execute('UPDATE mill_quotes SET mill_name = ? WHERE mill_id = ?', (new_name, id))
+            bump_data_version('quotes', mi_conn)
             mi_conn.commit()
             mi_conn.close()
         except Exception:
@@ -2948,18 +3951,85 @@ def po_seed():
 def health():
     return jsonify({'status': 'ok', 'cache_size': len(geo_cache)})
 
+@app.route('/health/live')
+def health_live():
+    """Liveness: the worker is up and answering, whether or not startup seeding has finished."""
+    return jsonify({'status': 'ok', 'pid': os.getpid(), 'uptime_s': round(time.time() - _startup.started, 3)})
+
+@app.route('/health/ready')
+def health_ready():
+    """Readiness: 200 once this worker's startup phases are done, 503 while seeding or if a phase failed."""
+    state = _startup.snapshot()
+    return jsonify(state), (200 if state['state'] == 'ready' else 503)
+
+@app.route('/api/cache/stats')
+def cache_stats():
+    """Per-namespace response cache counters for this worker, plus the shared data versions."""
+    try:
+        conn = get_mi_db(readonly=True)
+        versions = {r['name']: r['version'] for r in conn.execute("SELECT name, version FROM data_versions").fetchall()}
+        conn.close()
+        return jsonify({
+            'pid': os.getpid(),
+            'caches': {name: c.stats() for name, c in _response_caches.items()},
+            'data_versions': versions,
+            'lookups': {
+                'geo': dict(geo_cache.stats(), **_lookup_counts('geo')),
+                'distance': dict(distance_cache.stats(), **_lookup_counts('distance')),
+                'lanes': _lookup_counts('lanes'),
+            },
+            'geo_service': {
+                'queues': {q.name: q.stats() for q in (_geocode_jobs, _lane_jobs)},
+                'limiters': {l.name: l.stats() for l in (_nominatim_limiter, _osrm_limiter)},
+            },
+            'rl_store': dict(_rl_store.stats(), version=list(_rl_store.version)) if _rl_store else None,
+            'origin_index': _pricing._origins.stats() if _pricing._origins else None,
+            'customer_names': _customer_names.stats() if _customer_names else None,
+            'db_pool': _db_pool.stats(),
+            'write_queues': {q.name: q.stats() for q in (_crm_writer, _mi_writer)},
+            'intake_jobs': _intake_jobs.stats(),
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/db/profile')
+def db_profile():
+    """Configured performance profile per database and the pragma values a pooled connection runs with."""
+    try:
+        out = {}
+        for db, path, getter in (('crm', CRM_DB_PATH, get_crm_db), ('mi', MI_DB_PATH, get_mi_db)):
+            conn = getter(readonly=True)
+            try:
+                effective = effective_pragmas(conn)
+            finally:
+                conn.close()
+            profile = _db_profiles.get(db) or {}
+            out[db] = {
+                'path': path,
+                'size_bytes': os.path.getsize(path) if os.path.exists(path) else None,
+                'profile': profile.get('profile'),
+                'profile_source': profile.get('profile_source'),
+                'configured': profile.get('pragmas'),
+                'sources': profile.get('sources'),
+                'errors': profile.get('errors', []),
+                'effective': effective,
+            }
+        return jsonify({'pid': os.getpid(), 'databases': out, 'pool': _db_pool.stats()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/health/mi')
 def health_mi():
     """Mill Intel health check â verifies SQLite has data and reports counts."""
     try:
-        mi_conn = get_mi_db()
+        mi_conn = get_mi_db(readonly=True)
         quote_count = mi_conn.execute("SELECT COUNT(*) FROM mill_quotes").fetchone()[0]
         mill_count = mi_conn.execute("SELECT COUNT(*) FROM mills").fetchone()[0]
         latest_row = mi_conn.execute("SELECT MAX(date) as latest FROM mill_quotes").fetchone()
         latest_date = latest_row['latest'] if latest_row else None
         mi_conn.close()
 
-        crm_conn = get_crm_db()
+        crm_conn = get_crm_db(readonly=True)
         crm_mill_count = crm_conn.execute("SELECT COUNT(*) FROM mills").fetchone()[0]
         crm_cust_count = crm_conn.execute("SELECT COUNT(*) FROM customers").fetchone()[0]
         crm_conn.close()
@@ -3000,7 +4070,7 @@ def pricing_customers():
     seen = {}
     # CRM customers (have destination field)
     try:
-        conn = get_crm_db()
+        conn = get_crm_db(readonly=True)
         rows = conn.execute("SELECT name, destination, locations FROM customers ORDER BY name").fetchall()
         conn.close()
         for r in rows:
@@ -3022,7 +4092,7 @@ def pricing_customers():
     except: pass
     # MI customers
     try:
-        conn = get_mi_db()
+        conn = get_mi_db(readonly=True)
         rows = conn.execute("SELECT name, destination FROM customers ORDER BY name").fetchall()
         conn.close()
         for r in rows:
@@ -3054,7 +4124,7 @@ def set_matrix_cutoff():
 @app.route('/api/mi/mills', methods=['GET'])
 def mi_list_mills():
     """List all mills from CRM (single source of truth)."""
-    conn = get_crm_db()
+    conn = get_crm_db(readonly=True)
     rows = conn.execute("SELECT * FROM mills ORDER BY name").fetchall()
     conn.close()
     return jsonify([dict(r) for r in rows])
@@ -3079,17 +4149,17 @@ def mi_create_mill():
             lat, lon = coords['lat'], coords['lon']
     # Create in CRM and sync to MI
     crm_mill = find_or_create_crm_mill(name, city, state, region, lat, lon, data.get('trader', ''))
-    sync_mill_to_mi(crm_mill)
+    _mi_writer.execute(sync_crm_mills_to_mi)
     return jsonify(crm_mill), 201
 
 @app.route('/api/mi/mills/<int:mill_id>', methods=['GET'])
 def mi_get_mill(mill_id):
-    conn = get_crm_db()
+    conn = get_crm_db(readonly=True)
     mill = conn.execute("SELECT * FROM mills WHERE id=?", (mill_id,)).fetchone()
     conn.close()
     if not mill:
         return jsonify({'error': 'Not found'}), 404
-    mi_conn = get_mi_db()
+    mi_conn = get_mi_db(readonly=True)
     quotes = mi_conn.execute("SELECT * FROM mill_quotes WHERE mill_id=? ORDER BY date DESC LIMIT 100", (mill_id,)).fetchall()
     mi_conn.close()
     result = dict(mill)
@@ -3132,7 +4202,7 @@ def mi_update_mill(mill_id):
     if not mill:
         return jsonify({'error': 'Not found'}), 404
     # Sync to MI
-    sync_mill_to_mi(dict(mill))
+    _mi_writer.execute(sync_crm_mills_to_mi)
     return jsonify(dict(mill))
 
 @app.route('/api/mi/mills/geocode', methods=['POST'])
@@ -3212,6 +4282,7 @@ def consolidate_mills():
                 f"UPDATE mill_quotes SET mill_id=? WHERE mill_id IN ({placeholders})",
                 [survivor['id']] + old_ids
             )
+            bump_data_version('quotes', mi_conn)
             mi_conn.commit()
             mi_conn.close()
 
@@ -3255,7 +4326,7 @@ def _mi_default_since():
 
 @app.route('/api/mi/quotes', methods=['GET'])
 def mi_list_quotes():
-    conn = get_mi_db()
+    conn = get_mi_db(readonly=True)
     conditions = ["1=1"]
     params = []
     for k, col in [('mill', 'mill_name'), ('product', 'product'), ('trader', 'trader')]:
@@ -3281,9 +4352,52 @@ def mi_list_quotes():
     conn.close()
     return jsonify([dict(r) for r in rows])
 
+# Batches at or above this size use the set-based ingest path
+MI_BULK_INGEST_MIN = 25
+# ?wait=true returns the job's result once applied; give up (202 + job status) before gunicorn's 120s timeout
+INTAKE_WAIT_TIMEOUT = float(os.environ.get('INTAKE_WAIT_TIMEOUT', 100))
+
+# Quote fields the apply paths treat as text (.strip(), .upper()); null is fine for the optional ones
+MI_QUOTE_TEXT_FIELDS = ('mill', 'product', 'length')
+MI_QUOTE_OPTIONAL_TEXT_FIELDS = ('city', 'trader', 'date', 'source', 'notes', 'raw_text', 'shipWindow', 'ship_window')
+
+def _quote_field_error(i, q):
+    """Why quote #i can't be applied (a text field holding a number, list, ...), or None."""
+    for field in MI_QUOTE_TEXT_FIELDS:
+        if field in q and not isinstance(q[field], str):
+            return f"Quote {i}: '{field}' must be a string"
+    for field in MI_QUOTE_OPTIONAL_TEXT_FIELDS:
+        if q.get(field) is not None and not isinstance(q[field], str):
+            return f"Quote {i}: '{field}' must be a string"
+    return None
+
+def _intake_keys(quotes):
+    """Mill companies a batch touches (its CRM mill rows and product lists): jobs sharing one apply in order."""
+    names = {q['mill'].strip() for q in quotes if isinstance(q.get('mill'), str)}
+    return {extract_company_name(m).upper() for m in names if m}
+
+def _apply_intake_job(payload, progress):
+    """Intake job body: one POST /api/mi/quotes batch through the per-row or set-based path."""
+    submit = _mi_submit_quotes_bulk if payload['bulk'] else _mi_submit_quotes_inner
+    full_list_mills = set(payload['full_list_mills']) if payload['full_list_mills'] is not None else None
+    return submit(None, payload['quotes'], full_list_mills=full_list_mills, progress=progress)
+
+def _intake_status_db():
+    """Read-only MI connection for intake job status and the idle workers' poll; it never creates
+    the database file (a missing one means nothing is queued yet)."""
+    if not os.path.exists(MI_DB_PATH):
+        raise sqlite3.OperationalError(f"MI database {MI_DB_PATH} does not exist")
+    return get_mi_db(readonly=True)
+
+_intake_jobs = IntakeJobQueue(_mi_writer, _intake_status_db, _apply_intake_job,
+                              workers=int(os.environ.get('INTAKE_WORKERS', 2)),
+                              large=int(os.environ.get('INTAKE_LARGE_JOB', 500)))
+
 @app.route('/api/mi/quotes', methods=['POST'])
 
 def mi_submit_quotes():
+    """Validate a quote batch and queue it as an intake job: 202 with the job id, or with
+    ?wait=true the applied result (201) as soon as the job finishes."""
     data = request.get_json()
     if data is None:
         return jsonify({'error': 'Request body must be JSON'}), 400
@@ -3294,6 +4408,13 @@ def mi_submit_quotes():
     else:
         quotes = data if isinstance(data, list) else [data]
         is_full_list = request.args.get('full_list') == 'true'
+    if not all(isinstance(q, dict) for q in quotes):
+        return jsonify({'error': 'Each quote must be a JSON object'}), 400
+    # Reject bad field types here: inside the job they would only surface as a failed apply
+    for i, q in enumerate(quotes):
+        error = _quote_field_error(i, q)
+        if error:
+            return jsonify({'error': error}), 400
 
     # Build set of mills to wipe if this is a full price list submission
     full_list_mills = None
@@ -3305,70 +4426,88 @@ def mi_submit_quotes():
                 full_list_mills.add(mill)
         app.logger.info(f"Full-list intake for {len(full_list_mills)} mills: {full_list_mills}")
 
-    conn = get_mi_db()
+    # Large batches go through the set-based path; ?bulk=true|false forces either one
+    bulk_arg = request.args.get('bulk')
+    use_bulk = bulk_arg == 'true' if bulk_arg in ('true', 'false') else len(quotes) >= MI_BULK_INGEST_MIN
+
     try:
-        return _mi_submit_quotes_inner(conn, quotes, full_list_mills=full_list_mills)
+        job_id = _intake_jobs.enqueue(
+            {'quotes': quotes, 'full_list_mills': sorted(full_list_mills) if full_list_mills is not None else None,
+             'bulk': use_bulk},
+            _intake_keys(quotes), total=len(quotes))
+    except WriteQueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    if request.args.get('wait') == 'true':
+        job = _intake_jobs.wait(job_id, timeout=INTAKE_WAIT_TIMEOUT)
+        if job['status'] == 'done':
+            return jsonify(job['result']), 201
+        if job['status'] == 'failed':
+            return jsonify({'error': job['error'], 'job_id': job_id}), 500
+        return jsonify(dict(job, job_id=job_id, status_url=f'/api/mi/quotes/jobs/{job_id}')), 202
+    return jsonify({'job_id': job_id, 'status': 'queued', 'total': len(quotes),
+                    'status_url': f'/api/mi/quotes/jobs/{job_id}'}), 202
+
+@app.route('/api/mi/quotes/jobs/<int:job_id>', methods=['GET'])
+def mi_quote_job(job_id):
+    """Intake job status: stage, progress, timings, and the result once done (?wait=true blocks until then)."""
+    try:
+        if request.args.get('wait') == 'true':
+            job = _intake_jobs.wait(job_id, timeout=INTAKE_WAIT_TIMEOUT)
+        else:
+            job = _intake_jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _crm_mills_by_company(quotes):
+    """CRM mills for the companies named in a quote batch, keyed by UPPER(name): one indexed
+    lookup per batch (idx_mills_upper_name), so intake does not read every CRM mill."""
+    companies = sorted({extract_company_name(q['mill'].strip()).upper()
+                        for q in quotes if isinstance(q.get('mill'), str) and q['mill'].strip()})
+    found = {}
+    conn = get_crm_db(readonly=True)
+    try:
+        for i in range(0, len(companies), 500):
+            chunk = companies[i:i + 500]
+            rows = conn.execute(f"SELECT * FROM mills WHERE UPPER(name) IN ({','.join('?' * len(chunk))}) ORDER BY id",
+                                chunk).fetchall()
+            for row in rows:
+                found[row['name'].upper()] = dict(row)  # duplicate names: the newest row wins
     finally:
         conn.close()
+    return found
+
+def _mi_write(conn, unit):
+    """Run unit(conn) as one MI transaction: on conn when the caller passes one (scripts, tests),
+    otherwise through the MI write queue."""
+    if conn is None:
+        return _mi_writer.execute(unit)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        result = unit(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return result
 
-def _mi_submit_quotes_inner(conn, quotes, full_list_mills=None):
+def _mi_submit_quotes_inner(conn, quotes, full_list_mills=None, progress=None):
     """Submit quotes. full_list_mills: set of mill names whose ENTIRE old data should be wiped
-    (because a complete price list was received — anything not on the new list is withdrawn)."""
-    created = []
-
-    # Full-list wipe: if a complete price list came in for a mill, delete ALL old quotes
-    # for that mill so withdrawn products don't linger as stale ghost quotes.
-    if full_list_mills:
-        for mill_name in full_list_mills:
-            deleted = conn.execute(
-                "DELETE FROM mill_quotes WHERE UPPER(mill_name)=?",
-                (mill_name.upper(),)
-            ).rowcount
-            if deleted:
-                app.logger.info(f"Full-list wipe: cleared {deleted} old quotes for {mill_name}")
-
-    # Auto-replace: For each mill+product+length combo being uploaded, delete existing quotes
-    # This ensures uploaded quotes always show as "today" even if price unchanged
+    (because a complete price list was received — anything not on the new list is withdrawn).
+    Mills are resolved in CRM (and geocoded) first; the MI writes then run as one unit on conn,
+    or through the MI write queue when conn is None."""
     today_date = datetime.now().strftime('%Y-%m-%d')
-    cleared_combos = set()
-    # Capture old prices before deletion for mill_price_changes tracking
-    _old_prices = {}  # key: (MILL_UPPER, PROD_UPPER, LEN_UPPER) -> {price, date, mill_id}
-    for q in quotes:
-        mill_name = q.get('mill', '').strip()
-        product = q.get('product', '').strip()
-        length = q.get('length', 'RL').strip()
-        if mill_name and product:
-            key = (mill_name.upper(), product.upper(), length.upper())
-            if key not in cleared_combos:
-                cleared_combos.add(key)
-                # Capture old price before deleting
-                old_row = conn.execute(
-                    """SELECT price, date, mill_id FROM mill_quotes
-                       WHERE UPPER(mill_name)=? AND UPPER(product)=? AND UPPER(COALESCE(length,'RL'))=?
-                       ORDER BY id DESC LIMIT 1""",
-                    (mill_name.upper(), product.upper(), length.upper() if length else 'RL')
-                ).fetchone()
-                if old_row:
-                    _old_prices[key] = {'price': old_row['price'], 'date': old_row['date'], 'mill_id': old_row['mill_id']}
-                deleted = conn.execute(
-                    "DELETE FROM mill_quotes WHERE UPPER(mill_name)=? AND UPPER(product)=? AND UPPER(COALESCE(length,'RL'))=?",
-                    (mill_name.upper(), product.upper(), length.upper() if length else 'RL')
-                ).rowcount
-                if deleted:
-                    app.logger.info(f"Replaced existing quote for {mill_name} {product} {length}")
 
-    # Pre-cache existing CRM mills to avoid per-quote DB lookups and geocoding
-    crm_conn_pre = get_crm_db()
-    _mill_cache = {}
-    for row in crm_conn_pre.execute("SELECT * FROM mills").fetchall():
-        _mill_cache[row['name'].upper()] = dict(row)
-    crm_conn_pre.close()
+    # Pre-cache the batch's CRM mills to avoid per-quote DB lookups and geocoding
+    _mill_cache = _crm_mills_by_company(quotes)
 
-    # Pre-sync cached mills to MI so mill_id is available
-    for cached_mill in _mill_cache.values():
-        sync_mill_to_mi(cached_mill, mi_conn=conn)
-
-    for q in quotes:
+    # Find or create each quote's CRM mill; MI rows are written below in the same order
+    resolved = []  # (quote, crm_mill, price)
+    for i, q in enumerate(quotes):
+        if progress:
+            progress('resolving mills', i)
         mill_name = q.get('mill', '').strip()
         if not mill_name or not q.get('product') or not q.get('price'):
             continue
@@ -3379,7 +4518,7 @@ def _mi_submit_quotes_inner(conn, quotes, full_list_mills=None):
         except (ValueError, TypeError):
             continue
 
-        # Find or create mill in CRM â skip geocoding for known mills
+        # Find or create mill in CRM – skip geocoding for known mills
         company = extract_company_name(mill_name)
         cached = _mill_cache.get(company.upper())
         if cached:
@@ -3396,7 +4535,6 @@ def _mi_submit_quotes_inner(conn, quotes, full_list_mills=None):
             crm_mill = find_or_create_crm_mill(mill_name, city, state, region, lat, lon,
                                                 q.get('trader', 'Unknown'))
             _mill_cache[company.upper()] = crm_mill
-            sync_mill_to_mi(crm_mill, mi_conn=conn)
 
         mill_id = crm_mill['id']
         product = q['product']
@@ -3405,62 +4543,276 @@ def _mi_submit_quotes_inner(conn, quotes, full_list_mills=None):
         existing_products = json.loads(crm_mill.get('products') or '[]')
         if product not in existing_products:
             existing_products.append(product)
-            crm_conn = get_crm_db()
-            crm_conn.execute("UPDATE mills SET products=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
-                             (json.dumps(existing_products), mill_id))
-            crm_conn.commit()
-            crm_conn.close()
-            # Also update MI mirror
-            conn.execute("UPDATE mills SET products=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
-                         (json.dumps(existing_products), mill_id))
+            products_json = json.dumps(existing_products)
+            _crm_writer.execute(lambda c: c.execute(
+                "UPDATE mills SET products=?, updated_at=CURRENT_TIMESTAMP WHERE id=?", (products_json, mill_id)))
+        resolved.append((q, crm_mill, price_val))
+
+    def write(conn):
+        created = []
+
+        # Full-list wipe: if a complete price list came in for a mill, delete ALL old quotes
+        # for that mill so withdrawn products don't linger as stale ghost quotes.
+        if full_list_mills:
+            for mill_name in full_list_mills:
+                deleted = conn.execute(
+                    "DELETE FROM mill_quotes WHERE UPPER(mill_name)=?",
+                    (mill_name.upper(),)
+                ).rowcount
+                if deleted:
+                    app.logger.info(f"Full-list wipe: cleared {deleted} old quotes for {mill_name}")
 
-        conn.execute(
-            """INSERT INTO mill_quotes (mill_id, mill_name, product, price, length, volume, tls,
-               ship_window, notes, date, trader, source, raw_text)
-               VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)""",
-            (mill_id, mill_name, product, price_val,
-             q.get('length', 'RL'),
-             max(0, float(q.get('volume', 0) or 0)),
-             max(0, int(float(q.get('tls', 0) or 0))),
-             q.get('shipWindow', q.get('ship_window', '')) or 'Prompt', q.get('notes', ''),
-             q.get('date', today_date),  # Preserve original date for syncs, default to today
-             q.get('trader', 'Unknown'), q.get('source', 'manual'), q.get('raw_text', ''))
-        )
-        created.append(q)
+        # Auto-replace: For each mill+product+length combo being uploaded, delete existing quotes
+        # This ensures uploaded quotes always show as "today" even if price unchanged
+        cleared_combos = set()
+        # Capture old prices before deletion for mill_price_changes tracking
+        _old_prices = {}  # key: (MILL_UPPER, PROD_UPPER, LEN_UPPER) -> {price, date, mill_id}
+        for q in quotes:
+            mill_name = q.get('mill', '').strip()
+            product = q.get('product', '').strip()
+            length = q.get('length', 'RL').strip()
+            if mill_name and product:
+                key = (mill_name.upper(), product.upper(), length.upper())
+                if key not in cleared_combos:
+                    cleared_combos.add(key)
+                    # Capture old price before deleting
+                    old_row = conn.execute(
+                        """SELECT price, date, mill_id FROM mill_quotes
+                           WHERE UPPER(mill_name)=? AND UPPER(product)=? AND UPPER(COALESCE(length,'RL'))=?
+                           ORDER BY id DESC LIMIT 1""",
+                        (mill_name.upper(), product.upper(), length.upper() if length else 'RL')
+                    ).fetchone()
+                    if old_row:
+                        _old_prices[key] = {'price': old_row['price'], 'date': old_row['date'], 'mill_id': old_row['mill_id']}
+                    deleted = conn.execute(
+                        "DELETE FROM mill_quotes WHERE UPPER(mill_name)=? AND UPPER(product)=? AND UPPER(COALESCE(length,'RL'))=?",
+                        (mill_name.upper(), product.upper(), length.upper() if length else 'RL')
+                    ).rowcount
+                    if deleted:
+                        app.logger.info(f"Replaced existing quote for {mill_name} {product} {length}")
+
+        # New mills and product lists were written to CRM above; mirror them so mill_id is available
+        sync_crm_mills_to_mi(conn)
+
+        for q, crm_mill, price_val in resolved:
+            mill_name = q.get('mill', '').strip()
+            mill_id = crm_mill['id']
+            product = q['product']
 
-        # Track price changes for intelligence/mill-moves
-        length_val = q.get('length', 'RL')
-        combo_key = (mill_name.upper(), product.upper(), (length_val or 'RL').upper())
-        old_info = _old_prices.get(combo_key)
-        if old_info and abs(price_val - old_info['price']) > 0.001:
-            # Check if this exact change was already recorded (prevent duplicates from re-submissions)
-            existing_change = conn.execute(
-                """SELECT id FROM mill_price_changes
-                   WHERE mill_id=? AND product=? AND length=? AND new_price=? AND date=?
-                   ORDER BY id DESC LIMIT 1""",
-                (mill_id, product, length_val or 'RL', price_val, q.get('date', today_date))
-            ).fetchone()
-            if not existing_change:
-                change_val = round(price_val - old_info['price'], 2)
-                pct_val = round((change_val / old_info['price']) * 100, 2) if old_info['price'] else None
-                conn.execute(
-                    """INSERT INTO mill_price_changes (mill_id, mill_name, product, length,
-                       old_price, new_price, change, pct_change, date, prev_date, source, trader)
-                       VALUES (?,?,?,?,?,?,?,?,?,?,?,?)""",
-                    (mill_id, mill_name, product, length_val or 'RL',
-                     old_info['price'], price_val, change_val, pct_val,
-                     q.get('date', today_date), old_info['date'],
-                     q.get('source', 'manual'), q.get('trader', 'Unknown'))
-                )
+            conn.execute(
+                """INSERT INTO mill_quotes (mill_id, mill_name, product, price, length, volume, tls,
+                   ship_window, notes, date, trader, source, raw_text)
+                   VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)""",
+                (mill_id, mill_name, product, price_val,
+                 q.get('length', 'RL'),
+                 max(0, float(q.get('volume', 0) or 0)),
+                 max(0, int(float(q.get('tls', 0) or 0))),
+                 q.get('shipWindow', q.get('ship_window', '')) or 'Prompt', q.get('notes', ''),
+                 q.get('date', today_date),  # Preserve original date for syncs, default to today
+                 q.get('trader', 'Unknown'), q.get('source', 'manual'), q.get('raw_text', ''))
+            )
+            created.append(q)
+
+            # Track price changes for intelligence/mill-moves
+            length_val = q.get('length', 'RL')
+            combo_key = (mill_name.upper(), product.upper(), (length_val or 'RL').upper())
+            old_info = _old_prices.get(combo_key)
+            if old_info and abs(price_val - old_info['price']) > 0.001:
+                # Check if this exact change was already recorded (prevent duplicates from re-submissions)
+                existing_change = conn.execute(
+                    """SELECT id FROM mill_price_changes
+                       WHERE mill_id=? AND product=? AND length=? AND new_price=? AND date=?
+                       ORDER BY id DESC LIMIT 1""",
+                    (mill_id, product, length_val or 'RL', price_val, q.get('date', today_date))
+                ).fetchone()
+                if not existing_change:
+                    change_val = round(price_val - old_info['price'], 2)
+                    pct_val = round((change_val / old_info['price']) * 100, 2) if old_info['price'] else None
+                    conn.execute(
+                        """INSERT INTO mill_price_changes (mill_id, mill_name, product, length,
+                           old_price, new_price, change, pct_change, date, prev_date, source, trader)
+                           VALUES (?,?,?,?,?,?,?,?,?,?,?,?)""",
+                        (mill_id, mill_name, product, length_val or 'RL',
+                         old_info['price'], price_val, change_val, pct_val,
+                         q.get('date', today_date), old_info['date'],
+                         q.get('source', 'manual'), q.get('trader', 'Unknown'))
+                    )
+        return created
 
-    conn.commit()
+    if progress:
+        progress('writing', len(quotes))
+    created = _mi_write(conn, write)
     invalidate_matrix_cache()  # Clear cached matrix data
 
-    # Recompute price changes if this was a bulk sync (>50 quotes = likely full sync)
+    # Refresh price changes if this was a bulk sync (>50 quotes = likely full sync)
     if len(created) > 50:
-        recompute_price_changes()
+        if progress:
+            progress('refreshing price changes')
+        refresh_price_changes()
+
+    return {'created': len(created), 'quotes': created}
+
+def _mi_submit_quotes_bulk(conn, quotes, full_list_mills=None, progress=None):
+    """Set-based variant of _mi_submit_quotes_inner for large batches.
+    Stages the batch in temp tables, then does the old-price capture, replace-delete,
+    insert and price-change derivation as a handful of statements in one transaction
+    (on conn, or through the MI write queue when conn is None)."""
+    created = []
+    today_date = datetime.now().strftime('%Y-%m-%d')
+
+    # Replace keys: every mill+product+length combo in the batch (even rows that fail validation)
+    combos = {}
+    for q in quotes:
+        mill_name = (q.get('mill') or '').strip()
+        product = (q.get('product') or '').strip()
+        if mill_name and product:
+            length = (q.get('length') or 'RL').strip() or 'RL'
+            combos[(mill_name.upper(), product.upper(), length.upper())] = True
+
+    # Resolve the batch's mills once
+    _mill_cache = _crm_mills_by_company(quotes)
+    new_products = {}  # mill_id -> products list with additions from this batch
+    staged = []
+    for i, q in enumerate(quotes):
+        if progress:
+            progress('resolving mills', i)
+        mill_name = (q.get('mill') or '').strip()
+        if not mill_name or not q.get('product') or not q.get('price'):
+            continue
+        try:
+            price_val = float(q['price'])
+            if price_val <= 0:
+                continue
+        except (ValueError, TypeError):
+            continue
+
+        company = extract_company_name(mill_name)
+        crm_mill = _mill_cache.get(company.upper())
+        if not crm_mill:
+            city = q.get('city', '')
+            state = mi_extract_state(city) if city else ''
+            region = mi_get_region(state) if state else 'central'
+            lat, lon = None, None
+            if city:
+                coords = mi_geocode_location(city)
+                if coords:
+                    lat, lon = coords['lat'], coords['lon']
+            crm_mill = find_or_create_crm_mill(mill_name, city, state, region, lat, lon,
+                                                q.get('trader', 'Unknown'))
+            _mill_cache[company.upper()] = crm_mill
+        mill_id = crm_mill['id']
+
+        product = q['product']
+        products = new_products.get(mill_id)
+        if products is None:
+            products = json.loads(crm_mill.get('products') or '[]')
+        if product not in products:
+            new_products[mill_id] = products + [product]
+
+        length_val = q.get('length', 'RL')
+        staged.append((
+            len(staged), mill_id, mill_name, product, price_val, length_val,
+            max(0, float(q.get('volume', 0) or 0)),
+            max(0, int(float(q.get('tls', 0) or 0))),
+            q.get('shipWindow', q.get('ship_window', '')) or 'Prompt', q.get('notes', ''),
+            q.get('date', today_date),
+            q.get('trader', 'Unknown'), q.get('source', 'manual'), q.get('raw_text', ''),
+            mill_name.upper(), product.strip().upper(), ((length_val or 'RL').strip() or 'RL').upper(),
+        ))
+        created.append(q)
+
+    if new_products:
+        _crm_writer.execute(lambda c: c.executemany(
+            "UPDATE mills SET products=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
+            [(json.dumps(p), mid) for mid, p in new_products.items()]))
+
+    def write(conn):
+        # Python's round() so change/pct_change match the per-row path on exact .xx5 ties
+        conn.create_function('py_round', 2, round, deterministic=True)
+        try:
+            sync_crm_mills_to_mi(conn)
+
+            # Key columns are left untyped: a TEXT affinity would stop SQLite matching them against idx_mq_keys
+            conn.execute("CREATE TEMP TABLE _mq_full (mu PRIMARY KEY)")
+            conn.execute("CREATE TEMP TABLE _mq_combo (mu, pu, lu, PRIMARY KEY (mu, pu, lu))")
+            conn.execute("CREATE TEMP TABLE _mq_old (mu TEXT, pu TEXT, lu TEXT, price REAL, date TEXT, PRIMARY KEY (mu, pu, lu))")
+            conn.execute("""CREATE TEMP TABLE _mq_stage (seq INTEGER PRIMARY KEY, mill_id INTEGER, mill_name TEXT,
+                product TEXT, price REAL, length TEXT, volume REAL, tls INTEGER, ship_window TEXT, notes TEXT,
+                date TEXT, trader TEXT, source TEXT, raw_text TEXT, mu TEXT, pu TEXT, lu TEXT)""")
+            conn.executemany("INSERT OR IGNORE INTO _mq_full VALUES (?)",
+                             [(m.upper(),) for m in (full_list_mills or ())])
+            conn.executemany("INSERT INTO _mq_combo VALUES (?,?,?)", list(combos))
+            conn.executemany("INSERT INTO _mq_stage VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)", staged)
+
+            # Full-list wipe, then capture the latest surviving price per combo and drop the old rows
+            if full_list_mills:
+                deleted = conn.execute(
+                    "DELETE FROM mill_quotes WHERE UPPER(mill_name) IN (SELECT mu FROM temp._mq_full)"
+                ).rowcount
+                app.logger.info(f"Full-list wipe: cleared {deleted} old quotes for {len(full_list_mills)} mills")
+            conn.execute("""
+                INSERT INTO temp._mq_old (mu, pu, lu, price, date)
+                SELECT k.mu, k.pu, k.lu, mq.price, mq.date
+                FROM (SELECT c.mu, c.pu, c.lu, MAX(q.id) AS id
+                      FROM temp._mq_combo c CROSS JOIN mill_quotes q
+                      WHERE UPPER(q.mill_name)=c.mu AND UPPER(q.product)=c.pu AND UPPER(COALESCE(q.length,'RL'))=c.lu
+                      GROUP BY c.mu, c.pu, c.lu) k
+                JOIN mill_quotes mq ON mq.id=k.id
+            """)
+            replaced = conn.execute("""
+                DELETE FROM mill_quotes WHERE id IN (
+                    SELECT q.id FROM temp._mq_combo c CROSS JOIN mill_quotes q
+                    WHERE UPPER(q.mill_name)=c.mu AND UPPER(q.product)=c.pu AND UPPER(COALESCE(q.length,'RL'))=c.lu)
+            """).rowcount
+            if replaced:
+                app.logger.info(f"Replaced {replaced} existing quotes across {len(combos)} combos")
+
+            conn.execute("""
+                INSERT INTO mill_quotes (mill_id, mill_name, product, price, length, volume, tls,
+                   ship_window, notes, date, trader, source, raw_text)
+                SELECT mill_id, mill_name, product, price, length, volume, tls,
+                       ship_window, notes, date, trader, source, raw_text
+                FROM temp._mq_stage ORDER BY seq
+            """)
+
+            # Price changes: one per (mill, product, length, new price, date), skipping ones already recorded
+            conn.execute("""
+                INSERT INTO mill_price_changes (mill_id, mill_name, product, length,
+                   old_price, new_price, change, pct_change, date, prev_date, source, trader)
+                SELECT mill_id, mill_name, product, plen, old_price, price, chg,
+                       CASE WHEN old_price THEN py_round((chg / old_price) * 100, 2) END,
+                       date, old_date, source, trader
+                FROM (
+                    SELECT s.*, o.price AS old_price, o.date AS old_date,
+                           py_round(s.price - o.price, 2) AS chg,
+                           COALESCE(NULLIF(s.length, ''), 'RL') AS plen,
+                           ROW_NUMBER() OVER (PARTITION BY s.mill_id, s.product, COALESCE(NULLIF(s.length, ''), 'RL'),
+                                              s.price, s.date ORDER BY s.seq) AS rn
+                    FROM temp._mq_stage s
+                    JOIN temp._mq_old o ON o.mu=s.mu AND o.pu=s.pu AND o.lu=s.lu
+                    WHERE ABS(s.price - o.price) > 0.001
+                ) x
+                WHERE rn=1 AND NOT EXISTS (
+                    SELECT 1 FROM mill_price_changes p
+                    WHERE p.mill_id=x.mill_id AND p.product=x.product AND p.length=x.plen
+                      AND p.new_price=x.price AND p.date=x.date)
+                ORDER BY seq
+            """)
+        finally:
+            for tbl in ('_mq_full', '_mq_combo', '_mq_old', '_mq_stage'):
+                conn.execute(f"DROP TABLE IF EXISTS temp.{tbl}")
+
+    if progress:
+        progress('writing', len(quotes))
+    _mi_write(conn, write)
+    invalidate_matrix_cache()
+
+    if len(created) > 50:
+        if progress:
+            progress('refreshing price changes')
+        refresh_price_changes()
 
-    return jsonify({'created': len(created), 'quotes': created}), 201
+    return {'created': len(created), 'quotes': created}
 
 @app.route('/api/mi/quotes/by-mill', methods=['DELETE'])
 
@@ -3505,72 +4857,165 @@ def mi_rename_mill_quotes():
     cur = conn.execute("UPDATE mill_quotes SET mill_name=? WHERE mill_name=?", (new_name, old_name))
     conn.commit()
     conn.close()
+    invalidate_matrix_cache()
     return jsonify({'updated': cur.rowcount, 'old_name': old_name, 'new_name': new_name})
 
-@app.route('/api/mi/quotes/latest', methods=['GET'])
-def mi_latest_quotes():
-    conn = get_mi_db()
-    product = request.args.get('product')
-    region = request.args.get('region')
-    since = request.args.get('since')
-    show_all = request.args.get('all')  # ?all=true bypasses default 2-day window
+@app.route('/api/mi/price-changes/recompute', methods=['POST'])
 
-    # Default to 2-day window (today + yesterday) unless explicit since or all=true
-    if not since and not show_all:
-        since = _mi_default_since()
+def mi_recompute_price_changes():
+    """Maintain mill_price_changes (admin utility). mode: incremental (default) | full | verify."""
+    admin_key = os.environ.get('ADMIN_API_KEY', '')
+    if admin_key and request.headers.get('X-Admin-Key') != admin_key:
+        return jsonify({'error': 'Unauthorized'}), 403
+    mode = request.args.get('mode', 'incremental')
+    if mode == 'verify':
+        return jsonify(verify_price_changes())
+    if mode == 'full':
+        recompute_price_changes()
+        return jsonify({'mode': 'full', 'verify': verify_price_changes()})
+    if mode == 'incremental':
+        return jsonify(refresh_price_changes())
+    return jsonify({'error': 'mode must be incremental, full or verify'}), 400
+
+@app.route('/api/mi/latest-quotes/recompute', methods=['POST'])
+
+def mi_recompute_latest_quotes():
+    """Check or rebuild the latest_quotes table (admin utility). mode: verify (default) | full."""
+    admin_key = os.environ.get('ADMIN_API_KEY', '')
+    if admin_key and request.headers.get('X-Admin-Key') != admin_key:
+        return jsonify({'error': 'Unauthorized'}), 403
+    mode = request.args.get('mode', 'verify')
+    if mode == 'verify':
+        return jsonify(verify_latest_quotes())
+    if mode == 'full':
+        conn = get_mi_db()
+        try:
+            rebuild_latest_quotes(conn)
+            conn.commit()
+        finally:
+            conn.close()
+        invalidate_matrix_cache()
+        return jsonify({'mode': 'full', 'verify': verify_latest_quotes()})
+    return jsonify({'error': 'mode must be verify or full'}), 400
 
+def latest_quote_rows(conn, since=None, product=None, region=None):
+    """Newest quote per mill + space-insensitive product + length, joined to its mill."""
     # Pick newest-date row per mill+product+length, preferring lowest price on ties.
     # NOTE: MAX(id) is unreliable because seed inserts may not match date order.
-    # Uses ROW_NUMBER() window function (SQLite 3.25+) for efficient single-pass ranking.
-    inner_where = ""
+    # latest_quotes already holds the winner of every exact (mill, product, length) series;
+    # ranking those winners over the space-insensitive product gives the same row as ranking
+    # all quotes, and a series whose newest quote is before `since` has no rows after it either.
+    inner_clauses = []
     inner_params = []
     if since:
-        inner_where = " WHERE date >= ?"
-        inner_params = [since]
+        inner_clauses.append("date >= ?")
+        inner_params.append(since)
+    if product:
+        inner_clauses.append("norm_product=LOWER(REPLACE(?, ' ', ''))")
+        inner_params.append(product)
+    inner_where = (" WHERE " + " AND ".join(inner_clauses)) if inner_clauses else ""
 
     sql = f"""
-        SELECT sq.*, m.lat, m.lon, m.region, m.city, m.state
+        SELECT q.*, m.lat, m.lon, m.region, m.city, m.state
         FROM (
-            SELECT *, ROW_NUMBER() OVER (
-                PARTITION BY mill_name, LOWER(REPLACE(product, ' ', '')), length
-                ORDER BY date DESC, price ASC, id DESC
+            SELECT quote_id, ROW_NUMBER() OVER (
+                PARTITION BY mill_name, norm_product, length
+                ORDER BY date DESC, price ASC, quote_id DESC
             ) AS rn
-            FROM mill_quotes{inner_where}
-        ) sq
-        LEFT JOIN mills m ON sq.mill_id = m.id
-        WHERE sq.rn = 1
+            FROM latest_quotes{inner_where}
+        ) lq
+        JOIN mill_quotes q ON q.id = lq.quote_id
+        LEFT JOIN mills m ON q.mill_id = m.id
+        WHERE lq.rn = 1
     """
     params = list(inner_params)
-    if product:
-        sql += " AND LOWER(REPLACE(sq.product, ' ', ''))=LOWER(REPLACE(?, ' ', ''))"
-        params.append(product)
     if region:
         sql += " AND m.region=?"
         params.append(region)
-    sql += " ORDER BY sq.product, sq.price"
-    rows = conn.execute(sql, params).fetchall()
-    conn.close()
-    # Strip the rn column from results
-    return jsonify([{k: v for k, v in dict(r).items() if k != 'rn'} for r in rows])
+    sql += " ORDER BY q.product, q.price"
+    return conn.execute(sql, params).fetchall()
 
-@app.route('/api/mi/quotes/matrix', methods=['GET'])
-def mi_quote_matrix():
-    detail = request.args.get('detail', '')
-    filter_product = request.args.get('product', '')
-    filter_since = request.args.get('since', '')
-    show_all = request.args.get('all')
+@app.route('/api/mi/quotes/latest', methods=['GET'])
+def mi_latest_quotes():
+    conn = get_mi_db(readonly=True)
+    product = request.args.get('product')
+    region = request.args.get('region')
+    since = request.args.get('since')
+    show_all = request.args.get('all')  # ?all=true bypasses default 2-day window
 
     # Default to 2-day window (today + yesterday) unless explicit since or all=true
-    if not filter_since and not show_all:
-        filter_since = _mi_default_since()
-
-    # Check cache first (30s TTL to handle concurrent users)
-    cache_key = f"matrix:{detail}:{filter_product}:{filter_since}"
-    cached = get_cached_matrix(cache_key)
-    if cached:
-        return jsonify(cached)
-
-    conn = get_mi_db()
+    if not since and not show_all:
+        since = _mi_default_since()
+
+    try:
+        rows = latest_quote_rows(conn, since, product, region)
+    finally:
+        conn.close()
+    return jsonify([dict(r) for r in rows])
+
+def matrix_quote_rows(conn, detail, since=None, product=None):
+    """Matrix cells: newest quote per mill+product+length (detail='length') or per mill+product."""
+    if detail == 'length':
+        # One latest_quotes row per (mill, product, length) series is exactly this grid
+        sql = """
+            SELECT q.mill_name, q.product, q.length, q.price, q.date, q.volume,
+                   q.ship_window, q.tls, q.trader,
+                   m.lat, m.lon, m.region, m.city, m.state
+            FROM latest_quotes lq
+            JOIN mill_quotes q ON q.id = lq.quote_id
+            LEFT JOIN mills m ON q.mill_id = m.id
+            WHERE 1=1
+        """
+        params = []
+        if since:
+            sql += " AND lq.date >= ?"
+            params.append(since)
+        if product:
+            sql += " AND lq.product = ?"
+            params.append(product)
+        sql += " ORDER BY lq.mill_name, lq.product, lq.length"
+        return conn.execute(sql, params).fetchall()
+    # Rank the per-length winners in latest_quotes down to one row per mill+product
+    inner_where = ""
+    params = []
+    if since:
+        inner_where = " WHERE date >= ?"
+        params = [since]
+    sql = f"""
+        SELECT q.mill_name, q.product, q.price, q.date, q.volume, q.ship_window,
+               q.tls, q.trader, m.lat, m.lon, m.region, m.city, m.state
+        FROM (
+            SELECT quote_id, ROW_NUMBER() OVER (
+                PARTITION BY mill_name, product
+                ORDER BY date DESC, price ASC, quote_id DESC
+            ) AS rn
+            FROM latest_quotes{inner_where}
+        ) lq
+        JOIN mill_quotes q ON q.id = lq.quote_id
+        LEFT JOIN mills m ON q.mill_id = m.id
+        WHERE lq.rn = 1
+        ORDER BY q.mill_name, q.product
+    """
+    return conn.execute(sql, params).fetchall()
+
+@app.route('/api/mi/quotes/matrix', methods=['GET'])
+def mi_quote_matrix():
+    detail = request.args.get('detail', '')
+    filter_product = request.args.get('product', '')
+    filter_since = request.args.get('since', '')
+    show_all = request.args.get('all')
+
+    # Default to 2-day window (today + yesterday) unless explicit since or all=true
+    if not filter_since and not show_all:
+        filter_since = _mi_default_since()
+
+    # Check cache first (30s TTL to handle concurrent users)
+    cache_key = f"matrix:{detail}:{filter_product}:{filter_since}"
+    cached = get_cached_matrix(cache_key)
+    if cached:
+        return jsonify(cached)
+
+    conn = get_mi_db(readonly=True)
 
     def product_sort_key(prod):
         """Sort products: 2x4→2x6→2x8→2x10→2x12 by grade, then specialty."""
@@ -3588,32 +5033,7 @@ def mi_quote_matrix():
         return (1, 0, 0, 0, prod)
 
     if detail == 'length':
-        # Inner subquery also respects since filter to avoid stale data
-        inner_where = ""
-        inner_params = []
-        if filter_since:
-            inner_where = " WHERE date >= ?"
-            inner_params = [filter_since]
-        sql = f"""
-            SELECT sq.mill_name, sq.product, sq.length, sq.price, sq.date, sq.volume,
-                   sq.ship_window, sq.tls, sq.trader,
-                   m.lat, m.lon, m.region, m.city, m.state
-            FROM (
-                SELECT *, ROW_NUMBER() OVER (
-                    PARTITION BY mill_name, product, length
-                    ORDER BY date DESC, price ASC, id DESC
-                ) AS rn
-                FROM mill_quotes{inner_where}
-            ) sq
-            LEFT JOIN mills m ON sq.mill_id = m.id
-            WHERE sq.rn = 1
-        """
-        params = list(inner_params)
-        if filter_product:
-            sql += " AND sq.product = ?"
-            params.append(filter_product)
-        sql += " ORDER BY sq.mill_name, sq.product, sq.length"
-        rows = conn.execute(sql, params).fetchall()
+        rows = matrix_quote_rows(conn, 'length', filter_since, filter_product)
         conn.close()
 
         matrix = {}
@@ -3672,27 +5092,7 @@ def mi_quote_matrix():
         set_cached_matrix(cache_key, result)
         return jsonify(result)
     else:
-        inner_where2 = ""
-        inner_params2 = []
-        if filter_since:
-            inner_where2 = " WHERE date >= ?"
-            inner_params2 = [filter_since]
-        sql = f"""
-            SELECT sq.mill_name, sq.product, sq.price, sq.date, sq.volume, sq.ship_window,
-                   sq.tls, sq.trader, m.lat, m.lon, m.region, m.city, m.state
-            FROM (
-                SELECT *, ROW_NUMBER() OVER (
-                    PARTITION BY mill_name, product
-                    ORDER BY date DESC, price ASC, id DESC
-                ) AS rn
-                FROM mill_quotes{inner_where2}
-            ) sq
-            LEFT JOIN mills m ON sq.mill_id = m.id
-            WHERE sq.rn = 1
-        """
-        params = list(inner_params2)
-        sql += " ORDER BY sq.mill_name, sq.product"
-        rows = conn.execute(sql, params).fetchall()
+        rows = matrix_quote_rows(conn, '', filter_since)
         conn.close()
 
         matrix = {}
@@ -3737,7 +5137,7 @@ def mi_quote_history():
     except (ValueError, TypeError):
         days = 90
     cutoff = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-    conn = get_mi_db()
+    conn = get_mi_db(readonly=True)
     conditions = ["date >= ?"]
     params = [cutoff]
     if mill:
@@ -3755,10 +5155,38 @@ def mi_quote_history():
 
 # ----- MI: INTELLIGENCE ENGINE -----
 
-@app.route('/api/mi/intel/signals', methods=['GET'])
-def mi_intel_signals():
-    product_filter = request.args.get('product')
-    conn = get_mi_db()
+def _calc_slope(prices):
+    """Least-squares slope of a daily avg-price series (x = day index)."""
+    if len(prices) < 2:
+        return 0
+    n = len(prices)
+    x_sum = n * (n - 1) / 2
+    x2_sum = n * (n - 1) * (2 * n - 1) / 6
+    y_sum = sum(prices)
+    xy_sum = sum(i * p for i, p in enumerate(prices))
+    denom = n * x2_sum - x_sum * x_sum
+    if denom == 0:
+        return 0
+    return (n * xy_sum - x_sum * y_sum) / denom
+
+def _sql_sum(total, value):
+    """Accumulate like SQLite SUM(): NULLs skipped, None when nothing was added."""
+    if value is None:
+        return total
+    return value if total is None else total + value
+
+def _null_first(key):
+    """Sort key matching SQLite ORDER BY/GROUP BY on a nullable text column."""
+    return (key is not None, key or '')
+
+def compute_intel_signals(conn, product_filter=None):
+    """Compute all six intel signals for every product from one pass over the 30-day quote window.
+    Returns {product: [signal, ...]} (same payload as /api/mi/intel/signals)."""
+    return _compute_intel(conn, product_filter)['signals']
+
+def _compute_intel(conn, product_filter=None):
+    """One pass over the 30-day quote window: signals, 7-day best source per product and
+    window-wide quote stats."""
     now = datetime.now()
     d7 = (now - timedelta(days=7)).strftime('%Y-%m-%d')
     d14 = (now - timedelta(days=14)).strftime('%Y-%m-%d')
@@ -3769,23 +5197,80 @@ def mi_intel_signals():
     else:
         products = [r['product'] for r in conn.execute("SELECT DISTINCT product FROM mill_quotes").fetchall()]
 
+    # One read of the window as plain tuples; the week key is computed by SQLite so the
+    # volume grouping matches strftime() exactly
+    mill_geo = {r['id']: (r['city'], r['region']) for r in conn.execute("SELECT id, city, region FROM mills").fetchall()}
+    sql = """SELECT id, product, mill_name, price, volume, date, mill_id,
+                    CASE WHEN volume > 0 THEN strftime('%%W', date) END
+             FROM mill_quotes WHERE date >= ?"""
+    params = [d30]
+    if product_filter:
+        sql += " AND product=?"
+        params.append(product_filter)
+    cur = conn.cursor()
+    cur.row_factory = None
+    rows = cur.execute(sql, params).fetchall()
+    rows.sort()
+
+    # Latest RL print per product (first row by region, id on the newest date)
+    latest_rl = {}
+    if products:
+        placeholders = ','.join('?' * len(products))
+        for r in conn.execute(f"""
+            SELECT r.product, r.price FROM rl_prices r
+            JOIN (SELECT product, MAX(date) AS d FROM rl_prices WHERE product IN ({placeholders}) GROUP BY product) m
+              ON r.product = m.product AND r.date = m.d
+            ORDER BY r.product, r.region, r.id
+        """, products).fetchall():
+            latest_rl.setdefault(r['product'], r['price'])
+
+    # Per-product accumulators, filled in id order (the order the per-product queries scanned in)
+    acc = {}
+    best_source = {}
+    quotes_7d = 0
+    mills_7d = set()
+    for _, product, mill_name, price, volume, date, mill_id, week in rows:
+        a = acc.get(product)
+        if a is None:
+            a = acc[product] = {'mills_7d': set(), 'vol_7d': None, 'mills_30d': set(), 'vol_30d': None,
+                                'days': {}, 'regions': {}, 'weeks': {}}
+        a['mills_30d'].add(mill_name)
+        if volume is not None:
+            a['vol_30d'] = volume if a['vol_30d'] is None else a['vol_30d'] + volume
+        day = a['days'].get(date)
+        if day is None:
+            a['days'][date] = [price, 1]
+        else:
+            day[0] += price
+            day[1] += 1
+        if volume is not None and volume > 0:
+            a['weeks'][week] = _sql_sum(a['weeks'].get(week), volume)
+        if date >= d7:
+            quotes_7d += 1
+            mills_7d.add(mill_name)
+            a['mills_7d'].add(mill_name)
+            if volume is not None:
+                a['vol_7d'] = volume if a['vol_7d'] is None else a['vol_7d'] + volume
+            city, region = mill_geo.get(mill_id, (None, None))
+            best = a['regions'].get(region)
+            if best is None or price < best[0]:
+                a['regions'][region] = [price, mill_name]
+            src = best_source.get(product)
+            if src is None or price < src['price']:
+                best_source[product] = {'mill_name': mill_name, 'price': price, 'city': city, 'region': region}
+
+    empty = {'mills_7d': (), 'vol_7d': None, 'mills_30d': (), 'vol_30d': None, 'days': {}, 'regions': {}, 'weeks': {}}
     all_signals = {}
     for product in products:
+        a = acc.get(product, empty)
         signals = []
+        days = sorted(a['days'].items())
 
         # 1. Supply Pressure
-        mills_7d = conn.execute(
-            "SELECT COUNT(DISTINCT mill_name) as cnt, SUM(volume) as vol FROM mill_quotes WHERE product=? AND date>=?",
-            (product, d7)
-        ).fetchone()
-        mills_30d = conn.execute(
-            "SELECT COUNT(DISTINCT mill_name) as cnt, SUM(volume) as vol, COUNT(*) as quotes FROM mill_quotes WHERE product=? AND date>=?",
-            (product, d30)
-        ).fetchone()
-        m7 = mills_7d['cnt'] or 0
-        v7 = mills_7d['vol'] or 0
-        m30 = mills_30d['cnt'] or 0
-        v30 = mills_30d['vol'] or 0
+        m7 = len(a['mills_7d'])
+        v7 = a['vol_7d'] or 0
+        m30 = len(a['mills_30d'])
+        v30 = a['vol_30d'] or 0
         avg_weekly_mills = m30 / 4.3 if m30 else 0
         avg_weekly_vol = v30 / 4.3 if v30 else 0
 
@@ -3810,31 +5295,11 @@ def mi_intel_signals():
             })
 
         # 2. Price Momentum
-        prices_14d = conn.execute(
-            "SELECT date, AVG(price) as avg_price FROM mill_quotes WHERE product=? AND date>=? GROUP BY date ORDER BY date",
-            (product, d14)
-        ).fetchall()
-        prices_30d = conn.execute(
-            "SELECT date, AVG(price) as avg_price FROM mill_quotes WHERE product=? AND date>=? GROUP BY date ORDER BY date",
-            (product, d30)
-        ).fetchall()
-
-        def calc_slope(prices):
-            if len(prices) < 2:
-                return 0
-            n = len(prices)
-            x_sum = n * (n - 1) / 2
-            x2_sum = n * (n - 1) * (2 * n - 1) / 6
-            y_sum = sum(p['avg_price'] for p in prices)
-            xy_sum = sum(i * p['avg_price'] for i, p in enumerate(prices))
-            denom = n * x2_sum - x_sum * x_sum
-            if denom == 0:
-                return 0
-            return (n * xy_sum - x_sum * y_sum) / denom
-
-        slope_14d = calc_slope(prices_14d)
-        slope_30d = calc_slope(prices_30d)
-        current_avg = prices_14d[-1]['avg_price'] if prices_14d else 0
+        prices_30d = [total / cnt for _, (total, cnt) in days]
+        prices_14d = [total / cnt for d, (total, cnt) in days if d >= d14]
+        slope_14d = _calc_slope(prices_14d)
+        slope_30d = _calc_slope(prices_30d)
+        current_avg = prices_14d[-1] if prices_14d else 0
 
         if abs(slope_14d) > 0.5:
             direction = 'bullish' if slope_14d > 0 else 'bearish'
@@ -3850,12 +5315,8 @@ def mi_intel_signals():
         })
 
         # 3. Print vs Street
-        latest_rl = conn.execute(
-            "SELECT price FROM rl_prices WHERE product=? ORDER BY date DESC LIMIT 1",
-            (product,)
-        ).fetchone()
-        if latest_rl and current_avg > 0:
-            rl_price = latest_rl['price']
+        rl_price = latest_rl.get(product)
+        if rl_price is not None and current_avg > 0:
             gap = rl_price - current_avg
             if gap > 10:
                 direction = 'bearish'
@@ -3875,14 +5336,9 @@ def mi_intel_signals():
             })
 
         # 4. Regional Arbitrage
-        regional_prices = conn.execute("""
-            SELECT m.region, MIN(mq.price) as best_price, mq.mill_name
-            FROM mill_quotes mq LEFT JOIN mills m ON mq.mill_id = m.id
-            WHERE mq.product=? AND mq.date>=?
-            GROUP BY m.region
-        """, (product, d7)).fetchall()
-        if len(regional_prices) >= 2:
-            rp = {r['region']: {'price': r['best_price'], 'mill': r['mill_name']} for r in regional_prices}
+        if len(a['regions']) >= 2:
+            rp = {region: {'price': best[0], 'mill': best[1]}
+                  for region, best in sorted(a['regions'].items(), key=lambda kv: _null_first(kv[0]))}
             opps = []
             regions = list(rp.keys())
             for i in range(len(regions)):
@@ -3910,13 +5366,10 @@ def mi_intel_signals():
                 })
 
         # 5. Offering Velocity
-        daily_counts = conn.execute(
-            "SELECT date, COUNT(*) as cnt FROM mill_quotes WHERE product=? AND date>=? GROUP BY date",
-            (product, d30)
-        ).fetchall()
-        if daily_counts:
-            avg_daily = sum(r['cnt'] for r in daily_counts) / max(len(daily_counts), 1)
-            recent_daily = [r['cnt'] for r in daily_counts if r['date'] >= d7]
+        if days:
+            counts = [cnt for _, (_, cnt) in days]
+            avg_daily = sum(counts) / max(len(counts), 1)
+            recent_daily = [cnt for d, (_, cnt) in days if d >= d7]
             recent_avg = sum(recent_daily) / max(len(recent_daily), 1) if recent_daily else 0
             vel_ratio = recent_avg / avg_daily if avg_daily > 0 else 1
             if vel_ratio > 1.3:
@@ -3938,13 +5391,8 @@ def mi_intel_signals():
             })
 
         # 6. Volume Trend
-        weekly_vol = conn.execute("""
-            SELECT strftime('%%W', date) as week, SUM(volume) as vol
-            FROM mill_quotes WHERE product=? AND date>=? AND volume > 0
-            GROUP BY week ORDER BY week
-        """, (product, d30)).fetchall()
-        if len(weekly_vol) >= 2:
-            vols = [r['vol'] for r in weekly_vol]
+        if len(a['weeks']) >= 2:
+            vols = [v for _, v in sorted(a['weeks'].items(), key=lambda kv: _null_first(kv[0]))]
             avg_vol = sum(vols) / len(vols)
             latest_vol = vols[-1]
             change = ((latest_vol - avg_vol) / avg_vol * 100) if avg_vol > 0 else 0
@@ -3965,71 +5413,123 @@ def mi_intel_signals():
 
         all_signals[product] = signals
 
-    conn.close()
-    return jsonify(all_signals)
+    return {
+        'products': products,
+        'signals': all_signals,
+        'best_source': best_source,
+        'quotes_7d': quotes_7d,
+        'active_mills_7d': len(mills_7d),
+    }
+
+def _score_recommendation(product, signals, best):
+    """Turn a product's signals into a trading recommendation."""
+    score = 0
+    reasons = []
+
+    weights = {
+        'supply_pressure': 2, 'price_momentum': 3, 'print_vs_street': 1.5,
+        'offering_velocity': 1, 'volume_trend': 1.5, 'regional_arbitrage': 0
+    }
+
+    for sig in signals:
+        w = weights.get(sig['signal'], 1)
+        if sig['direction'] == 'bullish':
+            score += w * (2 if sig['strength'] == 'strong' else 1)
+        elif sig['direction'] == 'bearish':
+            score -= w * (2 if sig['strength'] == 'strong' else 1)
+        if sig.get('explanation'):
+            reasons.append(sig['explanation'])
+
+    if score >= 4: action = 'BUY NOW'
+    elif score >= 2: action = 'LEAN BUY'
+    elif score <= -4: action = 'SHORT / SELL'
+    elif score <= -2: action = 'LEAN SHORT'
+    else: action = 'HOLD / NEUTRAL'
+
+    if score >= 4: margin_range = [35, 50]
+    elif score >= 2: margin_range = [28, 40]
+    elif score <= -4: margin_range = [15, 22]
+    elif score <= -2: margin_range = [18, 28]
+    else: margin_range = [22, 35]
+
+    return {
+        'product': product, 'action': action, 'score': round(score, 1),
+        'confidence': min(abs(score) / 8, 1.0), 'margin_range': margin_range,
+        'best_source': best, 'reasons': reasons,
+        'signal_count': len(signals)
+    }
+
+# ----- MI: SIGNAL SNAPSHOT -----
+# Signals, best sources and recommendations for all products, shared by the signals,
+# recommendations and dashboard endpoints. Rebuilt only when the data version moves.
+_signal_snapshot = None
+_signal_snapshot_lock = threading.Lock()
+
+def _mi_signal_version(conn):
+    """Version stamp for everything the signals read: quote-table change counter (the
+    mill_quote_touches sequence), newest RL row, mills mirror, plus the day the windows are cut on."""
+    row = conn.execute("""
+        SELECT (SELECT seq FROM sqlite_sequence WHERE name='mill_quote_touches'),
+               (SELECT MAX(id) FROM rl_prices),
+               (SELECT COUNT(*) || ':' || COALESCE(MAX(updated_at), '') FROM mills)
+    """).fetchone()
+    return (datetime.now().strftime('%Y-%m-%d'), row[0] or 0, row[1] or 0, row[2])
+
+def get_signal_snapshot(conn=None):
+    """Return the current signal snapshot, rebuilding it (once, under a lock) if stale."""
+    global _signal_snapshot
+    own_conn = conn is None
+    conn = conn or get_mi_db()
+    try:
+        version = _mi_signal_version(conn)
+        snap = _signal_snapshot
+        if snap is not None and snap['version'] == version:
+            return snap
+        with _signal_snapshot_lock:
+            snap = _signal_snapshot
+            if snap is not None and snap['version'] == version:
+                return snap
+            intel = _compute_intel(conn)
+            intel['version'] = version
+            intel['recommendations'] = sorted(
+                (_score_recommendation(p, intel['signals'].get(p, []), intel['best_source'].get(p))
+                 for p in intel['products']),
+                key=lambda r: abs(r['score']), reverse=True)
+            _signal_snapshot = intel
+            return intel
+    finally:
+        if own_conn:
+            conn.close()
+
+@app.route('/api/mi/intel/signals', methods=['GET'])
+def mi_intel_signals():
+    product_filter = request.args.get('product')
+    conn = get_mi_db(readonly=True)
+    try:
+        snap = get_signal_snapshot(conn)
+        if not product_filter:
+            return jsonify(snap['signals'])
+        if product_filter in snap['signals']:
+            return jsonify({product_filter: snap['signals'][product_filter]})
+        return jsonify(compute_intel_signals(conn, product_filter))
+    finally:
+        conn.close()
 
 @app.route('/api/mi/intel/recommendations', methods=['GET'])
 def mi_intel_recommendations():
     product_filter = request.args.get('product')
-    conn = get_mi_db()
-    if product_filter:
-        products = [product_filter]
-    else:
-        products = [r['product'] for r in conn.execute("SELECT DISTINCT product FROM mill_quotes").fetchall()]
-
-    import json as json_mod
-    with app.test_request_context(f'/api/mi/intel/signals{"?product=" + product_filter if product_filter else ""}'):
-        sig_response = mi_intel_signals()
-        all_signals = json_mod.loads(sig_response.get_data())
-
-    recommendations = []
-    for product in products:
-        signals = all_signals.get(product, [])
-        score = 0
-        reasons = []
-
-        weights = {
-            'supply_pressure': 2, 'price_momentum': 3, 'print_vs_street': 1.5,
-            'offering_velocity': 1, 'volume_trend': 1.5, 'regional_arbitrage': 0
-        }
-
-        for sig in signals:
-            w = weights.get(sig['signal'], 1)
-            if sig['direction'] == 'bullish':
-                score += w * (2 if sig['strength'] == 'strong' else 1)
-            elif sig['direction'] == 'bearish':
-                score -= w * (2 if sig['strength'] == 'strong' else 1)
-            if sig.get('explanation'):
-                reasons.append(sig['explanation'])
-
-        if score >= 4: action = 'BUY NOW'
-        elif score >= 2: action = 'LEAN BUY'
-        elif score <= -4: action = 'SHORT / SELL'
-        elif score <= -2: action = 'LEAN SHORT'
-        else: action = 'HOLD / NEUTRAL'
-
-        if score >= 4: margin_range = [35, 50]
-        elif score >= 2: margin_range = [28, 40]
-        elif score <= -4: margin_range = [15, 22]
-        elif score <= -2: margin_range = [18, 28]
-        else: margin_range = [22, 35]
-
-        best = conn.execute("""
-            SELECT mq.mill_name, mq.price, m.city, m.region
-            FROM mill_quotes mq LEFT JOIN mills m ON mq.mill_id = m.id
-            WHERE mq.product=? AND mq.date >= ?
-            ORDER BY mq.price ASC LIMIT 1
-        """, (product, (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d'))).fetchone()
-
-        recommendations.append({
-            'product': product, 'action': action, 'score': round(score, 1),
-            'confidence': min(abs(score) / 8, 1.0), 'margin_range': margin_range,
-            'best_source': dict(best) if best else None, 'reasons': reasons,
-            'signal_count': len(signals)
-        })
-
-    conn.close()
-    return jsonify(sorted(recommendations, key=lambda r: abs(r['score']), reverse=True))
+    conn = get_mi_db(readonly=True)
+    try:
+        snap = get_signal_snapshot(conn)
+        if not product_filter:
+            return jsonify(snap['recommendations'])
+        if product_filter in snap['signals']:
+            signals = snap['signals'][product_filter]
+        else:
+            signals = compute_intel_signals(conn, product_filter).get(product_filter, [])
+        return jsonify([_score_recommendation(product_filter, signals, snap['best_source'].get(product_filter))])
+    finally:
+        conn.close()
 
 @app.route('/api/mi/intel/trends', methods=['GET'])
 def mi_intel_trends():
@@ -4038,7 +5538,7 @@ def mi_intel_trends():
         days = min(365, max(1, int(request.args.get('days', 90))))
     except (ValueError, TypeError):
         days = 90
-    conn = get_mi_db()
+    conn = get_mi_db(readonly=True)
     since = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
 
     sql = """
@@ -4079,7 +5579,7 @@ def mi_intel_trends():
 
 @app.route('/api/mi/customers', methods=['GET'])
 def mi_list_customers():
-    conn = get_mi_db()
+    conn = get_mi_db(readonly=True)
     rows = conn.execute("SELECT * FROM customers ORDER BY name").fetchall()
     conn.close()
     return jsonify([dict(r) for r in rows])
@@ -4108,7 +5608,7 @@ def mi_create_customer():
 
 @app.route('/api/mi/rl', methods=['GET'])
 def mi_list_rl():
-    conn = get_mi_db()
+    conn = get_mi_db(readonly=True)
     rows = conn.execute("SELECT * FROM rl_prices ORDER BY date DESC LIMIT 200").fetchall()
     conn.close()
     return jsonify([dict(r) for r in rows])
@@ -4137,6 +5637,7 @@ def mi_add_rl():
                     "INSERT OR REPLACE INTO rl_prices (date, region, product, length, price) VALUES (?,?,?,?,?)",
                     rows
                 )
+                bump_data_version('rl', conn)
                 conn.commit()
                 conn.close()
                 return jsonify({'created': len(rows)}), 201
@@ -4166,31 +5667,13 @@ def rl_history():
         if cached is not None:
             return jsonify(cached)
 
-        sql = "SELECT date, region, product, length, price FROM rl_prices WHERE 1=1"
-        params = []
-
-        if product:
-            sql += " AND product = ?"
-            params.append(product)
-        if region:
-            sql += " AND region = ?"
-            params.append(region)
-        if length:
-            sql += " AND length = ?"
-            params.append(length)
-        if date_from:
-            sql += " AND date >= ?"
-            params.append(date_from)
-        if date_to:
-            sql += " AND date <= ?"
-            params.append(date_to)
-
-        sql += " ORDER BY date"
-
-        conn = get_mi_db()
-        rows = conn.execute(sql, params).fetchall()
-        conn.close()
-        result = [dict(r) for r in rows]
+        store = get_rl_store()
+        result = []
+        for key in store.keys(region or None, product or None, length or None):
+            r_region, r_product, r_length = key
+            for d, price in store.series[key].slice(date_from, date_to):
+                result.append({'date': d, 'region': r_region, 'product': r_product, 'length': r_length, 'price': price})
+        result.sort(key=lambda r: r['date'])
         set_rl_cache(cache_key, result)
         return jsonify(result)
     except Exception as e:
@@ -4201,12 +5684,8 @@ def rl_history():
 def rl_dates():
     """Return list of available dates with row counts."""
     try:
-        conn = get_mi_db()
-        rows = conn.execute(
-            "SELECT date, COUNT(*) as row_count FROM rl_prices GROUP BY date ORDER BY date"
-        ).fetchall()
-        conn.close()
-        return jsonify([dict(r) for r in rows])
+        counts = get_rl_store().date_counts()
+        return jsonify([{'date': d, 'row_count': counts[d]} for d in sorted(counts)])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -4219,19 +5698,8 @@ def rl_entry():
         if not date:
             return jsonify({'error': 'date parameter required'}), 400
 
-        conn = get_mi_db()
-        rows = conn.execute(
-            "SELECT region, product, length, price FROM rl_prices WHERE date = ?",
-            (date,)
-        ).fetchall()
-        conn.close()
-
         result = {'date': date, 'west': {}, 'central': {}, 'east': {}}
-        for r in rows:
-            region = r['region']
-            product = r['product']
-            length = r['length']
-            price = r['price']
+        for region, product, length, price in get_rl_store().rows_on(date):
             if region not in result:
                 result[region] = {}
             if product not in result[region]:
@@ -4300,29 +5768,15 @@ def rl_chart_batch():
         if cached is not None:
             return jsonify(cached)
 
-        conn = get_mi_db()
+        store = get_rl_store()
 
-        # Fetch all regions for this product
-        sql = "SELECT date, region, price FROM rl_prices WHERE product=? AND length=?"
-        params = [product, length]
-        if date_from:
-            sql += " AND date>=?"
-            params.append(date_from)
-        if date_to:
-            sql += " AND date<=?"
-            params.append(date_to)
-        sql += " ORDER BY date"
-        rows = conn.execute(sql, params).fetchall()
+        def _points(region, prod):
+            series = store.get(region, prod, length)
+            return series.slice(date_from, date_to) if series else []
 
-        west, central, east = [], [], []
-        for r in rows:
-            entry = {'date': r['date'], 'price': r['price']}
-            if r['region'] == 'west':
-                west.append(entry)
-            elif r['region'] == 'central':
-                central.append(entry)
-            elif r['region'] == 'east':
-                east.append(entry)
+        # All regions for this product
+        west, central, east = [[{'date': d, 'price': p} for d, p in _points(reg, product)]
+                               for reg in ('west', 'central', 'east')]
 
         # Compute spreads if product is #2 grade
         spread46, spread_wc = [], []
@@ -4336,17 +5790,7 @@ def rl_chart_batch():
                 spread_product = None
 
             if spread_product:
-                sql2 = "SELECT date, region, price FROM rl_prices WHERE product=? AND length=? AND region='west'"
-                params2 = [spread_product, length]
-                if date_from:
-                    sql2 += " AND date>=?"
-                    params2.append(date_from)
-                if date_to:
-                    sql2 += " AND date<=?"
-                    params2.append(date_to)
-                sql2 += " ORDER BY date"
-                spread_rows = conn.execute(sql2, params2).fetchall()
-                spread_map = {r['date']: r['price'] for r in spread_rows}
+                spread_map = dict(_points('west', spread_product))
 
                 # Also get 2x4#2 west prices for the spread
                 if product.startswith('2x4'):
@@ -4354,17 +5798,7 @@ def rl_chart_batch():
                     w6_map = spread_map
                 else:
                     w6_map = {e['date']: e['price'] for e in west}
-                    sql3 = "SELECT date, price FROM rl_prices WHERE product='2x4#2' AND length=? AND region='west'"
-                    params3 = [length]
-                    if date_from:
-                        sql3 += " AND date>=?"
-                        params3.append(date_from)
-                    if date_to:
-                        sql3 += " AND date<=?"
-                        params3.append(date_to)
-                    sql3 += " ORDER BY date"
-                    w4_rows = conn.execute(sql3, params3).fetchall()
-                    w4_map = {r['date']: r['price'] for r in w4_rows}
+                    w4_map = dict(_points('west', '2x4#2'))
 
                 # Build 2x4/2x6 spread
                 for e in west:
@@ -4383,8 +5817,6 @@ def rl_chart_batch():
                 if w_price and c_price:
                     spread_wc.append({'date': d, 'spread': round(w_price - c_price)})
 
-        conn.close()
-
         result = {
             'west': west,
             'central': central,
@@ -4412,98 +5844,42 @@ def rl_spreads():
         if cached is not None:
             return jsonify(cached)
 
-        conn = get_mi_db()
+        store = get_rl_store()
 
         # Find latest two "complete" dates in range (skip partial entries with <10 rows)
-        date_sql = """SELECT date, COUNT(*) as cnt FROM rl_prices WHERE region=?"""
-        date_params = [region]
-        if date_from:
-            date_sql += " AND date>=?"
-            date_params.append(date_from)
-        if date_to:
-            date_sql += " AND date<=?"
-            date_params.append(date_to)
-        date_sql += " GROUP BY date HAVING cnt >= 10 ORDER BY date DESC LIMIT 2"
-        date_rows = conn.execute(date_sql, date_params).fetchall()
-        latest_date = date_rows[0]['date'] if date_rows else None
-        prev_date = date_rows[1]['date'] if len(date_rows) > 1 else None
+        counts = store.date_counts(region, date_from, date_to)
+        complete = sorted((d for d, c in counts.items() if c >= 10), reverse=True)
+        latest_date = complete[0] if complete else None
+        prev_date = complete[1] if len(complete) > 1 else None
 
         if not latest_date:
-            conn.close()
             return jsonify({'length_spreads': [], 'dimension_spreads': [], 'grade_spreads': [], 'wow_changes': []})
 
-        # Get latest prices
-        latest_rows = conn.execute(
-            "SELECT product, length, price FROM rl_prices WHERE region=? AND date=?",
-            (region, latest_date)
-        ).fetchall()
-        latest = {}
-        for r in latest_rows:
-            latest[(r['product'], r['length'])] = r['price']
-
-        # Get previous week prices for WoW
+        # Get latest prices, and previous week prices for WoW
+        latest = {(product, length): price for _, product, length, price in store.rows_on(latest_date, region)}
         prev = {}
         if prev_date:
-            prev_rows = conn.execute(
-                "SELECT product, length, price FROM rl_prices WHERE region=? AND date=?",
-                (region, prev_date)
-            ).fetchall()
-            for r in prev_rows:
-                prev[(r['product'], r['length'])] = r['price']
-
-        # Get aggregates for full date range
-        agg_sql = "SELECT product, length, AVG(price) as avg_price, MIN(price) as min_price, MAX(price) as max_price, COUNT(*) as cnt FROM rl_prices WHERE region=?"
-        agg_params = [region]
-        if date_from:
-            agg_sql += " AND date>=?"
-            agg_params.append(date_from)
-        if date_to:
-            agg_sql += " AND date<=?"
-            agg_params.append(date_to)
-        agg_sql += " GROUP BY product, length"
-        agg_rows = conn.execute(agg_sql, agg_params).fetchall()
-        agg = {}
-        for r in agg_rows:
-            agg[(r['product'], r['length'])] = {
-                'avg': round(r['avg_price'], 2),
-                'min': r['min_price'],
-                'max': r['max_price'],
-                'cnt': r['cnt']
-            }
-
-        # For percentile rank, get all prices per product+length
-        # Only include "complete" dates (10+ rows) to avoid partial mid-week updates skewing averages
-        complete_dates_sql = "SELECT date FROM rl_prices WHERE region=?"
-        cd_params = [region]
-        if date_from:
-            complete_dates_sql += " AND date>=?"
-            cd_params.append(date_from)
-        if date_to:
-            complete_dates_sql += " AND date<=?"
-            cd_params.append(date_to)
-        complete_dates_sql += " GROUP BY date HAVING COUNT(*) >= 10"
-        complete_dates = set(r['date'] for r in conn.execute(complete_dates_sql, cd_params).fetchall())
+            prev = {(product, length): price for _, product, length, price in store.rows_on(prev_date, region)}
 
-        hist_sql = "SELECT date, product, length, price FROM rl_prices WHERE region=?"
-        hist_params = [region]
-        if date_from:
-            hist_sql += " AND date>=?"
-            hist_params.append(date_from)
-        if date_to:
-            hist_sql += " AND date<=?"
-            hist_params.append(date_to)
-        hist_sql += " ORDER BY date"
-        hist_rows = conn.execute(hist_sql, hist_params).fetchall()
+        # Aggregates for the full date range, and all prices per product+length for percentile rank.
+        # Only "complete" dates (10+ rows) go into hist, so partial mid-week updates don't skew averages.
+        complete_dates = set(complete)
+        agg = {}
         hist = {}
-        for r in hist_rows:
-            if r['date'] not in complete_dates:
+        for key in store.keys(region=region):
+            points = store.series[key].slice(date_from, date_to)
+            if not points:
                 continue
-            key = (r['product'], r['length'])
-            if key not in hist:
-                hist[key] = {}
-            hist[key][r['date']] = r['price']
-
-        conn.close()
+            prices = [p for _, p in points]
+            agg[key[1:]] = {
+                'avg': round(sum(prices) / len(prices), 2),
+                'min': min(prices),
+                'max': max(prices),
+                'cnt': len(prices)
+            }
+            series_hist = {d: p for d, p in points if d in complete_dates}
+            if series_hist:
+                hist[key[1:]] = series_hist
 
         # COVID exclusion: remove dates between 2020-03-01 and 2022-12-31
         COVID_START = '2020-03-01'
@@ -4520,16 +5896,13 @@ def rl_spreads():
                 return None
             HALF_LIFE = 180  # days
             decay = math.log(2) / HALF_LIFE
-            try:
-                latest_ord = datetime.strptime(latest_dt, '%Y-%m-%d').toordinal()
-            except Exception:
-                latest_ord = datetime.now().toordinal()
+            ordinals = store.ordinals
+            latest_ord = ordinals.get(latest_dt) or datetime.now().toordinal()
             w_sum = 0.0
             w_total = 0.0
             for d, s in spreads_by_date:
-                try:
-                    d_ord = datetime.strptime(d, '%Y-%m-%d').toordinal()
-                except Exception:
+                d_ord = ordinals.get(d)
+                if d_ord is None:
                     continue
                 age_days = latest_ord - d_ord
                 w = math.exp(-decay * age_days)
@@ -4684,26 +6057,18 @@ def rl_backfill():
         if cached is not None:
             return jsonify(cached)
 
-        conn = get_mi_db()
-        placeholders = ','.join('?' for _ in products)
-        sql = f"SELECT date, region, product, price FROM rl_prices WHERE length='RL' AND product IN ({placeholders})"
-        params = list(products)
-        if date_from:
-            sql += " AND date>=?"
-            params.append(date_from)
-        sql += " ORDER BY date"
-        rows = conn.execute(sql, params).fetchall()
-        conn.close()
-
+        store = get_rl_store()
         # Group by date â S.rl-shaped entries
         by_date = {}
-        for r in rows:
-            d = r['date']
-            if d not in by_date:
-                by_date[d] = {'date': d, 'west': {}, 'central': {}, 'east': {}}
-            region = r['region']
-            if region in by_date[d]:
-                by_date[d][region][r['product']] = r['price']
+        for product in products:
+            for region in ('west', 'central', 'east'):
+                series = store.get(region, product, 'RL')
+                if series is None:
+                    continue
+                for d, price in series.slice(date_from):
+                    if d not in by_date:
+                        by_date[d] = {'date': d, 'west': {}, 'central': {}, 'east': {}}
+                    by_date[d][region][product] = price
 
         result = sorted(by_date.values(), key=lambda x: x['date'])
         set_rl_cache(cache_key, result)
@@ -4731,21 +6096,17 @@ def forecast_seasonal():
         if cached is not None:
             return jsonify(cached)
 
-        conn = get_mi_db()
         cutoff = (datetime.now() - timedelta(days=365 * years)).strftime('%Y-%m-%d')
 
-        # Fetch RL-length prices only (composite prices, not specified lengths)
-        rows = conn.execute(
-            "SELECT date, price FROM rl_prices WHERE product=? AND region=? AND length='RL' AND date>=? ORDER BY date",
-            (product, region, cutoff)
-        ).fetchall()
-        conn.close()
+        # RL-length prices only (composite prices, not specified lengths)
+        series = get_rl_store().get(region, product, 'RL')
+        rows = series.slice(cutoff) if series else []
 
         if not rows or len(rows) < 24:
             return jsonify({'error': 'Insufficient data', 'dataPoints': len(rows) if rows else 0})
 
-        prices = [float(r['price']) for r in rows]
-        dates = [r['date'] for r in rows]
+        prices = [p for _, p in rows]
+        dates = [d for d, _ in rows]
         n = len(prices)
 
         # Linear detrend: fit y = a*x + b via least squares
@@ -4859,31 +6220,24 @@ def forecast_shortterm():
         if cached is not None:
             return jsonify(cached)
 
-        conn = get_mi_db()
-        # Fetch last 104 weeks (2 years) for smoothing + volatility
+        series = get_rl_store().get(region, product, 'RL')
+        # Last 104 weeks (2 years) for smoothing + volatility
         cutoff = (datetime.now() - timedelta(days=730)).strftime('%Y-%m-%d')
-        rows = conn.execute(
-            "SELECT date, price FROM rl_prices WHERE product=? AND region=? AND length='RL' AND date>=? ORDER BY date",
-            (product, region, cutoff)
-        ).fetchall()
+        rows = series.slice(cutoff) if series else []
 
-        # Also fetch 5yr seasonal factors inline
+        # Also 5yr seasonal factors inline
         cutoff_5y = (datetime.now() - timedelta(days=365 * 5)).strftime('%Y-%m-%d')
-        seasonal_rows = conn.execute(
-            "SELECT date, price FROM rl_prices WHERE product=? AND region=? AND length='RL' AND date>=? ORDER BY date",
-            (product, region, cutoff_5y)
-        ).fetchall()
-        conn.close()
+        seasonal_rows = series.slice(cutoff_5y) if series else []
 
-        prices = [float(r['price']) for r in rows]
-        price_dates = [r['date'] for r in rows]
+        prices = [p for _, p in rows]
+        price_dates = [d for d, _ in rows]
 
         if len(prices) < 12:
             return jsonify({'error': 'Insufficient data', 'dataPoints': len(prices)})
 
         # Compute seasonal factors from 5yr data
-        seasonal_prices = [float(r['price']) for r in seasonal_rows]
-        seasonal_dates = [r['date'] for r in seasonal_rows]
+        seasonal_prices = [p for _, p in seasonal_rows]
+        seasonal_dates = [d for d, _ in seasonal_rows]
         s_avg = sum(seasonal_prices) / len(seasonal_prices) if seasonal_prices else 1
         monthly_avgs = {}
         for d, p in zip(seasonal_dates, seasonal_prices):
@@ -5023,94 +6377,19 @@ def forecast_pricing():
         # Only consider quotes from the last 2 business days for active quoting
         max_age_days = int(data.get('maxAgeDays', 2))
         quote_cutoff = business_day_cutoff(max_age_days)
+        snapshot = _pricing.snapshot(products, [destination], quote_cutoff)
 
         for product in products:
-            # 1. Get best mill costs from mill_quotes (only recent)
-            conn = get_mi_db()
-            mill_rows = conn.execute("""
-                SELECT mill_name, price, date FROM mill_quotes
-                WHERE product=? AND price > 0 AND date >= ?
-                ORDER BY date DESC
-            """, (product, quote_cutoff)).fetchall()
-            conn.close()
-
-            # Deduplicate: latest price per mill
-            seen_mills = {}
-            for r in mill_rows:
-                mill = r['mill_name']
-                if mill not in seen_mills:
-                    seen_mills[mill] = {'mill': mill, 'fob': float(r['price']), 'date': r['date']}
+            # Best landed cost (FOB + freight) over each mill's latest recent quote
+            candidates = snapshot.rank(product, destination)
 
-            if not seen_mills:
+            if candidates is None:
                 recommendations.append({
                     'product': product,
                     'error': f'No mill pricing available within {max_age_days} days'
                 })
                 continue
 
-            # 2. Calculate freight for each mill to destination
-            candidates = []
-            for mill_name, mill_data in seen_mills.items():
-                # Resolve mill origin
-                origin = ''
-                dir_entry = MILL_DIRECTORY.get(mill_name)
-                if dir_entry:
-                    origin = f"{dir_entry[0]}, {dir_entry[1]}"
-                else:
-                    # Try partial match
-                    for k, v in MILL_DIRECTORY.items():
-                        if mill_name.startswith(k.split(' - ')[0]):
-                            origin = f"{v[0]}, {v[1]}"
-                            break
-
-                if not origin or not destination:
-                    continue
-
-                # Calculate freight using existing mileage infrastructure
-                try:
-                    # Use cached lane data or geocoding
-                    freight_per_mbf = 0
-                    # Simplified freight: base + miles * rate / MBF per TL
-                    miles = None
-                    mi_conn = get_mi_db()
-                    lane = mi_conn.execute(
-                        "SELECT miles FROM lanes WHERE origin=? AND dest=?",
-                        (origin, destination)
-                    ).fetchone()
-                    mi_conn.close()
-
-                    if lane:
-                        miles = float(lane['miles'])
-                    else:
-                        # Try geocoding
-                        try:
-                            coords_o = geocode_location(origin)
-                            coords_d = geocode_location(destination)
-                            if coords_o and coords_d:
-                                miles = get_distance(coords_o, coords_d)
-                        except Exception:
-                            pass
-
-                    if miles:
-                        # Freight formula: (base + miles * rate) / MBF_per_TL
-                        base = 450  # default freight base
-                        rate = 2.25  # default per-mile rate
-                        mbf_per_tl = 23
-                        freight_per_mbf = round((base + miles * rate) / mbf_per_tl)
-                    else:
-                        freight_per_mbf = 20  # reasonable default
-                except Exception:
-                    freight_per_mbf = 20
-
-                landed = mill_data['fob'] + freight_per_mbf
-                candidates.append({
-                    'mill': mill_name,
-                    'fob': mill_data['fob'],
-                    'freight': freight_per_mbf,
-                    'landed': landed,
-                    'date': mill_data['date']
-                })
-
             if not candidates:
                 recommendations.append({
                     'product': product,
@@ -5118,40 +6397,22 @@ def forecast_pricing():
                 })
                 continue
 
-            # Sort by landed cost
-            candidates.sort(key=lambda c: c['landed'])
             best = candidates[0]
 
-            # 3. Get seasonal position for margin adjustment
+            # Seasonal position for margin adjustment
             seasonal_adj = 0
             seasonal_note = ''
-            try:
-                # Quick seasonal check inline
-                mi_conn = get_mi_db()
-                cutoff_5y = (datetime.now() - timedelta(days=365 * 5)).strftime('%Y-%m-%d')
-                s_rows = mi_conn.execute(
-                    "SELECT date, price FROM rl_prices WHERE product=? AND region='west' AND length='RL' AND date>=?",
-                    (product, cutoff_5y)
-                ).fetchall()
-                mi_conn.close()
-
-                if s_rows:
-                    s_prices = [float(r['price']) for r in s_rows]
-                    current_month = datetime.now().month
-                    month_prices = [float(r['price']) for r in s_rows if int(r['date'][5:7]) == current_month]
-                    if month_prices:
-                        latest = s_prices[-1]
-                        pct = round(sum(1 for p in month_prices if p <= latest) / len(month_prices) * 100)
-                        if pct < 30:
-                            seasonal_adj = -5
-                            seasonal_note = f"Below seasonal norm ({pct}th %ile for {MONTH_NAMES[current_month-1]}) â tighter margin, good buying window"
-                        elif pct > 70:
-                            seasonal_adj = 5
-                            seasonal_note = f"Above seasonal norm ({pct}th %ile for {MONTH_NAMES[current_month-1]}) â wider margin, prices elevated"
-                        else:
-                            seasonal_note = f"Near seasonal norm ({pct}th %ile for {MONTH_NAMES[current_month-1]})"
-            except Exception:
-                pass
+            pct = snapshot.seasonal.get(product)
+            if pct is not None:
+                current_month = datetime.now().month
+                if pct < 30:
+                    seasonal_adj = -5
+                    seasonal_note = f"Below seasonal norm ({pct}th %ile for {MONTH_NAMES[current_month-1]}) â tighter margin, good buying window"
+                elif pct > 70:
+                    seasonal_adj = 5
+                    seasonal_note = f"Above seasonal norm ({pct}th %ile for {MONTH_NAMES[current_month-1]}) â wider margin, prices elevated"
+                else:
+                    seasonal_note = f"Near seasonal norm ({pct}th %ile for {MONTH_NAMES[current_month-1]})"
 
             adjusted_margin = target_margin + seasonal_adj
             recommended_sell = best['landed'] + adjusted_margin
@@ -5187,7 +6448,7 @@ def forecast_pricing():
 
 @app.route('/api/mi/lanes', methods=['GET'])
 def mi_list_lanes():
-    conn = get_mi_db()
+    conn = get_mi_db(readonly=True)
     rows = conn.execute("SELECT * FROM lanes ORDER BY origin").fetchall()
     conn.close()
     return jsonify([dict(r) for r in rows])
@@ -5215,38 +6476,14 @@ def mi_add_lane():
 
 @app.route('/api/mi/mileage', methods=['POST'])
 def mi_mileage_lookup():
-    data = request.get_json() or {}
-    origin = data.get('origin', '')
-    dest = data.get('dest', '')
-    if not origin or not dest:
-        return jsonify({'error': 'Missing origin or dest'}), 400
-    conn = get_mi_db()
-    lane = conn.execute("SELECT miles FROM lanes WHERE origin=? AND dest=?", (origin, dest)).fetchone()
-    if lane:
-        conn.close()
-        return jsonify({'miles': lane['miles'], 'origin': origin, 'dest': dest})
-    conn.close()
-    origin_coords = mi_geocode_location(origin)
-    if not origin_coords:
-        return jsonify({'error': f'Could not geocode origin: {origin}'}), 404
-    time.sleep(0.5)  # Nominatim 1 req/s; blocking is acceptable for internal tool
-    dest_coords = mi_geocode_location(dest)
-    if not dest_coords:
-        return jsonify({'error': f'Could not geocode destination: {dest}'}), 404
-    miles = mi_get_distance(origin_coords, dest_coords)
-    if miles is None:
-        return jsonify({'error': 'Could not calculate route'}), 404
-    conn = get_mi_db()
-    conn.execute("INSERT OR IGNORE INTO lanes (origin, dest, miles) VALUES (?,?,?)", (origin, dest, miles))
-    conn.commit()
-    conn.close()
-    return jsonify({'miles': miles, 'origin': origin, 'dest': dest})
+    """Same lanes table and background resolver as /api/mileage (pending lanes: 202, or wait=true)."""
+    return mileage_lookup()
 
 # ----- MI: SETTINGS -----
 
 @app.route('/api/mi/settings', methods=['GET'])
 def mi_get_settings():
-    conn = get_mi_db()
+    conn = get_mi_db(readonly=True)
     rows = conn.execute("SELECT * FROM settings").fetchall()
     conn.close()
     return jsonify({r['key']: r['value'] for r in rows})
@@ -5260,16 +6497,17 @@ def mi_update_settings():
         conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?,?)", (k, str(v)))
     conn.commit()
     conn.close()
+    if any(k.startswith('db_profile.') for k in data):
+        load_db_profiles()
     return jsonify({'ok': True})
 
 # ==================== AUDIT TRAIL ====================
 
 def _log_audit(user, action, entity_type, entity_id=None, entity_name=None,
                old_value=None, new_value=None, details=None, ip_address=None):
-    """Log an action to the audit trail."""
+    """Log an action to the audit trail (through the CRM write queue; returns once committed)."""
     try:
-        conn = get_crm_db()
-        conn.execute('''
+        _crm_writer.execute(lambda conn: conn.execute('''
             INSERT INTO audit_log (user, action, entity_type, entity_id, entity_name,
                                    old_value, new_value, details, ip_address)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
@@ -5281,9 +6519,7 @@ def _log_audit(user, action, entity_type, entity_id=None, entity_name=None,
             json.dumps(new_value) if isinstance(new_value, (dict, list)) else new_value,
             details,
             ip_address
-        ))
-        conn.commit()
-        conn.close()
+        )).lastrowid)
     except Exception as e:
         print(f"[audit_log ERROR] {e}", flush=True)
 
@@ -5319,7 +6555,7 @@ def intel_mill_moves():
         days = min(365, max(1, int(request.args.get('days', 30))))
         product = request.args.get('product', '').strip()
         mill = request.args.get('mill', '').strip()
-        conn = get_mi_db()
+        conn = get_mi_db(readonly=True)
         cutoff = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
         sql = "SELECT * FROM mill_price_changes WHERE date >= ?"
         params = [cutoff]
@@ -5369,21 +6605,15 @@ def intel_regime():
         if cached:
             return jsonify(cached)
 
-        conn = get_mi_db()
         # Get last 90 days of RL prices (need buffer for 8-week ROC)
         cutoff = (datetime.now() - timedelta(days=120)).strftime('%Y-%m-%d')
-        rows = conn.execute(
-            """SELECT date, price FROM rl_prices
-               WHERE region=? AND product=? AND length='RL' AND date>=?
-               ORDER BY date ASC""",
-            (region, product, cutoff)
-        ).fetchall()
-        conn.close()
+        series = get_rl_store().get(region, product, 'RL')
+        rows = series.slice(cutoff) if series else []
 
         if len(rows) < 5:
             return jsonify({'error': 'Not enough RL data for regime detection', 'regime': 'Unknown', 'confidence': 0})
 
-        prices = [(r['date'], r['price']) for r in rows]
+        prices = rows
         current_price = prices[-1][1]
         current_date = prices[-1][0]
 
@@ -5456,6 +6686,190 @@ def intel_regime():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# ----- Spread rank engine -----
+# Percentile ranks for spread series: each series is sorted once and ranked with bisect
+# (the old code counted `v <= s` over the whole series for every point, O(n^2) per spread).
+# Histories come from the RL price store.
+
+SPREAD_REGIONS = ['west', 'central', 'east']
+SPREAD_ZONE_PRODUCTS = ['2x4#2', '2x6#2', '2x4#3', '2x6#3', '2x10#2', '2x4 MSR', '2x6 MSR']
+
+def rl_history_by_series(store, region, since, dates, products=None, length=None):
+    """(product, length) -> {date: price} from the RL store, keeping only the given dates."""
+    hist = {}
+    for key in store.keys(region=region, length=length):
+        if products is not None and key[1] not in products:
+            continue
+        series = store.series[key]
+        lo, hi = series.bounds(since)
+        points = {d: p for d, p in zip(series.dates[lo:hi], series.prices[lo:hi]) if d in dates}
+        if points:
+            hist[key[1:]] = points
+    return hist
+
+def percentile_rank(sorted_vals, value):
+    """Percent of sorted_vals <= value."""
+    return bisect_right(sorted_vals, value) / len(sorted_vals) * 100
+
+def compute_spread_signals(region, spread_type='all'):
+    """Spread mean-reversion signals for a region (see intel_spread_signals)."""
+    store = get_rl_store()
+    # Current and 5-year historical RL data; the other regions only matter for zone spreads
+    five_yr_ago = (datetime.now() - timedelta(days=5*365)).strftime('%Y-%m-%d')
+    zone_regions = [r for r in SPREAD_REGIONS if r != region] if spread_type in ('zone', 'all') else []
+
+    # Filter to complete dates only (>=10 rows per date)
+    date_counts = store.date_counts(region, five_yr_ago)
+    complete_dates = set(d for d, c in date_counts.items() if c >= 10)
+
+    # Build lookup: (product, length) -> {date: price}
+    hist = rl_history_by_series(store, region, five_yr_ago, complete_dates)
+
+    # Get latest date
+    all_dates = sorted(complete_dates)
+    if not all_dates:
+        return {'signals': [], 'signalCount': 0, 'region': region}
+    latest_dt = all_dates[-1]
+    latest_ord = store.ordinals[latest_dt]
+    # Exponential recency weight per date (180-day half-life), shared by every spread
+    HALF_LIFE = 180
+    decay_c = math.log(2) / HALF_LIFE
+    date_weight = {d: math.exp(-decay_c * (latest_ord - store.ordinals[d])) for d in all_dates}
+
+    # Get current regime for context
+    regime_data = None
+    try:
+        regime_cache = get_rl_cached(f"regime_{region}_2x4#2")
+        if regime_cache:
+            regime_data = regime_cache
+    except Exception:
+        pass
+    current_regime = regime_data['regime'] if regime_data else 'Unknown'
+
+    signals = []
+    EXTREME_LOW = 10
+    EXTREME_HIGH = 90
+
+    def _check_spread(name, hist_a, hist_b, spread_category):
+        """Check if a spread is at extreme percentile and compute reversion probability."""
+        if hist_a is None or hist_b is None:
+            return
+        # Current spread
+        if latest_dt not in hist_a or latest_dt not in hist_b:
+            return
+        current = round(hist_a[latest_dt] - hist_b[latest_dt], 2)
+
+        # Historical spreads on common dates
+        common = sorted(set(hist_a.keys()) & set(hist_b.keys()))
+        if len(common) < 20:
+            return
+        hist_vals = [(d, hist_a[d] - hist_b[d]) for d in common]
+        vals = [v for _, v in hist_vals]
+        sorted_vals = sorted(vals)
+        avg_s = round(sum(vals) / len(vals), 2)
+        pct = round(percentile_rank(sorted_vals, current))
+
+        if pct > EXTREME_LOW and pct < EXTREME_HIGH:
+            return  # Not extreme -- no signal
+
+        # Compute reversion probability: how often did extreme spreads revert toward mean within 4 weeks?
+        bucket_low = 0 if pct <= EXTREME_LOW else 90
+        bucket_high = 10 if pct <= EXTREME_LOW else 100
+        revert_count = 0
+        total_instances = 0
+        for i, (d, s) in enumerate(hist_vals):
+            # Check if this historical point was in the same percentile bucket
+            rank = percentile_rank(sorted_vals, s)
+            if rank >= bucket_low and rank <= bucket_high:
+                total_instances += 1
+                # Look ahead ~4 weeks (4-5 data points in weekly data)
+                look_ahead = min(i + 5, len(hist_vals) - 1)
+                if look_ahead > i:
+                    future_s = hist_vals[look_ahead][1]
+                    # Did it revert toward mean?
+                    if pct <= EXTREME_LOW and future_s > s:  # Was low, moved up
+                        revert_count += 1
+                    elif pct >= EXTREME_HIGH and future_s < s:  # Was high, moved down
+                        revert_count += 1
+
+        reversion_prob = round((revert_count / total_instances) * 100) if total_instances > 5 else None
+
+        direction = 'narrow' if abs(current) > abs(avg_s) else 'widen'
+        if pct <= EXTREME_LOW:
+            context = f"{name} spread is at {pct}th percentile (historically low)."
+            if reversion_prob:
+                context += f" {reversion_prob}% chance of reverting within 4 weeks."
+            actionable = f"Spread likely to {direction}. Watch for mean-reversion opportunity."
+        else:
+            context = f"{name} spread is at {pct}th percentile (historically high)."
+            if reversion_prob:
+                context += f" {reversion_prob}% chance of reverting within 4 weeks."
+            actionable = f"Spread likely to {direction}. Consider position adjustment."
+
+        # Weighted avg
+        w_sum = 0.0; w_total = 0.0
+        for d, s in hist_vals:
+            w = date_weight[d]
+            w_sum += w * s; w_total += w
+        wavg = round(w_sum / w_total, 2) if w_total > 0 else avg_s
+
+        signals.append({
+            'spread': name,
+            'category': spread_category,
+            'current': current,
+            'avg': avg_s,
+            'wavg': wavg,
+            'percentile': pct,
+            'direction': direction,
+            'reversionProb': reversion_prob,
+            'regime': current_regime,
+            'context': context,
+            'actionable': actionable,
+            'n': len(common)
+        })
+
+    # Check dimension spreads (vs 2x4)
+    if spread_type in ('dimension', 'all'):
+        for dim in ['2x6', '2x8', '2x10', '2x12']:
+            _check_spread(f"{dim} vs 2x4", hist.get((f"{dim}#2", 'RL')), hist.get(('2x4#2', 'RL')), 'dimension')
+
+    # Check length spreads (vs 16')
+    if spread_type in ('length', 'all'):
+        for prod in ['2x4#2', '2x6#2']:
+            for ln in ['8', '10', '12', '14', '20']:
+                if (prod, ln) in hist and (prod, '16') in hist:
+                    _check_spread(f"{prod} {ln}' vs 16'", hist[(prod, ln)], hist[(prod, '16')], 'length')
+
+    # Check grade spreads (#1 vs #2)
+    if spread_type in ('grade', 'all'):
+        for dim in ['2x4', '2x6', '2x8', '2x10', '2x12']:
+            _check_spread(f"{dim}#1 vs {dim}#2", hist.get((f"{dim}#1", 'RL')), hist.get((f"{dim}#2", 'RL')), 'grade')
+
+    # Check cross-zone (inter-region) spreads, on the primary region's complete dates
+    if spread_type in ('zone', 'all'):
+        zone_hist = {reg: rl_history_by_series(store, reg, five_yr_ago, complete_dates, SPREAD_ZONE_PRODUCTS, 'RL')
+                     for reg in zone_regions}
+        zone_hist[region] = hist
+        zone_pairs = [('west', 'central'), ('west', 'east'), ('central', 'east')]
+        for prod in SPREAD_ZONE_PRODUCTS:
+            for reg_a, reg_b in zone_pairs:
+                h_a = zone_hist.get(reg_a, {}).get((prod, 'RL'))
+                h_b = zone_hist.get(reg_b, {}).get((prod, 'RL'))
+                if h_a is None or h_b is None:
+                    continue
+                _check_spread(f"{prod} {reg_a.title()} vs {reg_b.title()}", h_a, h_b, 'zone')
+
+    # Sort by extremity (most extreme percentile first)
+    signals.sort(key=lambda s: min(s['percentile'], 100 - s['percentile']))
+
+    return {
+        'signals': signals,
+        'signalCount': len(signals),
+        'region': region,
+        'regime': current_regime,
+        'asOf': latest_dt
+    }
+
 @app.route('/api/intelligence/spread-signals', methods=['GET'])
 def intel_spread_signals():
     """Spread mean-reversion signals â flags extreme percentile spreads with reversion probability."""
@@ -5467,218 +6881,7 @@ def intel_spread_signals():
         if cached:
             return jsonify(cached)
 
-        conn = get_mi_db()
-        try:
-            # Get current and 5-year historical RL data for this region
-            five_yr_ago = (datetime.now() - timedelta(days=5*365)).strftime('%Y-%m-%d')
-            rows = conn.execute(
-                """SELECT date, product, length, price FROM rl_prices
-                   WHERE region=? AND date>=? ORDER BY date""",
-                (region, five_yr_ago)
-            ).fetchall()
-        finally:
-            conn.close()
-
-        # Filter to complete dates only (â¥10 rows per date)
-        from collections import Counter
-        date_counts = Counter(r['date'] for r in rows)
-        complete_dates = set(d for d, c in date_counts.items() if c >= 10)
-
-        # Build lookup: (product, length) -> {date: price}
-        hist = {}
-        for r in rows:
-            if r['date'] not in complete_dates:
-                continue
-            key = (r['product'], r['length'])
-            if key not in hist:
-                hist[key] = {}
-            hist[key][r['date']] = r['price']
-
-        # Get latest date
-        all_dates = sorted(complete_dates)
-        if not all_dates:
-            return jsonify({'signals': [], 'signalCount': 0, 'region': region})
-        latest_dt = all_dates[-1]
-
-        # Get current regime for context
-        regime_data = None
-        try:
-            regime_cache = get_rl_cached(f"regime_{region}_2x4#2")
-            if regime_cache:
-                regime_data = regime_cache
-        except Exception:
-            pass
-        current_regime = regime_data['regime'] if regime_data else 'Unknown'
-
-        signals = []
-        EXTREME_LOW = 10
-        EXTREME_HIGH = 90
-
-        def _check_spread(name, key_a, key_b, spread_category):
-            """Check if a spread is at extreme percentile and compute reversion probability."""
-            if key_a not in hist or key_b not in hist:
-                return
-            hist_a = hist[key_a]
-            hist_b = hist[key_b]
-            # Current spread
-            if latest_dt not in hist_a or latest_dt not in hist_b:
-                return
-            current = round(hist_a[latest_dt] - hist_b[latest_dt], 2)
-
-            # Historical spreads on common dates
-            common = sorted(set(hist_a.keys()) & set(hist_b.keys()))
-            if len(common) < 20:
-                return
-            hist_vals = [(d, hist_a[d] - hist_b[d]) for d in common]
-            vals = [v for _, v in hist_vals]
-            avg_s = round(sum(vals) / len(vals), 2)
-            pct = round(sum(1 for v in vals if v <= current) / len(vals) * 100)
-
-            if pct > EXTREME_LOW and pct < EXTREME_HIGH:
-                return  # Not extreme â no signal
-
-            # Compute reversion probability: how often did extreme spreads revert toward mean within 4 weeks?
-            bucket_low = 0 if pct <= EXTREME_LOW else 90
-            bucket_high = 10 if pct <= EXTREME_LOW else 100
-            revert_count = 0
-            total_instances = 0
-            for i, (d, s) in enumerate(hist_vals):
-                # Check if this historical point was in the same percentile bucket
-                rank = sum(1 for v in vals if v <= s) / len(vals) * 100
-                if rank >= bucket_low and rank <= bucket_high:
-                    total_instances += 1
-                    # Look ahead ~4 weeks (20 trading days â 4-5 data points in weekly data)
-                    look_ahead = min(i + 5, len(hist_vals) - 1)
-                    if look_ahead > i:
-                        future_s = hist_vals[look_ahead][1]
-                        # Did it revert toward mean?
-                        if pct <= EXTREME_LOW and future_s > s:  # Was low, moved up
-                            revert_count += 1
-                        elif pct >= EXTREME_HIGH and future_s < s:  # Was high, moved down
-                            revert_count += 1
-
-            reversion_prob = round((revert_count / total_instances) * 100) if total_instances > 5 else None
-
-            direction = 'narrow' if abs(current) > abs(avg_s) else 'widen'
-            if pct <= EXTREME_LOW:
-                context = f"{name} spread is at {pct}th percentile (historically low)."
-                if reversion_prob:
-                    context += f" {reversion_prob}% chance of reverting within 4 weeks."
-                actionable = f"Spread likely to {direction}. Watch for mean-reversion opportunity."
-            else:
-                context = f"{name} spread is at {pct}th percentile (historically high)."
-                if reversion_prob:
-                    context += f" {reversion_prob}% chance of reverting within 4 weeks."
-                actionable = f"Spread likely to {direction}. Consider position adjustment."
-
-            # Weighted avg
-            import math
-            HALF_LIFE = 180
-            decay_c = math.log(2) / HALF_LIFE
-            latest_ord = datetime.strptime(latest_dt, '%Y-%m-%d').toordinal()
-            w_sum = 0.0; w_total = 0.0
-            for d, s in hist_vals:
-                try:
-                    age = latest_ord - datetime.strptime(d, '%Y-%m-%d').toordinal()
-                    w = math.exp(-decay_c * age)
-                    w_sum += w * s; w_total += w
-                except Exception:
-                    pass
-            wavg = round(w_sum / w_total, 2) if w_total > 0 else avg_s
-
-            signals.append({
-                'spread': name,
-                'category': spread_category,
-                'current': current,
-                'avg': avg_s,
-                'wavg': wavg,
-                'percentile': pct,
-                'direction': direction,
-                'reversionProb': reversion_prob,
-                'regime': current_regime,
-                'context': context,
-                'actionable': actionable,
-                'n': len(common)
-            })
-
-        # Check dimension spreads (vs 2x4)
-        if spread_type in ('dimension', 'all'):
-            for dim in ['2x6', '2x8', '2x10', '2x12']:
-                _check_spread(f"{dim} vs 2x4", (f"{dim}#2", 'RL'), ('2x4#2', 'RL'), 'dimension')
-
-        # Check length spreads (vs 16')
-        if spread_type in ('length', 'all'):
-            for prod in ['2x4#2', '2x6#2']:
-                for ln in ['8', '10', '12', '14', '20']:
-                    if (prod, ln) in hist and (prod, '16') in hist:
-                        _check_spread(f"{prod} {ln}' vs 16'", (prod, ln), (prod, '16'), 'length')
-
-        # Check grade spreads (#1 vs #2)
-        if spread_type in ('grade', 'all'):
-            for dim in ['2x4', '2x6', '2x8', '2x10', '2x12']:
-                _check_spread(f"{dim}#1 vs {dim}#2", (f"{dim}#1", 'RL'), (f"{dim}#2", 'RL'), 'grade')
-
-        # Check cross-zone (inter-region) spreads
-        if spread_type in ('zone', 'all'):
-            # Load data for the other two regions
-            other_regions = [r for r in ['west', 'central', 'east'] if r != region]
-            zone_hist = {region: hist}  # reuse already-loaded data for primary region
-            for oreg in other_regions:
-                conn2 = get_mi_db()
-                try:
-                    orows = conn2.execute(
-                        """SELECT date, product, length, price FROM rl_prices
-                           WHERE region=? AND date>=? ORDER BY date""",
-                        (oreg, five_yr_ago)
-                    ).fetchall()
-                finally:
-                    conn2.close()
-                oh = {}
-                for r in orows:
-                    if r['date'] not in complete_dates:
-                        continue
-                    key = (r['product'], r['length'])
-                    if key not in oh:
-                        oh[key] = {}
-                    oh[key][r['date']] = r['price']
-                zone_hist[oreg] = oh
-
-            # Build cross-zone spread checks for key products
-            zone_products = ['2x4#2', '2x6#2', '2x4#3', '2x6#3', '2x10#2', '2x4 MSR', '2x6 MSR']
-            zone_pairs = [('west', 'central'), ('west', 'east'), ('central', 'east')]
-
-            # Save/restore hist for _check_spread since it reads from outer `hist`
-            orig_hist = hist
-            for prod in zone_products:
-                for reg_a, reg_b in zone_pairs:
-                    h_a = zone_hist.get(reg_a, {})
-                    h_b = zone_hist.get(reg_b, {})
-                    key_a = (prod, 'RL')
-                    key_b = (prod, 'RL')
-                    if key_a not in h_a or key_b not in h_b:
-                        continue
-                    # Merge into hist temporarily so _check_spread can read them
-                    fake_a = (f"_zone_{reg_a}_{prod}", 'RL')
-                    fake_b = (f"_zone_{reg_b}_{prod}", 'RL')
-                    hist[fake_a] = h_a[key_a]
-                    hist[fake_b] = h_b[key_b]
-                    label = f"{prod} {reg_a.title()} vs {reg_b.title()}"
-                    _check_spread(label, fake_a, fake_b, 'zone')
-                    # Clean up
-                    del hist[fake_a]
-                    del hist[fake_b]
-            hist = orig_hist
-
-        # Sort by extremity (most extreme percentile first)
-        signals.sort(key=lambda s: min(s['percentile'], 100 - s['percentile']))
-
-        result = {
-            'signals': signals,
-            'signalCount': len(signals),
-            'region': region,
-            'regime': current_regime,
-            'asOf': latest_dt
-        }
+        result = compute_spread_signals(region, spread_type)
         set_rl_cache(cache_key, result)
         return jsonify(result)
     except Exception as e:
@@ -5691,7 +6894,7 @@ def intel_spread_signals():
 def list_audit_log():
     """Paginated audit log retrieval with filters."""
     try:
-        conn = get_crm_db()
+        conn = get_crm_db(readonly=True)
         conditions = ['1=1']
         params = []
 
@@ -5785,36 +6988,35 @@ def upsert_trade_status():
         if status not in VALID_TRADE_STATUSES:
             return jsonify({'error': f'Invalid status. Must be one of: {", ".join(VALID_TRADE_STATUSES)}'}), 400
 
-        conn = get_crm_db()
-        existing = conn.execute('SELECT * FROM trade_status WHERE trade_id = ?', (trade_id,)).fetchone()
-
-        if existing:
-            old_status = existing['status']
-            conn.execute('''
-                UPDATE trade_status SET status = ?, trade_type = ?, assigned_to = ?,
-                       notes = ?, updated_at = datetime('now')
-                WHERE trade_id = ?
-            ''', (status, trade_type, data.get('assigned_to'), data.get('notes'), trade_id))
-            conn.commit()
+        def write(conn):
+            existing = conn.execute('SELECT status FROM trade_status WHERE trade_id = ?', (trade_id,)).fetchone()
+            if existing:
+                conn.execute('''
+                    UPDATE trade_status SET status = ?, trade_type = ?, assigned_to = ?,
+                           notes = ?, updated_at = datetime('now')
+                    WHERE trade_id = ?
+                ''', (status, trade_type, data.get('assigned_to'), data.get('notes'), trade_id))
+            else:
+                conn.execute('''
+                    INSERT INTO trade_status (trade_id, trade_type, status, assigned_to, notes)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (trade_id, trade_type, status, data.get('assigned_to'), data.get('notes')))
             row = conn.execute('SELECT * FROM trade_status WHERE trade_id = ?', (trade_id,)).fetchone()
-            conn.close()
+            return existing['status'] if existing else None, dict(row), existing is not None
+
+        old_status, row, updated = _crm_writer.execute(write)
+        if updated:
             _log_audit(get_current_user(), 'trade_status_update', 'trade', trade_id,
                        details=f'Status changed from {old_status} to {status}',
                        old_value=old_status, new_value=status,
                        ip_address=request.remote_addr)
-            return jsonify(dict(row))
-        else:
-            conn.execute('''
-                INSERT INTO trade_status (trade_id, trade_type, status, assigned_to, notes)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (trade_id, trade_type, status, data.get('assigned_to'), data.get('notes')))
-            conn.commit()
-            row = conn.execute('SELECT * FROM trade_status WHERE trade_id = ?', (trade_id,)).fetchone()
-            conn.close()
-            _log_audit(get_current_user(), 'trade_status_create', 'trade', trade_id,
-                       details=f'Trade created with status {status}',
-                       new_value=status, ip_address=request.remote_addr)
-            return jsonify(dict(row)), 201
+            return jsonify(row)
+        _log_audit(get_current_user(), 'trade_status_create', 'trade', trade_id,
+                   details=f'Trade created with status {status}',
+                   new_value=status, ip_address=request.remote_addr)
+        return jsonify(row), 201
+    except WriteQueueFull as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -5824,7 +7026,7 @@ def upsert_trade_status():
 def get_trade_status(trade_id):
     """Get status for a specific trade."""
     try:
-        conn = get_crm_db()
+        conn = get_crm_db(readonly=True)
         row = conn.execute('SELECT * FROM trade_status WHERE trade_id = ?', (trade_id,)).fetchone()
         conn.close()
         if not row:
@@ -5839,7 +7041,7 @@ def get_trade_status(trade_id):
 def list_trade_statuses():
     """List all trade statuses with optional filters."""
     try:
-        conn = get_crm_db()
+        conn = get_crm_db(readonly=True)
         conditions = ['1=1']
         params = []
 
@@ -5874,33 +7076,32 @@ def list_trade_statuses():
 def approve_trade(trade_id):
     """Approve a trade."""
     try:
-        user = get_current_user()
-
-        conn = get_crm_db()
-        row = conn.execute('SELECT * FROM trade_status WHERE trade_id = ?', (trade_id,)).fetchone()
-        if not row:
-            conn.close()
-            return jsonify({'error': 'Trade not found'}), 404
+        current_user = get_current_user()
 
-        if row['status'] != 'pending':
-            conn.close()
-            return jsonify({'error': f'Cannot approve trade in "{row["status"]}" status. Must be "pending".'}), 400
+        def write(conn):
+            row = conn.execute('SELECT * FROM trade_status WHERE trade_id = ?', (trade_id,)).fetchone()
+            if not row:
+                return {'error': 'Trade not found'}, 404
+            if row['status'] != 'pending':
+                return {'error': f'Cannot approve trade in "{row["status"]}" status. Must be "pending".'}, 400
+            conn.execute('''
+                UPDATE trade_status SET status = 'approved', approved_by = ?, approved_at = datetime('now'),
+                       updated_at = datetime('now')
+                WHERE trade_id = ?
+            ''', (current_user, trade_id))
+            return dict(conn.execute('SELECT * FROM trade_status WHERE trade_id = ?', (trade_id,)).fetchone()), 200
 
-        current_user = get_current_user()
-        conn.execute('''
-            UPDATE trade_status SET status = 'approved', approved_by = ?, approved_at = datetime('now'),
-                   updated_at = datetime('now')
-            WHERE trade_id = ?
-        ''', (current_user, trade_id))
-        conn.commit()
-        updated = conn.execute('SELECT * FROM trade_status WHERE trade_id = ?', (trade_id,)).fetchone()
-        conn.close()
+        updated, code = _crm_writer.execute(write)
+        if code != 200:
+            return jsonify(updated), code
 
         _log_audit(current_user, 'trade_approve', 'trade', trade_id,
                    details=f'Trade approved by {current_user}',
                    old_value='pending', new_value='approved',
                    ip_address=request.remote_addr)
-        return jsonify(dict(updated))
+        return jsonify(updated)
+    except WriteQueueFull as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -5910,56 +7111,58 @@ def approve_trade(trade_id):
 def advance_trade(trade_id):
     """Advance a trade to the next status in the workflow."""
     try:
-        conn = get_crm_db()
-        row = conn.execute('SELECT * FROM trade_status WHERE trade_id = ?', (trade_id,)).fetchone()
-        if not row:
-            conn.close()
-            return jsonify({'error': 'Trade not found'}), 404
-
-        current = row['status']
-        allowed_next = TRADE_STATUS_FLOW.get(current, [])
-        if not allowed_next:
-            conn.close()
-            return jsonify({'error': f'Trade in "{current}" status cannot be advanced.'}), 400
-
-        # Use requested status if provided and valid, otherwise take the first allowed
         data = request.get_json() or {}
         requested = data.get('status', '').strip()
-        if requested:
-            if requested not in allowed_next:
-                conn.close()
-                return jsonify({
-                    'error': f'Cannot move from "{current}" to "{requested}". Allowed: {", ".join(allowed_next)}'
-                }), 400
-            next_status = requested
-        else:
-            # Default: first non-cancelled option, or cancelled if that's the only option
-            next_status = next((s for s in allowed_next if s != 'cancelled'), allowed_next[0])
-
-        # Status transition
         current_user = get_current_user()
-        if next_status == 'approved':
-            conn.execute('''
-                UPDATE trade_status SET status = ?, approved_by = ?, approved_at = datetime('now'),
-                       updated_at = datetime('now'), notes = COALESCE(?, notes)
-                WHERE trade_id = ?
-            ''', (next_status, current_user, data.get('notes'), trade_id))
-        else:
-            conn.execute('''
-                UPDATE trade_status SET status = ?, updated_at = datetime('now'),
-                       notes = COALESCE(?, notes)
-                WHERE trade_id = ?
-            ''', (next_status, data.get('notes'), trade_id))
 
-        conn.commit()
-        updated = conn.execute('SELECT * FROM trade_status WHERE trade_id = ?', (trade_id,)).fetchone()
-        conn.close()
+        def write(conn):
+            row = conn.execute('SELECT * FROM trade_status WHERE trade_id = ?', (trade_id,)).fetchone()
+            if not row:
+                return {'error': 'Trade not found'}, 404
+
+            current = row['status']
+            allowed_next = TRADE_STATUS_FLOW.get(current, [])
+            if not allowed_next:
+                return {'error': f'Trade in "{current}" status cannot be advanced.'}, 400
+
+            # Use requested status if provided and valid, otherwise take the first allowed
+            if requested:
+                if requested not in allowed_next:
+                    return {
+                        'error': f'Cannot move from "{current}" to "{requested}". Allowed: {", ".join(allowed_next)}'
+                    }, 400
+                next_status = requested
+            else:
+                # Default: first non-cancelled option, or cancelled if that's the only option
+                next_status = next((s for s in allowed_next if s != 'cancelled'), allowed_next[0])
+
+            # Status transition
+            if next_status == 'approved':
+                conn.execute('''
+                    UPDATE trade_status SET status = ?, approved_by = ?, approved_at = datetime('now'),
+                           updated_at = datetime('now'), notes = COALESCE(?, notes)
+                    WHERE trade_id = ?
+                ''', (next_status, current_user, data.get('notes'), trade_id))
+            else:
+                conn.execute('''
+                    UPDATE trade_status SET status = ?, updated_at = datetime('now'),
+                           notes = COALESCE(?, notes)
+                    WHERE trade_id = ?
+                ''', (next_status, data.get('notes'), trade_id))
+            updated = conn.execute('SELECT * FROM trade_status WHERE trade_id = ?', (trade_id,)).fetchone()
+            return {'row': dict(updated), 'from': current, 'to': next_status}, 200
+
+        result, code = _crm_writer.execute(write)
+        if code != 200:
+            return jsonify(result), code
 
         _log_audit(current_user, 'trade_advance', 'trade', trade_id,
-                   details=f'Trade advanced from {current} to {next_status}',
-                   old_value=current, new_value=next_status,
+                   details=f'Trade advanced from {result["from"]} to {result["to"]}',
+                   old_value=result['from'], new_value=result['to'],
                    ip_address=request.remote_addr)
-        return jsonify(dict(updated))
+        return jsonify(result['row'])
+    except WriteQueueFull as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -6080,7 +7283,7 @@ def validate_trade():
 def get_credit(customer):
     """Get credit status for a customer."""
     try:
-        conn = get_crm_db()
+        conn = get_crm_db(readonly=True)
         row = conn.execute(
             'SELECT * FROM credit_limits WHERE UPPER(customer_name) = UPPER(?)',
             (customer,)
@@ -6173,7 +7376,7 @@ def update_credit(customer):
 def credit_summary():
     """List all customers with their credit exposure vs limit."""
     try:
-        conn = get_crm_db()
+        conn = get_crm_db(readonly=True)
         rows = conn.execute(
             'SELECT * FROM credit_limits ORDER BY customer_name'
         ).fetchall()
@@ -6267,7 +7470,7 @@ def freight_reconcile():
 def freight_variance():
     """List freight variances from audit log entries."""
     try:
-        conn = get_crm_db()
+        conn = get_crm_db(readonly=True)
         conditions = ["action = 'freight_reconcile'"]
         params = []
 
@@ -6314,135 +7517,54 @@ def freight_variance():
 
 # ==================== AUTO-OFFERING SYSTEM ====================
 
-def _compute_offering_products(profile, destination):
-    """Generate offering line items for a profile using best-cost sourcing + freight + seasonal adjustment."""
-    products = json.loads(profile['products']) if isinstance(profile['products'], str) else profile['products']
+def _profile_products(profile):
+    return json.loads(profile['products']) if isinstance(profile['products'], str) else profile['products']
+
+def offering_pricing_snapshot(products, destinations):
+    """Pricing snapshot shared by every profile priced in one pass (quotes from the last 2 business days)."""
+    return _pricing.snapshot(products, destinations, business_day_cutoff(2))
+
+def _offering_seasonal(pct):
+    """(margin adjustment, note) for an offering from the seasonal percentile."""
+    seasonal_adj = 0
+    seasonal_note = ''
+    if pct is not None:
+        if pct < 30:
+            seasonal_adj = -5
+            seasonal_note = f"Below seasonal norm ({pct}th %ile) â tighter margin"
+        elif pct > 70:
+            seasonal_adj = 5
+            seasonal_note = f"Above seasonal norm ({pct}th %ile) â wider margin"
+        else:
+            seasonal_note = f"Near seasonal norm ({pct}th %ile)"
+    return seasonal_adj, seasonal_note
+
+def _compute_offering_products(profile, destination, snapshot=None):
+    """Generate offering line items for a profile using best-cost sourcing + freight + seasonal adjustment.
+    Pass a snapshot from offering_pricing_snapshot() to share quotes, lanes and seasonals across profiles."""
+    products = _profile_products(profile)
     preferred = json.loads(profile['preferred_mills']) if profile['preferred_mills'] else []
     margin_target = float(profile['margin_target'] or 25)
     result_products = []
-
-    # Only consider quotes from the last 2 business days
-    quote_cutoff = business_day_cutoff(2)
+    if snapshot is None:
+        snapshot = offering_pricing_snapshot(products, [destination])
 
     for product in products:
-        # 1. Get latest mill quotes for this product (only recent)
-        conn = get_mi_db()
-        mill_rows = conn.execute("""
-            SELECT mill_name, price, date FROM mill_quotes
-            WHERE product=? AND price > 0 AND date >= ?
-            ORDER BY date DESC
-        """, (product, quote_cutoff)).fetchall()
-        conn.close()
-
-        # Deduplicate: latest price per mill
-        seen_mills = {}
-        for r in mill_rows:
-            mill = r['mill_name']
-            if mill not in seen_mills:
-                seen_mills[mill] = {'mill': mill, 'fob': float(r['price']), 'date': r['date']}
+        # Latest recent quote per mill (preferred mills if any match), ranked by FOB + freight
+        candidates = snapshot.rank(product, destination, preferred)
 
-        if not seen_mills:
+        if candidates is None:
             result_products.append({'product': product, 'error': 'No pricing available within 30 days'})
             continue
 
-        # 2. If preferred mills set, filter to those (but fall back to all if none match)
-        if preferred:
-            preferred_matches = {k: v for k, v in seen_mills.items()
-                                 if any(p.lower() in k.lower() for p in preferred)}
-            if preferred_matches:
-                seen_mills = preferred_matches
-
-        # 3. Calculate freight for each mill
-        candidates = []
-        for mill_name, mill_data in seen_mills.items():
-            origin = ''
-            dir_entry = MILL_DIRECTORY.get(mill_name)
-            if dir_entry:
-                origin = f"{dir_entry[0]}, {dir_entry[1]}"
-            else:
-                for k, v in MILL_DIRECTORY.items():
-                    if mill_name.startswith(k.split(' - ')[0]):
-                        origin = f"{v[0]}, {v[1]}"
-                        break
-
-            if not origin or not destination:
-                continue
-
-            try:
-                freight_per_mbf = 0
-                miles = None
-                mi_conn = get_mi_db()
-                lane = mi_conn.execute(
-                    "SELECT miles FROM lanes WHERE origin=? AND dest=?",
-                    (origin, destination)
-                ).fetchone()
-                mi_conn.close()
-
-                if lane:
-                    miles = float(lane['miles'])
-                else:
-                    try:
-                        coords_o = geocode_location(origin)
-                        coords_d = geocode_location(destination)
-                        if coords_o and coords_d:
-                            miles = get_distance(coords_o, coords_d)
-                    except Exception:
-                        pass
-
-                if miles:
-                    base = 450
-                    rate = 2.25
-                    mbf_per_tl = 23
-                    freight_per_mbf = round((base + miles * rate) / mbf_per_tl)
-                else:
-                    freight_per_mbf = 20
-            except Exception:
-                freight_per_mbf = 20
-
-            landed = mill_data['fob'] + freight_per_mbf
-            candidates.append({
-                'mill': mill_name,
-                'fob': mill_data['fob'],
-                'freight': freight_per_mbf,
-                'landed': landed,
-                'date': mill_data['date']
-            })
-
         if not candidates:
             result_products.append({'product': product, 'error': 'Could not calculate freight'})
             continue
 
-        candidates.sort(key=lambda c: c['landed'])
         best = candidates[0]
 
-        # 4. Seasonal margin adjustment
-        seasonal_adj = 0
-        seasonal_note = ''
-        try:
-            mi_conn = get_mi_db()
-            cutoff_5y = (datetime.now() - timedelta(days=365 * 5)).strftime('%Y-%m-%d')
-            s_rows = mi_conn.execute(
-                "SELECT date, price FROM rl_prices WHERE product=? AND region='west' AND length='RL' AND date>=?",
-                (product, cutoff_5y)
-            ).fetchall()
-            mi_conn.close()
-
-            if s_rows:
-                current_month = datetime.now().month
-                month_prices = [float(r['price']) for r in s_rows if int(r['date'][5:7]) == current_month]
-                if month_prices:
-                    latest = float(s_rows[-1]['price'])
-                    pct = round(sum(1 for p in month_prices if p <= latest) / len(month_prices) * 100)
-                    if pct < 30:
-                        seasonal_adj = -5
-                        seasonal_note = f"Below seasonal norm ({pct}th %ile) â tighter margin"
-                    elif pct > 70:
-                        seasonal_adj = 5
-                        seasonal_note = f"Above seasonal norm ({pct}th %ile) â wider margin"
-                    else:
-                        seasonal_note = f"Near seasonal norm ({pct}th %ile)"
-        except Exception:
-            pass
+        # Seasonal margin adjustment
+        seasonal_adj, seasonal_note = _offering_seasonal(snapshot.seasonal.get(product))
 
         adjusted_margin = margin_target + seasonal_adj
         recommended_sell = best['landed'] + adjusted_margin
@@ -6475,7 +7597,7 @@ def _compute_offering_products(profile, destination):
 def list_offering_profiles():
     """List all offering profiles, optionally filtered by trader."""
     try:
-        conn = get_crm_db()
+        conn = get_crm_db(readonly=True)
         trader = request.args.get('trader', '')
         if trader:
             rows = conn.execute('SELECT * FROM offering_profiles WHERE trader=? ORDER BY customer_name', (trader,)).fetchall()
@@ -6511,22 +7633,21 @@ def create_offering_profile():
         products_json = json.dumps(data['products']) if isinstance(data['products'], list) else data['products']
         preferred_json = json.dumps(data.get('preferred_mills', [])) if isinstance(data.get('preferred_mills', []), list) else data.get('preferred_mills', '[]')
 
-        conn = get_crm_db()
-        cur = conn.execute("""
-            INSERT INTO offering_profiles (customer_id, customer_name, destination, products, margin_target,
-                frequency, preferred_mills, day_of_week, active, notes, trader)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+        values = (
             data['customer_id'], data['customer_name'], data['destination'], products_json,
             float(data.get('margin_target', 25)), data.get('frequency', 'weekly'),
             preferred_json, int(data.get('day_of_week', 1)),
             1 if data.get('active', True) else 0, data.get('notes', ''), data['trader']
-        ))
-        conn.commit()
-        profile_id = cur.lastrowid
-        conn.close()
+        )
+        profile_id = _crm_writer.execute(lambda conn: conn.execute("""
+            INSERT INTO offering_profiles (customer_id, customer_name, destination, products, margin_target,
+                frequency, preferred_mills, day_of_week, active, notes, trader)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, values).lastrowid)
 
         return jsonify({'id': profile_id, 'message': 'Profile created'})
+    except WriteQueueFull as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -6539,12 +7660,6 @@ def update_offering_profile(pid):
         if not data:
             return jsonify({'error': 'JSON body required'}), 400
 
-        conn = get_crm_db()
-        existing = conn.execute('SELECT * FROM offering_profiles WHERE id=?', (pid,)).fetchone()
-        if not existing:
-            conn.close()
-            return jsonify({'error': 'Profile not found'}), 404
-
         fields = []
         vals = []
         for col in ['customer_name', 'destination', 'notes', 'frequency', 'trader']:
@@ -6567,14 +7682,19 @@ def update_offering_profile(pid):
             fields.append('active=?')
             vals.append(1 if data['active'] else 0)
 
-        if fields:
-            fields.append("updated_at=datetime('now')")
-            vals.append(pid)
-            conn.execute(f"UPDATE offering_profiles SET {', '.join(fields)} WHERE id=?", vals)
-            conn.commit()
+        def write(conn):
+            if not conn.execute('SELECT 1 FROM offering_profiles WHERE id=?', (pid,)).fetchone():
+                return False
+            if fields:
+                conn.execute(f"UPDATE offering_profiles SET {', '.join(fields)}, updated_at=datetime('now') WHERE id=?",
+                             vals + [pid])
+            return True
 
-        conn.close()
+        if not _crm_writer.execute(write):
+            return jsonify({'error': 'Profile not found'}), 404
         return jsonify({'message': 'Profile updated'})
+    except WriteQueueFull as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -6583,11 +7703,10 @@ def update_offering_profile(pid):
 def delete_offering_profile(pid):
     """Delete an offering profile."""
     try:
-        conn = get_crm_db()
-        conn.execute('DELETE FROM offering_profiles WHERE id=?', (pid,))
-        conn.commit()
-        conn.close()
+        _crm_writer.execute(lambda conn: conn.execute('DELETE FROM offering_profiles WHERE id=?', (pid,)).rowcount)
         return jsonify({'message': 'Profile deleted'})
+    except WriteQueueFull as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -6602,7 +7721,7 @@ def generate_offerings():
         profile_id = data.get('profile_id')
         force = data.get('force', False)  # bypass schedule check
 
-        conn = get_crm_db()
+        conn = get_crm_db(readonly=True)
 
         if profile_id:
             profiles = conn.execute('SELECT * FROM offering_profiles WHERE id=? AND active=1', (profile_id,)).fetchall()
@@ -6612,6 +7731,8 @@ def generate_offerings():
         now = datetime.now()
         today_dow = now.weekday()  # 0=Mon
         generated = []
+        snapshot = offering_pricing_snapshot([prod for p in profiles for prod in _profile_products(p)],
+                                             [p['destination'] for p in profiles])
 
         for profile in profiles:
             p = dict(profile)
@@ -6648,7 +7769,7 @@ def generate_offerings():
                 continue
 
             # Generate offering products
-            result_products = _compute_offering_products(p, p['destination'])
+            result_products = _compute_offering_products(p, p['destination'], snapshot)
 
             # Calculate total margin
             total_margin = sum(item.get('margin', 0) for item in result_products if 'error' not in item)
@@ -6657,19 +7778,19 @@ def generate_offerings():
             expires = (now + timedelta(days=3)).strftime('%Y-%m-%d %H:%M:%S')
 
             # Insert offering
-            cur = conn.execute("""
-                INSERT INTO offerings (profile_id, customer_id, customer_name, destination, status,
-                    products, margin_target, total_margin, expires_at, trader)
-                VALUES (?, ?, ?, ?, 'draft', ?, ?, ?, ?, ?)
-            """, (
+            values = (
                 p['id'], p['customer_id'], p['customer_name'], p['destination'],
                 json.dumps(result_products), p['margin_target'], total_margin,
                 expires, p['trader']
-            ))
-            conn.commit()
+            )
+            offering_id = _crm_writer.execute(lambda wconn: wconn.execute("""
+                INSERT INTO offerings (profile_id, customer_id, customer_name, destination, status,
+                    products, margin_target, total_margin, expires_at, trader)
+                VALUES (?, ?, ?, ?, 'draft', ?, ?, ?, ?, ?)
+            """, values).lastrowid)
 
             generated.append({
-                'offering_id': cur.lastrowid,
+                'offering_id': offering_id,
                 'customer': p['customer_name'],
                 'products_count': len([x for x in result_products if 'error' not in x]),
                 'total_margin': total_margin
@@ -6677,6 +7798,8 @@ def generate_offerings():
 
         conn.close()
         return jsonify({'generated': len(generated), 'offerings': generated})
+    except WriteQueueFull as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -6687,7 +7810,7 @@ def generate_offerings():
 def list_offerings():
     """List offerings with optional filters."""
     try:
-        conn = get_crm_db()
+        conn = get_crm_db(readonly=True)
         status = request.args.get('status', '')
         customer_id = request.args.get('customer_id', '')
         trader = request.args.get('trader', '')
@@ -6727,7 +7850,7 @@ def list_offerings():
 def get_offering(oid):
     """Get a single offering by ID."""
     try:
-        conn = get_crm_db()
+        conn = get_crm_db(readonly=True)
         row = conn.execute('SELECT * FROM offerings WHERE id=?', (oid,)).fetchone()
         conn.close()
         if not row:
@@ -6747,12 +7870,6 @@ def update_offering(oid):
         if not data:
             return jsonify({'error': 'JSON body required'}), 400
 
-        conn = get_crm_db()
-        existing = conn.execute('SELECT * FROM offerings WHERE id=?', (oid,)).fetchone()
-        if not existing:
-            conn.close()
-            return jsonify({'error': 'Offering not found'}), 404
-
         set_parts = []  # SQL fragments like 'field=?' or "field=datetime('now')"
         param_vals = []  # Only values for '=?' placeholders
 
@@ -6780,13 +7897,18 @@ def update_offering(oid):
             set_parts.append('edit_notes=?')
             param_vals.append(data['edit_notes'])
 
-        if set_parts:
-            param_vals.append(oid)
-            conn.execute(f"UPDATE offerings SET {', '.join(set_parts)} WHERE id=?", param_vals)
-            conn.commit()
+        def write(conn):
+            if not conn.execute('SELECT 1 FROM offerings WHERE id=?', (oid,)).fetchone():
+                return False
+            if set_parts:
+                conn.execute(f"UPDATE offerings SET {', '.join(set_parts)} WHERE id=?", param_vals + [oid])
+            return True
 
-        conn.close()
+        if not _crm_writer.execute(write):
+            return jsonify({'error': 'Offering not found'}), 404
         return jsonify({'message': 'Offering updated'})
+    except WriteQueueFull as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -6796,20 +7918,16 @@ def approve_offering(oid):
     """Quick-approve an offering."""
     try:
         data = request.get_json() or {}
-        conn = get_crm_db()
-        existing = conn.execute('SELECT * FROM offerings WHERE id=?', (oid,)).fetchone()
-        if not existing:
-            conn.close()
-            return jsonify({'error': 'Offering not found'}), 404
-
-        conn.execute("""
+        approved = _crm_writer.execute(lambda conn: conn.execute("""
             UPDATE offerings SET status='approved', approved_at=datetime('now'),
                 approved_by=?, edit_notes=?
             WHERE id=?
-        """, (data.get('approved_by', 'Ian'), data.get('notes', ''), oid))
-        conn.commit()
-        conn.close()
+        """, (data.get('approved_by', 'Ian'), data.get('notes', ''), oid)).rowcount)
+        if not approved:
+            return jsonify({'error': 'Offering not found'}), 404
         return jsonify({'message': 'Offering approved'})
+    except WriteQueueFull as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -6818,7 +7936,7 @@ def approve_offering(oid):
 def offering_history(customer_id):
     """Get offering history for a specific customer."""
     try:
-        conn = get_crm_db()
+        conn = get_crm_db(readonly=True)
         limit_n = min(200, max(1, int(request.args.get('limit', 20))))
         rows = conn.execute(
             'SELECT * FROM offerings WHERE customer_id=? ORDER BY generated_at DESC LIMIT ?',
@@ -6841,7 +7959,7 @@ def offering_history(customer_id):
 def offerings_pending_count():
     """Get count of pending draft offerings."""
     try:
-        conn = get_crm_db()
+        conn = get_crm_db(readonly=True)
         trader = request.args.get('trader', '')
         if trader:
             cnt = conn.execute("SELECT COUNT(*) FROM offerings WHERE status='draft' AND trader=?", (trader,)).fetchone()[0]
@@ -6860,7 +7978,7 @@ def offerings_pending_count():
 def dashboard_summary():
     """Aggregated KPI data for the enterprise dashboard."""
     try:
-        conn = get_crm_db()
+        conn = get_crm_db(readonly=True)
         now = datetime.now()
         today = now.strftime('%Y-%m-%d')
         week_ago = (now - timedelta(days=7)).strftime('%Y-%m-%d')
@@ -6910,17 +8028,18 @@ def dashboard_summary():
         # Mill Intel stats
         mi_stats = {}
         try:
-            mi_conn = get_mi_db()
+            mi_conn = get_mi_db(readonly=True)
             mi_stats['total_quotes'] = mi_conn.execute('SELECT COUNT(*) FROM mill_quotes').fetchone()[0]
             mi_stats['quotes_today'] = mi_conn.execute(
                 'SELECT COUNT(*) FROM mill_quotes WHERE date = ?', (today,)
             ).fetchone()[0]
-            mi_stats['quotes_this_week'] = mi_conn.execute(
-                'SELECT COUNT(*) FROM mill_quotes WHERE date >= ?', (week_ago,)
-            ).fetchone()[0]
-            mi_stats['active_mills'] = mi_conn.execute(
-                'SELECT COUNT(DISTINCT mill_name) FROM mill_quotes WHERE date >= ?', (week_ago,)
-            ).fetchone()[0]
+            snap = get_signal_snapshot(mi_conn)
+            mi_stats['quotes_this_week'] = snap['quotes_7d']
+            mi_stats['active_mills'] = snap['active_mills_7d']
+            mi_stats['recommendations'] = [
+                {'product': r['product'], 'action': r['action'], 'score': r['score']}
+                for r in snap['recommendations'][:5]
+            ]
 
             # Top movers (biggest price changes in last 7 days)
             top_movers = mi_conn.execute('''
@@ -6976,73 +8095,209 @@ def dashboard_summary():
 
 
 # ==================== OFFERING SCHEDULER ====================
-import threading
+# One process holds the 'scheduler' lease (scheduler.py) and runs the daily 6 AM offering job;
+# every worker polls, so another takes over within SCHEDULER_LEASE_TTL if the leader dies.
+SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', '1') != '0'
+SCHEDULER_POLL = int(os.environ.get('SCHEDULER_POLL', 30))
+SCHEDULER_LEASE_TTL = int(os.environ.get('SCHEDULER_LEASE_TTL', 90))
+OFFERING_WORKERS = int(os.environ.get('OFFERING_WORKERS', 4))
+
+def _offering_due(p, today_dow):
+    freq = p.get('frequency', 'weekly')
+    target_dow = p.get('day_of_week', 1)
+    if freq == 'daily':
+        return True
+    return today_dow == target_dow  # weekly / biweekly
+
+def generate_scheduled_offerings(params=None):
+    """Scheduled job: draft offerings for every due profile without one today.
+    Profiles are priced concurrently (OFFERING_WORKERS) against one shared pricing snapshot;
+    each insert re-checks for today's offering in the same statement, so reruns never duplicate."""
+    params = params or {}
+    t0 = time.perf_counter()
+    now = datetime.now()
+    today_str = now.strftime('%Y-%m-%d')
+    conn = get_crm_db()
+    profiles = [dict(r) for r in conn.execute('SELECT * FROM offering_profiles WHERE active=1').fetchall()]
+    done_today = {r[0] for r in conn.execute(
+        "SELECT DISTINCT profile_id FROM offerings WHERE DATE(generated_at)=?", (today_str,)).fetchall()}
+    conn.close()
+    due = [p for p in profiles
+           if (params.get('force') or _offering_due(p, now.weekday())) and p['id'] not in done_today]
+
+    snapshot = offering_pricing_snapshot([prod for p in due for prod in _profile_products(p)],
+                                         [p['destination'] for p in due])
+    t_snapshot = time.perf_counter()
+    results = {}
+    errors = {}
+    with ThreadPoolExecutor(max_workers=OFFERING_WORKERS) as pool:
+        futures = {pool.submit(_compute_offering_products, p, p['destination'], snapshot): p for p in due}
+        for fut, p in futures.items():
+            try:
+                results[p['id']] = fut.result()
+            except Exception as e:
+                errors[p['id']] = f"{type(e).__name__}: {e}"
+    t_compute = time.perf_counter()
 
-def _offering_scheduler_loop():
-    """Background thread: runs daily at 6 AM to generate offerings for due profiles."""
-    import time as _time
-    while True:
-        try:
-            now = datetime.now()
-            # Next 6 AM
-            target = now.replace(hour=6, minute=0, second=0, microsecond=0)
-            if now >= target:
-                target += timedelta(days=1)
-            wait_seconds = (target - now).total_seconds()
-            _time.sleep(wait_seconds)
-
-            # Generate offerings for all due profiles
-            with app.app_context():
-                conn = get_crm_db()
-                profiles = conn.execute('SELECT * FROM offering_profiles WHERE active=1').fetchall()
-                today_dow = datetime.now().weekday()
-                today_str = datetime.now().strftime('%Y-%m-%d')
+    expires = (now + timedelta(days=3)).strftime('%Y-%m-%d %H:%M:%S')
 
-                for profile in profiles:
-                    p = dict(profile)
-                    freq = p.get('frequency', 'weekly')
-                    target_dow = p.get('day_of_week', 1)
+    def insert_offerings(conn):
+        created = []
+        for p in due:
+            if p['id'] not in results:
+                continue
+            result_products = results[p['id']]
+            total_margin = sum(item.get('margin', 0) for item in result_products if 'error' not in item)
+            cur = conn.execute("""
+                INSERT INTO offerings (profile_id, customer_id, customer_name, destination, status,
+                    products, margin_target, total_margin, expires_at, trader)
+                SELECT ?, ?, ?, ?, 'draft', ?, ?, ?, ?, ?
+                WHERE NOT EXISTS (SELECT 1 FROM offerings WHERE profile_id=? AND DATE(generated_at)=?)
+            """, (
+                p['id'], p['customer_id'], p['customer_name'], p['destination'],
+                json.dumps(result_products), p['margin_target'], total_margin,
+                expires, p['trader'], p['id'], today_str
+            ))
+            if cur.rowcount:
+                created.append(cur.lastrowid)
+        return created
+
+    created = _crm_writer.execute(insert_offerings)
+    print(f"[Scheduler] Generated {len(created)} offerings for {len(due)} due profiles at {datetime.now()}")
+    return {
+        'profiles': len(profiles), 'due': len(due), 'generated': len(created), 'offering_ids': created,
+        'errors': {str(k): v for k, v in errors.items()}, 'lanes': len(snapshot.miles),
+        'timings': {'snapshot_s': round(t_snapshot - t0, 3), 'compute_s': round(t_compute - t_snapshot, 3),
+                    'total_s': round(time.perf_counter() - t0, 3)},
+    }
+
+_scheduler = JobScheduler(get_crm_db, SQLiteLease(get_crm_db, 'scheduler', ttl=SCHEDULER_LEASE_TTL),
+                          poll=SCHEDULER_POLL)
+_scheduler.register('offerings', generate_scheduled_offerings, daily_at=(6, 0))
+
+def start_offering_scheduler():
+    if SCHEDULER_ENABLED:
+        _scheduler.start()
+
+@app.route('/api/scheduler', methods=['GET'])
+def scheduler_status():
+    """Lease holder, whether this worker is the leader, registered jobs and the latest runs."""
+    try:
+        return jsonify(dict(_scheduler.stats(), enabled=SCHEDULER_ENABLED, runs=_scheduler.runs(limit=10)))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-                    if freq == 'daily':
-                        pass
-                    elif freq == 'weekly' and today_dow != target_dow:
-                        continue
-                    elif freq == 'biweekly' and today_dow != target_dow:
-                        continue
+@app.route('/api/scheduler/runs', methods=['GET'])
+def scheduler_runs():
+    try:
+        limit_n = min(500, max(1, int(request.args.get('limit', 50))))
+        return jsonify(_scheduler.runs(limit=limit_n, job=request.args.get('job') or None))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-                    # Skip if already generated today
-                    existing = conn.execute(
-                        "SELECT COUNT(*) FROM offerings WHERE profile_id=? AND DATE(generated_at)=?",
-                        (p['id'], today_str)
-                    ).fetchone()[0]
-                    if existing > 0:
-                        continue
+@app.route('/api/scheduler/runs/<int:run_id>', methods=['GET'])
+def scheduler_run(run_id):
+    run = _scheduler.get_run(run_id)
+    if run is None:
+        return jsonify({'error': 'Run not found'}), 404
+    return jsonify(run)
+
+@app.route('/api/scheduler/jobs/<job>/run', methods=['POST'])
+def scheduler_trigger(job):
+    """Queue a run now; the leader picks it up on its next poll. Body: optional params (e.g. {"force": true})."""
+    if job not in _scheduler.jobs:
+        return jsonify({'error': f'Unknown job: {job}'}), 404
+    try:
+        run_id = _scheduler.trigger(job, request.get_json(silent=True) or {})
+        return jsonify({'run_id': run_id, 'status': 'queued'}), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-                    result_products = _compute_offering_products(p, p['destination'])
-                    total_margin = sum(item.get('margin', 0) for item in result_products if 'error' not in item)
-                    expires = (datetime.now() + timedelta(days=3)).strftime('%Y-%m-%d %H:%M:%S')
 
-                    conn.execute("""
-                        INSERT INTO offerings (profile_id, customer_id, customer_name, destination, status,
-                            products, margin_target, total_margin, expires_at, trader)
-                        VALUES (?, ?, ?, ?, 'draft', ?, ?, ?, ?, ?)
-                    """, (
-                        p['id'], p['customer_id'], p['customer_name'], p['destination'],
-                        json.dumps(result_products), p['margin_target'], total_margin,
-                        expires, p['trader']
-                    ))
+# ==================== STARTUP ====================
+# Import does only what a worker needs to serve: the schema check (a no-op after the first
+# worker has migrated) and starting a background thread for seeding. Seeding and migration
+# hold a lock file next to the MI database, so gunicorn workers take turns instead of
+# repeating the work concurrently. Warm-ups run on first use (_geo_warm, get_rl_store).
+# Route traffic on /health/ready.
+SCHEMA_MIGRATIONS = (init_crm_db, init_mi_db)
 
-                conn.commit()
-                conn.close()
-                print(f"[Scheduler] Generated offerings at {datetime.now()}")
-        except Exception as e:
-            print(f"[Scheduler] Error: {e}")
-            import time as _time
-            _time.sleep(3600)  # retry in 1 hour on error
-
-# Start scheduler thread
-_scheduler_thread = threading.Thread(target=_offering_scheduler_loop, daemon=True)
-_scheduler_thread.start()
+def schema_stamp():
+    """PRAGMA user_version value for the current init_crm_db/init_mi_db code."""
+    src = ''.join(inspect.getsource(fn) for fn in SCHEMA_MIGRATIONS)
+    return int(hashlib.sha1(src.encode()).hexdigest()[:7], 16)
+
+def _db_stamp(path):
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+
+def load_db_profiles():
+    """Resolve the CRM and MI performance profiles from the environment and the MI settings table
+    (db_profile.<db> / db_profile.<db>.<pragma> keys). Pooled connections pick the result up on
+    their next checkout; other workers re-read the settings when they restart."""
+    global _db_profiles
+    settings = {}
+    try:
+        conn = get_mi_db(readonly=True)
+        try:
+            settings = {r['key']: r['value'] for r in
+                        conn.execute("SELECT key, value FROM settings WHERE key LIKE 'db_profile.%'")}
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"DB profile settings unreadable ({e}) -- using environment and defaults")
+    profiles = {db: resolve_profile(db, settings) for db in ('crm', 'mi')}
+    for db, profile in profiles.items():
+        for error in profile['errors']:
+            print(f"DB profile {db}: ignoring {error}")
+    _db_profiles = profiles
+    return profiles
+
+def startup_lock():
+    return process_lock(f"{MI_DB_PATH}.startup.lock")
+
+def migrate_databases():
+    """Run the schema migrations once per code version; returns False when both DBs were already stamped."""
+    stamp = schema_stamp()
+    current = lambda: _db_stamp(CRM_DB_PATH) == stamp and _db_stamp(MI_DB_PATH) == stamp
+    if current():
+        return False
+    with startup_lock():
+        if current():
+            return False  # another worker migrated while this one waited
+        init_crm_db()
+        restore_mi_from_snapshot()
+        init_mi_db()
+        for path in (CRM_DB_PATH, MI_DB_PATH):
+            conn = _db_pool.connect(path)
+            conn.execute(f"PRAGMA user_version={stamp}")
+            conn.close()
+    return True
+
+def seed_databases():
+    """Background startup: seed mills and RL history (each step skips when already done), then the scheduler."""
+    with startup_lock():
+        _startup.run('seed_crm_mills', seed_crm_mills)
+        _startup.run('sync_crm_mills_to_mi', sync_crm_mills_to_mi)
+        _startup.run('seed_rl_from_csv', seed_rl_from_csv)
+    _startup.run('resume_intake_jobs', _intake_jobs.resume)
+    _startup.run('start_offering_scheduler', start_offering_scheduler)
+
+def wait_until_ready(timeout=None):
+    """Block until background startup has finished (scripts and tests that repoint the DB paths)."""
+    return _startup.wait(timeout)
+
+with _startup.phase('migrate') as _phase:
+    if not migrate_databases():
+        _phase['status'] = 'skipped'
+load_db_profiles()
+_startup.start_background(seed_databases)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,297 @@
+"""
+SQLite connection pool for SYP Analytics
+ConnectionPool: per-thread pool of long-lived connections, keyed by database
+path and mode. Pragmas run once when a connection is opened; close() hands the
+connection back to the calling thread's pool instead of closing it.
+Read-only connections open the file with mode=ro and PRAGMA query_only, so GET
+handlers never take the write lock. attach=((alias, path), ...) keeps other
+databases ATTACHed to a pooled connection, so one connection can join across them.
+PROFILES / resolve_profile: per-database performance pragmas (mmap, page cache,
+synchronous, temp store, busy timeout), applied by the pool to every connection.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+
+
+PROFILE_PRAGMAS = ('mmap_size', 'cache_size', 'synchronous', 'temp_store', 'busy_timeout')
+# Set per database file; temp_store and busy_timeout are per connection and so shared by attached ones
+SCHEMA_PRAGMAS = ('mmap_size', 'cache_size', 'synchronous')
+_PRAGMA_NAMES = {'synchronous': ('OFF', 'NORMAL', 'FULL', 'EXTRA'), 'temp_store': ('DEFAULT', 'FILE', 'MEMORY')}
+
+PROFILES = {
+    # SQLite's own defaults: what every connection ran with before profiles existed
+    'default': {'mmap_size': 0, 'cache_size': -2000, 'synchronous': 'FULL', 'temp_store': 'DEFAULT',
+                'busy_timeout': 10000},
+    # WAL + synchronous=NORMAL only risks the last commits on power loss, never corruption
+    'production': {'mmap_size': 268435456, 'cache_size': -32768, 'synchronous': 'NORMAL',
+                   'temp_store': 'MEMORY', 'busy_timeout': 10000},
+    'low-memory': {'mmap_size': 0, 'cache_size': -2000, 'synchronous': 'NORMAL', 'temp_store': 'FILE',
+                   'busy_timeout': 10000},
+}
+DEFAULT_PROFILE = 'production'
+
+
+def _pragma_value(pragma, value):
+    """Validated pragma value (int, or an upper-case keyword for synchronous / temp_store)."""
+    text = str(value).strip()
+    if pragma in _PRAGMA_NAMES:
+        if text.upper() not in _PRAGMA_NAMES[pragma]:
+            raise ValueError(f"{pragma} must be one of {', '.join(_PRAGMA_NAMES[pragma])}")
+        return text.upper()
+    return int(text)
+
+
+def resolve_profile(db, settings=None, env=None):
+    """Performance pragmas for database `db` ('crm', 'mi').
+    The preset is {DB}_DB_PROFILE from the environment, else settings['db_profile.<db>'], else
+    DEFAULT_PROFILE; each pragma can be overridden the same way by {DB}_DB_<PRAGMA> or
+    settings['db_profile.<db>.<pragma>']. Invalid values are skipped and listed under errors.
+    Returns {'profile', 'profile_source', 'pragmas', 'sources', 'errors', 'statements'}."""
+    env = os.environ if env is None else env
+    settings = settings or {}
+    prefix = f"{db.upper()}_DB_"
+    errors = []
+    name, source = DEFAULT_PROFILE, 'default'
+    for origin, value in (('settings', settings.get(f'db_profile.{db}')), ('env', env.get(prefix + 'PROFILE'))):
+        if value:
+            if value in PROFILES:
+                name, source = value, origin
+            else:
+                errors.append(f"{origin}: unknown profile {value!r}")
+    pragmas = dict(PROFILES[name])
+    sources = {p: name for p in PROFILE_PRAGMAS}
+    for pragma in PROFILE_PRAGMAS:
+        for origin, value in (('settings', settings.get(f'db_profile.{db}.{pragma}')),
+                              ('env', env.get(prefix + pragma.upper()))):
+            if value is None or value == '':
+                continue
+            try:
+                pragmas[pragma] = _pragma_value(pragma, value)
+                sources[pragma] = origin
+            except ValueError as e:
+                errors.append(f"{origin}: {pragma}={value!r} ({e})")
+    statements = tuple(f"PRAGMA {p}={pragmas[p]}" for p in PROFILE_PRAGMAS)
+    return {'profile': name, 'profile_source': source, 'pragmas': pragmas, 'sources': sources,
+            'errors': errors, 'statements': statements}
+
+
+def effective_pragmas(conn, schema='main'):
+    """The profile pragmas as this connection actually runs them (mmap_size may be capped by
+    the SQLite build), plus journal_mode and page_size; schema picks an attached database."""
+    out = {}
+    for pragma in PROFILE_PRAGMAS + ('journal_mode', 'page_size'):
+        target = pragma if pragma in ('temp_store', 'busy_timeout') else f"{schema}.{pragma}"
+        value = conn.execute(f"PRAGMA {target}").fetchone()[0]
+        if pragma in _PRAGMA_NAMES and isinstance(value, int) and value < len(_PRAGMA_NAMES[pragma]):
+            value = _PRAGMA_NAMES[pragma][value]
+        out[pragma] = value
+    return out
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() returns it to the pool it came from.
+    Closing it again after that is a no-op; only a detached connection is really closed."""
+
+    def close(self):
+        if self.__dict__.get('_released'):
+            return      # already back in the pool, possibly idle or handed out again
+        pool = self.__dict__.pop('_pool', None)
+        if pool is None:
+            sqlite3.Connection.close(self)
+        else:
+            self._released = True
+            pool._release(self)
+
+    def detach(self):
+        """Take this connection out of the pool (e.g. after changing per-connection pragmas);
+        close() then really closes it."""
+        pool = self.__dict__.pop('_pool', None)
+        if pool is not None:
+            pool._count(in_use=-1)
+        return self
+
+
+class ConnectionPool:
+    """Idle connections per thread (max_idle, least recently used closed first).
+    A pooled connection is dropped instead of reused when its database file (or an
+    attached one) was replaced or deleted, or when it still holds temp tables.
+    profile(path) -> resolve_profile() result or None; its statements run on every
+    connection that last applied different ones, so a changed profile reaches
+    idle connections on their next checkout. Each attached database gets the
+    SCHEMA_PRAGMAS of its own profile as PRAGMA <alias>.<pragma>."""
+
+    def __init__(self, max_idle=8, timeout=10, pragmas=('journal_mode=WAL', 'foreign_keys=ON'), profile=None):
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.pragmas = pragmas
+        self.profile = profile
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.reused = 0
+        self.released = 0
+        self.discarded = 0
+        self.in_use = 0
+        self.readonly = 0
+
+    def _idle(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            # Connections must not cross a fork: abandon anything inherited from the parent
+            local.pid = os.getpid()
+            local.idle = []
+        return local.idle
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def _open(self, path, readonly, attach):
+        conn = None
+        if readonly:
+            try:
+                conn = sqlite3.connect(f"file:{quote(os.path.abspath(path))}?mode=ro", uri=True,
+                                       timeout=self.timeout, factory=PooledConnection)
+                conn._uri = True
+            except sqlite3.OperationalError:
+                conn = None    # no database file yet: a writable connection creates it, query_only still applies
+        if conn is None:
+            conn = sqlite3.connect(path, timeout=self.timeout, factory=PooledConnection)
+            conn._uri = False
+            for pragma in self.pragmas:
+                conn.execute(f"PRAGMA {pragma}")
+        for alias, other in attach:
+            # A URI (and so mode=ro) is only understood on a connection opened with uri=True
+            read_only_uri = readonly and conn._uri and os.path.exists(other)
+            conn.execute(f"ATTACH DATABASE ? AS {alias}",
+                         (f"file:{quote(os.path.abspath(other))}?mode=ro" if read_only_uri else other,))
+        if readonly:
+            conn.execute("PRAGMA query_only=ON")
+        conn.row_factory = sqlite3.Row
+        conn._key = (path, readonly, attach)
+        conn._ident = _idents(path, attach)
+        conn._profile = None
+        return conn
+
+    def connect(self, path, readonly=False, attach=()):
+        """A connection to path from this thread's pool, opened if none is idle.
+        Use it like a plain sqlite3 connection and close() it when done.
+        attach: ((alias, path), ...) databases attached under those schema names."""
+        attach = tuple(attach)
+        key = (path, bool(readonly), attach)
+        idle = self._idle()
+        conn = None
+        for i in range(len(idle) - 1, -1, -1):
+            if idle[i]._key == key:
+                conn = idle.pop(i)
+                if None in conn._ident or conn._ident != _idents(path, attach):
+                    _close_quietly(conn)
+                    self._count(discarded=1)
+                    conn = None
+                break
+        if conn is None:
+            conn = self._open(path, key[1], attach)
+            self._count(opened=1, in_use=1, readonly=int(key[1]))
+        else:
+            self._count(reused=1, in_use=1)
+        statements = self._profile_statements(path, attach)
+        if statements and conn._profile != statements:
+            for statement in statements:
+                conn.execute(statement)
+            conn._profile = statements
+        conn._pool = self
+        conn._released = False
+        return conn
+
+    def _profile_statements(self, path, attach):
+        if self.profile is None:
+            return ()
+        profile = self.profile(path)
+        statements = profile['statements'] if profile is not None else ()
+        for alias, other in attach:
+            other_profile = self.profile(other)
+            if other_profile is not None:
+                statements += tuple(f"PRAGMA {alias}.{p}={other_profile['pragmas'][p]}" for p in SCHEMA_PRAGMAS)
+        return statements
+
+    def _release(self, conn):
+        self._count(in_use=-1)
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+            conn.isolation_level = ''
+            conn.set_trace_callback(None)
+            reusable = conn.execute("SELECT 1 FROM temp.sqlite_master LIMIT 1").fetchone() is None
+        except sqlite3.Error:
+            reusable = False
+        if not reusable or getattr(self._local, 'pid', None) != os.getpid():
+            _close_quietly(conn)
+            self._count(discarded=1)
+            return
+        idle = self._idle()
+        idle.append(conn)
+        self._count(released=1)
+        if len(idle) > self.max_idle:
+            _close_quietly(idle.pop(0))
+            self._count(discarded=1)
+
+    @contextmanager
+    def transaction(self, path, immediate=False, attach=()):
+        """Pooled connection inside BEGIN (IMMEDIATE takes the write lock up front);
+        commits when the block exits cleanly, rolls back if it raises."""
+        conn = self.connect(path, attach=attach)
+        try:
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def clear(self):
+        """Close this thread's idle connections."""
+        idle = self._idle()
+        while idle:
+            _close_quietly(idle.pop())
+            self._count(discarded=1)
+
+    def stats(self):
+        with self._lock:
+            checkouts = self.opened + self.reused
+            return {
+                'opened': self.opened,
+                'readonly_opened': self.readonly,
+                'reused': self.reused,
+                'released': self.released,
+                'discarded': self.discarded,
+                'in_use': self.in_use,
+                'idle_this_thread': len(getattr(self._local, 'idle', ())),
+                'max_idle_per_thread': self.max_idle,
+                'reuse_rate': round(self.reused / checkouts, 4) if checkouts else None,
+            }
+
+
+def _idents(path, attach):
+    return (_file_ident(path),) + tuple(_file_ident(other) for _, other in attach)
+
+
+def _file_ident(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino)
+
+
+def _close_quietly(conn):
+    try:
+        sqlite3.Connection.close(conn)
+    except sqlite3.Error:
+        pass    # closed from another thread: left to the garbage collector
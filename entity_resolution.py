@@ -5,7 +5,10 @@ Fuzzy matching + canonical identity management for mills & customers.
 import re
 import json
 import sqlite3
+import threading
+from collections import Counter, defaultdict
 from datetime import datetime
+from functools import lru_cache
 
 # ── Scoring weights ──────────────────────────────────────────────
 W_LEVENSHTEIN = 0.50
@@ -17,6 +20,11 @@ THRESH_AUTO   = 0.92   # auto-link (high confidence)
 THRESH_REVIEW = 0.75   # show candidates for manual review
 # below THRESH_REVIEW → create new entity
 
+# ── Candidate blocking ───────────────────────────────────────────
+BLOCK_TOP_K   = 50     # candidates per resolve() that reach compute_score
+BLOCK_WIDEN   = 4      # x k when a name's tokens barely block (typo, partial word)
+SEARCH_TOP_K  = 150    # search() candidates: prefixes end in a partial word
+
 # ── Noise tokens removed before scoring ──────────────────────────
 _NOISE = {
     'inc', 'llc', 'co', 'corp', 'ltd', 'company', 'corporation',
@@ -48,6 +56,7 @@ _COMPANY_EXPANSIONS = {
 #  STRING UTILITIES
 # ═══════════════════════════════════════════════════════════════════
 
+@lru_cache(maxsize=65536)
 def _normalize(name):
     """Lowercase, strip punctuation/dashes, collapse whitespace."""
     if not name:
@@ -77,6 +86,18 @@ def _tokenize(s):
     return [t for t in s.split() if t not in _NOISE and len(t) > 1]
 
 
+@lru_cache(maxsize=65536)
+def _prepare(name):
+    """(normalized + expanded name, its token set) as compute_score sees one side."""
+    norm = _expand_abbreviations(_normalize(name))
+    return norm, frozenset(_tokenize(norm))
+
+
+@lru_cache(maxsize=65536)
+def _normalize_expanded(s):
+    return _expand_abbreviations(_normalize(s))
+
+
 def _make_canonical_id(entity_type, name):
     """Generate a canonical_id slug from type + name."""
     prefix = 'mill' if entity_type == 'mill' else 'cust'
@@ -93,20 +114,59 @@ def _make_normalized_key(name):
 #  LEVENSHTEIN DISTANCE
 # ═══════════════════════════════════════════════════════════════════
 
-def levenshtein(a, b):
-    """Compute Levenshtein edit distance."""
+def levenshtein(a, b, max_dist=None):
+    """Compute Levenshtein edit distance.
+    With max_dist, stops as soon as the distance must exceed it and returns max_dist + 1."""
+    if a == b:
+        return 0
+    # Common prefix/suffix never costs an edit
+    i, m, n = 0, len(a), len(b)
+    while i < m and i < n and a[i] == b[i]:
+        i += 1
+    while m > i and n > i and a[m - 1] == b[n - 1]:
+        m -= 1
+        n -= 1
+    a, b = a[i:m], b[i:n]
     m, n = len(a), len(b)
+    if max_dist is not None and abs(m - n) > max_dist:
+        return max_dist + 1
     if m == 0: return n
     if n == 0: return m
-    # Optimize: single-row DP
-    prev = list(range(n + 1))
-    for i in range(1, m + 1):
-        curr = [i] + [0] * n
-        for j in range(1, n + 1):
-            cost = 0 if a[i-1] == b[j-1] else 1
-            curr[j] = min(curr[j-1] + 1, prev[j] + 1, prev[j-1] + cost)
-        prev = curr
-    return prev[n]
+    if m > n:
+        a, b, m, n = b, a, n, m
+    # Bit-parallel DP (Myers/Hyyrö): one column of the table per character of b
+    peq = {}
+    for k, c in enumerate(a):
+        peq[c] = peq.get(c, 0) | (1 << k)
+    mask = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv, mv, dist = mask, 0, m
+    # Past this distance (less the characters left to match) the bound can't be met
+    give_up = max_dist + n if max_dist is not None else 2 * n + 1
+    get = peq.get
+    for c in b:
+        eq = get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & last:
+            dist += 1
+        elif mh & last:
+            dist -= 1
+        give_up -= 1
+        if dist > give_up:
+            return max_dist + 1
+        ph = (ph << 1) | 1
+        pv = ((mh << 1) | ~(xv | ph)) & mask
+        mv = ph & xv
+    return dist
+
+
+def _levenshtein_score(dist, max_len):
+    if max_len == 0:
+        return 1.0
+    return max(0.0, 1.0 - dist / max_len)
 
 
 def levenshtein_score(a, b):
@@ -119,6 +179,16 @@ def levenshtein_score(a, b):
     return max(0.0, 1.0 - levenshtein(a, b) / max_len)
 
 
+def _similar(a, b, threshold):
+    """levenshtein_score(a, b) > threshold, giving up once the distance is too large to pass."""
+    max_len = max(len(a), len(b))
+    if max_len == 0:
+        return 1.0 > threshold
+    bound = int((1.0 - threshold) * max_len) + 1
+    dist = levenshtein(a, b, bound)
+    return dist <= bound and _levenshtein_score(dist, max_len) > threshold
+
+
 # ═══════════════════════════════════════════════════════════════════
 #  TOKEN OVERLAP
 # ═══════════════════════════════════════════════════════════════════
@@ -127,7 +197,8 @@ def token_overlap_score(tokens_a, tokens_b):
     """Fraction of shared tokens relative to smaller set."""
     if not tokens_a or not tokens_b:
         return 0.0
-    set_a, set_b = set(tokens_a), set(tokens_b)
+    set_a = tokens_a if isinstance(tokens_a, frozenset) else set(tokens_a)
+    set_b = tokens_b if isinstance(tokens_b, frozenset) else set(tokens_b)
     shared = len(set_a & set_b)
     min_size = min(len(set_a), len(set_b))
     return shared / min_size if min_size > 0 else 0.0
@@ -137,11 +208,38 @@ def token_overlap_score(tokens_a, tokens_b):
 #  SEMANTIC SCORING (mill-aware)
 # ═══════════════════════════════════════════════════════════════════
 
+class _AliasOrder:
+    """A company alias dict's keys, longest first (hashed by identity for the parts cache)."""
+
+    def __init__(self, aliases):
+        self.aliases = aliases
+        self.size = len(aliases)
+        self.keys = tuple(sorted(aliases.keys(), key=len, reverse=True))
+
+
+_NO_ALIASES = _AliasOrder({})
+_alias_orders = {}
+
+
+def _alias_order(mill_company_aliases):
+    if not mill_company_aliases:
+        return _NO_ALIASES
+    order = _alias_orders.get(id(mill_company_aliases))
+    if order is None or order.aliases is not mill_company_aliases or order.size != len(mill_company_aliases):
+        order = _alias_orders[id(mill_company_aliases)] = _AliasOrder(mill_company_aliases)
+    return order
+
+
 def _extract_parts(name, mill_company_aliases=None):
     """Extract (company, city, state) from a mill name.
     Handles 'Company - City', 'Company City', etc."""
     if not name:
         return '', '', ''
+    return _parts(name, _alias_order(mill_company_aliases))
+
+
+@lru_cache(maxsize=65536)
+def _parts(name, order):
     raw = name.strip()
 
     # "Company - City" format
@@ -166,9 +264,9 @@ def _extract_parts(name, mill_company_aliases=None):
 
     # No separator — try alias lookup for company, rest is city
     norm = _normalize(raw)
-    if mill_company_aliases:
+    if order.keys:
         # Try longest-first prefix match
-        for alias in sorted(mill_company_aliases.keys(), key=len, reverse=True):
+        for alias in order.keys:
             if norm == alias or norm.startswith(alias + ' '):
                 company = alias
                 city = norm[len(alias):].strip()
@@ -190,19 +288,29 @@ def semantic_score(name_a, name_b, entity_type, mill_company_aliases=None):
         # (handled by levenshtein + token overlap already)
         return 0.0
 
-    comp_a, city_a, state_a = _extract_parts(name_a, mill_company_aliases)
-    comp_b, city_b, state_b = _extract_parts(name_b, mill_company_aliases)
+    order = _alias_order(mill_company_aliases)
+    return _semantic(_extract_parts_ordered(name_a, order), _extract_parts_ordered(name_b, order))
+
+
+def _extract_parts_ordered(name, order):
+    return _parts(name, order) if name else ('', '', '')
+
+
+def _semantic(parts_a, parts_b):
+    """semantic_score of two mill names' (company, city, state)."""
+    comp_a, city_a, state_a = parts_a
+    comp_b, city_b, state_b = parts_b
 
     score = 0.0
 
     # Company match (0.5)
     if comp_a and comp_b:
         # Expand abbreviations for comparison
-        ca = _expand_abbreviations(_normalize(comp_a))
-        cb = _expand_abbreviations(_normalize(comp_b))
+        ca = _normalize_expanded(comp_a)
+        cb = _normalize_expanded(comp_b)
         if ca == cb:
             score += 0.5
-        elif levenshtein_score(ca, cb) > 0.85:
+        elif _similar(ca, cb, 0.85):
             score += 0.4
 
     # City match (0.3)
@@ -211,7 +319,7 @@ def semantic_score(name_a, name_b, entity_type, mill_company_aliases=None):
         cb = _normalize(city_b)
         if ca == cb:
             score += 0.3
-        elif levenshtein_score(ca, cb) > 0.85:
+        elif _similar(ca, cb, 0.85):
             score += 0.2
 
     # State match (0.2)
@@ -231,16 +339,14 @@ def compute_score(input_name, candidate_name, entity_type='mill', mill_company_a
 
     score = 0.5 × levenshtein + 0.3 × token_overlap + 0.2 × semantic
     """
-    # Pre-normalize both names
-    norm_a = _expand_abbreviations(_normalize(input_name))
-    norm_b = _expand_abbreviations(_normalize(candidate_name))
+    # Pre-normalize both names (memoized)
+    norm_a, tok_a = _prepare(input_name)
+    norm_b, tok_b = _prepare(candidate_name)
 
     # 1. Levenshtein (50%)
     lev = levenshtein_score(norm_a, norm_b)
 
     # 2. Token overlap (30%)
-    tok_a = _tokenize(norm_a)
-    tok_b = _tokenize(norm_b)
     tok = token_overlap_score(tok_a, tok_b)
 
     # 3. Semantic bonus (20%)
@@ -249,6 +355,131 @@ def compute_score(input_name, candidate_name, entity_type='mill', mill_company_a
     return W_LEVENSHTEIN * lev + W_TOKEN * tok + W_SEMANTIC * sem
 
 
+def score_candidates(input_name, candidate_names, entity_type='mill', mill_company_aliases=None, min_score=None):
+    """compute_score(input_name, c) for each candidate name, preparing the input once.
+    With min_score, a candidate that can't reach it is None: token overlap and semantic
+    parts are scored first and bound how far the edit distance may go before giving up.
+    Every score returned is identical to compute_score's."""
+    norm_a, tok_a = _prepare(input_name)
+    mill = entity_type == 'mill'
+    order = _alias_order(mill_company_aliases)
+    parts_a = _extract_parts_ordered(input_name, order) if mill else None
+    scores = []
+    for name in candidate_names:
+        norm_b, tok_b = _prepare(name)
+        tok = token_overlap_score(tok_a, tok_b)
+        sem = _semantic(parts_a, _extract_parts_ordered(name, order)) if mill else 0.0
+        max_len = max(len(norm_a), len(norm_b))
+        if min_score is None or max_len == 0:
+            lev = levenshtein_score(norm_a, norm_b)
+        else:
+            need = (min_score - W_TOKEN * tok - W_SEMANTIC * sem) / W_LEVENSHTEIN
+            if need > 1.0:
+                scores.append(None)
+                continue
+            bound = int((1.0 - need) * max_len) + 1 if need > 0 else max_len
+            dist = levenshtein(norm_a, norm_b, bound)
+            if dist > bound:
+                scores.append(None)
+                continue
+            lev = _levenshtein_score(dist, max_len)
+        scores.append(W_LEVENSHTEIN * lev + W_TOKEN * tok + W_SEMANTIC * sem)
+    return scores
+
+
+# ═══════════════════════════════════════════════════════════════════
+#  CANDIDATE BLOCKING INDEX
+# ═══════════════════════════════════════════════════════════════════
+
+def _trigrams(s):
+    padded = f' {s} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CandidateIndex:
+    """In-memory blocking index over entity_canonical + entity_alias: token inverted
+    index, character trigrams and company-prefix buckets (per entity type), so only
+    the entities sharing the most features with a name are scored in full."""
+
+    def __init__(self, mill_company_aliases=None, version=None):
+        self.mill_company_aliases = mill_company_aliases or {}
+        self.version = version
+        self.entities = {}                 # canonical_id → {type, canonical_name, metadata, aliases}
+        self.tokens = defaultdict(set)     # (type, token) → canonical_ids
+        self.grams = defaultdict(set)      # (type, trigram) → canonical_ids
+        self.prefixes = defaultdict(set)   # (type, company) → canonical_ids
+
+    @classmethod
+    def load(cls, conn, mill_company_aliases=None, version=None):
+        """Build from both tables in one pass (two queries)."""
+        index = cls(mill_company_aliases, version)
+        for row in conn.execute("SELECT type, canonical_id, canonical_name, metadata FROM entity_canonical ORDER BY id"):
+            index.add_entity(row['type'], row['canonical_id'], row['canonical_name'], row['metadata'])
+        for row in conn.execute("SELECT canonical_id, variant FROM entity_alias ORDER BY id"):
+            index.add_alias(row['canonical_id'], row['variant'])
+        return index
+
+    def features(self, name):
+        """(tokens, trigrams, company) of a name, normalized the way compute_score sees it."""
+        norm, tokens = _prepare(name)
+        company = _normalize_expanded(_extract_parts(name, self.mill_company_aliases)[0])
+        return tokens, _trigrams(norm), company
+
+    def _postings(self, entity_type, name):
+        tokens, grams, company = self.features(name)
+        yield from (self.tokens[(entity_type, t)] for t in tokens)
+        yield from (self.grams[(entity_type, g)] for g in grams)
+        if company:
+            yield self.prefixes[(entity_type, company)]
+
+    def add_entity(self, entity_type, canonical_id, canonical_name, metadata='{}'):
+        self.entities[canonical_id] = {'type': entity_type, 'canonical_name': canonical_name,
+                                       'metadata': metadata, 'aliases': []}
+        for posting in self._postings(entity_type, canonical_name):
+            posting.add(canonical_id)
+
+    def add_alias(self, canonical_id, variant):
+        entity = self.entities.get(canonical_id)
+        if entity is None:
+            return
+        entity['aliases'].append(variant)
+        for posting in self._postings(entity['type'], variant):
+            posting.add(canonical_id)
+
+    def remove_entity(self, canonical_id):
+        entity = self.entities.pop(canonical_id, None)
+        if entity is None:
+            return
+        for name in [entity['canonical_name']] + entity['aliases']:
+            for posting in self._postings(entity['type'], name):
+                posting.discard(canonical_id)
+
+    def candidates(self, name, entity_type, k=BLOCK_TOP_K):
+        """Up to k canonical_ids of entity_type ranked by shared features with name
+        (company bucket 5, token 3, trigram 1 each). When a token of name has an empty
+        or short bucket (a typo or a cut-off word), the ranking rests on trigrams alone
+        for it and ties run long, so up to k * BLOCK_WIDEN are returned instead."""
+        tokens, grams, company = self.features(name)
+        counts = Counter()
+        for g in grams:
+            counts.update(self.grams.get((entity_type, g), ()))
+        weak = not tokens
+        for t in tokens:
+            bucket = self.tokens.get((entity_type, t), ())
+            weak = weak or len(bucket) < k
+            for cid in bucket:
+                counts[cid] += 3
+        if company:
+            for cid in self.prefixes.get((entity_type, company), ()):
+                counts[cid] += 5
+        return [cid for cid, _ in counts.most_common(k * BLOCK_WIDEN if weak else k)]
+
+    def stats(self):
+        return {'version': self.version, 'entities': len(self.entities),
+                'aliases': sum(len(e['aliases']) for e in self.entities.values()),
+                'tokens': len(self.tokens), 'trigrams': len(self.grams), 'prefixes': len(self.prefixes)}
+
+
 # ═══════════════════════════════════════════════════════════════════
 #  RESOLUTION ENGINE
 # ═══════════════════════════════════════════════════════════════════
@@ -256,17 +487,86 @@ def compute_score(input_name, candidate_name, entity_type='mill', mill_company_a
 class EntityResolver:
     """Resolves names to canonical entities using fuzzy matching."""
 
-    def __init__(self, crm_db_path, mill_company_aliases=None):
+    def __init__(self, crm_db_path, mill_company_aliases=None, pool=None):
         self.crm_db_path = crm_db_path
         self.mill_company_aliases = mill_company_aliases or {}
+        self.pool = pool      # db_pool.ConnectionPool; plain connections when None
+        self._index = None
+        self._pending = {}    # connection → [index it changed, uncommitted version bumps]
+        self._index_lock = threading.RLock()
 
     def _get_conn(self):
+        if self.pool is not None:
+            return self.pool.connect(self.crm_db_path)
         conn = sqlite3.connect(self.crm_db_path, timeout=10)
         conn.row_factory = sqlite3.Row
         conn.execute("PRAGMA journal_mode=WAL")
         conn.execute("PRAGMA foreign_keys=ON")
         return conn
 
+    def _get_mi_conn(self, mi_db_path, readonly=False):
+        if self.pool is not None:
+            return self.pool.connect(mi_db_path, readonly)
+        conn = sqlite3.connect(mi_db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # ── Candidate index upkeep ───────────────────────────────────
+    # The 'entities' row of data_versions is bumped by triggers on every row inserted
+    # into / deleted from entity_canonical and entity_alias, by any process. Writes made
+    # here are applied to the index straight away and, once committed, advance its
+    # version by the rows they touched, so the index only reloads for other writers.
+
+    def _entities_version(self, conn):
+        try:
+            row = conn.execute("SELECT version FROM data_versions WHERE name='entities'").fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else None
+
+    def _get_index(self, conn):
+        """The candidate index, reloaded if another writer moved the entities version."""
+        version = self._entities_version(conn)
+        with self._index_lock:
+            index = self._index
+            if index is None or version is None or index.version != version:
+                index = CandidateIndex.load(conn, self.mill_company_aliases, version)
+                self._index = index
+            return index
+
+    def _index_write(self, conn, rows, apply):
+        """Apply a write of `rows` rows (as made on conn) to the loaded index."""
+        if rows <= 0:
+            return
+        with self._index_lock:
+            index = self._index
+            if index is None:
+                return
+            apply(index)
+            pending = self._pending.setdefault(conn, [index, 0])
+            if pending[0] is not index:
+                pending[0] = None    # the index was reloaded mid-transaction; its version will catch up
+            pending[1] += rows
+
+    def _commit(self, conn):
+        conn.commit()
+        with self._index_lock:
+            index, rows = self._pending.pop(conn, (None, 0))
+            if index is not None and index is self._index and index.version is not None:
+                index.version += rows
+
+    def _close(self, conn):
+        """Close conn; uncommitted index changes are discarded with the whole index."""
+        with self._index_lock:
+            index, _ = self._pending.pop(conn, (None, 0))
+            if index is not None and index is self._index:
+                self._index = None
+        conn.close()
+
+    def index_stats(self):
+        index = self._index
+        return index.stats() if index is not None else None
+
     def resolve(self, name, entity_type, context='manual'):
         """
         Resolve a name to a canonical entity.
@@ -306,7 +606,7 @@ class EntityResolver:
             if exact:
                 # Register this variant as an alias
                 self._add_alias(conn, exact['canonical_id'], name, norm_input, 'auto', 1.0)
-                conn.commit()
+                self._commit(conn)
                 return {
                     'canonical_id': exact['canonical_id'],
                     'canonical_name': exact['canonical_name'],
@@ -314,33 +614,21 @@ class EntityResolver:
                     'score': 1.0,
                 }
 
-            # 3. Fuzzy match against all entities of same type
-            all_entities = conn.execute(
-                "SELECT * FROM entity_canonical WHERE type=?",
-                (entity_type,)
-            ).fetchall()
-
+            # 3. Fuzzy match against the top blocking candidates of same type
+            index = self._get_index(conn)
             candidates = []
-            for entity in all_entities:
-                score = compute_score(
-                    name, entity['canonical_name'],
-                    entity_type, self.mill_company_aliases
+            for cid in index.candidates(name, entity_type):
+                entity = index.entities[cid]
+                # Best of the canonical name and all aliases of this entity
+                scores = score_candidates(
+                    name, [entity['canonical_name']] + entity['aliases'],
+                    entity_type, self.mill_company_aliases, min_score=THRESH_REVIEW
                 )
-                # Also check against all aliases of this entity
-                aliases = conn.execute(
-                    "SELECT variant FROM entity_alias WHERE canonical_id=?",
-                    (entity['canonical_id'],)
-                ).fetchall()
-                for a in aliases:
-                    alias_score = compute_score(
-                        name, a['variant'],
-                        entity_type, self.mill_company_aliases
-                    )
-                    score = max(score, alias_score)
-
-                if score >= THRESH_REVIEW:
+                score = max((sc for sc in scores if sc is not None), default=None)
+
+                if score is not None and score >= THRESH_REVIEW:
                     candidates.append({
-                        'canonical_id': entity['canonical_id'],
+                        'canonical_id': cid,
                         'canonical_name': entity['canonical_name'],
                         'score': round(score, 4),
                         'metadata': json.loads(entity['metadata'] or '{}'),
@@ -352,7 +640,7 @@ class EntityResolver:
             if candidates and candidates[0]['score'] >= THRESH_AUTO:
                 best = candidates[0]
                 self._add_alias(conn, best['canonical_id'], name, norm_input, 'auto', best['score'])
-                conn.commit()
+                self._commit(conn)
                 return {
                     'canonical_id': best['canonical_id'],
                     'canonical_name': best['canonical_name'],
@@ -364,14 +652,10 @@ class EntityResolver:
                 review_id = self._add_review(
                     conn, name, norm_input, entity_type, candidates[:5], context
                 )
-                conn.commit()
+                self._commit(conn)
                 # Enrich candidates with alias lists
                 for c in candidates[:5]:
-                    aliases = conn.execute(
-                        "SELECT variant FROM entity_alias WHERE canonical_id=?",
-                        (c['canonical_id'],)
-                    ).fetchall()
-                    c['aliases'] = [a['variant'] for a in aliases]
+                    c['aliases'] = list(index.entities[c['canonical_id']]['aliases'])
                 return {
                     'action': 'review',
                     'review_id': review_id,
@@ -381,7 +665,7 @@ class EntityResolver:
             else:
                 # Create new entity
                 result = self.create_entity(conn, entity_type, name)
-                conn.commit()
+                self._commit(conn)
                 return {
                     'canonical_id': result['canonical_id'],
                     'canonical_name': result['canonical_name'],
@@ -389,7 +673,7 @@ class EntityResolver:
                     'score': 0.0,
                 }
         finally:
-            conn.close()
+            self._close(conn)
 
     def create_entity(self, conn, entity_type, name, metadata=None):
         """Create a new canonical entity + self-alias."""
@@ -418,6 +702,7 @@ class EntityResolver:
                VALUES (?,?,?,?,?)""",
             (entity_type, canonical_name, canonical_id, norm_key, meta_json)
         )
+        self._index_write(conn, 1, lambda index: index.add_entity(entity_type, canonical_id, canonical_name, meta_json))
         # Add self as alias
         self._add_alias(conn, canonical_id, canonical_name, norm_key, 'canonical', 1.0)
         return {'canonical_id': canonical_id, 'canonical_name': canonical_name}
@@ -425,14 +710,15 @@ class EntityResolver:
     def _add_alias(self, conn, canonical_id, variant, variant_normalized, source, score):
         """Add an alias, ignoring duplicates."""
         try:
-            conn.execute(
+            cur = conn.execute(
                 """INSERT OR IGNORE INTO entity_alias
                    (canonical_id, variant, variant_normalized, source, score)
                    VALUES (?,?,?,?,?)""",
                 (canonical_id, variant.strip(), variant_normalized, source, score)
             )
         except sqlite3.IntegrityError:
-            pass
+            return
+        self._index_write(conn, cur.rowcount, lambda index: index.add_alias(canonical_id, variant.strip()))
 
     def _add_review(self, conn, input_name, input_normalized, entity_type, candidates, context):
         """Add to manual review queue."""
@@ -459,7 +745,7 @@ class EntityResolver:
                     "UPDATE entity_review SET resolved_id=? WHERE id=?",
                     (result['canonical_id'], review_id)
                 )
-                conn.commit()
+                self._commit(conn)
                 return {'canonical_id': result['canonical_id'], 'action': 'created'}
             elif chosen_canonical_id:
                 # Link to chosen entity
@@ -469,7 +755,7 @@ class EntityResolver:
                     "UPDATE entity_review SET resolved_id=? WHERE id=?",
                     (chosen_canonical_id, review_id)
                 )
-                conn.commit()
+                self._commit(conn)
                 canonical = conn.execute(
                     "SELECT * FROM entity_canonical WHERE canonical_id=?", (chosen_canonical_id,)
                 ).fetchone()
@@ -481,31 +767,27 @@ class EntityResolver:
             else:
                 return {'error': 'Must provide chosen_canonical_id or create_new=true'}
         finally:
-            conn.close()
+            self._close(conn)
 
     def search(self, query, entity_type, limit=10):
         """Search entities by fuzzy match — for autocomplete / manual linking."""
         conn = self._get_conn()
         try:
-            all_entities = conn.execute(
-                "SELECT * FROM entity_canonical WHERE type=?", (entity_type,)
-            ).fetchall()
+            index = self._get_index(conn)
+            cids = index.candidates(query, entity_type, max(limit * 5, SEARCH_TOP_K))
+            scores = score_candidates(
+                query, [index.entities[cid]['canonical_name'] for cid in cids],
+                entity_type, self.mill_company_aliases, min_score=0.3
+            )
             results = []
-            for entity in all_entities:
-                score = compute_score(
-                    query, entity['canonical_name'],
-                    entity_type, self.mill_company_aliases
-                )
-                if score >= 0.3:  # low threshold for search
-                    aliases = conn.execute(
-                        "SELECT variant FROM entity_alias WHERE canonical_id=?",
-                        (entity['canonical_id'],)
-                    ).fetchall()
+            for cid, score in zip(cids, scores):
+                entity = index.entities[cid]
+                if score is not None and score >= 0.3:  # low threshold for search
                     results.append({
-                        'canonical_id': entity['canonical_id'],
+                        'canonical_id': cid,
                         'canonical_name': entity['canonical_name'],
                         'score': round(score, 4),
-                        'aliases': [a['variant'] for a in aliases],
+                        'aliases': list(entity['aliases']),
                         'metadata': json.loads(entity['metadata'] or '{}'),
                     })
             results.sort(key=lambda r: r['score'], reverse=True)
@@ -584,8 +866,7 @@ class EntityResolver:
             # Mill Intel data
             if mi_db_path:
                 try:
-                    mi_conn = sqlite3.connect(mi_db_path, timeout=10)
-                    mi_conn.row_factory = sqlite3.Row
+                    mi_conn = self._get_mi_conn(mi_db_path, readonly=True)
                     # Get quotes for all alias names
                     placeholders = ','.join(['?' for _ in alias_names])
                     if alias_names:
@@ -647,10 +928,10 @@ class EntityResolver:
                 return {'error': 'Entity not found'}
             norm = _make_normalized_key(variant_name)
             self._add_alias(conn, canonical_id, variant_name, norm, 'manual', 1.0)
-            conn.commit()
+            self._commit(conn)
             return {'ok': True, 'canonical_id': canonical_id, 'variant': variant_name}
         finally:
-            conn.close()
+            self._close(conn)
 
     def merge_entities(self, source_id, target_id):
         """Merge source entity into target. Moves all aliases + references."""
@@ -675,13 +956,14 @@ class EntityResolver:
                           _make_normalized_key(source['canonical_name']), 'merge', 1.0)
 
             # Delete source aliases and entity
-            conn.execute("DELETE FROM entity_alias WHERE canonical_id=?", (source_id,))
-            conn.execute("DELETE FROM entity_canonical WHERE canonical_id=?", (source_id,))
+            deleted = conn.execute("DELETE FROM entity_alias WHERE canonical_id=?", (source_id,)).rowcount
+            deleted += conn.execute("DELETE FROM entity_canonical WHERE canonical_id=?", (source_id,)).rowcount
+            self._index_write(conn, deleted, lambda index: index.remove_entity(source_id))
 
             # Resolve any pending reviews pointing to source
             conn.execute("UPDATE entity_review SET resolved_id=? WHERE resolved_id=?", (target_id, source_id))
 
-            conn.commit()
+            self._commit(conn)
             return {
                 'ok': True,
                 'target_id': target_id,
@@ -689,7 +971,7 @@ class EntityResolver:
                 'merged_aliases': len(aliases),
             }
         finally:
-            conn.close()
+            self._close(conn)
 
     def migrate_existing(self, mill_company_aliases=None, mill_directory=None,
                          customer_aliases=None, mi_db_path=None):
@@ -837,8 +1119,7 @@ class EntityResolver:
             # ── Phase 6: Scan Mill Intel mills ────────────────────
             if mi_db_path:
                 try:
-                    mi_conn = sqlite3.connect(mi_db_path, timeout=10)
-                    mi_conn.row_factory = sqlite3.Row
+                    mi_conn = self._get_mi_conn(mi_db_path)
                     mi_mills = mi_conn.execute(
                         "SELECT * FROM mills WHERE canonical_id IS NULL OR canonical_id=''"
                     ).fetchall()
@@ -879,10 +1160,10 @@ class EntityResolver:
                 except Exception as e:
                     stats['mi_error'] = str(e)
 
-            conn.commit()
+            self._commit(conn)
             return stats
         finally:
-            conn.close()
+            self._close(conn)
 
     def get_pending_reviews(self):
         """Get all unresolved review items."""
@@ -926,6 +1207,7 @@ class EntityResolver:
                 'customer_entities': custs,
                 'total_aliases': aliases,
                 'pending_reviews': pending,
+                'candidate_index': self.index_stats(),
             }
         finally:
             conn.close()
@@ -0,0 +1,152 @@
+"""
+Geocoding / routing client plumbing for SYP Analytics
+SQLiteRateLimiter: token bucket shared by every thread and gunicorn worker
+(state lives in a SQLite row, updated under BEGIN IMMEDIATE; give it a database
+file of its own so tokens never wait on application writes).
+LookupQueue: bounded background queue that coalesces duplicate in-flight keys
+onto one Future, so request threads never sleep for rate limits themselves.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class QueueFull(Exception):
+    """The background lookup queue is at capacity."""
+
+
+class SQLiteRateLimiter:
+    """Token bucket (rate tokens/s, burst capacity) stored in the rate_limits table,
+    which is created on first use."""
+
+    def __init__(self, connect, name, rate, capacity=1):
+        self.connect = connect
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.waited = 0.0
+        self.calls = 0
+
+    def reserve(self):
+        """Take a token, going into debt if none is left; return seconds to wait before using it."""
+        conn = self.connect()
+        try:
+            conn.isolation_level = None
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_limits "
+                         "(name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)")
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated_at FROM rate_limits WHERE name=?", (self.name,)).fetchone()
+            tokens = self.capacity if row is None else min(self.capacity, row[0] + (now - row[1]) * self.rate)
+            tokens -= 1
+            conn.execute("INSERT OR REPLACE INTO rate_limits (name, tokens, updated_at) VALUES (?,?,?)",
+                         (self.name, tokens, now))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return max(0.0, -tokens / self.rate)
+
+    def acquire(self):
+        wait = self.reserve()
+        self.calls += 1
+        if wait > 0:
+            self.waited += wait
+            time.sleep(wait)
+
+    def stats(self):
+        return {'rate': self.rate, 'capacity': self.capacity, 'calls': self.calls,
+                'waited_s': round(self.waited, 3)}
+
+
+class LookupQueue:
+    """Bounded background queue of keyed lookups run by a few daemon threads."""
+
+    def __init__(self, name, fn, maxsize=500, workers=1):
+        self.name = name
+        self.fn = fn
+        self.maxsize = maxsize
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._threads = []
+        self._pid = os.getpid()
+        self.submitted = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+
+    def _ensure_workers(self):
+        with self._start_lock:
+            if self._pid != os.getpid():
+                # After a fork the parent's workers do not exist in this process, and the
+                # lookups it had queued or in flight would never finish here: start empty
+                self._pid = os.getpid()
+                self._lock = threading.Lock()
+                self._queue = queue.Queue(maxsize=self.maxsize)
+                self._inflight = {}
+                self._threads = []
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(len(self._threads), self.workers):
+                t = threading.Thread(target=self._run, args=(self._queue, self._inflight, self._lock),
+                                     name=f'{self.name}-lookup-{i}', daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def submit(self, key, *args):
+        """Future for fn(*args); a key already queued or running shares its Future."""
+        self._ensure_workers()
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.coalesced += 1
+                return fut
+            fut = Future()
+            try:
+                self._queue.put_nowait((key, args, fut))
+            except queue.Full:
+                self.rejected += 1
+                raise QueueFull(f'{self.name} lookup queue is full ({self.maxsize})')
+            self._inflight[key] = fut
+            self.submitted += 1
+        return fut
+
+    def pending(self, key):
+        if self._pid != os.getpid():
+            return False
+        with self._lock:
+            return key in self._inflight
+
+    def _run(self, work, inflight, lock):
+        while True:
+            key, args, fut = work.get()
+            try:
+                result = self.fn(*args)
+            except Exception as e:
+                self.failed += 1
+                fut.set_exception(e)
+            else:
+                self.completed += 1
+                fut.set_result(result)
+            finally:
+                with lock:
+                    inflight.pop(key, None)
+                work.task_done()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'inflight': len(self._inflight),
+                'maxsize': self.maxsize,
+                'workers': self.workers,
+                'submitted': self.submitted,
+                'coalesced': self.coalesced,
+                'rejected': self.rejected,
+                'completed': self.completed,
+                'failed': self.failed,
+            }
@@ -0,0 +1,276 @@
+"""
+Background quote intake for SYP Analytics
+IntakeJobQueue: intake batches persisted as intake_jobs rows (queued -> running ->
+done/failed, with stage, progress, result and timings) and applied by a small pool
+of worker threads in each process. Each job lists the keys (mill companies) it
+touches in intake_job_keys; a job is only claimed once no earlier unfinished job
+shares one of its keys, so batches for the same mill apply in submission order
+while batches for other mills run alongside.
+"""
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+
+
+class IntakeJobQueue:
+    """writer: WriteQueue for the database holding the job tables (all job state changes are
+    units on it); connect() -> read-only connection for status reads and the idle workers'
+    poll. apply(payload, progress) -> JSON-able result runs in a worker thread;
+    progress(stage, processed=None) records how far it got.
+    Running jobs are heartbeated every heartbeat seconds while apply runs; one whose heartbeat
+    is older than stale_after seconds (its process died) is queued again, up to max_attempts
+    runs, and the old run can then no longer record its outcome. Idle workers exit after idle_exit seconds;
+    enqueue() and resume() start them again. Finished jobs are kept for retention seconds.
+    Jobs with total >= large (e.g. a cloud sync) hold at most workers - 1 of this process's
+    workers, so small batches always have one free."""
+
+    def __init__(self, writer, connect, apply, workers=2, poll=0.5, stale_after=300, max_attempts=3,
+                 idle_exit=30, heartbeat=2.0, retention=7 * 86400, large=None):
+        self.writer = writer
+        self.connect = connect
+        self.apply = apply
+        self.workers = workers
+        self.poll = poll
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self.idle_exit = idle_exit
+        self.heartbeat = heartbeat
+        self.retention = retention
+        self.large = large
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._threads = []
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._finished = threading.Condition()
+        self._finished_runs = 0     # bumped under _finished by every run this process ends
+        self._lock = threading.Lock()
+        self.applied = 0
+        self.failed = 0
+        self.requeued = 0
+        self.lost = 0
+
+    def enqueue(self, payload, keys, total=0):
+        """Persist a job and wake the workers; returns the job id."""
+        now = time.time()
+
+        def insert(conn):
+            conn.execute("DELETE FROM intake_jobs WHERE finished_at < ?", (now - self.retention,))
+            job_id = conn.execute(
+                "INSERT INTO intake_jobs (status, stage, payload, total, queued_at) VALUES ('queued', 'queued', ?, ?, ?)",
+                (json.dumps(payload), total, now)).lastrowid
+            conn.executemany("INSERT OR IGNORE INTO intake_job_keys (key, job_id) VALUES (?, ?)",
+                             [(k, job_id) for k in sorted(set(keys))])
+            return job_id
+        job_id = self.writer.execute(insert)
+        self._ensure_workers()
+        self._wake.set()
+        return job_id
+
+    def resume(self):
+        """Start workers if unfinished jobs are waiting (e.g. left over from before a restart)."""
+        conn = self.connect()
+        try:
+            waiting = conn.execute("SELECT 1 FROM intake_jobs WHERE status IN ('queued', 'running') LIMIT 1").fetchone()
+        finally:
+            conn.close()
+        if waiting:
+            self._ensure_workers()
+        return bool(waiting)
+
+    def _ensure_workers(self):
+        with self._start_lock:
+            if self._pid != os.getpid():
+                # After a fork the parent's worker threads do not exist in this process
+                self._pid = os.getpid()
+                self._threads = []
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                t = threading.Thread(target=self._loop, daemon=True, name=f"intake-{len(self._threads)}")
+                self._threads.append(t)
+                t.start()
+
+    def _claim(self, conn):
+        now = time.time()
+        # Jobs whose holder stopped heartbeating are retried, or failed once out of attempts
+        for row in conn.execute("SELECT id, attempts FROM intake_jobs WHERE status='running' AND heartbeat_at < ?",
+                                (now - self.stale_after,)).fetchall():
+            if row[1] >= self.max_attempts:
+                self._finish(conn, row[0], 'failed', None, 'abandoned: worker stopped responding', now)
+            else:
+                conn.execute("UPDATE intake_jobs SET status='queued', stage='queued', holder=NULL WHERE id=?", (row[0],))
+                with self._lock:
+                    self.requeued += 1
+        large_ok = True
+        if self.large is not None:
+            running = conn.execute("SELECT COUNT(*) FROM intake_jobs WHERE status='running' AND holder=? AND total >= ?",
+                                   (self.holder, self.large)).fetchone()[0]
+            large_ok = running < max(1, self.workers - 1)
+        row = conn.execute("""
+            SELECT id, payload FROM intake_jobs j
+            WHERE status='queued' AND (? OR total < ?) AND NOT EXISTS (
+                SELECT 1 FROM intake_job_keys k
+                JOIN intake_job_keys e ON e.key = k.key AND e.job_id < k.job_id
+                WHERE k.job_id = j.id)
+            ORDER BY id LIMIT 1
+        """, (large_ok, self.large if self.large is not None else 0)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE intake_jobs SET status='running', stage='running', holder=?, attempts=attempts+1, "
+                     "started_at=?, heartbeat_at=? WHERE id=?", (self.holder, now, now, row[0]))
+        attempt = conn.execute("SELECT attempts FROM intake_jobs WHERE id=?", (row[0],)).fetchone()[0]
+        return row[0], row[1], attempt
+
+    def _finish(self, conn, job_id, status, result, error, now, attempt=None):
+        """Record the outcome; with attempt, only if this holder's claim is still the current one
+        (a job requeued as stale and claimed again belongs to its new run). Returns False if not."""
+        sql = ("UPDATE intake_jobs SET status=?, stage=?, result=?, error=?, finished_at=?, "
+               "duration_s=ROUND(? - started_at, 3) WHERE id=?")
+        params = (status, status, json.dumps(result) if result is not None else None, error, now, now, job_id)
+        if attempt is not None:
+            sql += " AND status='running' AND holder=? AND attempts=?"
+            params += (self.holder, attempt)
+        if conn.execute(sql, params).rowcount == 0:
+            return False
+        # Finished jobs no longer hold back later ones for the same keys
+        conn.execute("DELETE FROM intake_job_keys WHERE job_id=?", (job_id,))
+        return True
+
+    def _claimable(self):
+        """Read-only check for queued or stale running jobs: idle workers only take the write lock
+        when there is something to claim."""
+        conn = self.connect()
+        try:
+            return conn.execute("SELECT 1 FROM intake_jobs WHERE status='queued' "
+                                "OR (status='running' AND heartbeat_at < ?) LIMIT 1",
+                                (time.time() - self.stale_after,)).fetchone() is not None
+        finally:
+            conn.close()
+
+    def _loop(self):
+        idle_since = time.time()
+        while True:
+            try:
+                claimed = self.writer.execute(self._claim) if self._claimable() else None
+            except Exception as e:
+                print(f"[IntakeJobs] Error: {e}")
+                claimed = None
+            if claimed is None:
+                if time.time() - idle_since > self.idle_exit:
+                    return
+                self._wake.wait(self.poll)
+                self._wake.clear()
+                continue
+            self._run(*claimed)
+            idle_since = time.time()
+
+    def _run(self, job_id, payload, attempt):
+        started = time.time()
+        last = [started, 'running']
+        owned = "WHERE id=? AND status='running' AND holder=? AND attempts=?"
+
+        def progress(stage, processed=None):
+            # Nothing is recorded for a job's first heartbeat interval, so short jobs cost no extra writes
+            now = time.time()
+            if now - last[0] < self.heartbeat and (stage == last[1] or now - started < self.heartbeat):
+                return
+            last[0], last[1] = now, stage
+            self.writer.execute(lambda conn: conn.execute(
+                "UPDATE intake_jobs SET stage=?, processed=COALESCE(?, processed), heartbeat_at=? " + owned,
+                (stage, processed, now, job_id, self.holder, attempt)))
+
+        # Keep heartbeat_at fresh for as long as apply runs, including long stretches without progress calls
+        done = threading.Event()
+
+        def beat():
+            while not done.wait(self.heartbeat):
+                try:
+                    self.writer.execute(lambda conn: conn.execute(
+                        "UPDATE intake_jobs SET heartbeat_at=? " + owned, (time.time(), job_id, self.holder, attempt)))
+                except Exception as e:
+                    print(f"[IntakeJobs] heartbeat for job {job_id} failed: {e}")
+        beater = threading.Thread(target=beat, daemon=True, name=f"intake-heartbeat-{job_id}")
+        beater.start()
+        try:
+            result = self.apply(json.loads(payload), progress)
+            status, error = 'done', None
+        except Exception as e:
+            result, status, error = None, 'failed', f"{type(e).__name__}: {e}"
+            print(f"[IntakeJobs] job {job_id} failed: {error}")
+        finally:
+            done.set()
+            beater.join()
+        recorded = self.writer.execute(lambda conn: self._finish(conn, job_id, status, result, error, time.time(),
+                                                                 attempt))
+        with self._lock:
+            if not recorded:
+                self.lost += 1
+            elif status == 'done':
+                self.applied += 1
+            else:
+                self.failed += 1
+        if not recorded:
+            print(f"[IntakeJobs] job {job_id} was requeued while this run held it; its outcome is not recorded")
+        with self._finished:
+            self._finished_runs += 1
+            self._finished.notify_all()
+        self._wake.set()  # a job waiting on this one's keys may be claimable now
+
+    def get(self, job_id, include_result=True):
+        conn = self.connect()
+        try:
+            row = conn.execute("SELECT id, status, stage, total, processed, attempts, holder, queued_at, started_at, "
+                               "heartbeat_at, finished_at, duration_s, error" + (", result" if include_result else "") +
+                               " FROM intake_jobs WHERE id=?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            job = dict(row)
+            if job['status'] == 'queued':
+                job['waiting_on'] = [r[0] for r in conn.execute(
+                    "SELECT DISTINCT e.job_id FROM intake_job_keys k JOIN intake_job_keys e "
+                    "ON e.key = k.key AND e.job_id < k.job_id WHERE k.job_id=? ORDER BY e.job_id", (job_id,))]
+        finally:
+            conn.close()
+        if include_result:
+            job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def wait(self, job_id, timeout=None):
+        """Block until the job is done or failed (or timeout seconds pass); returns get(job_id).
+        Jobs finished by this process wake the waiter at once; others are noticed by polling."""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            with self._finished:
+                seen = self._finished_runs
+            job = self.get(job_id, include_result=False)
+            if job is None or job['status'] in ('done', 'failed'):
+                return self.get(job_id) if job is not None else None
+            remaining = self.poll if deadline is None else min(self.poll, deadline - time.time())
+            if remaining <= 0:
+                return job
+            with self._finished:
+                # A run that ended after the status read above has already notified: look again
+                if self._finished_runs == seen:
+                    self._finished.wait(remaining)
+
+    def stats(self):
+        conn = self.connect()
+        try:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM intake_jobs GROUP BY status").fetchall())
+        finally:
+            conn.close()
+        with self._lock:
+            return {
+                'jobs': counts,
+                'workers_alive': sum(1 for t in self._threads if t.is_alive()) if self._pid == os.getpid() else 0,
+                'max_workers': self.workers,
+                'large': self.large,
+                'applied': self.applied,
+                'failed': self.failed,
+                'requeued': self.requeued,
+                'lost': self.lost,
+                'holder': self.holder,
+            }
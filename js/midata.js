@@ -104,6 +104,29 @@ async function miApiGetWithRetry(path, retries = 2, timeoutMs = 30000) {
   throw new Error('All retries exhausted');
 }
 
+// Quote intake is applied in the background: poll the job until it is done and return its result.
+// The interval backs off from intervalMs to maxIntervalMs; gives up after timeoutMs or maxErrors failed polls in a row.
+async function miWaitForJob(job, {intervalMs = 500, maxIntervalMs = 5000, timeoutMs = 10 * 60 * 1000, maxErrors = 5} = {}) {
+  if (!job || !job.job_id || job.created !== undefined) return job;
+  const url = job.status_url || `/api/mi/quotes/jobs/${job.job_id}`;
+  const deadline = Date.now() + timeoutMs;
+  let delay = intervalMs, errors = 0, status = job;
+  while (Date.now() < deadline) {
+    await new Promise(r => setTimeout(r, Math.min(delay, Math.max(0, deadline - Date.now()))));
+    delay = Math.min(delay * 1.5, maxIntervalMs);
+    try {
+      status = await miApiGet(url);
+      errors = 0;
+    } catch (e) {
+      if (++errors >= maxErrors) throw new Error(`Quote intake job ${job.job_id}: status check failed ${errors} times (${e.message})`);
+      continue;
+    }
+    if (status.status === 'done') return status.result;
+    if (status.status === 'failed') throw new Error(status.error || 'Quote intake failed');
+  }
+  throw new Error(`Quote intake job ${job.job_id} still ${status.status || 'queued'} after ${Math.round(timeoutMs / 1000)}s - check ${url}`);
+}
+
 async function miLoadQuoteHistory(mill, product, days = 90) {
   const params = new URLSearchParams();
   if (mill) params.set('mill', mill);
@@ -137,7 +160,7 @@ async function miSubmitQuotes(quotes, opts={}) {
   // (any product/length NOT on the new list is effectively withdrawn by the mill)
   const isFullList = opts.full_list || false;
   const payload = isFullList ? {quotes, full_list: true} : quotes;
-  const result = await miApiPost('/api/mi/quotes', payload);
+  const result = await miWaitForJob(await miApiPost('/api/mi/quotes', payload));
 
   // Local state cleanup
   if (isFullList) {
@@ -1254,8 +1254,16 @@ async function lookupMileageWithAPI(lanes){
     if(res.ok){
       const data=await res.json();
       if(data.results){
+        // New lanes the server is still resolving come back pending - poll, don't fail them
+        if(data.pending){
+          if(statusEl)statusEl.textContent=`Resolving ${data.pending} new lane(s)...`;
+          data.results=await pollPendingLanes(data.results);
+        }
+        const stillPending=[];
         data.results.forEach(r=>{
-          if(r.miles){
+          if(r.pending){
+            stillPending.push({origin:r.origin,dest:r.dest});
+          }else if(r.miles){
             // Check for fuzzy duplicate before pushing
             const existingIdx=S.lanes.findIndex(l=>{
               const lo=l.origin.toLowerCase().trim(),ld=l.dest.toLowerCase().trim();
@@ -1275,8 +1283,12 @@ async function lookupMileageWithAPI(lanes){
           }
         });
         save('lanes',S.lanes);
-        if(statusEl)statusEl.textContent='';
-        return failedLanes;
+        if(!stillPending.length){
+          if(statusEl)statusEl.textContent='';
+          return failedLanes;
+        }
+        // Server didn't finish in time - look only those lanes up directly
+        lanes=stillPending;
       }
     }
   }catch(e){}
@@ -1377,6 +1389,26 @@ async function geocodeLocation(location){
 
 function sleep(ms){return new Promise(r=>setTimeout(r,ms))}
 
+// Poll /api/mileage/status for results still pending on the server (with backoff).
+// Returns the results with resolved lanes filled in; lanes still pending keep pending:true.
+async function pollPendingLanes(results){
+  results=results.slice();
+  for(let i=0;i<8&&results.some(r=>r.pending);i++){
+    await sleep(Math.min(500*2**i,4000));
+    const idx=[];
+    results.forEach((r,j)=>{if(r.pending)idx.push(j)});
+    const st=await fetch('/api/mileage/status',{
+      method:'POST',
+      headers:{'Content-Type':'application/json'},
+      body:JSON.stringify({lanes:idx.map(j=>({origin:results[j].origin,dest:results[j].dest}))})
+    });
+    if(!st.ok)break;
+    const polled=(await st.json()).results||[];
+    idx.forEach((j,k)=>{if(polled[k])results[j]=polled[k]});
+  }
+  return results;
+}
+
 // Single mileage lookup via server API (with fallback)
 async function getMileageFromAPI(origin,dest){
   // Try server first
@@ -1390,6 +1422,11 @@ async function getMileageFromAPI(origin,dest){
     if(res.ok){
       const data=await res.json();
       if(data.miles)return data.miles;
+      // New lane: the server resolves it in the background - poll its status for a while
+      if(data.pending){
+        const r=(await pollPendingLanes([{origin,dest,pending:true}]))[0];
+        if(r.miles)return r.miles;
+      }
     }
   }catch(e){}
   
@@ -0,0 +1,80 @@
+"""
+Compiled name matching for SYP Analytics
+AliasMatcher: alias table compiled once -- a dict on the normalized key for exact
+matches and a token trie for the longest alias that prefixes a name on a word boundary.
+CustomerNames: normalized, "&"/"and" fuzzy and suffix-stripped forms of the CRM
+customer names, rebuilt only when the CRM customers version moves.
+"""
+import re
+
+_SEPARATORS_RE = re.compile(r'[_\-\u2013\u2014]+')
+_SPACES_RE = re.compile(r'\s+')
+_AMPERSAND_RE = re.compile(r'\s*&\s*')
+
+
+def name_key(name):
+    """Lowercase, dashes/underscores to spaces, whitespace collapsed (the frontend normalizer)."""
+    return _SPACES_RE.sub(' ', _SEPARATORS_RE.sub(' ', name.lower()).strip())
+
+
+def fuzzy_key(key):
+    """name_key with "&" read as "and"."""
+    return _SPACES_RE.sub(' ', _AMPERSAND_RE.sub(' and ', key)).strip()
+
+
+class AliasMatcher:
+    """alias -> canonical, matched against name_key(name)."""
+
+    _END = object()
+
+    def __init__(self, aliases):
+        self.exact = dict(aliases)
+        self._trie = {}
+        for alias, canonical in aliases.items():
+            node = self._trie
+            for token in alias.split(' '):
+                node = node.setdefault(token, {})
+            node[self._END] = canonical
+
+    def match(self, key):
+        """Canonical name for an exact alias, else None."""
+        return self.exact.get(key)
+
+    def prefix(self, key):
+        """Canonical name of the longest alias followed by a space in key, else None."""
+        node, found = self._trie, None
+        tokens = key.split(' ')
+        for token in tokens[:-1]:   # the alias must be followed by at least one more word
+            node = node.get(token)
+            if node is None:
+                break
+            found = node.get(self._END, found)
+        return found
+
+    def __len__(self):
+        return len(self.exact)
+
+
+class CustomerNames:
+    """Lookup tables over existing customer names (first row wins, as the old row scans did)."""
+
+    def __init__(self, names, aliases, suffix_re, version=None):
+        self.version = version
+        self.count = 0
+        self.by_canonical = {}   # alias canonical -> customer whose key is that alias
+        self.by_fuzzy = {}       # fuzzy_key -> customer
+        self.by_stripped = {}    # suffix-stripped lowercase name -> customer
+        for name in names:
+            if not name:
+                continue
+            self.count += 1
+            key = name_key(name)
+            canonical = aliases.match(key)
+            if canonical is not None:
+                self.by_canonical.setdefault(canonical, name)
+            self.by_fuzzy.setdefault(fuzzy_key(key), name)
+            self.by_stripped.setdefault(suffix_re.sub('', name.lower()).strip(), name)
+
+    def stats(self):
+        return {'version': self.version, 'customers': self.count, 'fuzzy_keys': len(self.by_fuzzy),
+                'stripped_keys': len(self.by_stripped)}
@@ -0,0 +1,230 @@
+"""
+Landed-cost pricing for SYP Analytics (customer pricing recommendations and offerings)
+OriginIndex: mill name -> shipping origin ("City, ST") and coordinates, from MILL_DIRECTORY
+names, their company prefixes and the CRM mills' locations; rebuilt when CRM mills change.
+PricingEngine: builds a PricingSnapshot for a set of products and destinations --
+latest recent quote per mill (one query), every mill x destination lane (one
+batched lookup, misses resolved together), and the seasonal percentile per product
+(memoized per RL store version and day) -- which ranks candidates by landed cost.
+"""
+import json
+import threading
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+FREIGHT_BASE = 450      # $ per truckload
+FREIGHT_RATE = 2.25     # $ per mile
+MBF_PER_TL = 23
+DEFAULT_FREIGHT = 20    # $/MBF when the lane can't be resolved
+
+
+def freight_per_mbf(miles):
+    """Freight $/MBF: (base + miles * rate) / MBF per truckload, or the default without miles."""
+    if not miles:
+        return DEFAULT_FREIGHT
+    return round((FREIGHT_BASE + miles * FREIGHT_RATE) / MBF_PER_TL)
+
+
+class OriginIndex:
+    """Mill name -> origin ("City, ST"), built once per CRM mills version. Lookup order: exact
+    MILL_DIRECTORY name, first directory entry whose company ("Canfor" of "Canfor - DeQuincy")
+    prefixes the name, CRM location name, CRM company name. Coordinates come from the CRM
+    rows/locations for that place, else from geo(key) (a cache-only geocode lookup) if given."""
+
+    def __init__(self, directory, crm_mills=(), geo=None, version=None):
+        self.version = version
+        self.geo = geo
+        self.exact = {name: f"{city}, {state}" for name, (city, state) in directory.items()}
+        self.companies = {}
+        for name, origin in self.exact.items():
+            self.companies.setdefault(name.split(' - ')[0], origin)
+        self.max_company = max((len(c) for c in self.companies), default=0)
+        self._rank = {c: i for i, c in enumerate(self.companies)}
+        self.crm = {}
+        self.coords = {}
+        self._memo = {}  # non-directory names already matched (the index never changes once built)
+        for m in crm_mills:
+            primary = f"{m['city']}, {m['state']}" if m.get('city') and m.get('state') else ''
+            if primary and m.get('lat') is not None and m.get('lon') is not None:
+                self.coords.setdefault(primary, (m['lat'], m['lon']))
+            try:
+                locations = json.loads(m.get('locations') or '[]')
+            except (TypeError, ValueError):
+                locations = []
+            for loc in locations if isinstance(locations, list) else []:
+                if not (isinstance(loc, dict) and loc.get('city') and loc.get('state')):
+                    continue
+                place = f"{loc['city']}, {loc['state']}"
+                if loc.get('lat') is not None and loc.get('lon') is not None:
+                    self.coords.setdefault(place, (loc['lat'], loc['lon']))
+                if loc.get('name'):
+                    self.crm.setdefault(loc['name'].upper(), place)
+                primary = primary or place
+            if m.get('name') and primary:
+                self.crm.setdefault(m['name'].upper(), primary)
+
+    def origin(self, mill_name):
+        origin = self.exact.get(mill_name) or self._memo.get(mill_name)
+        if origin is None:
+            origin = self._memo[mill_name] = self._match(mill_name)
+        return origin
+
+    def _match(self, mill_name):
+        # Companies that prefix the name; the earliest in directory order wins (as the old linear scan did)
+        prefixes = [mill_name[:n] for n in range(min(len(mill_name), self.max_company), 0, -1)
+                    if mill_name[:n] in self.companies]
+        if prefixes:
+            return self.companies[min(prefixes, key=self._rank.__getitem__)]
+        upper = mill_name.upper()
+        return self.crm.get(upper) or self.crm.get(upper.split(' - ')[0], '')
+
+    def resolve(self, mill_name):
+        """{'origin', 'city', 'state', 'lat', 'lon'} for a mill, or None if its origin is unknown."""
+        origin = self.origin(mill_name)
+        if not origin:
+            return None
+        city, _, state = origin.rpartition(', ')
+        coords = self.coords.get(origin)
+        if coords is None and self.geo:
+            found = self.geo(origin.lower().strip())
+            coords = (found['lat'], found['lon']) if found else None
+        return {'origin': origin, 'city': city, 'state': state,
+                'lat': coords[0] if coords else None, 'lon': coords[1] if coords else None}
+
+    def stats(self):
+        return {'version': self.version, 'directory': len(self.exact), 'companies': len(self.companies),
+                'crm_names': len(self.crm), 'places_with_coords': len(self.coords)}
+
+
+class PricingSnapshot:
+    """Quotes, origins, lane miles and seasonal percentiles for one pricing pass (read-only once built)."""
+
+    def __init__(self, quotes, origins, miles, seasonal):
+        self.quotes = quotes        # product -> [(mill, fob, date)], latest quote per mill, newest first
+        self.origins = origins      # mill -> origin ('' if unknown)
+        self.miles = miles          # (origin, destination) -> miles or None
+        self.seasonal = seasonal    # product -> seasonal percentile or None
+
+    def rank(self, product, destination, preferred=()):
+        """Candidates sorted by landed cost: [{'mill', 'fob', 'freight', 'landed', 'date'}].
+        None when the product has no recent quotes; [] when no quoting mill has a known origin.
+        preferred narrows to mills containing any of the names, if any match."""
+        rows = self.quotes.get(product)
+        if not rows:
+            return None
+        if preferred:
+            wanted = [p.lower() for p in preferred]
+            matches = [r for r in rows if any(p in r[0].lower() for p in wanted)]
+            rows = matches or rows
+        rows = [r for r in rows if self.origins.get(r[0]) and destination]
+        freight = [freight_per_mbf(self.miles.get((self.origins[r[0]], destination))) for r in rows]
+        landed = [r[1] + f for r, f in zip(rows, freight)]
+        order = sorted(range(len(rows)), key=landed.__getitem__)
+        return [{'mill': rows[i][0], 'fob': rows[i][1], 'freight': freight[i], 'landed': landed[i], 'date': rows[i][2]}
+                for i in order]
+
+
+class PricingEngine:
+    """connect_mi() -> MI connection; crm_mills() -> CRM mills rows (dicts);
+    lookup_lanes(pairs) -> {pair: miles} known lanes; resolve_lanes(pairs) -> {pair: miles or Exception};
+    rl_store() -> current RLPriceStore; origins_version() -> CRM mills version (the origin index
+    is rebuilt when it changes; without it, on every call); geo(key) -> cached coords or None."""
+
+    def __init__(self, connect_mi, crm_mills, directory, lookup_lanes, resolve_lanes, rl_store,
+                 origins_version=None, geo=None):
+        self.connect_mi = connect_mi
+        self.crm_mills = crm_mills
+        self.directory = directory
+        self.lookup_lanes = lookup_lanes
+        self.resolve_lanes = resolve_lanes
+        self.rl_store = rl_store
+        self.origins_version = origins_version
+        self.geo = geo
+        self._origins = None
+        self._seasonal = {}
+        self._lock = threading.Lock()
+
+    def origin_index(self):
+        """Current OriginIndex; the version is read before the mills, so a concurrent write only forces a rebuild."""
+        version = self.origins_version() if self.origins_version else None
+        index = self._origins
+        if index is not None and version is not None and index.version == version:
+            return index
+        index = OriginIndex(self.directory, self.crm_mills(), self.geo, version)
+        self._origins = index
+        return index
+
+    def latest_quotes(self, products, cutoff):
+        """product -> [(mill, fob, date)]: each mill's latest quote since cutoff (latest id on a tie)."""
+        products = sorted(set(products))
+        quotes = {p: [] for p in products}
+        if not products:
+            return quotes
+        conn = self.connect_mi()
+        try:
+            rows = conn.execute(f"""
+                SELECT product, mill_name, price, date FROM mill_quotes
+                WHERE product IN ({','.join('?' * len(products))}) AND price > 0 AND date >= ?
+                ORDER BY product, date DESC, id DESC
+            """, (*products, cutoff)).fetchall()
+        finally:
+            conn.close()
+        seen = set()
+        for product, mill, price, date in rows:
+            if (product, mill) not in seen:
+                seen.add((product, mill))
+                quotes[product].append((mill, float(price), date))
+        return quotes
+
+    def lane_miles(self, pairs):
+        """Miles for every (origin, destination) pair: one lanes query, then all misses resolved in one batch."""
+        pairs = list(dict.fromkeys(pairs))
+        miles = {pair: None for pair in pairs}
+        known = self.lookup_lanes(pairs)
+        miles.update({pair: float(m) for pair, m in known.items()})
+        missing = [pair for pair in pairs if pair not in known]
+        if missing:
+            try:
+                resolved = self.resolve_lanes(missing)
+            except Exception:
+                resolved = {}
+            for pair, m in resolved.items():
+                if not isinstance(m, Exception):
+                    miles[pair] = m
+        return miles
+
+    def seasonal_percentile(self, product, region='west', years=5):
+        """Where the latest RL price sits among this calendar month's prices over `years` (0-100), or None.
+        Memoized per (product, RL store version, day)."""
+        store = self.rl_store()
+        today = datetime.now()
+        key = (product, region, years, store.version, today.date())
+        if key in self._seasonal:
+            return self._seasonal[key]
+        pct = None
+        series = store.get(region, product, 'RL')
+        if series:
+            lo, hi = series.bounds((today - timedelta(days=365 * years)).strftime('%Y-%m-%d'))
+            month = f"{today.month:02d}"
+            month_prices = sorted(series.prices[i] for i in range(lo, hi) if series.dates[i][5:7] == month)
+            if month_prices:
+                latest = series.prices[hi - 1]
+                pct = round(bisect_right(month_prices, latest) / len(month_prices) * 100)
+        with self._lock:
+            if len(self._seasonal) > 1000:
+                self._seasonal.clear()
+            self._seasonal[key] = pct
+        return pct
+
+    def snapshot(self, products, destinations, quote_cutoff):
+        quotes = self.latest_quotes(products, quote_cutoff)
+        index = self.origin_index()
+        origins = {mill: index.origin(mill) for rows in quotes.values() for mill, _, _ in rows}
+        pairs = [(o, d) for o in dict.fromkeys(origins.values()) if o for d in dict.fromkeys(destinations) if d]
+        seasonal = {}
+        for product in quotes:
+            try:
+                seasonal[product] = self.seasonal_percentile(product)
+            except Exception:
+                seasonal[product] = None
+        return PricingSnapshot(quotes, origins, self.lane_miles(pairs), seasonal)
@@ -0,0 +1,156 @@
+"""
+Response caches for SYP Analytics
+VersionedCache: thread-safe LRU + TTL cache whose entries are tagged with a
+data version. The version lives in SQLite, so a write seen by one gunicorn
+worker invalidates the cached responses of every worker.
+LRUDict: bounded in-memory tier for lookups persisted in SQLite (geocodes, miles).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class VersionedCache:
+    """LRU cache with a TTL, invalidated when version_fn() moves."""
+
+    def __init__(self, name, maxsize, ttl, version_fn):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version_fn = version_fn
+        self._data = OrderedDict()   # key -> (version, expires_at, value)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def _current_version(self):
+        try:
+            return self.version_fn()
+        except Exception:
+            return None
+
+    def get(self, key):
+        """Return the cached value or None. Remembers the version it checked so a
+        following set() on the same thread tags the value with the version it was
+        computed under, not a newer one."""
+        version = self._current_version()
+        self._local.version = version
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or version is None:
+                self.misses += 1
+                return None
+            if entry[0] != version:
+                del self._data[key]
+                self.stale += 1
+                self.misses += 1
+                return None
+            if entry[1] <= now:
+                del self._data[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key, value, version=None):
+        if version is None:
+            version = getattr(self._local, 'version', None)
+            self._local.version = None
+        if version is None:
+            version = self._current_version()
+        if version is None:
+            return
+        with self._lock:
+            self._data[key] = (version, time.time() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop this process's entries (other workers notice the version bump instead)."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'expired': self.expired,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+class LRUDict:
+    """Thread-safe, size-bounded LRU mapping with hit/miss/eviction counters.
+    Used as the in-memory tier in front of a persistent (SQLite) lookup table."""
+
+    def __init__(self, name, maxsize):
+        self.name = name
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __getitem__(self, key):
+        with self._lock:
+            return self._data[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
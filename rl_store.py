@@ -0,0 +1,129 @@
+"""
+In-memory RL price store for SYP Analytics
+RLPriceStore: the rl_prices table loaded once into one series per
+(region, product, length): sorted dates, date ordinals and float prices in
+arrays. RL endpoints slice these instead of querying SQLite. A store is never
+modified; a reload builds a new one and the caller swaps the reference.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+
+def _ordinal(d):
+    try:
+        return datetime.fromisoformat(d).toordinal()
+    except ValueError:
+        return None
+
+
+class RLSeries:
+    """One (region, product, length) price series, ascending by date."""
+    __slots__ = ('dates', 'ords', 'prices')
+
+    def __init__(self, dates, prices, ordinals):
+        self.dates = dates
+        self.ords = array('l', (ordinals[d] or 0 for d in dates))  # 0 for unparseable dates
+        self.prices = array('d', prices)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def bounds(self, date_from=None, date_to=None):
+        """Index range of dates in [date_from, date_to] (string comparison, like the SQL filters)."""
+        lo = bisect_left(self.dates, date_from) if date_from else 0
+        hi = bisect_right(self.dates, date_to) if date_to else len(self.dates)
+        return lo, max(lo, hi)
+
+    def slice(self, date_from=None, date_to=None):
+        """[(date, price)] in date order."""
+        lo, hi = self.bounds(date_from, date_to)
+        return list(zip(self.dates[lo:hi], self.prices[lo:hi]))
+
+    def as_dict(self, date_from=None, date_to=None):
+        lo, hi = self.bounds(date_from, date_to)
+        return dict(zip(self.dates[lo:hi], self.prices[lo:hi]))
+
+    def price_on(self, d):
+        i = bisect_left(self.dates, d)
+        if i < len(self.dates) and self.dates[i] == d:
+            return self.prices[i]
+        return None
+
+    def nbytes(self):
+        return self.ords.itemsize * len(self.ords) + self.prices.itemsize * len(self.prices) + 8 * len(self.dates)
+
+
+class RLPriceStore:
+    """All RL series plus per-region date counts, tagged with the data version it was loaded at."""
+
+    def __init__(self, rows, version=None):
+        """rows: (region, product, length, date, price) in any order."""
+        self.version = version
+        grouped = {}
+        interned = {}
+        for region, product, length, d, price in rows:
+            d = interned.setdefault(d, d)
+            grouped.setdefault((region, product, length), []).append((d, price))
+        self.ordinals = {d: _ordinal(d) for d in interned}   # date -> ordinal (None if unparseable)
+        self.series = {}
+        self._date_counts = {}
+        for key in sorted(grouped):
+            points = sorted(grouped[key])
+            self.series[key] = RLSeries([d for d, _ in points], [p for _, p in points], self.ordinals)
+            counts = self._date_counts.setdefault(key[0], {})
+            for d, _ in points:
+                counts[d] = counts.get(d, 0) + 1
+        self.rows = sum(len(s) for s in self.series.values())
+        self.dates = sorted(interned)
+
+    @classmethod
+    def from_db(cls, conn, version_fn=None):
+        """Load rl_prices in one read transaction; version_fn(conn) is read inside it."""
+        cur = conn.cursor()
+        cur.row_factory = None
+        cur.execute("BEGIN")
+        try:
+            version = version_fn(conn) if version_fn else None
+            return cls(cur.execute("SELECT region, product, length, date, price FROM rl_prices"), version)
+        finally:
+            cur.execute("COMMIT")
+
+    def get(self, region, product, length='RL'):
+        return self.series.get((region, product, length))
+
+    def keys(self, region=None, product=None, length=None):
+        """Series keys matching the given parts, sorted by (region, product, length)."""
+        return [k for k in self.series
+                if (region is None or k[0] == region)
+                and (product is None or k[1] == product)
+                and (length is None or k[2] == length)]
+
+    def regions(self):
+        return list(self._date_counts)
+
+    def date_counts(self, region=None, date_from=None, date_to=None):
+        """{date: row count} for one region (all regions if None), within [date_from, date_to]."""
+        regions = [region] if region is not None else self.regions()
+        out = {}
+        for r in regions:
+            for d, c in self._date_counts.get(r, {}).items():
+                if (not date_from or d >= date_from) and (not date_to or d <= date_to):
+                    out[d] = out.get(d, 0) + c
+        return out
+
+    def rows_on(self, d, region=None):
+        """[(region, product, length, price)] printed on one date, sorted by key."""
+        return [(k[0], k[1], k[2], p) for k in self.keys(region=region)
+                for p in (self.series[k].price_on(d),) if p is not None]
+
+    def stats(self):
+        series_bytes = sum(s.nbytes() for s in self.series.values())
+        date_bytes = sum(len(d) + 49 for d in self.dates)
+        return {
+            'rows': self.rows,
+            'series': len(self.series),
+            'dates': len(self.dates),
+            'array_bytes': series_bytes,
+            'approx_bytes': series_bytes + date_bytes + 200 * len(self.series),
+        }
@@ -0,0 +1,219 @@
+"""
+Background job scheduling for SYP Analytics
+SQLiteLease: leader lease in a SQLite row, so exactly one process (of all gunicorn
+workers) runs scheduled jobs; it expires unless its holder keeps renewing it.
+JobScheduler: daily jobs and manual triggers recorded as job_runs rows
+(queued -> running -> done/failed, with timings), executed by the lease holder.
+"""
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+
+class SQLiteLease:
+    """Named lease row in scheduler_leases: (holder, expires_at), taken under BEGIN IMMEDIATE."""
+
+    def __init__(self, connect, name, holder=None, ttl=90):
+        self.connect = connect
+        self.name = name
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.ttl = ttl
+
+    def _txn(self, fn):
+        conn = self.connect()
+        try:
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(conn, time.time())
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+        finally:
+            conn.close()
+
+    def acquire(self):
+        """Take the lease if it is free or expired, or renew it if held; True if this holder owns it."""
+        def take(conn, now):
+            row = conn.execute("SELECT holder, expires_at, acquired_at FROM scheduler_leases WHERE name=?",
+                               (self.name,)).fetchone()
+            if row is not None and row[0] != self.holder and row[1] > now:
+                return False
+            acquired = row[2] if row is not None and row[0] == self.holder else now
+            conn.execute("INSERT OR REPLACE INTO scheduler_leases (name, holder, expires_at, acquired_at) "
+                         "VALUES (?,?,?,?)", (self.name, self.holder, now + self.ttl, acquired))
+            return True
+        return self._txn(take)
+
+    def release(self):
+        self._txn(lambda conn, now: conn.execute("DELETE FROM scheduler_leases WHERE name=? AND holder=?",
+                                                 (self.name, self.holder)))
+
+    def current(self):
+        conn = self.connect()
+        try:
+            row = conn.execute("SELECT holder, expires_at, acquired_at FROM scheduler_leases WHERE name=?",
+                               (self.name,)).fetchone()
+        finally:
+            conn.close()
+        if row is None or row[1] <= time.time():
+            return None
+        return {'holder': row[0], 'expires_at': row[1], 'acquired_at': row[2]}
+
+
+class JobScheduler:
+    """Polls every `poll` seconds: renews the lease, queues due daily runs, runs queued ones (one at a time)."""
+
+    def __init__(self, connect, lease, poll=30, misfire_grace=3600):
+        self.connect = connect
+        self.lease = lease
+        self.poll = poll
+        self.misfire_grace = misfire_grace
+        self.jobs = {}
+        self.is_leader = False
+        self._runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix='job-run')
+        self._current = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def register(self, name, fn, daily_at=None):
+        """fn(params) -> JSON-able result; daily_at=(hour, minute) queues one run per day at that time."""
+        self.jobs[name] = {'fn': fn, 'daily_at': daily_at}
+
+    def _execute(self, sql, params=()):
+        conn = self.connect()
+        try:
+            cur = conn.execute(sql, params)
+            conn.commit()
+            return cur
+        finally:
+            conn.close()
+
+    def trigger(self, name, params=None, trigger='manual'):
+        """Queue a run of job `name`; whichever process holds the lease picks it up. Returns the run id."""
+        if name not in self.jobs:
+            raise KeyError(name)
+        cur = self._execute("INSERT INTO job_runs (job, trigger, status, params, queued_at) VALUES (?,?,'queued',?,?)",
+                            (name, trigger, json.dumps(params or {}), time.time()))
+        self._wake.set()
+        return cur.lastrowid
+
+    def _queue_due(self, now):
+        """Queue today's slot of each daily job once it has passed (within misfire_grace).
+        The unique (job, scheduled_for) index makes this idempotent across processes and restarts."""
+        for name, job in self.jobs.items():
+            if not job['daily_at']:
+                continue
+            hour, minute = job['daily_at']
+            slot = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if slot > now:
+                slot -= timedelta(days=1)
+            if (now - slot).total_seconds() > self.misfire_grace:
+                continue
+            self._execute("INSERT OR IGNORE INTO job_runs (job, trigger, status, params, scheduled_for, queued_at) "
+                          "VALUES (?, 'schedule', 'queued', '{}', ?, ?)",
+                          (name, slot.strftime('%Y-%m-%d %H:%M'), time.time()))
+
+    def _claim(self):
+        conn = self.connect()
+        try:
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT id, job, params FROM job_runs WHERE status='queued' ORDER BY id LIMIT 1").fetchone()
+            if row is not None:
+                conn.execute("UPDATE job_runs SET status='running', holder=?, started_at=? WHERE id=?",
+                             (self.lease.holder, time.time(), row[0]))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return row
+
+    def _run(self, run_id, name, params):
+        t0 = time.perf_counter()
+        try:
+            result = self.jobs[name]['fn'](json.loads(params or '{}'))
+            status, error = 'done', None
+        except Exception as e:
+            result, status, error = None, 'failed', f"{type(e).__name__}: {e}"
+            print(f"[Scheduler] {name} run {run_id} failed: {error}")
+        self._execute("UPDATE job_runs SET status=?, finished_at=?, duration_s=?, result=?, error=? WHERE id=?",
+                      (status, time.time(), round(time.perf_counter() - t0, 3),
+                       json.dumps(result) if result is not None else None, error, run_id))
+        self._wake.set()  # claim the next queued run without waiting for the poll
+        return status
+
+    def tick(self, now=None):
+        """One scheduler step; returns the Future of a run it started, else None."""
+        was_leader = self.is_leader
+        self.is_leader = self.lease.acquire()
+        if not self.is_leader:
+            return None
+        if not was_leader:
+            # Runs left 'running' by a previous holder whose lease lapsed will never finish
+            self._execute("UPDATE job_runs SET status='failed', error='abandoned: leader lease lapsed', finished_at=? "
+                          "WHERE status='running' AND holder IS NOT ?", (time.time(), self.lease.holder))
+        self._queue_due(now or datetime.now())
+        if self._current is not None and not self._current.done():
+            return None
+        row = self._claim()
+        if row is None:
+            return None
+        self._current = self._runner.submit(self._run, row[0], row[1], row[2])
+        return self._current
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"[Scheduler] Error: {e}")
+            self._wake.wait(self.poll)
+            self._wake.clear()
+        if self.is_leader:
+            self.lease.release()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='job-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def runs(self, limit=50, job=None):
+        conn = self.connect()
+        try:
+            sql = "SELECT * FROM job_runs" + (" WHERE job=?" if job else "") + " ORDER BY id DESC LIMIT ?"
+            rows = conn.execute(sql, ((job, limit) if job else (limit,))).fetchall()
+        finally:
+            conn.close()
+        return [self._run_dict(r) for r in rows]
+
+    def get_run(self, run_id):
+        conn = self.connect()
+        try:
+            row = conn.execute("SELECT * FROM job_runs WHERE id=?", (run_id,)).fetchone()
+        finally:
+            conn.close()
+        return self._run_dict(row) if row is not None else None
+
+    @staticmethod
+    def _run_dict(row):
+        d = dict(row)
+        for key in ('params', 'result'):
+            d[key] = json.loads(d[key]) if d[key] else None
+        return d
+
+    def stats(self):
+        return {'holder': self.lease.holder, 'is_leader': self.is_leader, 'lease': self.lease.current(),
+                'running': self._thread is not None and self._thread.is_alive(),
+                'jobs': {name: {'daily_at': job['daily_at']} for name, job in self.jobs.items()}}
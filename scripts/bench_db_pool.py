@@ -0,0 +1,86 @@
+"""
+Benchmark: per-request connection overhead, legacy get_*_db() vs the connection pool.
+
+  legacy   get_mi_db() as it was before db_pool.py: sqlite3.connect, row factory,
+           PRAGMA journal_mode=WAL and foreign_keys=ON on every call (kept below)
+  pooled   get_mi_db() / get_mi_db(readonly=True) from this thread's pool
+For each: a bare connect + one-row read + close cycle, and the GET endpoints below
+through the Flask test client with app.get_mi_db / get_crm_db swapped for the legacy
+getters. Runs against the live databases; nothing is written.
+
+Usage: python scripts/bench_db_pool.py [--cycles 5000] [--requests 500]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import app  # noqa: E402
+app.wait_until_ready()  # keep the background seed out of the timings
+
+ENDPOINTS = ['/api/mi/settings', '/api/mi/lanes', '/api/offerings/pending-count', '/api/cache/stats']
+
+
+def legacy_connect(path):
+    conn = sqlite3.connect(path, timeout=10)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+def legacy_get_mi_db(readonly=False):
+    return legacy_connect(app.MI_DB_PATH)
+
+
+def legacy_get_crm_db(readonly=False):
+    return legacy_connect(app.CRM_DB_PATH)
+
+
+def cycle(getter, n, **kw):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        conn = getter(**kw)
+        conn.execute("SELECT value FROM settings LIMIT 1").fetchone()
+        conn.close()
+    return (time.perf_counter() - t0) / n
+
+
+def requests(client, n):
+    t0 = time.perf_counter()
+    for i in range(n):
+        resp = client.get(ENDPOINTS[i % len(ENDPOINTS)])
+        assert resp.status_code == 200, (ENDPOINTS[i % len(ENDPOINTS)], resp.status_code)
+    return (time.perf_counter() - t0) / n
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--cycles', type=int, default=5000)
+    ap.add_argument('--requests', type=int, default=500)
+    args = ap.parse_args()
+
+    legacy_t = cycle(legacy_get_mi_db, args.cycles)
+    pooled_t = cycle(app.get_mi_db, args.cycles)
+    ro_t = cycle(app.get_mi_db, args.cycles, readonly=True)
+    print(f"connect + read + close   legacy {legacy_t * 1e6:>7.1f}us   pooled {pooled_t * 1e6:>6.1f}us   "
+          f"pooled readonly {ro_t * 1e6:>6.1f}us")
+
+    client = app.app.test_client()
+    pooled_get = (app.get_mi_db, app.get_crm_db)
+    requests(client, len(ENDPOINTS))   # warm caches and routes
+    app.get_mi_db, app.get_crm_db = legacy_get_mi_db, legacy_get_crm_db
+    try:
+        legacy_req = requests(client, args.requests)
+    finally:
+        app.get_mi_db, app.get_crm_db = pooled_get
+    pooled_req = requests(client, args.requests)
+    print(f"GET {len(ENDPOINTS)} endpoints      legacy {legacy_req * 1e6:>7.1f}us   pooled {pooled_req * 1e6:>6.1f}us   "
+          f"(per request, {args.requests} requests)")
+    print(f"pool: {app._db_pool.stats()}")
+
+
+if __name__ == '__main__':
+    main()
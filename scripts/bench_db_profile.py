@@ -0,0 +1,113 @@
+"""
+Benchmark: hot RL and quote queries under each SQLite performance profile (db_pool.PROFILES).
+
+Copies the MI database to a scratch file and adds --quotes synthetic mill quotes, then for
+each profile opens a fresh connection with the profile's pragmas and runs:
+  rl load         the full rl_prices read RLPriceStore.from_db does
+  rl sorted       rl_prices ordered by series and date (a sort larger than the default cache)
+  mpc full rows   recompute_price_changes' dedup + sort (_MPC_FULL_ROWS_SQL)
+  latest quotes   the window-function latest_quotes rebuild query (_LATEST_QUOTES_SQL)
+  quote history   one product's newest quotes by date
+Each query runs twice per connection: cold (first use of the connection's page cache, as
+a freshly opened connection sees it) and warm (a long-lived pooled connection). Reports
+medians over --rounds fresh connections per profile.
+
+Usage: python scripts/bench_db_profile.py [--quotes 200000] [--rounds 5]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import app  # noqa: E402
+app.wait_until_ready()  # background seed must finish before the MI database is copied
+from db_pool import PROFILES, resolve_profile  # noqa: E402
+
+QUERIES = [
+    ('rl load', "SELECT region, product, length, date, price FROM rl_prices", ()),
+    ('rl sorted', "SELECT region, product, length, date, price FROM rl_prices "
+                  "ORDER BY product, length, region, date", ()),
+    ('mpc full rows', app._MPC_FULL_ROWS_SQL, ()),
+    ('latest quotes', app._LATEST_QUOTES_SQL, ()),
+    ('quote history', "SELECT * FROM mill_quotes WHERE product=? ORDER BY date DESC LIMIT 2000", ('2x4#2',)),
+]
+PRODUCTS = ['2x4#2', '2x6#2', '2x8#2', '2x10#2', '2x12#2', '2x4#1', '2x6#1', '2x4#3']
+LENGTHS = ['8', '10', '12', '14', '16', '18', '20', 'RL']
+
+
+def add_quotes(path, n):
+    rng = random.Random(5)
+    conn = sqlite3.connect(path)
+    mills = [f"Bench Mill {i} - Town {i}" for i in range(60)]
+    conn.executemany("INSERT OR IGNORE INTO mills (name, city, state, region) VALUES (?, 'Town', 'AR', 'central')",
+                     [(m,) for m in mills])
+    ids = dict(conn.execute("SELECT name, id FROM mills").fetchall())
+    rows = []
+    for _ in range(n):
+        mill = rng.choice(mills)
+        day = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        rows.append((ids[mill], mill, rng.choice(PRODUCTS), rng.randint(300, 700), rng.choice(LENGTHS), day, 'Bench'))
+    conn.executemany("INSERT INTO mill_quotes (mill_id, mill_name, product, price, length, date, trader) "
+                     "VALUES (?,?,?,?,?,?,?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def run(path, profile):
+    """One fresh connection: (cold, warm) seconds per query."""
+    conn = sqlite3.connect(path, timeout=10)
+    for statement in resolve_profile('mi', {'db_profile.mi': profile}, {})['statements']:
+        conn.execute(statement)
+    out = {}
+    for label, sql, params in QUERIES:
+        times = []
+        for _ in range(2):
+            t0 = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            times.append(time.perf_counter() - t0)
+        out[label] = times
+    conn.close()
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--quotes', type=int, default=200000)
+    ap.add_argument('--rounds', type=int, default=5)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'mi.db')
+        src = app.get_mi_db()
+        dst = sqlite3.connect(path)
+        src.backup(dst)
+        dst.close()
+        src.close()
+        add_quotes(path, args.quotes)
+        rl_rows = sqlite3.connect(path).execute("SELECT COUNT(*) FROM rl_prices").fetchone()[0]
+        print(f"scratch MI: {rl_rows} rl_prices, {args.quotes} mill_quotes, "
+              f"{os.path.getsize(path) / 1e6:.0f} MB")
+
+        # Profiles interleaved round by round so drift in the machine's load hits them all alike
+        rounds = {name: [] for name in PROFILES}
+        for _ in range(args.rounds):
+            for name in PROFILES:
+                rounds[name].append(run(path, name))
+        header = ''.join(f"{name:>22}" for name in PROFILES)
+        print(f"{'median ms (cold / warm)':<24}{header}")
+        for label, _, _ in QUERIES:
+            cells = ''
+            for name in PROFILES:
+                cold = statistics.median(r[label][0] for r in rounds[name]) * 1000
+                warm = statistics.median(r[label][1] for r in rounds[name]) * 1000
+                cells += f"{cold:>14.0f} / {warm:>5.0f}"
+            print(f"{label:<24}{cells}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark: entity candidate blocking vs the full scan in EntityResolver.
+
+Scratch CRM with --entities mill entities (MILL_DIRECTORY names plus synthetic
+"Company - City" mills), each with --aliases extra variants. For --queries noisy names:
+  legacy   the fuzzy step resolve() ran before the index: every entity of the type,
+           one entity_alias query per entity, compute_score on every name and alias
+           (kept below as the reference)
+  blocked  CandidateIndex.candidates() + compute_score on the top BLOCK_TOP_K
+and the same for search() on 12-character prefixes (canonical names only). Reports index
+build time and how often both pick the same best entity / top score.
+
+Usage: python scripts/bench_entity_resolution.py [--entities 2000] [--aliases 3] [--queries 20]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import app  # noqa: E402
+app.wait_until_ready()  # background seed must finish before the DB paths are repointed
+from entity_resolution import EntityResolver, CandidateIndex, compute_score, THRESH_REVIEW  # noqa: E402
+
+CITIES = ['DeQuincy', 'Fulton', 'Gurdon', 'Huttig', 'Monroeville', 'Troy', 'Weldon', 'Brooklet', 'Ruston',
+          'Camden', 'Crossett', 'Dierks', 'Emerson', 'Glenwood', 'Hattiesburg', 'Joyce', 'Leola', 'Mansfield']
+WORDS = ['Pine', 'Southern', 'Timber', 'River', 'Delta', 'Piney', 'Creek', 'Valley', 'Ridge', 'Bayou',
+         'Forest', 'Lumber', 'Mill', 'Wood', 'Products', 'Gulf', 'Coastal', 'Hill']
+
+
+def legacy_fuzzy(res, name, entity_type):
+    conn = res._get_conn()
+    candidates = []
+    for entity in conn.execute("SELECT * FROM entity_canonical WHERE type=?", (entity_type,)).fetchall():
+        score = compute_score(name, entity['canonical_name'], entity_type, res.mill_company_aliases)
+        for a in conn.execute("SELECT variant FROM entity_alias WHERE canonical_id=?", (entity['canonical_id'],)).fetchall():
+            score = max(score, compute_score(name, a['variant'], entity_type, res.mill_company_aliases))
+        if score >= THRESH_REVIEW:
+            candidates.append((round(score, 4), entity['canonical_id']))
+    conn.close()
+    candidates.sort(key=lambda c: c[0], reverse=True)
+    return candidates[0] if candidates else None
+
+
+def blocked_fuzzy(res, name, entity_type):
+    conn = res._get_conn()
+    index = res._get_index(conn)
+    conn.close()
+    candidates = []
+    for cid in index.candidates(name, entity_type):
+        entity = index.entities[cid]
+        score = compute_score(name, entity['canonical_name'], entity_type, res.mill_company_aliases)
+        for variant in entity['aliases']:
+            score = max(score, compute_score(name, variant, entity_type, res.mill_company_aliases))
+        if score >= THRESH_REVIEW:
+            candidates.append((round(score, 4), cid))
+    candidates.sort(key=lambda c: c[0], reverse=True)
+    return candidates[0] if candidates else None
+
+
+def legacy_search(res, query, entity_type, limit=10):
+    conn = res._get_conn()
+    results = []
+    for entity in conn.execute("SELECT * FROM entity_canonical WHERE type=?", (entity_type,)).fetchall():
+        score = compute_score(query, entity['canonical_name'], entity_type, res.mill_company_aliases)
+        if score >= 0.3:
+            conn.execute("SELECT variant FROM entity_alias WHERE canonical_id=?", (entity['canonical_id'],)).fetchall()
+            results.append(round(score, 4))
+    conn.close()
+    return sorted(results, reverse=True)[:limit]
+
+
+def noisy(name, rng):
+    chars = list(name)
+    i = rng.randrange(1, len(chars) - 1)
+    chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    return ''.join(chars).replace(' - ', ' ')
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--entities', type=int, default=2000)
+    ap.add_argument('--aliases', type=int, default=3)
+    ap.add_argument('--queries', type=int, default=20)
+    args = ap.parse_args()
+    rng = random.Random(7)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app.CRM_DB_PATH = os.path.join(tmp, 'crm.db')
+        app.init_crm_db()
+        res = EntityResolver(app.CRM_DB_PATH, app.MILL_COMPANY_ALIASES)
+        names = list(app.MILL_DIRECTORY)
+        while len(names) < args.entities:
+            names.append(f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(['Lumber', 'Timber', 'Forest Products'])}"
+                         f" - {rng.choice(CITIES)} {len(names)}")
+        conn = res._get_conn()
+        for name in dict.fromkeys(names):
+            cid = res.create_entity(conn, 'mill', name)['canonical_id']
+            for k in range(args.aliases):
+                variant = noisy(name, rng) + (' LLC' if k % 2 else '')
+                res._add_alias(conn, cid, variant, variant.lower(), 'bench', 1.0)
+        conn.commit()
+        total_aliases = conn.execute("SELECT COUNT(*) FROM entity_alias").fetchone()[0]
+        t0 = time.perf_counter()
+        CandidateIndex.load(conn, res.mill_company_aliases, res._entities_version(conn))
+        build_t = time.perf_counter() - t0
+        conn.close()
+        print(f"{len(set(names))} entities, {total_aliases} aliases; index build {build_t * 1000:.0f}ms")
+
+        queries = [noisy(rng.choice(names), rng) for _ in range(args.queries)]
+        t0 = time.perf_counter()
+        legacy = [legacy_fuzzy(res, q, 'mill') for q in queries]
+        legacy_t = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        blocked = [blocked_fuzzy(res, q, 'mill') for q in queries]
+        blocked_t = time.perf_counter() - t0
+        same = sum(a == b for a, b in zip(legacy, blocked))
+        print(f"resolve fuzzy step  legacy {legacy_t / len(queries) * 1000:>8.1f}ms/name   "
+              f"blocked {blocked_t / len(queries) * 1000:>6.1f}ms/name   same best: {same}/{len(queries)}")
+
+        t0 = time.perf_counter()
+        legacy = [legacy_search(res, q[:12], 'mill')[:1] for q in queries]
+        legacy_t = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        blocked = [[r['score'] for r in res.search(q[:12], 'mill')][:1] for q in queries]
+        blocked_t = time.perf_counter() - t0
+        same = sum(a == b for a, b in zip(legacy, blocked))
+        print(f"search (12 chars)   legacy {legacy_t / len(queries) * 1000:>8.1f}ms/query  "
+              f"blocked {blocked_t / len(queries) * 1000:>6.1f}ms/query  same top score: {same}/{len(queries)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark: entity scoring kernel, --inputs noisy mill names x --candidates names.
+
+  legacy     compute_score as it was before the kernel (full list-per-row DP levenshtein,
+             normalization and alias sorting on every call; kept below as the reference),
+             timed on --legacy-sample inputs and extrapolated to the full grid
+  compute    compute_score per pair (bit-parallel levenshtein, memoized normalization)
+  batch      score_candidates per input (input prepared once)
+  bounded    score_candidates(min_score=THRESH_REVIEW): pairs that can't reach the
+             review threshold stop early and come back as None
+Checks compute/batch scores are identical to legacy on the sample and that bounded only
+drops pairs below the threshold.
+
+Usage: python scripts/bench_entity_scoring.py [--inputs 1000] [--candidates 5000] [--legacy-sample 10]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import app  # noqa: E402
+app.wait_until_ready()  # keep the background seed out of the timings
+from entity_resolution import (compute_score, score_candidates, _normalize, _expand_abbreviations, _tokenize,  # noqa: E402
+                               _STATES, THRESH_REVIEW, W_LEVENSHTEIN, W_TOKEN, W_SEMANTIC)
+
+normalize = _normalize.__wrapped__
+CITIES = ['DeQuincy', 'Fulton', 'Gurdon', 'Huttig', 'Monroeville', 'Troy', 'Weldon', 'Brooklet', 'Ruston',
+          'Camden', 'Crossett', 'Dierks', 'Emerson', 'Glenwood', 'Hattiesburg', 'Joyce', 'Leola', 'Mansfield']
+WORDS = ['Pine', 'Southern', 'Timber', 'River', 'Delta', 'Piney', 'Creek', 'Valley', 'Ridge', 'Bayou',
+         'Forest', 'Lumber', 'Mill', 'Wood', 'Products', 'Gulf', 'Coastal', 'Hill']
+
+
+def legacy_levenshtein(a, b):
+    m, n = len(a), len(b)
+    if m == 0: return n
+    if n == 0: return m
+    prev = list(range(n + 1))
+    for i in range(1, m + 1):
+        curr = [i] + [0] * n
+        for j in range(1, n + 1):
+            cost = 0 if a[i-1] == b[j-1] else 1
+            curr[j] = min(curr[j-1] + 1, prev[j] + 1, prev[j-1] + cost)
+        prev = curr
+    return prev[n]
+
+
+def legacy_levenshtein_score(a, b):
+    max_len = max(len(a), len(b))
+    return 1.0 if max_len == 0 else max(0.0, 1.0 - legacy_levenshtein(a, b) / max_len)
+
+
+def legacy_parts(name, aliases):
+    if not name:
+        return '', '', ''
+    raw = name.strip()
+    for sep in (' - ', ' – ', ' — '):
+        if sep in raw:
+            company, rest = [p.strip() for p in raw.split(sep, 1)]
+            if ',' in rest:
+                city, state = rest.split(',', 1)
+                return company.lower(), city.strip().lower(), state.strip().upper()
+            words = rest.split()
+            if words and words[-1].upper() in _STATES:
+                return company.lower(), ' '.join(words[:-1]).lower(), words[-1].upper()
+            return company.lower(), rest.lower(), ''
+    norm = normalize(raw)
+    for alias in sorted(aliases.keys(), key=len, reverse=True):
+        if norm == alias or norm.startswith(alias + ' '):
+            words = norm[len(alias):].strip().split()
+            if words and words[-1].upper() in _STATES:
+                return alias, ' '.join(words[:-1]), words[-1].upper()
+            return alias, ' '.join(words), ''
+    return norm, '', ''
+
+
+def legacy_compute_score(a, b, aliases):
+    norm_a, norm_b = _expand_abbreviations(normalize(a)), _expand_abbreviations(normalize(b))
+    tok_a, tok_b = set(_tokenize(norm_a)), set(_tokenize(norm_b))
+    tok = len(tok_a & tok_b) / min(len(tok_a), len(tok_b)) if tok_a and tok_b else 0.0
+    (comp_a, city_a, state_a), (comp_b, city_b, state_b) = legacy_parts(a, aliases), legacy_parts(b, aliases)
+    sem = 0.0
+    if comp_a and comp_b:
+        ca, cb = _expand_abbreviations(normalize(comp_a)), _expand_abbreviations(normalize(comp_b))
+        sem += 0.5 if ca == cb else 0.4 if legacy_levenshtein_score(ca, cb) > 0.85 else 0.0
+    if city_a and city_b:
+        ca, cb = normalize(city_a), normalize(city_b)
+        sem += 0.3 if ca == cb else 0.2 if legacy_levenshtein_score(ca, cb) > 0.85 else 0.0
+    if state_a and state_b and state_a == state_b:
+        sem += 0.2
+    return W_LEVENSHTEIN * legacy_levenshtein_score(norm_a, norm_b) + W_TOKEN * tok + W_SEMANTIC * sem
+
+
+def noisy(name, rng):
+    chars = list(name)
+    i = rng.randrange(1, len(chars) - 1)
+    chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    return ''.join(chars)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--inputs', type=int, default=1000)
+    ap.add_argument('--candidates', type=int, default=5000)
+    ap.add_argument('--legacy-sample', type=int, default=10)
+    args = ap.parse_args()
+    rng = random.Random(11)
+    aliases = app.MILL_COMPANY_ALIASES
+
+    candidates = list(app.MILL_DIRECTORY)
+    while len(candidates) < args.candidates:
+        candidates.append(f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(['Lumber', 'Timber', 'Forest Products'])}"
+                          f" - {rng.choice(CITIES)}")
+    candidates = candidates[:args.candidates]
+    inputs = [noisy(rng.choice(candidates), rng) for _ in range(args.inputs)]
+    pairs = len(inputs) * len(candidates)
+    sample = inputs[:args.legacy_sample]
+
+    t0 = time.perf_counter()
+    legacy = [[legacy_compute_score(q, c, aliases) for c in candidates] for q in sample]
+    legacy_t = (time.perf_counter() - t0) / len(sample) * len(inputs)
+
+    t0 = time.perf_counter()
+    computed = [[compute_score(q, c, 'mill', aliases) for c in candidates] for q in inputs]
+    compute_t = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batch = [score_candidates(q, candidates, 'mill', aliases) for q in inputs]
+    batch_t = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    bounded = [score_candidates(q, candidates, 'mill', aliases, min_score=THRESH_REVIEW) for q in inputs]
+    bounded_t = time.perf_counter() - t0
+
+    kept = sum(s is not None for row in bounded for s in row)
+    bounded_ok = all(b == c if b is not None else c < THRESH_REVIEW
+                     for brow, crow in zip(bounded, computed) for b, c in zip(brow, crow))
+    print(f"{len(inputs)} inputs x {len(candidates)} candidates = {pairs} pairs")
+    for label, t in (('legacy', legacy_t), ('compute', compute_t), ('batch', batch_t), ('bounded', bounded_t)):
+        print(f"{label:<8} {t:>8.1f}s  {t / pairs * 1e6:>6.2f}us/pair" + ('  (extrapolated)' if label == 'legacy' else ''))
+    print(f"identical to legacy: {computed[:len(sample)] == legacy and batch == computed}")
+    print(f"bounded kept {kept} pairs >= {THRESH_REVIEW}, others all below: {bounded_ok}")
+
+
+if __name__ == '__main__':
+    main()
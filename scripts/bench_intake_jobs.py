@@ -0,0 +1,97 @@
+"""
+Benchmark: quote intake responsiveness while large cloud syncs are being applied.
+
+  legacy   POST /api/mi/quotes applied the batch inside the request (kept below as
+           legacy_post: the per-row / set-based submit inline)
+  jobs     POST validates and queues an intake job (202); workers apply it, and
+           ?wait=true blocks until the job is done
+Requests are served by --http-workers threads, like gunicorn's sync workers. --syncs
+batches of --sync-quotes quotes (--mills mills each) are posted first; meanwhile 2-quote
+POSTs for a different mill arrive every 20ms. Reports how long each sync held a request
+worker, when the syncs were applied, and the small POSTs' latency (queueing included).
+
+Usage: python scripts/bench_intake_jobs.py [--sync-quotes 8000] [--syncs 2] [--mills 40] [--posts 30]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import app  # noqa: E402
+app.wait_until_ready()  # background seed must finish before the DB paths are repointed
+
+
+def legacy_post(quotes):
+    """POST /api/mi/quotes before intake jobs: the submit ran in the request thread."""
+    submit = app._mi_submit_quotes_bulk if len(quotes) >= app.MI_BULK_INGEST_MIN else app._mi_submit_quotes_inner
+    return submit(None, quotes)
+
+
+def sync_batch(n, mills, sync=0):
+    return [{'mill': f'Sync Mill {sync * mills + i % mills}', 'product': f'2x{4 + 2 * (i // mills % 4)}#2',
+             'length': str(8 + 2 * (i // (mills * 4) % 10)), 'price': 380 + i % 50,
+             'trader': 'Bench', 'date': '2026-01-05', 'source': 'syp_analytics'} for i in range(n)]
+
+
+def run(label, post_sync, post_small, args):
+    small = [{'mill': 'Walk-in Mill', 'product': '2x4#2', 'length': '16', 'price': 400, 'trader': 'Bench'}] * 2
+    server = ThreadPoolExecutor(max_workers=args.http_workers)
+
+    def timed(fn, *a):
+        t0 = time.perf_counter()
+        return server.submit(lambda: (fn(*a), time.perf_counter() - t0))
+
+    t0 = time.perf_counter()
+    syncs = [timed(post_sync, sync_batch(args.sync_quotes, args.mills, s)) for s in range(args.syncs)]
+    posts = []
+    for _ in range(args.posts):
+        time.sleep(0.02)
+        posts.append(timed(post_small, small))
+    held = [f.result()[1] for f in syncs]
+    for job, _ in (f.result() for f in syncs):
+        if job is not None:
+            app._intake_jobs.wait(job)
+    applied = time.perf_counter() - t0
+    latencies = sorted(f.result()[1] for f in posts)
+    server.shutdown()
+    p95 = latencies[int(0.95 * (len(latencies) - 1))] * 1000
+    print(f"{label:<7} sync POST held {max(held) * 1000:>7.0f}ms  applied {applied * 1000:>7.0f}ms  "
+          f"small POST p50 {statistics.median(latencies) * 1000:>7.1f}ms  p95 {p95:>7.1f}ms")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--sync-quotes', type=int, default=8000)
+    ap.add_argument('--syncs', type=int, default=2)
+    ap.add_argument('--mills', type=int, default=40)
+    ap.add_argument('--http-workers', type=int, default=2, help='request workers (gunicorn runs 2)')
+    ap.add_argument('--posts', type=int, default=30)
+    args = ap.parse_args()
+    app.mi_geocode_location = lambda loc: None
+    client = app.app.test_client()
+
+    def queued_sync(quotes):
+        resp = client.post('/api/mi/quotes', json=quotes)
+        assert resp.status_code == 202
+        return resp.get_json()['job_id']
+
+    def queued_small(quotes):
+        assert app.app.test_client().post('/api/mi/quotes?wait=true', json=quotes).status_code == 201
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, post_sync, post_small in (('legacy', lambda q: legacy_post(q) and None, legacy_post),
+                                             ('jobs', queued_sync, queued_small)):
+            app.CRM_DB_PATH = os.path.join(tmp, f'crm_{label}.db')
+            app.MI_DB_PATH = os.path.join(tmp, f'mi_{label}.db')
+            app.init_crm_db()
+            app.init_mi_db()
+            run(label, post_sync, post_small, args)
+        print(f"intake jobs: {app._intake_jobs.stats()}")
+
+
+if __name__ == '__main__':
+    main()
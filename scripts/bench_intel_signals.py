@@ -0,0 +1,328 @@
+"""
+Benchmark: single-pass intel signal engine vs the per-product query loop.
+
+The per-product implementation that /api/mi/intel/signals used before
+compute_intel_signals() is kept below as the reference. Both run against the
+same generated 30-day quote window and their JSON payloads are compared.
+Recommendations are compared the same way: the old route (signals re-run plus a
+best-source query per product) against a signal snapshot hit.
+
+Usage: python scripts/bench_intel_signals.py [--products 60] [--quotes 50000] [--days 180]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import app  # noqa: E402
+app.wait_until_ready()  # background seed must finish before the DB paths are repointed
+
+
+def legacy_signals(conn, product_filter=None):
+    """Per-product implementation (about 8 queries per product)."""
+    now = datetime.now()
+    d7 = (now - timedelta(days=7)).strftime('%Y-%m-%d')
+    d14 = (now - timedelta(days=14)).strftime('%Y-%m-%d')
+    d30 = (now - timedelta(days=30)).strftime('%Y-%m-%d')
+
+    if product_filter:
+        products = [product_filter]
+    else:
+        products = [r['product'] for r in conn.execute("SELECT DISTINCT product FROM mill_quotes").fetchall()]
+
+    all_signals = {}
+    for product in products:
+        signals = []
+
+        # 1. Supply Pressure
+        mills_7d = conn.execute(
+            "SELECT COUNT(DISTINCT mill_name) as cnt, SUM(volume) as vol FROM mill_quotes WHERE product=? AND date>=?",
+            (product, d7)
+        ).fetchone()
+        mills_30d = conn.execute(
+            "SELECT COUNT(DISTINCT mill_name) as cnt, SUM(volume) as vol, COUNT(*) as quotes FROM mill_quotes WHERE product=? AND date>=?",
+            (product, d30)
+        ).fetchone()
+        m7 = mills_7d['cnt'] or 0
+        v7 = mills_7d['vol'] or 0
+        m30 = mills_30d['cnt'] or 0
+        v30 = mills_30d['vol'] or 0
+        avg_weekly_mills = m30 / 4.3 if m30 else 0
+        avg_weekly_vol = v30 / 4.3 if v30 else 0
+
+        if avg_weekly_mills > 0:
+            mill_ratio = m7 / avg_weekly_mills
+            vol_ratio = v7 / avg_weekly_vol if avg_weekly_vol > 0 else 1
+            if mill_ratio > 1.2 or vol_ratio > 1.3:
+                direction = 'bearish'
+                strength = 'strong' if mill_ratio > 1.5 or vol_ratio > 1.5 else 'moderate'
+            elif mill_ratio < 0.8 or vol_ratio < 0.7:
+                direction = 'bullish'
+                strength = 'strong' if mill_ratio < 0.5 else 'moderate'
+            else:
+                direction = 'neutral'
+                strength = 'weak'
+            signals.append({
+                'signal': 'supply_pressure',
+                'mills_offering_7d': m7, 'volume_7d': round(v7, 1),
+                'mills_avg_weekly': round(avg_weekly_mills, 1), 'volume_avg_weekly': round(avg_weekly_vol, 1),
+                'direction': direction, 'strength': strength,
+                'explanation': f"{m7} mills offering {product} this week ({round(v7)} MBF), vs {round(avg_weekly_mills,1)} mills avg. {'More supply = potential to short.' if direction=='bearish' else 'Tighter supply = consider buying.' if direction=='bullish' else 'Supply steady.'}"
+            })
+
+        # 2. Price Momentum
+        prices_14d = conn.execute(
+            "SELECT date, AVG(price) as avg_price FROM mill_quotes WHERE product=? AND date>=? GROUP BY date ORDER BY date",
+            (product, d14)
+        ).fetchall()
+        prices_30d = conn.execute(
+            "SELECT date, AVG(price) as avg_price FROM mill_quotes WHERE product=? AND date>=? GROUP BY date ORDER BY date",
+            (product, d30)
+        ).fetchall()
+
+        def calc_slope(prices):
+            if len(prices) < 2:
+                return 0
+            n = len(prices)
+            x_sum = n * (n - 1) / 2
+            x2_sum = n * (n - 1) * (2 * n - 1) / 6
+            y_sum = sum(p['avg_price'] for p in prices)
+            xy_sum = sum(i * p['avg_price'] for i, p in enumerate(prices))
+            denom = n * x2_sum - x_sum * x_sum
+            if denom == 0:
+                return 0
+            return (n * xy_sum - x_sum * y_sum) / denom
+
+        slope_14d = calc_slope(prices_14d)
+        slope_30d = calc_slope(prices_30d)
+        current_avg = prices_14d[-1]['avg_price'] if prices_14d else 0
+
+        if abs(slope_14d) > 0.5:
+            direction = 'bullish' if slope_14d > 0 else 'bearish'
+            strength = 'strong' if abs(slope_14d) > 2 else 'moderate'
+        else:
+            direction = 'neutral'
+            strength = 'weak'
+        signals.append({
+            'signal': 'price_momentum',
+            'current_avg': round(current_avg, 2), 'slope_14d': round(slope_14d, 2), 'slope_30d': round(slope_30d, 2),
+            'direction': direction, 'strength': strength,
+            'explanation': f"{product} avg ${round(current_avg)}. Price {'rising' if slope_14d > 0 else 'falling'} ~${abs(round(slope_14d, 1))}/day over 14d. {'Buy before prices climb higher.' if direction=='bullish' else 'Prices softening â wait or short.' if direction=='bearish' else 'Prices stable.'}"
+        })
+
+        # 3. Print vs Street
+        latest_rl = conn.execute(
+            "SELECT price FROM rl_prices WHERE product=? ORDER BY date DESC LIMIT 1",
+            (product,)
+        ).fetchone()
+        if latest_rl and current_avg > 0:
+            rl_price = latest_rl['price']
+            gap = rl_price - current_avg
+            if gap > 10:
+                direction = 'bearish'
+                explanation = f"Mills offering {product} ${round(gap)} below RL print (${round(rl_price)}). Street is cheaper than print."
+            elif gap < -10:
+                direction = 'bullish'
+                explanation = f"Mills charging ${round(abs(gap))} above RL print (${round(rl_price)}). Genuine tightness."
+            else:
+                direction = 'neutral'
+                explanation = f"Mill prices tracking close to RL print (${round(rl_price)} vs ${round(current_avg)} street)."
+            signals.append({
+                'signal': 'print_vs_street',
+                'rl_price': round(rl_price, 2), 'avg_street': round(current_avg, 2), 'gap': round(gap, 2),
+                'direction': direction,
+                'strength': 'strong' if abs(gap) > 20 else 'moderate' if abs(gap) > 10 else 'weak',
+                'explanation': explanation
+            })
+
+        # 4. Regional Arbitrage
+        regional_prices = conn.execute("""
+            SELECT m.region, MIN(mq.price) as best_price, mq.mill_name
+            FROM mill_quotes mq LEFT JOIN mills m ON mq.mill_id = m.id
+            WHERE mq.product=? AND mq.date>=?
+            GROUP BY m.region
+        """, (product, d7)).fetchall()
+        if len(regional_prices) >= 2:
+            rp = {r['region']: {'price': r['best_price'], 'mill': r['mill_name']} for r in regional_prices}
+            opps = []
+            regions = list(rp.keys())
+            for i in range(len(regions)):
+                for j in range(i+1, len(regions)):
+                    spread = abs(rp[regions[i]]['price'] - rp[regions[j]]['price'])
+                    if spread > 10:
+                        cheaper = regions[i] if rp[regions[i]]['price'] < rp[regions[j]]['price'] else regions[j]
+                        opps.append({
+                            'from_region': cheaper,
+                            'to_region': regions[j] if cheaper == regions[i] else regions[i],
+                            'spread': round(spread, 2),
+                            'cheaper_mill': rp[cheaper]['mill'],
+                            'cheaper_price': rp[cheaper]['price']
+                        })
+            if opps:
+                signals.append({
+                    'signal': 'regional_arbitrage',
+                    'opportunities': opps,
+                    'direction': 'opportunity',
+                    'strength': 'strong' if any(o['spread'] > 25 for o in opps) else 'moderate',
+                    'explanation': f"Regional spread on {product}: " + ', '.join(
+                        f"${o['spread']} between {o['from_region']} and {o['to_region']} ({o['cheaper_mill']} at ${o['cheaper_price']})"
+                        for o in opps[:3]
+                    )
+                })
+
+        # 5. Offering Velocity
+        daily_counts = conn.execute(
+            "SELECT date, COUNT(*) as cnt FROM mill_quotes WHERE product=? AND date>=? GROUP BY date",
+            (product, d30)
+        ).fetchall()
+        if daily_counts:
+            avg_daily = sum(r['cnt'] for r in daily_counts) / max(len(daily_counts), 1)
+            recent_daily = [r['cnt'] for r in daily_counts if r['date'] >= d7]
+            recent_avg = sum(recent_daily) / max(len(recent_daily), 1) if recent_daily else 0
+            vel_ratio = recent_avg / avg_daily if avg_daily > 0 else 1
+            if vel_ratio > 1.3:
+                direction = 'bearish'
+                explanation = f"Above-average quoting on {product} ({round(recent_avg,1)} vs {round(avg_daily,1)} daily avg). Mills pushing inventory."
+            elif vel_ratio < 0.7:
+                direction = 'bullish'
+                explanation = f"Below-average activity on {product}. Quiet market suggests tightening."
+            else:
+                direction = 'neutral'
+                explanation = f"Normal quoting velocity on {product}."
+            signals.append({
+                'signal': 'offering_velocity',
+                'recent_avg_daily': round(recent_avg, 1), 'avg_daily_30d': round(avg_daily, 1),
+                'velocity_ratio': round(vel_ratio, 2),
+                'direction': direction,
+                'strength': 'strong' if abs(vel_ratio - 1) > 0.5 else 'moderate' if abs(vel_ratio - 1) > 0.3 else 'weak',
+                'explanation': explanation
+            })
+
+        # 6. Volume Trend
+        weekly_vol = conn.execute("""
+            SELECT strftime('%%W', date) as week, SUM(volume) as vol
+            FROM mill_quotes WHERE product=? AND date>=? AND volume > 0
+            GROUP BY week ORDER BY week
+        """, (product, d30)).fetchall()
+        if len(weekly_vol) >= 2:
+            vols = [r['vol'] for r in weekly_vol]
+            avg_vol = sum(vols) / len(vols)
+            latest_vol = vols[-1]
+            change = ((latest_vol - avg_vol) / avg_vol * 100) if avg_vol > 0 else 0
+            if change > 15:
+                direction = 'bearish'
+            elif change < -15:
+                direction = 'bullish'
+            else:
+                direction = 'neutral'
+            signals.append({
+                'signal': 'volume_trend',
+                'latest_week_mbf': round(latest_vol, 1), 'avg_week_mbf': round(avg_vol, 1),
+                'change_pct': round(change, 1),
+                'direction': direction,
+                'strength': 'strong' if abs(change) > 30 else 'moderate' if abs(change) > 15 else 'weak',
+                'explanation': f"{product} volume {'up' if change > 0 else 'down'} {round(abs(change))}% vs avg ({round(latest_vol)} MBF this week vs {round(avg_vol)} avg)."
+            })
+
+        all_signals[product] = signals
+
+    return all_signals
+
+
+def legacy_recommendations(conn):
+    """Old /api/mi/intel/recommendations: full signal run plus one best-source query per product."""
+    all_signals = legacy_signals(conn)
+    d7 = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
+    recs = []
+    for product in all_signals:
+        best = conn.execute("""
+            SELECT mq.mill_name, mq.price, m.city, m.region
+            FROM mill_quotes mq LEFT JOIN mills m ON mq.mill_id = m.id
+            WHERE mq.product=? AND mq.date >= ?
+            ORDER BY mq.price ASC LIMIT 1
+        """, (product, d7)).fetchone()
+        recs.append(app._score_recommendation(product, all_signals[product], dict(best) if best else None))
+    return sorted(recs, key=lambda r: abs(r['score']), reverse=True)
+
+
+def seed(n_products, n_quotes, days, seed=1):
+    rnd = random.Random(seed)
+    conn = app.get_mi_db()
+    regions = ['west', 'central', 'east', None]
+    for i in range(1, 81):
+        conn.execute("INSERT INTO mills (id, name, city, region) VALUES (?,?,?,?)",
+                     (i, f'Mill {i}', f'City {i % 7}', rnd.choice(regions)))
+    products = [f'2x{w}#{g} {k}' for w in (4, 6, 8, 10, 12) for g in (1, 2, 3) for k in range(4)][:n_products]
+    today = datetime.now()
+    quotes = []
+    for _ in range(n_quotes):
+        mill_id = rnd.randrange(1, 81)
+        quotes.append((mill_id, f'Mill {mill_id}', rnd.choice(products), rnd.randrange(380, 420, 5),
+                       rnd.choice([0, 0, 1, 2.5, 5]), (today - timedelta(days=rnd.randrange(0, days))).strftime('%Y-%m-%d')))
+    conn.executemany("""INSERT INTO mill_quotes (mill_id, mill_name, product, price, volume, date, trader)
+                        VALUES (?,?,?,?,?,?,'Bench')""", quotes)
+    rl = []
+    for p in products[::2]:
+        for d in range(3):
+            for region in ('west', 'central', 'east'):
+                rl.append(((today - timedelta(days=7 * d)).strftime('%Y-%m-%d'), region, p, 'RL', rnd.randrange(370, 430)))
+    conn.executemany("INSERT INTO rl_prices (date, region, product, length, price) VALUES (?,?,?,?,?)", rl)
+    conn.commit()
+    conn.close()
+    return products
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        conn = app.get_mi_db()
+        t0 = time.perf_counter()
+        result = fn(conn)
+        elapsed = time.perf_counter() - t0
+        conn.close()
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--products', type=int, default=60)
+    ap.add_argument('--quotes', type=int, default=50000)
+    ap.add_argument('--days', type=int, default=180, help='days of quote history to spread quotes over')
+    ap.add_argument('--repeat', type=int, default=5)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app.MI_DB_PATH = os.path.join(tmp, 'mi.db')
+        app.init_mi_db()
+        products = seed(args.products, args.quotes, args.days)
+
+        legacy_t, legacy = timed(legacy_signals, args.repeat)
+        engine_t, engine = timed(app.compute_intel_signals, args.repeat)
+        same = json.dumps(legacy, sort_keys=True) == json.dumps(engine, sort_keys=True)
+        print(f"{len(products)} products, {args.quotes} quotes over {args.days} days")
+        print(f"  per-product loop : {legacy_t * 1000:8.1f} ms")
+        print(f"  single pass      : {engine_t * 1000:8.1f} ms  ({legacy_t / engine_t:.1f}x)")
+        print(f"  identical JSON   : {same}")
+        one = products[3]
+        same_one = json.dumps(legacy_signals(app.get_mi_db(), one), sort_keys=True) == \
+            json.dumps(app.compute_intel_signals(app.get_mi_db(), one), sort_keys=True)
+        print(f"  identical (?product={one}) : {same_one}")
+
+        legacy_t, legacy = timed(legacy_recommendations, args.repeat)
+        app.get_signal_snapshot()
+        snap_t, snap = timed(lambda conn: app.get_signal_snapshot(conn)['recommendations'], args.repeat)
+        same = json.dumps(legacy, sort_keys=True) == json.dumps(snap, sort_keys=True)
+        print("recommendations")
+        print(f"  signals + best-source loop : {legacy_t * 1000:8.1f} ms")
+        print(f"  snapshot hit               : {snap_t * 1000:8.3f} ms  ({legacy_t / snap_t:.0f}x)")
+        print(f"  identical JSON             : {same}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark: latest_quotes-backed matrix / latest endpoints vs the window-function queries.
+
+The ROW_NUMBER() queries the endpoints ran before latest_quotes existed are kept
+below as the reference. Each is timed against the row helper the endpoint now
+uses (the work done on a matrix cache miss) and the row sets are compared.
+
+Usage: python scripts/bench_latest_quotes.py [--quotes 200000] [--days 180]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import app  # noqa: E402
+app.wait_until_ready()  # background seed must finish before the DB paths are repointed
+
+PRODUCTS = ['2x4#1', '2x4#2', '2x6#1', '2x6#2', '2x8#2', '2x10#2', '2x12#2', '2x4#3', '2x6#3', '2x4 #2']
+LENGTHS = ['8', '10', '12', '14', '16', '18', '20', 'RL', None]
+
+LEGACY_LATEST = """
+    SELECT sq.*, m.lat, m.lon, m.region, m.city, m.state
+    FROM (
+        SELECT *, ROW_NUMBER() OVER (
+            PARTITION BY mill_name, LOWER(REPLACE(product, ' ', '')), length
+            ORDER BY date DESC, price ASC, id DESC
+        ) AS rn
+        FROM mill_quotes WHERE date >= ?
+    ) sq
+    LEFT JOIN mills m ON sq.mill_id = m.id
+    WHERE sq.rn = 1
+    ORDER BY sq.product, sq.price
+"""
+
+LEGACY_MATRIX = """
+    SELECT sq.mill_name, sq.product, {length}sq.price, sq.date, sq.volume, sq.ship_window,
+           sq.tls, sq.trader, m.lat, m.lon, m.region, m.city, m.state
+    FROM (
+        SELECT *, ROW_NUMBER() OVER (
+            PARTITION BY {partition}
+            ORDER BY date DESC, price ASC, id DESC
+        ) AS rn
+        FROM mill_quotes WHERE date >= ?
+    ) sq
+    LEFT JOIN mills m ON sq.mill_id = m.id
+    WHERE sq.rn = 1
+"""
+
+
+def seed(n_quotes, days, seed=1):
+    rnd = random.Random(seed)
+    conn = app.get_mi_db()
+    for i in range(1, 81):
+        conn.execute("INSERT INTO mills (id, name, region) VALUES (?,?,?)", (i, f'Mill {i}', 'central'))
+    today = datetime.now()
+    quotes = []
+    for _ in range(n_quotes):
+        mill_id = rnd.randrange(1, 81)
+        quotes.append((mill_id, f'Mill {mill_id}', rnd.choice(PRODUCTS), rnd.randrange(380, 420, 5),
+                       rnd.choice(LENGTHS), (today - timedelta(days=rnd.randrange(0, days))).strftime('%Y-%m-%d')))
+    conn.executemany("""INSERT INTO mill_quotes (mill_id, mill_name, product, price, length, date, trader)
+                        VALUES (?,?,?,?,?,?,'Bench')""", quotes)
+    conn.commit()
+    conn.close()
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        conn = app.get_mi_db()
+        t0 = time.perf_counter()
+        result = fn(conn)
+        elapsed = time.perf_counter() - t0
+        conn.close()
+        best = elapsed if best is None else min(best, elapsed)
+    return best, sorted((tuple(r) for r in result), key=repr)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--quotes', type=int, default=200000)
+    ap.add_argument('--days', type=int, default=180)
+    ap.add_argument('--repeat', type=int, default=5)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app.MI_DB_PATH = os.path.join(tmp, 'mi.db')
+        app.init_mi_db()
+        t0 = time.perf_counter()
+        seed(args.quotes, args.days)
+        print(f"seeded {args.quotes} quotes over {args.days} days in {time.perf_counter() - t0:.1f}s "
+              f"(triggers maintaining latest_quotes)")
+        print(f"latest_quotes consistent: {app.verify_latest_quotes()['ok']}")
+
+        print(f"{'query':<22} {'since':>6} {'window (ms)':>12} {'table (ms)':>11} {'speedup':>8}  identical")
+        for label, days in (('2d', 2), ('30d', 30), ('all', 10000)):
+            since = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+            cases = [
+                ('latest', lambda c: c.execute(LEGACY_LATEST, (since,)).fetchall(),
+                 lambda c: app.latest_quote_rows(c, since)),
+                ('matrix?detail=length', lambda c: c.execute(LEGACY_MATRIX.format(
+                    length='sq.length, ', partition='mill_name, product, length'), (since,)).fetchall(),
+                 lambda c: app.matrix_quote_rows(c, 'length', since)),
+                ('matrix', lambda c: c.execute(LEGACY_MATRIX.format(
+                    length='', partition='mill_name, product'), (since,)).fetchall(),
+                 lambda c: app.matrix_quote_rows(c, '', since)),
+            ]
+            for name, old_fn, new_fn in cases:
+                old_t, old = timed(old_fn, args.repeat)
+                new_t, new = timed(new_fn, args.repeat)
+                if name == 'latest':
+                    old = sorted((r[:-6] + r[-5:] for r in old), key=repr)  # drop rn
+                print(f"{name:<22} {label:>6} {old_t * 1000:>12.1f} {new_t * 1000:>11.1f} "
+                      f"{old_t / new_t:>7.1f}x  {old == new}")
+
+
+if __name__ == '__main__':
+    main()
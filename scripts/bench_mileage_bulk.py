@@ -0,0 +1,79 @@
+"""
+Benchmark: bulk lane mileage, one OSRM /route call per lane vs batched /table calls.
+
+Runs against the local stub (scripts/geo_stub_server.py) with a per-request
+latency standing in for the public servers. Places are geocoded up front so
+both paths time routing only; the per-lane path is the loop /api/mileage/bulk
+ran before (get_distance per lane, OSRM limiter applied), the batched path is
+resolve_lanes_bulk. Miles are compared lane by lane.
+
+Usage: python scripts/bench_mileage_bulk.py [--origins 10] [--dests 10] [--latency 0.05]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+sys.path.insert(0, HERE)
+import app  # noqa: E402
+app.wait_until_ready()  # background seed must finish before the DB paths are repointed
+from geo_stub_server import start_stub_server  # noqa: E402
+
+
+def clear_distances():
+    app.distance_cache.clear()
+    conn = app.get_mi_db()
+    conn.execute("DELETE FROM distance_cache")
+    conn.execute("DELETE FROM lanes")
+    conn.commit()
+    conn.close()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--origins', type=int, default=10)
+    ap.add_argument('--dests', type=int, default=10)
+    ap.add_argument('--latency', type=float, default=0.05)
+    ap.add_argument('--osrm-rate', type=float, default=app.OSRM_RATE)
+    args = ap.parse_args()
+
+    server = start_stub_server(latency=args.latency)
+    app.NOMINATIM_URL = app.OSRM_URL = server.url
+    app._nominatim_limiter.rate = 10000.0
+    app._osrm_limiter.rate = args.osrm_rate
+    pairs = [(f'Mill {i}, AR', f'Customer {j}, TX') for i in range(args.origins) for j in range(args.dests)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app.MI_DB_PATH = os.path.join(tmp, 'mi.db')
+        app.init_mi_db()
+        places = {p for pair in pairs for p in pair}
+        coords = {p: app.geocode_location(p) for p in places}
+        print(f"{len(pairs)} lanes, {len(places)} places, stub latency {args.latency * 1000:.0f}ms, "
+              f"OSRM limit {args.osrm_rate}/s")
+
+        clear_distances()
+        before = dict(server.requests)
+        t0 = time.perf_counter()
+        per_lane = {(o, d): app.get_distance(coords[o], coords[d]) for o, d in pairs}
+        route_t = time.perf_counter() - t0
+        route_calls = server.requests['route'] - before['route']
+
+        clear_distances()
+        before = dict(server.requests)
+        t0 = time.perf_counter()
+        batched = app.resolve_lanes_bulk(pairs)
+        table_t = time.perf_counter() - t0
+        table_calls = server.requests['table'] - before['table']
+
+        print(f"{'path':<10} {'requests':>9} {'seconds':>9}")
+        print(f"{'route':<10} {route_calls:>9} {route_t:>9.2f}")
+        print(f"{'table':<10} {table_calls:>9} {table_t:>9.2f}")
+        print(f"speedup {route_t / table_t:.1f}x, identical: {per_lane == batched}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: CRM -> MI mill mirror and quote POST latency as the number of CRM mills grows.
+
+  legacy   the row-by-row sync this replaced (kept below): every CRM mill read, then one
+           SELECT plus one INSERT / UPDATE per mill on MI. Boot ran it once; every quote
+           POST ran the same per-mill loop as its pre-sync.
+  mirror   sync_crm_mills_to_mi(): a version check, and when CRM mills changed, one
+           set-based upsert over the attached CRM database
+For each --mills size (fresh databases in a temp dir): a full sync both ways, the no-op
+mirror check, and the median latency of a 2-quote POST /api/mi/quotes for known mills
+next to the legacy pre-sync cost that each of those POSTs used to pay on top.
+
+Usage: python scripts/bench_mill_mirror.py [--mills 100,1000,5000] [--posts 50]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import app  # noqa: E402
+app.wait_until_ready()  # background seed must finish before the DB paths are repointed
+
+
+def legacy_sync(crm_mills, mi_conn):
+    """Per-mill sync_mill_to_mi loop as it ran at boot and in every quote POST."""
+    for md in crm_mills:
+        existing = mi_conn.execute("SELECT id FROM mills WHERE id=?", (md['id'],)).fetchone()
+        if not existing:
+            mi_conn.execute(
+                "INSERT OR REPLACE INTO mills (id, name, city, state, lat, lon, region, locations, products, notes) VALUES (?,?,?,?,?,?,?,?,?,?)",
+                (md['id'], md['name'], md.get('city', ''), md.get('state', ''), md.get('lat'), md.get('lon'),
+                 md.get('region', ''), md.get('locations', '[]'), md.get('products', '[]'), md.get('notes', '')))
+        else:
+            mi_conn.execute(
+                "UPDATE mills SET name=?, city=?, state=?, lat=?, lon=?, region=?, locations=?, products=?, notes=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
+                (md['name'], md.get('city', ''), md.get('state', ''), md.get('lat'), md.get('lon'),
+                 md.get('region', ''), md.get('locations', '[]'), md.get('products', '[]'), md.get('notes', ''), md['id']))
+
+
+def legacy_round(rollback):
+    t0 = time.perf_counter()
+    crm = app.get_crm_db()
+    crm_mills = [dict(r) for r in crm.execute("SELECT * FROM mills").fetchall()]
+    crm.close()
+    mi = app.get_mi_db()
+    legacy_sync(crm_mills, mi)
+    mi.rollback() if rollback else mi.commit()
+    mi.close()
+    return time.perf_counter() - t0
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--mills', default='100,1000,5000')
+    ap.add_argument('--posts', type=int, default=50)
+    args = ap.parse_args()
+    app.mi_geocode_location = lambda loc: None
+
+    print(f"{'mills':>6} {'legacy sync':>12} {'mirror sync':>12} {'no-op check':>12} {'POST p50':>10} "
+          f"{'legacy pre-sync/POST':>21}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in [int(x) for x in args.mills.split(',')]:
+            app.CRM_DB_PATH = os.path.join(tmp, f'crm_{n}.db')
+            app.MI_DB_PATH = os.path.join(tmp, f'mi_{n}.db')
+            app.init_crm_db()
+            app.init_mi_db()
+            crm = app.get_crm_db()
+            crm.executemany("INSERT INTO mills (name, city, state, region, products) VALUES (?, 'Town', 'AR', 'west', '[\"2x4#2\"]')",
+                            [(f'Bench Mill {i}',) for i in range(n)])
+            crm.commit()
+            crm.close()
+
+            legacy_t = legacy_round(rollback=True)
+            mirror_t = timed(lambda: app.sync_crm_mills_to_mi(force=True))
+            check_t = timed(app.sync_crm_mills_to_mi)
+
+            client = app.app.test_client()
+            quotes = [{'mill': f'Bench Mill {i}', 'product': '2x4#2', 'length': '16', 'price': 400, 'trader': 'Bench'}
+                      for i in range(2)]
+            posts = []
+            for _ in range(args.posts):
+                t0 = time.perf_counter()
+                assert client.post('/api/mi/quotes?wait=true', json=quotes).status_code == 201
+                posts.append(time.perf_counter() - t0)
+            presync = statistics.median(legacy_round(rollback=True) for _ in range(5))
+            print(f"{n:>6} {legacy_t * 1000:>10.1f}ms {mirror_t * 1000:>10.1f}ms {check_t * 1000:>10.2f}ms "
+                  f"{statistics.median(posts) * 1000:>8.2f}ms {presync * 1000:>19.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
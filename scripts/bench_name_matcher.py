@@ -0,0 +1,120 @@
+"""
+Benchmark: compiled alias matcher vs the per-call alias sort and customer row scan.
+
+10k names for each function:
+  extract_company_name      mill names without a " - City" part (aliases, alias + suffix,
+                            unknown names); legacy sorts MILL_COMPANY_ALIASES twice per call
+  normalize_customer_name   against a scratch CRM with --customers rows; legacy queries every
+                            customer per call and normalizes each row against every alias
+The legacy implementations (the code before name_matcher.py) are kept below as the
+reference; checks both give identical results.
+
+Usage: python scripts/bench_name_matcher.py [--names 10000] [--customers 500]
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import app  # noqa: E402
+app.wait_until_ready()  # background seed must finish before the DB paths are repointed
+
+
+def legacy_extract_company_name(mill_name):
+    if not mill_name:
+        return mill_name
+    name = mill_name.strip()
+    if ' - ' in name:
+        return name.split(' - ')[0].strip()
+    lower = re.sub(r'[_\-\u2013\u2014]+', ' ', name.lower()).strip()
+    lower = re.sub(r'\s+', ' ', lower)
+    for alias, canonical in sorted(app.MILL_COMPANY_ALIASES.items(), key=lambda x: -len(x[0])):
+        if lower == alias:
+            return canonical
+    for alias, canonical in sorted(app.MILL_COMPANY_ALIASES.items(), key=lambda x: -len(x[0])):
+        if lower.startswith(alias + ' '):
+            return canonical
+    return name
+
+
+def legacy_normalize_customer_name(name):
+    trimmed = name.strip()
+    conn = app.get_crm_db()
+    rows = conn.execute('SELECT DISTINCT name FROM customers').fetchall()
+    conn.close()
+    lower = re.sub(r'[_\-\u2013\u2014]+', ' ', trimmed.lower()).strip()
+    lower = re.sub(r'\s+', ' ', lower)
+    sorted_aliases = sorted(app.CUSTOMER_ALIASES.items(), key=lambda x: -len(x[0]))
+    for alias, canonical in sorted_aliases:
+        if lower == alias:
+            for row in rows:
+                if row['name']:
+                    row_lower = re.sub(r'[_\-\u2013\u2014]+', ' ', row['name'].lower()).strip()
+                    row_lower = re.sub(r'\s+', ' ', row_lower)
+                    for a2, can2 in sorted_aliases:
+                        if row_lower == a2 and can2 == canonical:
+                            return row['name']
+            return canonical
+    fuzzy_lower = re.sub(r'\s*&\s*', ' and ', lower)
+    fuzzy_lower = re.sub(r'\s+', ' ', fuzzy_lower).strip()
+    for row in rows:
+        if row['name']:
+            row_fuzzy = re.sub(r'[_\-\u2013\u2014]+', ' ', row['name'].lower()).strip()
+            row_fuzzy = re.sub(r'\s*&\s*', ' and ', row_fuzzy)
+            row_fuzzy = re.sub(r'\s+', ' ', row_fuzzy).strip()
+            if fuzzy_lower == row_fuzzy:
+                return row['name']
+    stripped = app._CORP_SUFFIXES_RE.sub('', lower).strip()
+    if stripped:
+        for row in rows:
+            if row['name']:
+                if stripped == app._CORP_SUFFIXES_RE.sub('', row['name'].lower()).strip():
+                    return row['name']
+    return trimmed
+
+
+def timed(fn, names):
+    t0 = time.perf_counter()
+    out = [fn(n) for n in names]
+    return time.perf_counter() - t0, out
+
+
+def report(label, legacy, compiled, n):
+    (legacy_t, legacy_out), (compiled_t, compiled_out) = legacy, compiled
+    print(f"{label:<24} legacy {legacy_t * 1000:>8.0f}ms ({legacy_t / n * 1e6:>6.1f}us/name)   "
+          f"compiled {compiled_t * 1000:>6.0f}ms ({compiled_t / n * 1e6:>5.1f}us/name)   "
+          f"identical: {legacy_out == compiled_out}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--names', type=int, default=10000)
+    ap.add_argument('--customers', type=int, default=500)
+    args = ap.parse_args()
+
+    aliases = list(app.MILL_COMPANY_ALIASES)
+    pool = aliases + [f"{a} sawmill {i}" for i, a in enumerate(aliases)] + [f"Unknown Mill {i}" for i in range(50)]
+    mills = [pool[i % len(pool)] for i in range(args.names)]
+    report('extract_company_name', timed(legacy_extract_company_name, mills),
+           timed(app.extract_company_name, mills), len(mills))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app.CRM_DB_PATH = os.path.join(tmp, 'crm.db')
+        app.init_crm_db()
+        conn = app.get_crm_db()
+        conn.executemany("INSERT INTO customers (name, trader) VALUES (?, 'b')",
+                         [(f"Customer {i} {'& Sons' if i % 3 else 'Lumber Inc'}",) for i in range(args.customers)])
+        conn.commit()
+        conn.close()
+        cpool = (list(app.CUSTOMER_ALIASES) + [f"customer {i} and sons" for i in range(0, args.customers, 7)]
+                 + [f"Customer {i} Lumber" for i in range(0, args.customers, 3)] + [f"New Buyer {i}" for i in range(50)])
+        customers = [cpool[i % len(cpool)] for i in range(args.names)]
+        report('normalize_customer_name', timed(legacy_normalize_customer_name, customers),
+               timed(app.normalize_customer_name, customers), len(customers))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+Benchmark: offering generation for 100 profiles x 10 products.
+
+Scratch CRM + MI databases: today's quotes for 10 products from 60 directory mills
+and 10 prefix-named mills ("Canfor Sawmill 3"), every mill -> destination lane already
+in the lanes table (no network), RL history seeded from data/rl_prices.csv.gz.
+  legacy    per profile and product: quote query, MILL_DIRECTORY scan per mill, one
+            lanes query per mill, a five-year RL slice for the seasonal percentile
+            (the code before pricing_engine.py, kept below as the reference)
+  engine    _compute_offering_products per profile against one shared snapshot
+  job       generate_scheduled_offerings (snapshot + OFFERING_WORKERS threads + inserts)
+Checks that legacy and engine produce identical offerings. Also times origin resolution for
+10k quote mill names: the MILL_DIRECTORY prefix scan vs the cached OriginIndex.
+
+Usage: python scripts/bench_pricing_engine.py [--profiles 100] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import app  # noqa: E402
+app.wait_until_ready()  # background seed must finish before the DB paths are repointed
+
+PRODUCTS = ['2x4#1', '2x4#2', '2x6#1', '2x6#2', '2x8#2', '2x10#2', '2x12#2', '2x4#3', '2x6#3', '2x8#3']
+DESTINATIONS = ['Dallas, TX', 'Atlanta, GA', 'Chicago, IL', 'Denver, CO', 'Charlotte, NC',
+                'Nashville, TN', 'Houston, TX', 'Columbus, OH', 'Orlando, FL', 'Kansas City, MO']
+
+
+def legacy_compute_offering_products(profile, destination):
+    products = json.loads(profile['products']) if isinstance(profile['products'], str) else profile['products']
+    preferred = json.loads(profile['preferred_mills']) if profile['preferred_mills'] else []
+    margin_target = float(profile['margin_target'] or 25)
+    result_products = []
+    quote_cutoff = app.business_day_cutoff(2)
+    for product in products:
+        conn = app.get_mi_db()
+        mill_rows = conn.execute("""
+            SELECT mill_name, price, date FROM mill_quotes
+            WHERE product=? AND price > 0 AND date >= ?
+            ORDER BY date DESC
+        """, (product, quote_cutoff)).fetchall()
+        conn.close()
+        seen_mills = {}
+        for r in mill_rows:
+            if r['mill_name'] not in seen_mills:
+                seen_mills[r['mill_name']] = {'mill': r['mill_name'], 'fob': float(r['price']), 'date': r['date']}
+        if not seen_mills:
+            result_products.append({'product': product, 'error': 'No pricing available within 30 days'})
+            continue
+        if preferred:
+            preferred_matches = {k: v for k, v in seen_mills.items() if any(p.lower() in k.lower() for p in preferred)}
+            if preferred_matches:
+                seen_mills = preferred_matches
+        candidates = []
+        for mill_name, mill_data in seen_mills.items():
+            origin = ''
+            dir_entry = app.MILL_DIRECTORY.get(mill_name)
+            if dir_entry:
+                origin = f"{dir_entry[0]}, {dir_entry[1]}"
+            else:
+                for k, v in app.MILL_DIRECTORY.items():
+                    if mill_name.startswith(k.split(' - ')[0]):
+                        origin = f"{v[0]}, {v[1]}"
+                        break
+            if not origin or not destination:
+                continue
+            try:
+                miles = app.resolve_lane_miles(origin, destination)
+            except Exception:
+                miles = None
+            freight_per_mbf = round((450 + miles * 2.25) / 23) if miles else 20
+            candidates.append({'mill': mill_name, 'fob': mill_data['fob'], 'freight': freight_per_mbf,
+                               'landed': mill_data['fob'] + freight_per_mbf, 'date': mill_data['date']})
+        if not candidates:
+            result_products.append({'product': product, 'error': 'Could not calculate freight'})
+            continue
+        candidates.sort(key=lambda c: c['landed'])
+        best = candidates[0]
+        seasonal_adj, seasonal_note = 0, ''
+        cutoff_5y = (datetime.now() - timedelta(days=365 * 5)).strftime('%Y-%m-%d')
+        s_series = app.get_rl_store().get('west', product, 'RL')
+        s_rows = s_series.slice(cutoff_5y) if s_series else []
+        if s_rows:
+            month_prices = [p for d, p in s_rows if int(d[5:7]) == datetime.now().month]
+            if month_prices:
+                latest = s_rows[-1][1]
+                pct = round(sum(1 for p in month_prices if p <= latest) / len(month_prices) * 100)
+                seasonal_adj, seasonal_note = app._offering_seasonal(pct)
+        adjusted_margin = margin_target + seasonal_adj
+        alts = [{'mill': c['mill'], 'fob': c['fob'], 'freight': c['freight'], 'landed': c['landed'],
+                 'diff': round(c['landed'] - best['landed'])} for c in candidates[1:4]]
+        result_products.append({
+            'product': product, 'mill': best['mill'], 'fob': best['fob'], 'freight': best['freight'],
+            'landed': best['landed'], 'margin': adjusted_margin, 'price': best['landed'] + adjusted_margin,
+            'seasonalNote': seasonal_note, 'quoteDate': best['date'], 'alternatives': alts})
+    return result_products
+
+
+def legacy_origin(mill_name):
+    dir_entry = app.MILL_DIRECTORY.get(mill_name)
+    if dir_entry:
+        return f"{dir_entry[0]}, {dir_entry[1]}"
+    for k, v in app.MILL_DIRECTORY.items():
+        if mill_name.startswith(k.split(' - ')[0]):
+            return f"{v[0]}, {v[1]}"
+    return ''
+
+
+def setup(tmp, n_profiles):
+    app.CRM_DB_PATH = os.path.join(tmp, 'crm.db')
+    app.MI_DB_PATH = os.path.join(tmp, 'mi.db')
+    app.init_crm_db()
+    app.init_mi_db()
+    app.seed_rl_from_csv()
+    directory = list(app.MILL_DIRECTORY.items())[:60]
+    companies = list(dict.fromkeys(name.split(' - ')[0] for name, _ in directory))
+    mills = [name for name, _ in directory] + [f"{companies[i % len(companies)]} Sawmill {i}" for i in range(10)]
+    origins = {f"{city}, {state}" for _, (city, state) in app.MILL_DIRECTORY.items()}
+    today = datetime.now().strftime('%Y-%m-%d')
+    mi = app.get_mi_db()
+    mi.executemany("INSERT INTO mills (id, name) VALUES (?,?)", list(enumerate(mills, 1)))
+    mi.executemany("INSERT INTO mill_quotes (mill_id, mill_name, product, price, date, trader) VALUES (?,?,?,?,?,'b')",
+                   [(i, m, p, 380 + (i * 7 + j * 13) % 97 + i / 100, today)
+                    for i, m in enumerate(mills, 1) for j, p in enumerate(PRODUCTS)])
+    mi.executemany("INSERT OR IGNORE INTO lanes (origin, dest, miles) VALUES (?,?,?)",
+                   [(o, d, 200 + (hash((o, d)) % 900)) for o in origins for d in DESTINATIONS])
+    mi.commit()
+    mi.close()
+    crm = app.get_crm_db()
+    crm.execute("INSERT INTO customers (id, name, trader) VALUES (1, 'Bench', 'b')")
+    crm.executemany("""INSERT INTO offering_profiles (customer_id, customer_name, destination, products,
+                       preferred_mills, frequency, trader) VALUES (1, ?, ?, ?, ?, 'daily', 'b')""",
+                    [(f'Customer {k}', DESTINATIONS[k % len(DESTINATIONS)], json.dumps(PRODUCTS),
+                      json.dumps(['Canfor']) if k % 5 == 0 else '') for k in range(n_profiles)])
+    crm.commit()
+    profiles = [dict(r) for r in crm.execute("SELECT * FROM offering_profiles").fetchall()]
+    crm.close()
+    return profiles
+
+
+def best_of(fn, repeat):
+    best, out = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--profiles', type=int, default=100)
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        profiles = setup(tmp, args.profiles)
+        app.get_rl_store()
+
+        def legacy():
+            return [legacy_compute_offering_products(p, p['destination']) for p in profiles]
+
+        def engine():
+            snap = app.offering_pricing_snapshot([x for p in profiles for x in app._profile_products(p)],
+                                                 [p['destination'] for p in profiles])
+            return [app._compute_offering_products(p, p['destination'], snap) for p in profiles]
+
+        def job():
+            crm = app.get_crm_db()
+            crm.execute("DELETE FROM offerings")
+            crm.commit()
+            crm.close()
+            return app.generate_scheduled_offerings({'force': True})
+
+        legacy_t, legacy_out = best_of(legacy, args.repeat)
+        engine_t, engine_out = best_of(engine, args.repeat)
+        job_t, job_out = best_of(job, args.repeat)
+        items = sum(len(o) for o in engine_out)
+        print(f"{len(profiles)} profiles x {len(PRODUCTS)} products = {items} line items")
+        print(f"{'legacy':<8} {legacy_t * 1000:>8.0f}ms")
+        print(f"{'engine':<8} {engine_t * 1000:>8.0f}ms")
+        print(f"{'job':<8} {job_t * 1000:>8.0f}ms  (generated {job_out['generated']}, timings {job_out['timings']})")
+        print(f"identical: {legacy_out == engine_out}")
+
+        companies = list(dict.fromkeys(n.split(' - ')[0] for n in app.MILL_DIRECTORY))
+        pool = list(app.MILL_DIRECTORY) + [f"{c} Sawmill" for c in companies] + ['Unknown Lumber']
+        names = [pool[i % len(pool)] for i in range(10000)]
+        scan_t, scanned = best_of(lambda: [legacy_origin(n) for n in names], args.repeat)
+
+        def indexed_lookup():
+            index = app.get_origin_index()  # once per request / snapshot, as the pricing code does
+            return [index.origin(n) for n in names]
+        index_t, indexed = best_of(indexed_lookup, args.repeat)
+        print(f"\norigins for {len(names)} names: prefix scan {scan_t * 1000:.0f}ms, "
+              f"index {index_t * 1000:.0f}ms, identical: {scanned == indexed}")
+
+
+if __name__ == '__main__':
+    main()
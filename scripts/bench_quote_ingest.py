@@ -0,0 +1,87 @@
+"""
+Benchmark: per-row vs set-based quote ingest for POST /api/mi/quotes.
+
+Each run gets fresh CRM + MI databases in a temp dir, seeds one batch so the
+replace / old-price capture paths have work to do, then times a re-submission
+with moved prices through both paths and checks they leave identical tables.
+The trailing mill_price_changes refresh is shared by both paths and
+is switched off here so the comparison covers the price changes each path derives.
+
+Usage: python scripts/bench_quote_ingest.py [--sizes 100,1000,10000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import app  # noqa: E402
+app.wait_until_ready()  # background seed must finish before the DB paths are repointed
+
+PRODUCTS = ['2x4#1', '2x4#2', '2x6#1', '2x6#2', '2x8#2', '2x10#2', '2x12#2', '2x4#3', '2x6#3', '2x8#3']
+LENGTHS = ['8', '10', '12', '14', '16', '18', '20', 'RL']
+
+
+def use_fresh_dbs(tmp, tag):
+    app.CRM_DB_PATH = os.path.join(tmp, f'crm_{tag}.db')
+    app.MI_DB_PATH = os.path.join(tmp, f'mi_{tag}.db')
+    app.init_crm_db()
+    app.init_mi_db()
+    for name, (city, state) in list(app.MILL_DIRECTORY.items())[:60]:
+        app.find_or_create_crm_mill(name, city, state, app.mi_get_region(state), 0.0, 0.0, 'Bench')
+
+
+def make_batch(n, seed, date):
+    rnd = random.Random(seed)
+    mills = list(app.MILL_DIRECTORY)[:60]
+    return [{
+        'mill': rnd.choice(mills), 'product': rnd.choice(PRODUCTS), 'length': rnd.choice(LENGTHS),
+        'price': rnd.randrange(380, 620), 'volume': rnd.randrange(0, 5), 'tls': rnd.randrange(0, 4),
+        'date': date, 'trader': 'Bench', 'source': 'bench',
+    } for _ in range(n)]
+
+
+def snapshot():
+    conn = app.get_mi_db()
+    quotes = conn.execute("""SELECT mill_id, mill_name, product, price, length, volume, tls, ship_window,
+                                    date, trader, source FROM mill_quotes ORDER BY id""").fetchall()
+    changes = conn.execute("""SELECT mill_id, mill_name, product, length, old_price, new_price, change,
+                                     pct_change, date, prev_date FROM mill_price_changes ORDER BY id""").fetchall()
+    conn.close()
+    return [tuple(r) for r in quotes], [tuple(r) for r in changes]
+
+
+def run(fn, tmp, tag, n):
+    use_fresh_dbs(tmp, tag)
+    with app.app.test_request_context():
+        conn = app.get_mi_db()
+        app._mi_submit_quotes_bulk(conn, make_batch(n, 1, '2026-01-05'))
+        conn.close()
+        batch = make_batch(n, 2, '2026-01-06')
+        conn = app.get_mi_db()
+        t0 = time.perf_counter()
+        fn(conn, batch)
+        elapsed = time.perf_counter() - t0
+        conn.close()
+    return elapsed, snapshot()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--sizes', default='100,1000,10000')
+    args = ap.parse_args()
+    sizes = [int(s) for s in args.sizes.split(',')]
+    app.refresh_price_changes = lambda: None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'quotes':>8} {'per-row (s)':>12} {'bulk (s)':>10} {'speedup':>8}  identical")
+        for n in sizes:
+            row_t, row_snap = run(app._mi_submit_quotes_inner, tmp, f'row{n}', n)
+            bulk_t, bulk_snap = run(app._mi_submit_quotes_bulk, tmp, f'bulk{n}', n)
+            print(f"{n:>8} {row_t:>12.3f} {bulk_t:>10.3f} {row_t / bulk_t:>7.1f}x  {row_snap == bulk_snap}")
+
+
+if __name__ == '__main__':
+    main()
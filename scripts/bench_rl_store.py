@@ -0,0 +1,131 @@
+"""
+Benchmark: in-memory RL price store vs per-request rl_prices queries.
+
+Loads data/rl_prices.csv.gz into a scratch database, then reports
+  - store build time, memory retained and peak while loading (tracemalloc),
+    and whether every series matches rl_prices row for row
+  - per endpoint: the rl_prices reads it issued before the store (SQL below,
+    kept as the reference) and the full request served from the store with
+    the response cache cleared.
+
+Usage: python scripts/bench_rl_store.py [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import app  # noqa: E402
+app.wait_until_ready()  # background seed must finish before the DB paths are repointed
+from rl_store import RLPriceStore  # noqa: E402
+
+FIVE_YR = (datetime.now() - timedelta(days=5 * 365)).strftime('%Y-%m-%d')
+TWO_YR = (datetime.now() - timedelta(days=730)).strftime('%Y-%m-%d')
+DAYS_120 = (datetime.now() - timedelta(days=120)).strftime('%Y-%m-%d')
+SERIES_SQL = "SELECT date, price FROM rl_prices WHERE product=? AND region=? AND length=? AND date>=? ORDER BY date"
+
+# endpoint -> (url, [(sql, params)] it ran per request)
+CASES = [
+    ('history', '/api/rl/history?product=2x4%232&region=west',
+     [("SELECT date, region, product, length, price FROM rl_prices WHERE product=? AND region=? ORDER BY date",
+       ('2x4#2', 'west'))]),
+    ('chart-batch', '/api/rl/chart-batch?product=2x6%232&length=RL',
+     [("SELECT date, region, price FROM rl_prices WHERE product=? AND length=? ORDER BY date", ('2x6#2', 'RL')),
+      ("SELECT date, region, price FROM rl_prices WHERE product=? AND length=? AND region='west' ORDER BY date",
+       ('2x4#2', 'RL')),
+      ("SELECT date, price FROM rl_prices WHERE product='2x4#2' AND length=? AND region='west' ORDER BY date",
+       ('RL',))]),
+    ('spreads', '/api/rl/spreads?region=west',
+     [("SELECT date, COUNT(*) as cnt FROM rl_prices WHERE region=? GROUP BY date HAVING cnt >= 10 "
+       "ORDER BY date DESC LIMIT 2", ('west',)),
+      ("SELECT product, length, AVG(price), MIN(price), MAX(price), COUNT(*) FROM rl_prices WHERE region=? "
+       "GROUP BY product, length", ('west',)),
+      ("SELECT date FROM rl_prices WHERE region=? GROUP BY date HAVING COUNT(*) >= 10", ('west',)),
+      ("SELECT date, product, length, price FROM rl_prices WHERE region=? ORDER BY date", ('west',))]),
+    ('backfill', '/api/rl/backfill',
+     [("SELECT date, region, product, price FROM rl_prices WHERE length='RL' AND product IN "
+       "('2x4#2','2x6#2','2x8#2','2x10#2','2x12#2','2x4#1','2x6#1') ORDER BY date", ())]),
+    ('seasonal', '/api/forecast/seasonal?product=2x4%232&region=west',
+     [(SERIES_SQL, ('2x4#2', 'west', 'RL', FIVE_YR))]),
+    ('shortterm', '/api/forecast/shortterm?product=2x4%232&region=west',
+     [(SERIES_SQL, ('2x4#2', 'west', 'RL', TWO_YR)), (SERIES_SQL, ('2x4#2', 'west', 'RL', FIVE_YR))]),
+    ('regime', '/api/intelligence/regime?region=west&product=2x4%232',
+     [(SERIES_SQL, ('2x4#2', 'west', 'RL', DAYS_120))]),
+    ('spread-signals', '/api/intelligence/spread-signals?region=west',
+     [("SELECT region, date, product, length, price FROM rl_prices WHERE region IN ('west','central','east') "
+       "AND date>=?", (FIVE_YR,))]),
+]
+
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_sql(queries):
+    conn = app.get_mi_db()
+    for sql, params in queries:
+        conn.execute(sql, params).fetchall()
+    conn.close()
+
+
+def check_series(store):
+    """Every series in the store matches rl_prices row for row."""
+    conn = app.get_mi_db()
+    rows = conn.execute("SELECT region, product, length, date, price FROM rl_prices "
+                        "ORDER BY region, product, length, date").fetchall()
+    conn.close()
+    flat = [(k[0], k[1], k[2], d, p) for k, s in store.series.items() for d, p in s.slice()]
+    return [tuple(r) for r in rows] == flat
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--repeat', type=int, default=5)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app.MI_DB_PATH = os.path.join(tmp, 'mi.db')
+        app.init_mi_db()
+        app.seed_rl_from_csv()
+
+        conn = app.get_mi_db()
+        build_t = best_of(lambda: RLPriceStore.from_db(conn), args.repeat)
+        tracemalloc.start()
+        store = RLPriceStore.from_db(conn)
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        conn.close()
+        stats = store.stats()
+        print(f"store: {stats['rows']} rows, {stats['series']} series, {stats['dates']} dates; "
+              f"built in {build_t * 1000:.0f}ms")
+        print(f"memory: retained {retained / 1e6:.1f}MB (arrays {stats['array_bytes'] / 1e6:.1f}MB), "
+              f"peak while loading {peak / 1e6:.1f}MB")
+        print(f"store matches rl_prices: {check_series(store)}")
+
+        app.get_rl_store()
+        client = app.app.test_client()
+
+        def request(url):
+            app._rl_cache.clear()
+            resp = client.get(url)
+            assert resp.status_code == 200, (url, resp.status_code)
+
+        print(f"\n{'endpoint':<16} {'SQL reads (ms)':>15} {'request from store (ms)':>23}")
+        for name, url, queries in CASES:
+            sql_t = best_of(lambda: run_sql(queries), args.repeat)
+            req_t = best_of(lambda: request(url), args.repeat)
+            print(f"{name:<16} {sql_t * 1000:>15.1f} {req_t * 1000:>23.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""
+Benchmark: spread-signal rank engine vs the quadratic percentile loop.
+
+The implementation /api/intelligence/spread-signals used before
+compute_spread_signals() is kept below as the reference: a count over the whole
+series for every point's percentile and one extra rl_prices read per other
+region for zone spreads. Both run on the full data/rl_prices.csv.gz history
+loaded into a scratch database; payloads are compared per region and type.
+
+Usage: python scripts/bench_spread_signals.py [--repeat 3]
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import app  # noqa: E402
+app.wait_until_ready()  # background seed must finish before the DB paths are repointed
+
+
+def _load(conn, region, five_yr_ago):
+    return conn.execute(
+        """SELECT date, product, length, price FROM rl_prices
+           WHERE region=? AND date>=? ORDER BY date""",
+        (region, five_yr_ago)
+    ).fetchall()
+
+
+def legacy_spread_signals(region, spread_type='all'):
+    """Previous implementation (O(n^2) percentile loop, per-region reloads)."""
+    conn = app.get_mi_db()
+    try:
+        five_yr_ago = (datetime.now() - timedelta(days=5*365)).strftime('%Y-%m-%d')
+        rows = _load(conn, region, five_yr_ago)
+    finally:
+        conn.close()
+
+    date_counts = Counter(r['date'] for r in rows)
+    complete_dates = set(d for d, c in date_counts.items() if c >= 10)
+    hist = {}
+    for r in rows:
+        if r['date'] not in complete_dates:
+            continue
+        hist.setdefault((r['product'], r['length']), {})[r['date']] = r['price']
+
+    all_dates = sorted(complete_dates)
+    if not all_dates:
+        return {'signals': [], 'signalCount': 0, 'region': region}
+    latest_dt = all_dates[-1]
+    regime_data = app.get_rl_cached(f"regime_{region}_2x4#2")
+    current_regime = regime_data['regime'] if regime_data else 'Unknown'
+
+    signals = []
+    EXTREME_LOW = 10
+    EXTREME_HIGH = 90
+
+    def _check_spread(name, key_a, key_b, spread_category):
+        if key_a not in hist or key_b not in hist:
+            return
+        hist_a = hist[key_a]
+        hist_b = hist[key_b]
+        if latest_dt not in hist_a or latest_dt not in hist_b:
+            return
+        current = round(hist_a[latest_dt] - hist_b[latest_dt], 2)
+        common = sorted(set(hist_a.keys()) & set(hist_b.keys()))
+        if len(common) < 20:
+            return
+        hist_vals = [(d, hist_a[d] - hist_b[d]) for d in common]
+        vals = [v for _, v in hist_vals]
+        avg_s = round(sum(vals) / len(vals), 2)
+        pct = round(sum(1 for v in vals if v <= current) / len(vals) * 100)
+        if pct > EXTREME_LOW and pct < EXTREME_HIGH:
+            return
+        bucket_low = 0 if pct <= EXTREME_LOW else 90
+        bucket_high = 10 if pct <= EXTREME_LOW else 100
+        revert_count = 0
+        total_instances = 0
+        for i, (d, s) in enumerate(hist_vals):
+            rank = sum(1 for v in vals if v <= s) / len(vals) * 100
+            if rank >= bucket_low and rank <= bucket_high:
+                total_instances += 1
+                look_ahead = min(i + 5, len(hist_vals) - 1)
+                if look_ahead > i:
+                    future_s = hist_vals[look_ahead][1]
+                    if pct <= EXTREME_LOW and future_s > s:
+                        revert_count += 1
+                    elif pct >= EXTREME_HIGH and future_s < s:
+                        revert_count += 1
+        reversion_prob = round((revert_count / total_instances) * 100) if total_instances > 5 else None
+        direction = 'narrow' if abs(current) > abs(avg_s) else 'widen'
+        if pct <= EXTREME_LOW:
+            context = f"{name} spread is at {pct}th percentile (historically low)."
+            if reversion_prob:
+                context += f" {reversion_prob}% chance of reverting within 4 weeks."
+            actionable = f"Spread likely to {direction}. Watch for mean-reversion opportunity."
+        else:
+            context = f"{name} spread is at {pct}th percentile (historically high)."
+            if reversion_prob:
+                context += f" {reversion_prob}% chance of reverting within 4 weeks."
+            actionable = f"Spread likely to {direction}. Consider position adjustment."
+        decay_c = math.log(2) / 180
+        latest_ord = datetime.strptime(latest_dt, '%Y-%m-%d').toordinal()
+        w_sum = 0.0; w_total = 0.0
+        for d, s in hist_vals:
+            age = latest_ord - datetime.strptime(d, '%Y-%m-%d').toordinal()
+            w = math.exp(-decay_c * age)
+            w_sum += w * s; w_total += w
+        wavg = round(w_sum / w_total, 2) if w_total > 0 else avg_s
+        signals.append({
+            'spread': name, 'category': spread_category, 'current': current, 'avg': avg_s,
+            'wavg': wavg, 'percentile': pct, 'direction': direction, 'reversionProb': reversion_prob,
+            'regime': current_regime, 'context': context, 'actionable': actionable, 'n': len(common)
+        })
+
+    if spread_type in ('dimension', 'all'):
+        for dim in ['2x6', '2x8', '2x10', '2x12']:
+            _check_spread(f"{dim} vs 2x4", (f"{dim}#2", 'RL'), ('2x4#2', 'RL'), 'dimension')
+    if spread_type in ('length', 'all'):
+        for prod in ['2x4#2', '2x6#2']:
+            for ln in ['8', '10', '12', '14', '20']:
+                if (prod, ln) in hist and (prod, '16') in hist:
+                    _check_spread(f"{prod} {ln}' vs 16'", (prod, ln), (prod, '16'), 'length')
+    if spread_type in ('grade', 'all'):
+        for dim in ['2x4', '2x6', '2x8', '2x10', '2x12']:
+            _check_spread(f"{dim}#1 vs {dim}#2", (f"{dim}#1", 'RL'), (f"{dim}#2", 'RL'), 'grade')
+    if spread_type in ('zone', 'all'):
+        zone_hist = {region: hist}
+        for oreg in [r for r in ['west', 'central', 'east'] if r != region]:
+            conn2 = app.get_mi_db()
+            try:
+                orows = _load(conn2, oreg, five_yr_ago)
+            finally:
+                conn2.close()
+            oh = {}
+            for r in orows:
+                if r['date'] in complete_dates:
+                    oh.setdefault((r['product'], r['length']), {})[r['date']] = r['price']
+            zone_hist[oreg] = oh
+        for prod in ['2x4#2', '2x6#2', '2x4#3', '2x6#3', '2x10#2', '2x4 MSR', '2x6 MSR']:
+            for reg_a, reg_b in [('west', 'central'), ('west', 'east'), ('central', 'east')]:
+                h_a = zone_hist.get(reg_a, {})
+                h_b = zone_hist.get(reg_b, {})
+                if (prod, 'RL') not in h_a or (prod, 'RL') not in h_b:
+                    continue
+                fake_a = (f"_zone_{reg_a}_{prod}", 'RL')
+                fake_b = (f"_zone_{reg_b}_{prod}", 'RL')
+                hist[fake_a] = h_a[(prod, 'RL')]
+                hist[fake_b] = h_b[(prod, 'RL')]
+                _check_spread(f"{prod} {reg_a.title()} vs {reg_b.title()}", fake_a, fake_b, 'zone')
+                del hist[fake_a]
+                del hist[fake_b]
+
+    signals.sort(key=lambda s: min(s['percentile'], 100 - s['percentile']))
+    return {'signals': signals, 'signalCount': len(signals), 'region': region,
+            'regime': current_regime, 'asOf': latest_dt}
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app.MI_DB_PATH = os.path.join(tmp, 'mi.db')
+        app.init_mi_db()
+        t0 = time.perf_counter()
+        app.seed_rl_from_csv()
+        print(f"loaded data/rl_prices.csv.gz in {time.perf_counter() - t0:.1f}s")
+
+        print(f"{'region':<8} {'type':<10} {'before (ms)':>12} {'after (ms)':>11} {'speedup':>8} {'signals':>8}  identical")
+        for region in ('west', 'central', 'east'):
+            for spread_type in ('all', 'zone', 'length'):
+                old_t, old = timed(lambda: legacy_spread_signals(region, spread_type), args.repeat)
+                new_t, new = timed(lambda: app.compute_spread_signals(region, spread_type), args.repeat)
+                same = json.dumps(old, sort_keys=True) == json.dumps(new, sort_keys=True)
+                print(f"{region:<8} {spread_type:<10} {old_t * 1000:>12.1f} {new_t * 1000:>11.1f} "
+                      f"{old_t / new_t:>7.1f}x {new['signalCount']:>8}  {same}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark: rl_prices seeding and cold start of app.py.
+
+Seed only (in-process, fresh database each run):
+  legacy    csv.DictReader into one list, executemany with all indexes live
+            (the loader before bulk_load_rl, kept below as the reference)
+  csv       iter_rl_csv chunks + bulk_load_rl (pragmas, deferred indexes)
+  snapshot  bulk_load_rl attaching a prebuilt snapshot
+Cold start (subprocess, scratch MI/CRM databases): `import app` (worker boot,
+when it can start answering /health/live) and app.wait_until_ready() (background
+seeding done, /health/ready is 200):
+  csv       no database, no snapshot: parse the CSV
+  snapshot  no database, snapshot present: copy it into place
+  warm      database already migrated and seeded (every worker after the first)
+
+Usage: python scripts/bench_startup.py [--repeat 3]
+"""
+import argparse
+import csv
+import gzip
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+import app  # noqa: E402
+app.wait_until_ready()  # background seed must finish before the DB paths are repointed
+from build_rl_snapshot import build  # noqa: E402
+
+
+def legacy_seed(csv_path):
+    rows = []
+    with gzip.open(csv_path, 'rt') as f:
+        for row in csv.DictReader(f):
+            try:
+                price = float(row['price'])
+                if price <= 0:
+                    continue
+                rows.append((row['date'], row['region'], row['product'], row['length'], price))
+            except (ValueError, KeyError):
+                continue
+    conn = app.get_mi_db()
+    conn.executemany("INSERT OR IGNORE INTO rl_prices (date, region, product, length, price) VALUES (?,?,?,?,?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def fast_csv_seed(csv_path):
+    conn = app.get_rl_load_db()
+    app.bulk_load_rl(conn, app.iter_rl_csv(csv_path))
+    conn.close()
+
+
+def snapshot_seed(snap):
+    conn = app.get_rl_load_db()
+    app.bulk_load_rl(conn, attach=snap)
+    conn.close()
+
+
+def time_seed(fn, arg, repeat):
+    best = None
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            app.MI_DB_PATH = os.path.join(tmp, 'mi.db')
+            app.init_mi_db()
+            t0 = time.perf_counter()
+            fn(arg)
+            elapsed = time.perf_counter() - t0
+            conn = app.get_mi_db()
+            n = conn.execute("SELECT COUNT(*) FROM rl_prices").fetchone()[0]
+            conn.close()
+        best = elapsed if best is None else min(best, elapsed)
+    return best, n
+
+
+def cold_start(tmp, snapshot):
+    env = dict(os.environ, MI_DB_PATH=os.path.join(tmp, 'mi.db'), CRM_DB_PATH=os.path.join(tmp, 'crm.db'),
+               RL_SNAPSHOT_PATH=snapshot)
+    code = ("import time; t = time.perf_counter(); import app; b = time.perf_counter() - t; "
+            "app.wait_until_ready(); print(b, time.perf_counter() - t)")
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    boot, ready = out.stdout.strip().splitlines()[-1].split()
+    return float(boot), float(ready)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as work:
+        snap = os.path.join(work, 'rl_prices.sqlite')
+        build(snap)
+        print(f"snapshot: {os.path.getsize(snap) / 1e6:.1f}MB, CSV: {os.path.getsize(app.RL_CSV_PATH) / 1e6:.1f}MB")
+
+        print(f"\n{'seed':<10} {'seconds':>8} {'rows':>8}")
+        for name, fn, arg in (('legacy', legacy_seed, app.RL_CSV_PATH), ('csv', fast_csv_seed, app.RL_CSV_PATH),
+                              ('snapshot', snapshot_seed, snap)):
+            t, n = time_seed(fn, arg, args.repeat)
+            print(f"{name:<10} {t:>8.2f} {n:>8}")
+
+        print(f"\n{'cold start':<10} {'boot (s)':>9} {'ready (s)':>10}")
+        missing = os.path.join(work, 'no-snapshot.sqlite')
+        for name, snapshot, reuse in (('csv', missing, False), ('snapshot', snap, False), ('warm', snap, True)):
+            best = None
+            for _ in range(args.repeat):
+                with tempfile.TemporaryDirectory() as tmp:
+                    if reuse:
+                        cold_start(tmp, snapshot)
+                    t = cold_start(tmp, snapshot)
+                best = t if best is None else min(best, t)
+            print(f"{name:<10} {best[0]:>9.2f} {best[1]:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: concurrent small writes, per-request connections vs the CRM write queue.
+
+  legacy   each write opens its own connection, INSERTs one audit_log row and commits,
+           as _log_audit did before write_queue.py (kept below)
+  queued   each write is a unit on a WriteQueue over the same database, group-committed
+--threads writers each do --writes rows against a scratch copy of the CRM schema. Reports
+throughput, per-write latency percentiles and 'database is locked' failures.
+
+Usage: python scripts/bench_write_queue.py [--threads 50] [--writes 40] [--busy-timeout 10]
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import app  # noqa: E402
+app.wait_until_ready()  # keep the background seed out of the timings
+from write_queue import WriteQueue  # noqa: E402
+
+INSERT = "INSERT INTO audit_log (user, action, entity_type, entity_id, details) VALUES (?,?,?,?,?)"
+
+
+def legacy_write(path, timeout, i):
+    conn = sqlite3.connect(path, timeout=timeout)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(INSERT, ('bench', 'bench', 'trade', str(i), 'legacy'))
+    conn.commit()
+    conn.close()
+
+
+def run(write, threads, writes):
+    latencies, errors = [], []
+    start = threading.Barrier(threads)
+
+    def worker(t):
+        start.wait()
+        for n in range(writes):
+            t0 = time.perf_counter()
+            try:
+                write(t * writes + n)
+            except sqlite3.OperationalError as e:
+                errors.append(str(e))
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for th in pool:
+        th.start()
+    for th in pool:
+        th.join()
+    return time.perf_counter() - t0, sorted(latencies), errors
+
+
+def report(label, elapsed, latencies, errors):
+    p95 = latencies[int(0.95 * (len(latencies) - 1))] * 1000
+    print(f"{label:<8} {len(latencies) / elapsed:>8.0f} writes/s   p50 {statistics.median(latencies) * 1000:>7.2f}ms   "
+          f"p95 {p95:>7.2f}ms   locked errors {sum('locked' in e for e in errors)}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--threads', type=int, default=50)
+    ap.add_argument('--writes', type=int, default=40)
+    ap.add_argument('--busy-timeout', type=float, default=10,
+                    help='legacy connections\' busy timeout in seconds (get_crm_db uses 10)')
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        real = app.CRM_DB_PATH
+        app.CRM_DB_PATH = os.path.join(tmp, 'crm.db')
+        try:
+            app.init_crm_db()
+            path = app.CRM_DB_PATH
+            report('legacy', *run(lambda i: legacy_write(path, args.busy_timeout, i), args.threads, args.writes))
+            queue = WriteQueue(lambda: app.get_crm_db(), 'bench')
+            report('queued', *run(lambda i: queue.execute(
+                lambda conn: conn.execute(INSERT, ('bench', 'bench', 'trade', str(i), 'queued'))),
+                args.threads, args.writes))
+            stats = queue.stats()
+            print(f"queue: {stats['batches']} commits, avg batch {stats['avg_batch']}, max depth {stats['max_depth']}, "
+                  f"commit ms {stats['commit_ms']}")
+        finally:
+            app.CRM_DB_PATH = real
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Build data/rl_prices.sqlite: an MI database (current schema) already holding the
+rl_prices seed from data/rl_prices.csv.gz, tagged with the CSV's SHA-1.
+
+On a cold start with no MI database, app.py copies this file into place instead
+of parsing the CSV (restore_mi_from_snapshot); if the database exists but
+rl_prices is empty, the snapshot is attached and copied table to table. A
+snapshot built from a different CSV is ignored. Run it in the deploy build step
+or after updating the CSV.
+
+Usage: python scripts/build_rl_snapshot.py [--out data/rl_prices.sqlite]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import app  # noqa: E402
+app.wait_until_ready()  # background seed must finish before the DB paths are repointed
+
+
+def build(out):
+    tmp = f"{out}.{os.getpid()}.tmp"
+    for path in (tmp, tmp + '-wal', tmp + '-shm'):
+        if os.path.exists(path):
+            os.remove(path)
+    app.MI_DB_PATH = tmp
+    app.init_mi_db()
+    conn = app.get_rl_load_db()
+    rows = app.bulk_load_rl(conn, app.iter_rl_csv(app.RL_CSV_PATH))
+    conn.execute("CREATE TABLE IF NOT EXISTS rl_snapshot (csv_sha1 TEXT, rows INTEGER, built_at TEXT)")
+    conn.execute("DELETE FROM rl_snapshot")
+    conn.execute("INSERT INTO rl_snapshot VALUES (?, ?, datetime('now'))", (app.file_sha1(app.RL_CSV_PATH), rows))
+    conn.commit()
+    conn.close()
+    # One self-contained file: fold the WAL back in and compact
+    conn = sqlite3.connect(tmp)
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.execute("VACUUM")
+    conn.close()
+    os.replace(tmp, out)
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--out', default=app.RL_SNAPSHOT_PATH)
+    args = ap.parse_args()
+    t0 = time.perf_counter()
+    rows = build(args.out)
+    print(f"wrote {args.out}: {rows} RL prices, {os.path.getsize(args.out) / 1e6:.1f}MB "
+          f"in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
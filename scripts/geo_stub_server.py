@@ -0,0 +1,118 @@
+"""
+Local Nominatim + OSRM stub for tests and benchmarks.
+
+Serves the three endpoints app.py uses:
+  /search?q=...                              Nominatim: deterministic coords per place name
+  /route/v1/driving/lon,lat;lon,lat          OSRM route: one distance
+  /table/v1/driving/lon,lat;...?sources=&destinations=&annotations=distance
+Distances are great-circle meters x 1.25 (a typical road factor), so results
+are stable and the route and table services agree. An optional per-request
+latency models the public servers. Request counts are kept per service.
+
+Usage: python scripts/geo_stub_server.py [--port 5999] [--latency 0.05]
+       then NOMINATIM_URL=OSRM_URL=http://127.0.0.1:5999 gunicorn app:app ...
+"""
+import argparse
+import hashlib
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+ROAD_FACTOR = 1.25
+
+
+def place_coords(name):
+    """Deterministic point inside the US South for a place name."""
+    h = hashlib.sha1(name.lower().strip().encode()).digest()
+    lat = 29.0 + (h[0] * 256 + h[1]) / 65535 * 8.0
+    lon = -100.0 + (h[2] * 256 + h[3]) / 65535 * 20.0
+    return round(lat, 4), round(lon, 4)
+
+
+def road_meters(a, b):
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(h)) * ROAD_FACTOR
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = 'GeoStub/1.0'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        stub = self.server
+        if stub.latency:
+            time.sleep(stub.latency)
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if url.path == '/search':
+            stub.count('search')
+            q = query.get('q', [''])[0]
+            if q.lower().startswith('nowhere'):
+                return self._send([])
+            lat, lon = place_coords(q)
+            return self._send([{'lat': str(lat), 'lon': str(lon), 'type': 'city', 'display_name': q}])
+        for service in ('route', 'table'):
+            prefix = f'/{service}/v1/driving/'
+            if url.path.startswith(prefix):
+                stub.count(service)
+                points = [tuple(map(float, p.split(',')))[::-1] for p in unquote(url.path[len(prefix):]).split(';')]
+                if service == 'route':
+                    return self._send({'code': 'Ok', 'routes': [{'distance': road_meters(points[0], points[1])}]})
+                sources = [int(i) for i in query['sources'][0].split(';')] if 'sources' in query else range(len(points))
+                dests = [int(i) for i in query['destinations'][0].split(';')] if 'destinations' in query else range(len(points))
+                return self._send({'code': 'Ok', 'distances': [
+                    [road_meters(points[s], points[d]) for d in dests] for s in sources]})
+        self._send({'code': 'InvalidUrl'}, 400)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, latency=0.0):
+        super().__init__(addr, StubHandler)
+        self.latency = latency
+        self.requests = {'search': 0, 'route': 0, 'table': 0}
+        self._lock = threading.Lock()
+
+    def count(self, service):
+        with self._lock:
+            self.requests[service] += 1
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+
+def start_stub_server(port=0, latency=0.0):
+    """Start the stub on a background thread; returns the server (see .url, .requests, .shutdown())."""
+    server = StubServer(('127.0.0.1', port), latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--port', type=int, default=5999)
+    ap.add_argument('--latency', type=float, default=0.0)
+    args = ap.parse_args()
+    server = StubServer(('127.0.0.1', args.port), args.latency)
+    print(f'geo stub listening on {server.url}')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
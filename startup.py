@@ -0,0 +1,112 @@
+"""
+Startup orchestration for SYP Analytics
+process_lock: exclusive flock on a lock file, shared by every gunicorn worker,
+so migrations and seeding run in one process at a time.
+StartupTracker: named phases with timings, a background runner for the slow
+ones, and the ready/failed state reported by /health/ready.
+RunOnce: defers a warm-up to its first use and runs it until it succeeds once per process.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows dev box): single process, the lock is a no-op
+    fcntl = None
+
+
+@contextmanager
+def process_lock(path):
+    """Hold an exclusive lock on path (created if missing) for the duration of the block."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+class StartupTracker:
+    """Phase timings for this process; ready once the background phases have finished."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.state = 'starting'
+        self.phases = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block as a phase; the block may set entry['status'] (e.g. 'skipped')."""
+        entry = {'name': name, 'status': 'running', 'seconds': None, 'error': None}
+        with self._lock:
+            self.phases.append(entry)
+        t0 = time.perf_counter()
+        try:
+            yield entry
+        except Exception as e:
+            entry['status'] = 'failed'
+            entry['error'] = f"{type(e).__name__}: {e}"
+            raise
+        else:
+            if entry['status'] == 'running':
+                entry['status'] = 'done'
+        finally:
+            entry['seconds'] = round(time.perf_counter() - t0, 3)
+            print(f"[Startup] {name}: {entry['status']} in {entry['seconds']:.2f}s")
+
+    def run(self, name, fn):
+        with self.phase(name):
+            return fn()
+
+    def start_background(self, fn):
+        """Run fn on a daemon thread; the process is ready when it returns, failed if it raises."""
+        def target():
+            try:
+                fn()
+                self.state = 'ready'
+            except Exception as e:
+                self.state = 'failed'
+                print(f"[Startup] failed: {type(e).__name__}: {e}")
+            finally:
+                self._done.set()
+        thread = threading.Thread(target=target, name='startup', daemon=True)
+        thread.start()
+        return thread
+
+    def wait(self, timeout=None):
+        """Block until the background phases finish; True if startup succeeded."""
+        self._done.wait(timeout)
+        return self.state == 'ready'
+
+    def snapshot(self):
+        with self._lock:
+            phases = [dict(p) for p in self.phases]
+        return {'state': self.state, 'pid': os.getpid(), 'uptime_s': round(time.time() - self.started, 3),
+                'phases': phases}
+
+
+class RunOnce:
+    """Call fn the first time this is called; once it has returned, later calls return False
+    immediately. If fn raises, the exception propagates and the next call tries again."""
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.done = False
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        if self.done:
+            return False
+        with self._lock:
+            if self.done:
+                return False
+            self.fn()
+            self.done = True
+        return True
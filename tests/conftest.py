@@ -4,5 +4,59 @@ Pytest fixtures for SYP Analytics backend tests.
 import sys
 import os
 
+import pytest
+
 # Add project root to path so we can import app
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Tests drive the job scheduler with explicit tick() calls instead of its polling thread
+os.environ.setdefault('SCHEDULER_ENABLED', '0')
+
+
+@pytest.fixture(scope='session', autouse=True)
+def app_started():
+    """Let app's background startup seeding finish before tests repoint MI_DB_PATH/CRM_DB_PATH."""
+    import app
+    assert app.wait_until_ready(timeout=120)
+
+
+@pytest.fixture
+def tmp_dbs(tmp_path, monkeypatch):
+    """Fresh CRM and MI databases under tmp_path with app pointed at them; yields tmp_path.
+    This process's geo/distance and response caches are emptied before and after, so no
+    entry outlives the databases it was read from."""
+    import app
+
+    def clear_caches():
+        app.geo_cache.clear()
+        app.distance_cache.clear()
+        for cache in app._response_caches.values():
+            cache.clear()
+
+    monkeypatch.setattr(app, 'CRM_DB_PATH', str(tmp_path / 'crm.db'))
+    monkeypatch.setattr(app, 'MI_DB_PATH', str(tmp_path / 'mi.db'))
+    app.init_crm_db()
+    app.init_mi_db()
+    clear_caches()
+    yield tmp_path
+    clear_caches()
+
+
+@pytest.fixture
+def client(tmp_dbs, monkeypatch):
+    """Flask test client over tmp_dbs; quote intake doesn't geocode new mills."""
+    import app
+    monkeypatch.setattr(app, 'mi_geocode_location', lambda loc: None)
+    return app.app.test_client()
+
+
+@pytest.fixture
+def mi_conn(tmp_dbs):
+    """MI connection on tmp_dbs with Canfor, West Fraser and Interfor as mills 1-3."""
+    import app
+    conn = app.get_mi_db()
+    for i, name in enumerate(['Canfor', 'West Fraser', 'Interfor'], start=1):
+        conn.execute("INSERT INTO mills (id, name) VALUES (?, ?)", (i, name))
+    conn.commit()
+    yield conn
+    conn.close()
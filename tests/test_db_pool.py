@@ -0,0 +1,117 @@
+"""
+Tests for the per-thread SQLite connection pool (db_pool.ConnectionPool).
+"""
+import os
+import sqlite3
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_pool import ConnectionPool
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / 'pool.db')
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+class TestConnectionPool:
+
+    def test_close_resets_and_returns_connection(self, db):
+        pool = ConnectionPool(max_idle=2)
+        conn = pool.connect(db)
+        conn.isolation_level = None
+        conn.row_factory = None
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("INSERT INTO t VALUES (1)")       # left uncommitted
+        conn.set_trace_callback(print)
+        conn.close()
+
+        again = pool.connect(db)
+        assert again is conn
+        assert again.isolation_level == '' and again.row_factory is sqlite3.Row
+        assert again.execute("SELECT COUNT(*) AS n FROM t").fetchone()['n'] == 0
+        again.execute("CREATE TEMP TABLE scratch (y)")  # session state: not handed out again
+        again.close()
+        assert pool.connect(db) is not conn
+
+        conns = [pool.connect(db) for _ in range(4)]
+        for c in conns:
+            c.close()
+        assert pool.stats()['idle_this_thread'] == 2
+
+    def test_readonly_connections_and_transactions(self, db):
+        pool = ConnectionPool()
+        with pool.transaction(db, immediate=True) as conn:
+            conn.execute("INSERT INTO t VALUES (1)")
+            # a read-only connection reads the last commit while the write lock is held
+            ro = pool.connect(db, readonly=True)
+            assert ro.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+            with pytest.raises(sqlite3.OperationalError):
+                ro.execute("INSERT INTO t VALUES (2)")
+            ro.close()
+        with pytest.raises(ZeroDivisionError):
+            with pool.transaction(db) as conn:
+                conn.execute("INSERT INTO t VALUES (3)")
+                1 / 0
+        conn = pool.connect(db, readonly=True)
+        assert [r[0] for r in conn.execute("SELECT x FROM t")] == [1]
+        conn.close()
+        stats = pool.stats()
+        assert stats['readonly_opened'] == 1 and stats['in_use'] == 0
+
+    def test_per_thread_and_replaced_files(self, db, tmp_path):
+        pool = ConnectionPool()
+        main = pool.connect(db)
+        main.close()
+        seen = []
+
+        def worker():
+            conn = pool.connect(db)
+            seen.append(conn)
+            conn.execute("SELECT 1").fetchone()
+            conn.close()
+
+        t = threading.Thread(target=worker)
+        t.start()
+        t.join()
+        assert seen[0] is not main
+
+        # A database file swapped in under the same path gets a fresh connection
+        other = str(tmp_path / 'other.db')
+        conn = sqlite3.connect(other)
+        conn.execute("CREATE TABLE u (y)")
+        conn.commit()
+        conn.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db + suffix):
+                os.remove(db + suffix)
+        os.replace(other, db)
+        conn = pool.connect(db)
+        assert conn is not main
+        assert conn.execute("SELECT name FROM sqlite_master").fetchone()[0] == 'u'
+        conn.close()
+
+    def test_repeated_close_keeps_pooled_connection_open(self, db):
+        pool = ConnectionPool()
+        conn = pool.connect(db)
+        conn.close()
+        conn.close()        # e.g. closed on both the success and the except path
+        again = pool.connect(db)
+        assert again is conn
+        assert again.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+        again.close()
+
+        detached = pool.connect(db).detach()
+        detached.close()
+        with pytest.raises(sqlite3.ProgrammingError):
+            detached.execute("SELECT 1")
@@ -0,0 +1,87 @@
+"""
+Tests for the SQLite performance profiles (db_pool.resolve_profile, load_db_profiles,
+/api/db/profile).
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from db_pool import ConnectionPool, PROFILES, resolve_profile, effective_pragmas
+
+
+@pytest.fixture
+def client(tmp_dbs, monkeypatch):
+    monkeypatch.setattr(app, '_db_profiles', app._db_profiles)   # restored after load_db_profiles() swaps it
+    app.load_db_profiles()
+    return app.app.test_client()
+
+
+class TestDBProfile:
+
+    def test_environment_beats_settings_beats_preset(self):
+        settings = {'db_profile.mi': 'low-memory', 'db_profile.mi.cache_size': '-8000',
+                    'db_profile.mi.temp_store': 'memory', 'db_profile.crm.synchronous': 'sometimes'}
+        env = {'MI_DB_CACHE_SIZE': '-16000', 'MI_DB_MMAP_SIZE': 'lots', 'CRM_DB_PROFILE': 'default'}
+        mi = resolve_profile('mi', settings, env)
+        assert mi['profile'] == 'low-memory' and mi['profile_source'] == 'settings'
+        assert mi['pragmas'] == dict(PROFILES['low-memory'], cache_size=-16000, temp_store='MEMORY')
+        assert mi['sources']['cache_size'] == 'env' and mi['sources']['temp_store'] == 'settings'
+        assert len(mi['errors']) == 1 and 'mmap_size' in mi['errors'][0]
+        crm = resolve_profile('crm', settings, env)
+        assert crm['profile'] == 'default' and crm['pragmas'] == PROFILES['default']
+        assert len(crm['errors']) == 1 and 'synchronous' in crm['errors'][0]
+        assert resolve_profile('crm', {}, {})['profile'] == 'production'
+
+    def test_pool_applies_profile_and_follows_changes(self, tmp_path):
+        path = str(tmp_path / 'p.db')
+        profiles = {'p': resolve_profile('mi', {}, {})}
+        pool = ConnectionPool(profile=lambda _: profiles['p'])
+        for readonly in (False, True):
+            conn = pool.connect(path, readonly)
+            got = effective_pragmas(conn)
+            conn.close()
+            assert {k: got[k] for k in PROFILES['production']} == PROFILES['production']
+
+        profiles['p'] = resolve_profile('mi', {'db_profile.mi': 'default'}, {})
+        conn = pool.connect(path)      # the idle connection is reused with the new profile
+        got = effective_pragmas(conn)
+        conn.close()
+        assert pool.stats()['opened'] == 2
+        assert {k: got[k] for k in PROFILES['default']} == PROFILES['default']
+
+    def test_attached_database_gets_its_own_profile(self, tmp_path):
+        main, other = str(tmp_path / 'main.db'), str(tmp_path / 'other.db')
+        profiles = {main: resolve_profile('mi', {}, {}),
+                    other: resolve_profile('crm', {'db_profile.crm': 'low-memory', 'db_profile.crm.cache_size': '-4000'}, {})}
+        pool = ConnectionPool(profile=profiles.get)
+        conn = pool.connect(main, attach=(('crm', other),))
+        main_got, crm_got = effective_pragmas(conn), effective_pragmas(conn, 'crm')
+        conn.close()
+        assert main_got['cache_size'] == -32768 and main_got['synchronous'] == 'NORMAL'
+        assert (crm_got['cache_size'], crm_got['synchronous'], crm_got['mmap_size']) == (-4000, 'NORMAL', 0)
+
+        profiles[other] = resolve_profile('crm', {'db_profile.crm': 'default'}, {})
+        conn = pool.connect(main, attach=(('crm', other),))     # reused, the alias follows its profile
+        crm_got = effective_pragmas(conn, 'crm')
+        conn.close()
+        assert pool.stats()['opened'] == 1
+        assert (crm_got['cache_size'], crm_got['synchronous']) == (-2000, 'FULL')
+
+    def test_diagnostics_endpoint_reports_settings_changes(self, client):
+        body = client.get('/api/db/profile').get_json()
+        for db in ('crm', 'mi'):
+            info = body['databases'][db]
+            assert info['profile'] == 'production' and info['errors'] == []
+            assert {k: info['effective'][k] for k in info['configured']} == info['configured']
+            assert info['effective']['journal_mode'] == 'wal'
+
+        resp = client.put('/api/mi/settings', json={'db_profile.crm': 'low-memory', 'db_profile.crm.cache_size': -4000})
+        assert resp.status_code == 200
+        crm = client.get('/api/db/profile').get_json()['databases']['crm']
+        assert crm['profile'] == 'low-memory' and crm['sources']['cache_size'] == 'settings'
+        assert crm['effective']['cache_size'] == -4000 and crm['effective']['temp_store'] == 'FILE'
+        assert client.get('/api/db/profile').get_json()['databases']['mi']['profile'] == 'production'
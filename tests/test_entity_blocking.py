@@ -0,0 +1,123 @@
+"""
+Tests for the entity candidate-blocking index (entity_resolution.CandidateIndex).
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from entity_resolution import EntityResolver, CandidateIndex, compute_score, THRESH_AUTO, THRESH_REVIEW
+
+CUSTOMERS = [f"{a} {b} {c}" for a in ('Smith', 'Delta', 'Acme', 'Southern', 'Gulf', 'Piedmont')
+             for b in ('Truss', 'Builders', 'Homes', 'Framing') for c in ('Inc', 'LLC', '& Sons', 'Supply')]
+
+WORDS = ['Pine', 'Southern', 'Timber', 'River', 'Delta', 'Piney', 'Creek', 'Valley', 'Ridge', 'Bayou',
+         'Forest', 'Lumber', 'Mill', 'Wood', 'Products', 'Gulf', 'Coastal', 'Hill']
+CITIES = ['DeQuincy', 'Fulton', 'Gurdon', 'Huttig', 'Monroeville', 'Troy', 'Weldon', 'Brooklet', 'Ruston']
+
+
+@pytest.fixture
+def resolver(tmp_dbs):
+    res = EntityResolver(app.CRM_DB_PATH, app.MILL_COMPANY_ALIASES)
+    conn = res._get_conn()
+    for name in app.MILL_DIRECTORY:
+        res.create_entity(conn, 'mill', name)
+    for name in CUSTOMERS:
+        res.create_entity(conn, 'customer', name)
+    conn.commit()
+    conn.close()
+    return res
+
+
+def brute_force(res, name, entity_type, aliases=True):
+    """The full scan resolve() (and, without aliases, search()) did before blocking."""
+    conn = res._get_conn()
+    best = None
+    for entity in conn.execute("SELECT * FROM entity_canonical WHERE type=?", (entity_type,)).fetchall():
+        score = compute_score(name, entity['canonical_name'], entity_type, res.mill_company_aliases)
+        variants = conn.execute("SELECT variant FROM entity_alias WHERE canonical_id=?",
+                                (entity['canonical_id'],)).fetchall() if aliases else []
+        for a in variants:
+            score = max(score, compute_score(name, a['variant'], entity_type, res.mill_company_aliases))
+        if best is None or round(score, 4) > best[0]:
+            best = (round(score, 4), entity['canonical_id'])
+    conn.close()
+    return best
+
+
+def queries():
+    mills = list(app.MILL_DIRECTORY)[::8]
+    out = [('mill', m[:4] + m[5] + m[4] + m[6:]) for m in mills] + [('mill', m.replace(' - ', ' ')) for m in mills]
+    out += [('mill', m[:-1]) for m in mills] + [('mill', m.replace('Lumber', 'Lbr')) for m in mills]
+    out += [('mill', 'Georgia Pacific - Gurdon'), ('mill', 'West Fraser Huttig AR'), ('mill', 'Brand New Sawmill')]
+    out += [('customer', c.replace('&', 'and').upper()) for c in CUSTOMERS[::9]]
+    out += [('customer', c.replace(' Inc', ' Incorporated')) for c in CUSTOMERS[::10]] + [('customer', 'Nobody Co')]
+    return out
+
+
+class TestEntityBlocking:
+
+    def test_resolve_top_match_matches_brute_force(self, resolver):
+        for entity_type, name in queries():
+            score, best_id = brute_force(resolver, name, entity_type)
+            result = resolver.resolve(name, entity_type)
+            if result['action'] == 'matched' and result['score'] == 1.0:
+                continue    # exact alias / canonical fast path, before any scoring
+            if score >= THRESH_AUTO:
+                assert (result['action'], result['canonical_id'], result['score']) == ('matched', best_id, score), name
+            elif score >= THRESH_REVIEW:
+                assert result['action'] == 'review', name
+                assert result['candidates'][0]['score'] == score, name
+            else:
+                assert result['action'] == 'created', name
+
+    def test_search_top_match_matches_brute_force(self, resolver):
+        for entity_type, name in queries():
+            score, _ = brute_force(resolver, name, entity_type, aliases=False)
+            top = resolver.search(name, entity_type, limit=5)
+            assert (top[0]['score'] if top else None) == (score if score >= 0.3 else None), name
+
+    def test_search_prefixes_match_brute_force(self, resolver):
+        # Many mills sharing words, so a cut-off or misspelt word (empty or short token
+        # bucket) leaves long ties among the trigram-only candidates
+        conn = resolver._get_conn()
+        for i, (a, b, c) in enumerate((a, b, c) for a in WORDS for b in WORDS for c in ('Lumber', 'Timber')):
+            resolver.create_entity(conn, 'mill', f"{a} {b} {c} - {CITIES[i % len(CITIES)]} {i}")
+        conn.commit()
+        conn.close()
+        names = [f"{a} {b}" for a in WORDS[::3] for b in WORDS[1::4]]
+        prefixes = {typo[:n] for name in names for typo in (name, name[:3] + name[4] + name[3] + name[5:])
+                    for n in (8, 12)}
+        for name in sorted(prefixes):
+            score, _ = brute_force(resolver, name, 'mill', aliases=False)
+            top = resolver.search(name, 'mill', limit=5)
+            assert (top[0]['score'] if top else None) == (score if score >= 0.3 else None), name
+
+    def test_index_follows_writes_without_reloading(self, resolver):
+        conn = resolver._get_conn()
+        index = resolver._get_index(conn)
+        conn.close()
+        created = resolver.resolve('Totally New Timber Works', 'mill')
+        assert created['action'] == 'created'
+        target = resolver.resolve('Canfor - DeQuincy', 'mill')['canonical_id']
+        resolver.link_alias(target, 'CSP DeQuincy')
+        merged = resolver.merge_entities(created['canonical_id'], target)
+        assert merged['ok']
+
+        conn = resolver._get_conn()
+        assert resolver._get_index(conn) is index          # local writes: no reload
+        fresh = CandidateIndex.load(conn, resolver.mill_company_aliases, resolver._entities_version(conn))
+        assert index.version == fresh.version
+        assert index.entities == fresh.entities
+        assert {k: v for k, v in index.grams.items() if v} == {k: v for k, v in fresh.grams.items() if v}
+
+        # Another process's write moves the version: the next lookup reloads
+        conn.execute("INSERT INTO entity_alias (canonical_id, variant, variant_normalized) VALUES (?,?,?)",
+                     (target, 'Canfor DQ', 'canfor dq'))
+        conn.commit()
+        reloaded = resolver._get_index(conn)
+        conn.close()
+        assert reloaded is not index and 'Canfor DQ' in reloaded.entities[target]['aliases']
@@ -0,0 +1,111 @@
+"""
+Tests for the entity scoring kernel: bounded bit-parallel levenshtein, memoized
+compute_score and the score_candidates batch API (entity_resolution.py).
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from entity_resolution import (levenshtein, compute_score, score_candidates, _normalize, _expand_abbreviations,
+                               _tokenize, _STATES, W_LEVENSHTEIN, W_TOKEN, W_SEMANTIC)
+
+
+def dp_levenshtein(a, b):
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        curr = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            curr[j] = min(curr[j - 1] + 1, prev[j] + 1, prev[j - 1] + (a[i - 1] != b[j - 1]))
+        prev = curr
+    return prev[len(b)]
+
+
+def dp_score(a, b):
+    max_len = max(len(a), len(b))
+    return 1.0 if max_len == 0 else max(0.0, 1.0 - dp_levenshtein(a, b) / max_len)
+
+
+def legacy_parts(name, aliases):
+    """_extract_parts before memoization."""
+    if not name:
+        return '', '', ''
+    raw = name.strip()
+    for sep in (' - ', ' \u2013 ', ' \u2014 '):
+        if sep in raw:
+            company, rest = [p.strip() for p in raw.split(sep, 1)]
+            if ',' in rest:
+                city, state = rest.split(',', 1)
+                return company.lower(), city.strip().lower(), state.strip().upper()
+            words = rest.split()
+            if words and words[-1].upper() in _STATES:
+                return company.lower(), ' '.join(words[:-1]).lower(), words[-1].upper()
+            return company.lower(), rest.lower(), ''
+    norm = _normalize(raw)
+    for alias in sorted(aliases.keys(), key=len, reverse=True):
+        if norm == alias or norm.startswith(alias + ' '):
+            words = norm[len(alias):].strip().split()
+            if words and words[-1].upper() in _STATES:
+                return alias, ' '.join(words[:-1]), words[-1].upper()
+            return alias, ' '.join(words), ''
+    return norm, '', ''
+
+
+def legacy_compute_score(a, b, entity_type, aliases):
+    """compute_score before the kernel: full DP levenshtein, nothing memoized."""
+    norm_a, norm_b = _expand_abbreviations(_normalize(a)), _expand_abbreviations(_normalize(b))
+    tok_a, tok_b = set(_tokenize(norm_a)), set(_tokenize(norm_b))
+    tok = len(tok_a & tok_b) / min(len(tok_a), len(tok_b)) if tok_a and tok_b else 0.0
+    sem = 0.0
+    if entity_type == 'mill':
+        (comp_a, city_a, state_a), (comp_b, city_b, state_b) = legacy_parts(a, aliases), legacy_parts(b, aliases)
+        if comp_a and comp_b:
+            ca, cb = _expand_abbreviations(_normalize(comp_a)), _expand_abbreviations(_normalize(comp_b))
+            sem += 0.5 if ca == cb else 0.4 if dp_score(ca, cb) > 0.85 else 0.0
+        if city_a and city_b:
+            ca, cb = _normalize(city_a), _normalize(city_b)
+            sem += 0.3 if ca == cb else 0.2 if dp_score(ca, cb) > 0.85 else 0.0
+        if state_a and state_b and state_a == state_b:
+            sem += 0.2
+    return W_LEVENSHTEIN * dp_score(norm_a, norm_b) + W_TOKEN * tok + W_SEMANTIC * sem
+
+
+def noisy_pairs(count, seed=3):
+    rng = random.Random(seed)
+    names = list(app.MILL_DIRECTORY) + list(app.MILL_COMPANY_ALIASES) + list(app.CUSTOMER_ALIASES)
+    pairs = []
+    for _ in range(count):
+        chars = list(rng.choice(names))
+        for _ in range(rng.randint(0, 3) if len(chars) > 3 else 0):
+            i = rng.randrange(len(chars) - 1)
+            chars[i:i + 2] = rng.choice([chars[i + 1:i + 2] + chars[i:i + 1], chars[i + 1:i + 2], [chars[i], 'e', chars[i + 1]]])
+        pairs.append((''.join(chars), rng.choice(names), rng.choice(['mill', 'customer'])))
+    return pairs
+
+
+class TestEntityScoring:
+
+    def test_bounded_levenshtein_matches_dp(self):
+        rng = random.Random(1)
+        for _ in range(3000):
+            a = ''.join(rng.choice('abc d') for _ in range(rng.randint(0, 80)))
+            b = ''.join(rng.choice('abc d') for _ in range(rng.randint(0, 80)))
+            dist, bound = dp_levenshtein(a, b), rng.randint(0, 12)
+            assert levenshtein(a, b) == dist
+            assert levenshtein(a, b, bound) == (dist if dist <= bound else bound + 1)
+
+    def test_compute_score_is_bit_identical(self):
+        for a, b, entity_type in noisy_pairs(3000):
+            assert compute_score(a, b, entity_type, app.MILL_COMPANY_ALIASES) == \
+                legacy_compute_score(a, b, entity_type, app.MILL_COMPANY_ALIASES), (a, b)
+
+    def test_score_candidates_prunes_only_below_min_score(self):
+        candidates = list(app.MILL_DIRECTORY)
+        for query, _, entity_type in noisy_pairs(40, seed=9):
+            exact = [compute_score(query, c, entity_type, app.MILL_COMPANY_ALIASES) for c in candidates]
+            assert score_candidates(query, candidates, entity_type, app.MILL_COMPANY_ALIASES) == exact
+            bounded = score_candidates(query, candidates, entity_type, app.MILL_COMPANY_ALIASES, min_score=0.75)
+            for got, want in zip(bounded, exact):
+                assert got == want if got is not None else want < 0.75
@@ -0,0 +1,98 @@
+"""
+Tests for the persistent geocode / distance caches and lane reuse.
+Network calls are replaced by a fake requests.get that counts them.
+"""
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+COORDS = {
+    'dallas, tx': ('32.78', '-96.80'),
+    'monroe, la': ('32.51', '-92.12'),
+    'huttig, ar': ('33.04', '-92.18'),
+}
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+        self.ok = True
+
+    def json(self):
+        return self.payload
+
+
+@pytest.fixture
+def network(tmp_dbs, monkeypatch):
+    monkeypatch.setattr(app.time, 'sleep', lambda s: None)
+    calls = []
+
+    def fake_get(url, params=None, **kwargs):
+        calls.append(url)
+        if 'nominatim' in url:
+            lat, lon = COORDS[params['q'].lower()]
+            return FakeResponse([{'lat': lat, 'lon': lon, 'type': 'city'}])
+        if '/table/' in url:
+            rows, cols = len(params['sources'].split(';')), len(params['destinations'].split(';'))
+            return FakeResponse({'code': 'Ok', 'distances': [[400000] * cols for _ in range(rows)]})
+        return FakeResponse({'code': 'Ok', 'routes': [{'distance': 400000}]})
+
+    monkeypatch.setattr(app.requests, 'get', fake_get)
+    yield calls
+    app.geo_cache.clear()
+    app.distance_cache.clear()
+
+
+def restart_worker():
+    """Drop the per-process tier, as a fresh or different gunicorn worker would have."""
+    app.geo_cache.clear()
+    app.distance_cache.clear()
+
+
+class TestPersistentLookups:
+
+    def test_geocode_and_distance_survive_restart(self, network):
+        a = app.geocode_location('Dallas, TX')
+        b = app.geocode_location('Monroe, LA')
+        assert app.get_distance(a, b) == 249
+        assert len(network) == 3
+        restart_worker()
+        assert app.geocode_location('dallas, tx') == a
+        assert app.get_distance(a, b) == 249
+        assert len(network) == 3
+
+    def test_bulk_mileage_reuses_known_lanes(self, network):
+        client = app.app.test_client()
+        lanes = [{'origin': 'Monroe, LA', 'dest': 'Dallas, TX'}, {'origin': 'Huttig, AR', 'dest': 'Dallas, TX'}]
+        first = client.post('/api/mileage/bulk', json={'lanes': lanes}).get_json()
+        assert [r['miles'] for r in first['results']] == [249, 249]
+        assert len(network) == 4   # 3 geocodes + one /table call for both lanes
+        restart_worker()
+        second = client.post('/api/mileage/bulk', json={'lanes': lanes}).get_json()
+        assert second == first
+        assert len(network) == 4
+
+    def test_resolve_lane_miles_writes_back(self, network):
+        assert app.resolve_lane_miles('Huttig, AR', 'Monroe, LA') == 249
+        restart_worker()
+        del network[:]
+        assert app.resolve_lane_miles('Huttig, AR', 'Monroe, LA') == 249
+        assert network == []
+        stats = app.app.test_client().get('/api/cache/stats').get_json()['lookups']
+        assert stats['lanes']['hits'] >= 1
+
+    def test_lookup_counters_are_exact_under_threads(self, network):
+        before = app._lookup_counts('lanes')['hits']
+        threads = [threading.Thread(target=lambda: [app._count_lookup('lanes', hits=1) for _ in range(2000)])
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert app._lookup_counts('lanes')['hits'] - before == 16000
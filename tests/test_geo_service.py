@@ -0,0 +1,168 @@
+"""
+Tests for the rate-limited background geocoding service (geo_service) and the
+async /api/mileage/bulk + /api/mileage/status flow.
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from geo_service import LookupQueue, QueueFull, SQLiteRateLimiter
+
+
+class TestRateLimiter:
+
+    def test_bucket_is_shared_between_processes(self, tmp_dbs):
+        # Two limiter objects on one database stand in for two gunicorn workers
+        worker_a = SQLiteRateLimiter(lambda: sqlite3.connect(app.MI_DB_PATH), 'nominatim', rate=1.0)
+        worker_b = SQLiteRateLimiter(lambda: sqlite3.connect(app.MI_DB_PATH), 'nominatim', rate=1.0)
+        waits = [worker_a.reserve(), worker_b.reserve(), worker_a.reserve()]
+        assert waits[0] == 0
+        assert 0.9 < waits[1] <= 1.0
+        assert 1.9 < waits[2] <= 2.0
+
+    def test_tokens_do_not_take_the_mi_write_lock(self, tmp_dbs):
+        writer = sqlite3.connect(app.MI_DB_PATH, timeout=0)
+        writer.execute("BEGIN IMMEDIATE")      # e.g. a long quote intake transaction
+        try:
+            t0 = time.time()
+            assert app._osrm_limiter.reserve() >= 0
+            assert time.time() - t0 < 1
+        finally:
+            writer.rollback()
+            writer.close()
+        assert os.path.exists(f"{app.MI_DB_PATH}.rate_limits.db")
+
+
+class TestLookupQueue:
+
+    def test_duplicate_keys_share_one_call(self):
+        release = threading.Event()
+        calls = []
+
+        def fetch(x):
+            calls.append(x)
+            release.wait(5)
+            return x * 2
+
+        q = LookupQueue('t', fetch, maxsize=10)
+        first = q.submit('k', 21)
+        second = q.submit('k', 21)
+        assert first is second
+        release.set()
+        assert first.result(5) == 42
+        assert calls == [21]
+        assert q.stats()['coalesced'] == 1
+
+    def test_queue_is_bounded(self):
+        release = threading.Event()
+        started = threading.Event()
+
+        def fetch(x):
+            started.set()
+            release.wait(5)
+            return x
+
+        q = LookupQueue('t', fetch, maxsize=1)
+        q.submit('a', 1)
+        started.wait(5)           # 'a' is running, the queue itself is empty
+        q.submit('b', 2)
+        with pytest.raises(QueueFull):
+            q.submit('c', 3)
+        release.set()
+
+    def test_forked_child_starts_its_own_workers(self):
+        release = threading.Event()
+        calls = []
+
+        def fetch(x):
+            calls.append(x)
+            if len(calls) == 1:
+                release.wait(5)       # the parent's lookup, still running at fork time
+            return x
+
+        q = LookupQueue('t', fetch, maxsize=10)
+        parent = q.submit('k', 1)
+        assert q.pending('k')
+        q._pid = -1                  # as seen from a child forked now
+        assert not q.pending('k')
+        child = q.submit('k', 2)
+        assert child is not parent and child.result(5) == 2
+        assert len(q._threads) == 1 and q._threads[0].is_alive()
+        release.set()
+
+
+class Resp:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+def fake_geo(monkeypatch, release):
+    """requests.get stand-in for Nominatim / OSRM that blocks until release is set."""
+    def fake_get(url, params=None, **kwargs):
+        release.wait(5)
+        if 'nominatim' in url:
+            return Resp([{'lat': '32.5', 'lon': '-92.1', 'type': 'city'}] if params['q'] != 'Nowhere, ZZ' else [])
+        if '/table/' in url:
+            rows, cols = len(params['sources'].split(';')), len(params['destinations'].split(';'))
+            return Resp({'code': 'Ok', 'distances': [[160934] * cols for _ in range(rows)]})
+        return Resp({'code': 'Ok', 'routes': [{'distance': 160934}]})
+
+    monkeypatch.setattr(app.requests, 'get', fake_get)
+    monkeypatch.setattr(app._nominatim_limiter, 'rate', 1000.0)
+
+
+class TestAsyncMileage:
+
+    def test_async_bulk_then_poll(self, tmp_dbs, monkeypatch):
+        release = threading.Event()
+        fake_geo(monkeypatch, release)
+        client = app.app.test_client()
+        lanes = [{'origin': 'Monroe, LA', 'dest': 'Ruston, LA'}, {'origin': 'Nowhere, ZZ', 'dest': 'Ruston, LA'}]
+        first = client.post('/api/mileage/bulk', json={'lanes': lanes, 'async': True}).get_json()
+        assert first['pending'] == 2
+        assert all(r['pending'] for r in first['results'])
+
+        release.set()
+        app._lane_jobs._queue.join()
+        status = client.post('/api/mileage/status', json={'lanes': lanes}).get_json()
+        assert status['pending'] == 0
+        assert status['results'][0]['miles'] == 100
+        assert status['results'][1]['error'] == 'Could not geocode: Nowhere, ZZ'
+
+    def test_single_lane_does_not_block_unless_asked(self, tmp_dbs, monkeypatch):
+        release = threading.Event()
+        fake_geo(monkeypatch, release)
+        client = app.app.test_client()
+        lane = {'origin': 'Monroe, LA', 'dest': 'Ruston, LA'}
+        first = client.post('/api/mileage', json=lane)
+        assert first.status_code == 202
+        assert first.get_json() == dict(lane, miles=None, pending=True, status_url='/api/mileage/status')
+        assert client.post('/api/geocode', json={'location': 'Minden, LA'}).status_code == 202
+
+        release.set()
+        waited = client.post('/api/mileage?wait=true', json=lane)
+        assert waited.status_code == 200 and waited.get_json()['miles'] == 100
+        assert client.post('/api/mileage', json=lane).get_json()['miles'] == 100     # from the lanes table
+        app._geocode_jobs._queue.join()     # Minden's write lands in this test's database, not a later one's
+
+    def test_bulk_resolve_gives_up_on_slow_geocodes(self, tmp_dbs, monkeypatch):
+        release = threading.Event()
+        fake_geo(monkeypatch, release)
+        pairs = [('Monroe, LA', 'Ruston, LA'), ('Bastrop, LA', 'Ruston, LA')]
+        outcome = app.resolve_lanes_bulk(pairs, timeout=0.2)
+        assert outcome == {pairs[0]: None, pairs[1]: None}    # pending, handed to the background resolver
+
+        release.set()
+        app._geocode_jobs._queue.join()
+        app._lane_jobs._queue.join()
+        assert app.lookup_lane_miles(pairs) == {pairs[0]: 100, pairs[1]: 100}
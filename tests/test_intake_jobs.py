@@ -0,0 +1,147 @@
+"""
+Tests for background quote intake (intake_jobs.IntakeJobQueue behind POST /api/mi/quotes).
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+def quote(mill, price, product='2x4#2'):
+    return {'mill': mill, 'product': product, 'length': '16', 'price': price, 'trader': 'Test', 'date': '2026-01-05'}
+
+
+class TestIntakeJobs:
+
+    def test_post_queues_job_and_status_reports_result(self, client):
+        resp = client.post('/api/mi/quotes', json=[quote('Canfor', 400), quote('Canfor', 410, '2x6#2')])
+        assert resp.status_code == 202
+        body = resp.get_json()
+        assert body['status'] == 'queued' and body['total'] == 2
+        assert body['status_url'] == f"/api/mi/quotes/jobs/{body['job_id']}"
+
+        job = client.get(body['status_url'] + '?wait=true').get_json()
+        assert job['status'] == 'done' and job['stage'] == 'done' and job['attempts'] == 1
+        assert job['result']['created'] == 2 and job['duration_s'] is not None
+        assert client.get('/api/mi/quotes/jobs/999999').status_code == 404
+        assert client.post('/api/mi/quotes', json=[quote('Canfor', 400), 'not a quote']).status_code == 400
+        conn = sqlite3.connect(app.MI_DB_PATH)
+        assert conn.execute("SELECT COUNT(*) FROM intake_job_keys").fetchone()[0] == 0
+        conn.close()
+
+    def test_non_string_fields_rejected_before_queueing(self, client):
+        for bad in ({'mill': 42}, {'length': 16}, {'product': ['2x4#2']}, {'trader': {'name': 'x'}}):
+            resp = client.post('/api/mi/quotes', json=[quote('Canfor', 400), dict(quote('Canfor', 410), **bad)])
+            assert resp.status_code == 400
+            assert 'Quote 1' in resp.get_json()['error'] and next(iter(bad)) in resp.get_json()['error']
+        assert app._intake_jobs.stats()['jobs'].get('queued', 0) == 0
+        ok = dict(quote('Canfor', 400), notes=None)
+        assert client.post('/api/mi/quotes?wait=true', json=[ok]).status_code == 201
+
+    def test_wait_keeps_synchronous_response(self, client):
+        resp = client.post('/api/mi/quotes?wait=true', json={'quotes': [quote('Interfor', 395)], 'full_list': True})
+        assert resp.status_code == 201
+        body = resp.get_json()
+        assert body['created'] == 1 and body['quotes'] == [quote('Interfor', 395)]
+        stats = client.get('/api/cache/stats').get_json()['intake_jobs']
+        assert stats['jobs'].get('done', 0) >= 1 and stats['max_workers'] >= 2
+
+    def test_same_mill_in_order_other_mills_not_blocked(self, client, monkeypatch):
+        gate = threading.Event()
+        real_inner = app._mi_submit_quotes_inner
+
+        def slow_inner(conn, quotes, full_list_mills=None, progress=None):
+            if quotes[0]['price'] == 400:
+                gate.wait(10)       # stands in for a long cloud sync for this mill
+            return real_inner(conn, quotes, full_list_mills, progress)
+        monkeypatch.setattr(app, '_mi_submit_quotes_inner', slow_inner)
+
+        first = client.post('/api/mi/quotes', json=[quote('Canfor', 400)]).get_json()['job_id']
+        second = client.post('/api/mi/quotes', json=[quote('Canfor', 410)]).get_json()['job_id']
+        try:
+            other = client.post('/api/mi/quotes?wait=true', json=[quote('West Fraser', 420)])
+            assert other.status_code == 201 and other.get_json()['created'] == 1
+            assert app._intake_jobs.get(first)['status'] == 'running'
+            queued = app._intake_jobs.get(second)
+            assert queued['status'] == 'queued' and queued['waiting_on'] == [first]
+        finally:
+            gate.set()
+        assert app._intake_jobs.wait(second, timeout=10)['status'] == 'done'
+        assert app._intake_jobs.get(first)['finished_at'] <= app._intake_jobs.get(second)['started_at']
+        conn = sqlite3.connect(app.MI_DB_PATH)
+        assert conn.execute("SELECT price FROM mill_quotes WHERE mill_name='Canfor'").fetchall() == [(410.0,)]
+        conn.close()
+
+    def test_wait_sees_a_job_that_finishes_before_it_sleeps(self, client, monkeypatch):
+        gate = threading.Event()
+        real_inner = app._mi_submit_quotes_inner
+
+        def gated_inner(conn, quotes, full_list_mills=None, progress=None):
+            gate.wait(10)
+            return real_inner(conn, quotes, full_list_mills, progress)
+        monkeypatch.setattr(app, '_mi_submit_quotes_inner', gated_inner)
+        monkeypatch.setattr(app._intake_jobs, 'poll', 5)
+        jobs = app._intake_jobs
+        job_id = client.post('/api/mi/quotes', json=[quote('Canfor', 400)]).get_json()['job_id']
+        real_get = jobs.get
+        reads = []
+
+        def racy_get(job_id, include_result=True):
+            job = real_get(job_id, include_result)
+            if not reads:
+                # The job ends (and notifies) between wait()'s status read and its sleep
+                reads.append(job['status'])
+                gate.set()
+                deadline = time.time() + 5
+                while real_get(job_id, False)['status'] != 'done' and time.time() < deadline:
+                    time.sleep(0.01)
+                time.sleep(0.1)
+            return job
+        monkeypatch.setattr(jobs, 'get', racy_get)
+        t0 = time.time()
+        assert jobs.wait(job_id, timeout=10)['status'] == 'done'
+        assert reads[0] != 'done' and time.time() - t0 < 3
+
+    def test_idle_workers_poll_without_writing(self, client, monkeypatch):
+        monkeypatch.setattr(app._intake_jobs, 'poll', 0.02)
+        assert client.post('/api/mi/quotes?wait=true', json=[quote('Canfor', 400)]).status_code == 201
+        time.sleep(0.1)
+        submitted = app._mi_writer.stats()['submitted']
+        time.sleep(0.3)                  # ~15 polls per worker
+        assert app._intake_jobs.stats()['workers_alive'] > 0
+        assert app._mi_writer.stats()['submitted'] == submitted
+
+    def test_long_apply_keeps_heartbeat_and_requeued_run_cannot_finish(self, client, monkeypatch):
+        gate = threading.Event()
+        real_inner = app._mi_submit_quotes_inner
+
+        def silent_inner(conn, quotes, full_list_mills=None, progress=None):
+            gate.wait(10)           # a long write with no progress() calls
+            return real_inner(conn, quotes, full_list_mills, None)
+        monkeypatch.setattr(app, '_mi_submit_quotes_inner', silent_inner)
+        monkeypatch.setattr(app._intake_jobs, 'heartbeat', 0.05)
+
+        job_id = client.post('/api/mi/quotes', json=[quote('Canfor', 400)]).get_json()['job_id']
+        try:
+            deadline = time.time() + 5
+            while app._intake_jobs.get(job_id)['status'] != 'running' and time.time() < deadline:
+                time.sleep(0.02)
+            first_beat = app._intake_jobs.get(job_id)['started_at']
+            time.sleep(0.3)
+            assert app._intake_jobs.get(job_id)['heartbeat_at'] > first_beat + 0.1
+            # Another holder takes the job over (as if this run had been requeued as stale)
+            app._mi_writer.execute(lambda conn: conn.execute(
+                "UPDATE intake_jobs SET holder='other', attempts=attempts+1 WHERE id=?", (job_id,)))
+        finally:
+            gate.set()
+        lost = app._intake_jobs.stats()['lost']
+        deadline = time.time() + 5
+        while app._intake_jobs.stats()['lost'] == lost and time.time() < deadline:
+            time.sleep(0.02)
+        job = app._intake_jobs.get(job_id)
+        assert (job['status'], job['holder'], job['result']) == ('running', 'other', None)
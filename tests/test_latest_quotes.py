@@ -0,0 +1,76 @@
+"""
+Tests for the trigger-maintained latest_quotes table.
+It must always match the window-function ranking over mill_quotes.
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+def insert_quote(conn, mill_id, mill, product, length, price, date):
+    conn.execute(
+        """INSERT INTO mill_quotes (mill_id, mill_name, product, price, length, date, trader, source)
+           VALUES (?,?,?,?,?,?,?,?)""",
+        (mill_id, mill, product, price, length, date, 'Test', 'test'))
+
+
+def random_batch(conn, rnd, n):
+    mills = [(1, 'Canfor'), (2, 'West Fraser'), (3, 'Interfor')]
+    for _ in range(n):
+        mill_id, mill = rnd.choice(mills)
+        insert_quote(conn, mill_id, mill, rnd.choice(['2x4#2', '2x6#2', '2x4 #2']),
+                     rnd.choice(['12', '16', 'RL', None]), rnd.randrange(400, 420, 5),
+                     f"2026-01-{rnd.randrange(1, 6):02d}")
+
+
+class TestLatestQuotes:
+
+    def test_winner_follows_inserts_and_deletes(self, mi_conn):
+        insert_quote(mi_conn, 1, 'Canfor', '2x4#2', '16', 410, '2026-01-02')
+        insert_quote(mi_conn, 1, 'Canfor', '2x4#2', '16', 400, '2026-01-02')
+        insert_quote(mi_conn, 1, 'Canfor', '2x4#2', '16', 450, '2026-01-01')
+        mi_conn.commit()
+        row = mi_conn.execute("SELECT price FROM latest_quotes").fetchall()
+        assert [r['price'] for r in row] == [400]
+        mi_conn.execute("DELETE FROM mill_quotes WHERE price=400")
+        mi_conn.commit()
+        assert mi_conn.execute("SELECT price FROM latest_quotes").fetchone()['price'] == 410
+        mi_conn.execute("DELETE FROM mill_quotes")
+        mi_conn.commit()
+        assert mi_conn.execute("SELECT COUNT(*) FROM latest_quotes").fetchone()[0] == 0
+
+    def test_random_edits_match_window_ranking(self, mi_conn):
+        rnd = random.Random(11)
+        random_batch(mi_conn, rnd, 150)
+        mi_conn.commit()
+        for _ in range(15):
+            random_batch(mi_conn, rnd, 15)
+            ids = [r[0] for r in mi_conn.execute("SELECT id FROM mill_quotes").fetchall()]
+            mi_conn.executemany("DELETE FROM mill_quotes WHERE id=?", [(i,) for i in rnd.sample(ids, 8)])
+            ids = [r[0] for r in mi_conn.execute("SELECT id FROM mill_quotes").fetchall()]
+            mi_conn.execute("UPDATE mill_quotes SET price=price-10 WHERE id=?", (rnd.choice(ids),))
+            mi_conn.execute("UPDATE mill_quotes SET date='2026-01-09', length='RL' WHERE id=?", (rnd.choice(ids),))
+            mi_conn.execute("UPDATE mill_quotes SET mill_name=? WHERE mill_name=?",
+                            rnd.choice([('West Fraser', 'Interfor'), ('Interfor', 'West Fraser')]))
+            mi_conn.commit()
+            check = app.verify_latest_quotes()
+            assert check['ok'], check
+
+    def test_endpoints_read_latest_quotes(self, mi_conn):
+        insert_quote(mi_conn, 1, 'Canfor', '2x4#2', '16', 410, '2026-01-02')
+        insert_quote(mi_conn, 1, 'Canfor', '2x4 #2', '16', 405, '2026-01-02')
+        insert_quote(mi_conn, 1, 'Canfor', '2x4#2', '12', 395, '2026-01-03')
+        insert_quote(mi_conn, 2, 'West Fraser', '2x4#2', '16', 400, '2025-12-20')
+        mi_conn.commit()
+        client = app.app.test_client()
+        latest = client.get('/api/mi/quotes/latest?since=2026-01-01&product=2x4%232').get_json()
+        assert sorted((q['length'], q['price']) for q in latest) == [('12', 395), ('16', 405)]
+        by_length = client.get('/api/mi/quotes/matrix?detail=length&since=2026-01-01').get_json()
+        assert set(by_length['columns']) == {"2x4#2 12'", "2x4#2 16'", "2x4 #2 16'"}
+        by_product = client.get('/api/mi/quotes/matrix?all=true').get_json()
+        assert by_product['matrix']['Canfor']['2x4#2']['price'] == 395
+        assert by_product['matrix']['West Fraser']['2x4#2']['price'] == 400
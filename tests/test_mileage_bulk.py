@@ -0,0 +1,71 @@
+"""
+Tests for batched /api/mileage/bulk routing (OSRM /table) against the local
+Nominatim + OSRM stub in scripts/geo_stub_server.py.
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+import app
+from geo_stub_server import start_stub_server
+
+
+@pytest.fixture
+def stub(tmp_dbs, monkeypatch):
+    server = start_stub_server()
+    monkeypatch.setattr(app, 'NOMINATIM_URL', server.url)
+    monkeypatch.setattr(app, 'OSRM_URL', server.url)
+    monkeypatch.setattr(app._nominatim_limiter, 'rate', 10000.0)
+    monkeypatch.setattr(app._osrm_limiter, 'rate', 10000.0)
+    yield server
+    server.shutdown()
+    app.geo_cache.clear()
+    app.distance_cache.clear()
+
+
+def lanes_for(n_origins, n_dests):
+    return [{'origin': f'Mill {i}, AR', 'dest': f'Customer {j}, TX'}
+            for i in range(n_origins) for j in range(n_dests)]
+
+
+class TestBulkMileage:
+
+    def test_thousands_of_lanes_in_few_table_calls(self, stub):
+        lanes = lanes_for(60, 40)    # 2400 lanes, 100 places
+        client = app.app.test_client()
+        body = client.post('/api/mileage/bulk', json={'lanes': lanes}).get_json()
+        assert body['pending'] == 0
+        assert all(r['miles'] for r in body['results'])
+        assert stub.requests['search'] == 100
+        assert stub.requests['route'] == 0
+        assert stub.requests['table'] == 1     # 60 + 40 coordinates fit one request
+
+        app.geo_cache.clear()
+        app.distance_cache.clear()
+        again = client.post('/api/mileage/bulk', json={'lanes': lanes}).get_json()
+        assert again == body
+        assert stub.requests == {'search': 100, 'route': 0, 'table': 1}
+
+    def test_table_miles_match_single_route(self, stub):
+        lanes = lanes_for(70, 45)    # needs several chunked requests
+        bulk = app.resolve_lanes_bulk([(l['origin'], l['dest']) for l in lanes])
+        assert stub.requests['table'] > 1
+        for origin, dest in list(bulk)[::97]:
+            app.distance_cache.clear()
+            conn = app.get_mi_db()
+            conn.execute("DELETE FROM distance_cache")
+            conn.commit()
+            conn.close()
+            miles = app.get_distance(app.geocode_location(origin), app.geocode_location(dest))
+            assert bulk[(origin, dest)] == miles
+
+    def test_unknown_place_fails_only_its_lanes(self, stub):
+        pairs = [('Nowhere, ZZ', 'Customer 1, TX'), ('Mill 1, AR', 'Customer 1, TX')]
+        outcome = app.resolve_lanes_bulk(pairs)
+        assert str(outcome[pairs[0]]) == 'Could not geocode: Nowhere, ZZ'
+        assert outcome[pairs[1]] > 0
@@ -0,0 +1,131 @@
+"""
+Tests for the CRM -> MI mill mirror (sync_crm_mills_to_mi) and the CRM database attached to
+MI connections.
+"""
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+def add_crm_mills(names, trader='Test'):
+    conn = app.get_crm_db()
+    conn.executemany("INSERT INTO mills (name, city, state, region, products, trader) VALUES (?, 'Town', 'AR', 'west', '[]', ?)",
+                     [(n, trader) for n in names])
+    conn.commit()
+    conn.close()
+
+
+def mi_mills():
+    conn = sqlite3.connect(app.MI_DB_PATH)
+    rows = conn.execute("SELECT id, name, city, products FROM mills ORDER BY id").fetchall()
+    conn.close()
+    return rows
+
+
+class TestMillMirror:
+
+    def test_mirror_runs_only_when_crm_mills_change(self, client):
+        add_crm_mills(['Canfor', 'Interfor', 'Dup Mill', 'Dup Mill'])
+        assert app.sync_crm_mills_to_mi() == 3
+        assert app.sync_crm_mills_to_mi() is None
+        assert [r[1] for r in mi_mills()] == ['Canfor', 'Interfor', 'Dup Mill']
+        assert mi_mills()[2][0] == 4      # duplicate CRM names: the newest row is mirrored
+
+        conn = app.get_crm_db()
+        conn.execute("UPDATE mills SET city='Huttig', products='[\"2x4#2\"]' WHERE name='Canfor'")
+        conn.execute("DELETE FROM mills WHERE name='Interfor'")
+        conn.execute("INSERT INTO mills (name, products) VALUES ('Interfor', '[]')")   # re-created, new id
+        conn.commit()
+        conn.close()
+        assert app.sync_crm_mills_to_mi() == 2
+        rows = {r[1]: r for r in mi_mills()}
+        assert rows['Canfor'][2:] == ('Huttig', '["2x4#2"]')
+        assert rows['Interfor'][0] == 5
+        assert app.sync_crm_mills_to_mi() is None
+
+    def test_recreated_mill_keeps_its_quotes(self, client):
+        add_crm_mills(['Acme'])
+        app.sync_crm_mills_to_mi()
+        conn = app.get_mi_db()
+        conn.execute("INSERT INTO mill_quotes (mill_id, mill_name, product, price, date, trader) "
+                     "VALUES (1, 'Acme', '2x4#2', 400, '2026-01-05', 'Test')")
+        conn.execute("INSERT INTO mill_price_changes (mill_id, mill_name, product, new_price, date) "
+                     "VALUES (1, 'Acme', '2x4#2', 400, '2026-01-05')")
+        conn.commit()
+        conn.close()
+        crm = app.get_crm_db()
+        crm.execute("DELETE FROM mills WHERE name='Acme'")
+        crm.execute("INSERT INTO mills (name, products) VALUES ('Acme', '[]')")    # re-created as id 2
+        crm.commit()
+        crm.close()
+
+        assert app.sync_crm_mills_to_mi() == 1
+        assert [r[:2] for r in mi_mills()] == [(2, 'Acme')]
+        conn = sqlite3.connect(app.MI_DB_PATH)
+        assert conn.execute("SELECT mill_id FROM mill_quotes").fetchall() == [(2,)]
+        assert conn.execute("SELECT mill_id FROM mill_price_changes").fetchall() == [(2,)]
+        conn.close()
+        resp = client.post('/api/mi/quotes?wait=true', json=[{'mill': 'Other Mill', 'product': '2x4#2', 'length': '16',
+                                                              'price': 390, 'trader': 'Test'}])
+        assert resp.status_code == 201
+
+    def test_quote_post_cost_does_not_grow_with_mills(self, client, monkeypatch):
+        statements = []
+        real_get_mi_db = app.get_mi_db
+
+        def get_mi_db(readonly=False):
+            conn = real_get_mi_db(readonly)
+            # Intake job bookkeeping (and the commits it shares) varies with timing, not with mill count
+            conn.set_trace_callback(lambda s: 'intake_job' in s or s.startswith(('BEGIN', 'COMMIT', 'SAVEPOINT', 'RELEASE'))
+                                    or statements.append(s))
+            return conn
+        monkeypatch.setattr(app, 'get_mi_db', get_mi_db)
+
+        def post(bulk):
+            quotes = [{'mill': m, 'product': '2x4#2', 'length': '16', 'price': 400, 'trader': 'Test'}
+                      for m in ('Canfor', 'West Fraser')]
+            resp = client.post('/api/mi/quotes?wait=true&bulk=' + bulk, json=quotes)
+            assert resp.status_code == 201 and resp.get_json()['created'] == 2
+
+        counts = {}
+        for bulk in ('false', 'true'):
+            post(bulk)                          # creates the mills / product lists and mirrors them
+            del statements[:]
+            post(bulk)
+            counts[bulk] = [len(statements)]
+            add_crm_mills([f'Filler Mill {bulk} {i}' for i in range(300)])
+            app.sync_crm_mills_to_mi()
+            del statements[:]
+            post(bulk)
+            counts[bulk].append(len(statements))
+            assert not any('crm.mills' in s for s in statements)
+        assert counts['false'][0] == counts['false'][1] and counts['true'][0] == counts['true'][1]
+        assert len(mi_mills()) == 602
+
+    def test_list_mills_joins_across_databases(self, client):
+        add_crm_mills(['Canfor', 'Interfor'])
+        add_crm_mills(['Weyerhaeuser'], trader='Other')
+        app.sync_crm_mills_to_mi()
+        conn = app.get_mi_db()
+        conn.executemany("INSERT INTO mill_quotes (mill_id, mill_name, product, price, date, trader) VALUES (?,?,?,?,?,?)",
+                         [(1, 'Canfor', '2x4#2', 400, '2026-01-05', 'Test'), (1, 'Canfor', '2x6#2', 410, '2026-01-07', 'Test')])
+        conn.commit()
+        conn.close()
+
+        mills = {m['name']: m for m in client.get('/api/crm/mills').get_json()}
+        assert list(mills) == ['Canfor', 'Interfor', 'Weyerhaeuser']
+        assert (mills['Canfor']['last_quoted'], mills['Canfor']['quote_count']) == ('2026-01-07', 2)
+        assert (mills['Interfor']['last_quoted'], mills['Interfor']['quote_count']) == (None, 0)
+        assert [m['name'] for m in client.get('/api/crm/mills?trader=Other').get_json()] == ['Weyerhaeuser']
+
+        # Read-only MI connections attach CRM read-only as well
+        ro = app.get_mi_db(readonly=True)
+        with pytest.raises(sqlite3.OperationalError):
+            ro.execute("UPDATE crm.mills SET city='X'")
+        ro.close()
@@ -0,0 +1,99 @@
+"""
+Tests for the compiled alias matcher and customer name index (name_matcher.py).
+"""
+import os
+import re
+import sys
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from app import MILL_COMPANY_ALIASES, CUSTOMER_ALIASES, _CORP_SUFFIXES_RE
+
+
+def _key(name):
+    return re.sub(r'\s+', ' ', re.sub(r'[_\-\u2013\u2014]+', ' ', name.lower()).strip())
+
+
+def legacy_extract_company_name(mill_name):
+    if not mill_name:
+        return mill_name
+    name = mill_name.strip()
+    for sep in (' - ', ' \u2013 ', ' \u2014 '):
+        if sep in name:
+            return name.split(sep)[0].strip()
+    lower = _key(name)
+    for alias, canonical in sorted(MILL_COMPANY_ALIASES.items(), key=lambda x: -len(x[0])):
+        if lower == alias:
+            return canonical
+    for alias, canonical in sorted(MILL_COMPANY_ALIASES.items(), key=lambda x: -len(x[0])):
+        if lower.startswith(alias + ' '):
+            return canonical
+    return name
+
+
+def legacy_normalize_customer_name(name, rows):
+    trimmed = name.strip()
+    lower = _key(trimmed)
+    sorted_aliases = sorted(CUSTOMER_ALIASES.items(), key=lambda x: -len(x[0]))
+    for alias, canonical in sorted_aliases:
+        if lower == alias:
+            for row in rows:
+                if row and any(_key(row) == a2 and c2 == canonical for a2, c2 in sorted_aliases):
+                    return row
+            return canonical
+    fuzzy = re.sub(r'\s+', ' ', re.sub(r'\s*&\s*', ' and ', lower)).strip()
+    for row in rows:
+        if row and fuzzy == re.sub(r'\s+', ' ', re.sub(r'\s*&\s*', ' and ', _key(row))).strip():
+            return row
+    stripped = _CORP_SUFFIXES_RE.sub('', lower).strip()
+    for row in rows:
+        if stripped and row and stripped == _CORP_SUFFIXES_RE.sub('', row.lower()).strip():
+            return row
+    return trimmed
+
+
+def mill_names():
+    names = []
+    for alias in MILL_COMPANY_ALIASES:
+        names += [alias, alias.upper(), alias.replace(' ', '_'), f"{alias} sawmill", f"{alias}x mill",
+                  f"  {alias.title()}  - Town", f"{alias}-{alias}"]
+    return names + ['Unknown Mill Co', 'gp', 'west fraser timber co', 'wm', '']
+
+
+class TestNameMatcher:
+
+    def test_extract_company_name_matches_sorted_alias_scan(self):
+        names = mill_names()
+        assert [app.extract_company_name(n) for n in names] == [legacy_extract_company_name(n) for n in names]
+
+    def test_normalize_customer_name_matches_row_scan(self):
+        rows = ['Power Truss & Lumber', 'Smith & Sons Lumber', 'Acme Builders', 'Rehkemper and Son Inc',
+                'Delta Construction LLC', None, 'Johnson and Associates']
+        inputs = list(CUSTOMER_ALIASES) + ['Smith and Sons Lumber', 'Acme Builders Inc', 'acme builders',
+                                          'Delta Construction', 'Johnson & Associates', 'Brand New', 'rehkemper sons']
+        conn = MagicMock()
+        conn.execute.return_value.fetchall.return_value = [{'name': n} for n in rows]
+        with patch('app.get_crm_db', return_value=conn):
+            got = [app.normalize_customer_name(n) for n in inputs]
+        assert got == [legacy_normalize_customer_name(n, rows) for n in inputs]
+
+    def test_customer_names_rebuild_on_customer_writes(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(app, 'CRM_DB_PATH', str(tmp_path / 'crm.db'))
+        app.init_crm_db()
+        conn = app.get_crm_db()
+        conn.execute("INSERT INTO customers (name, trader) VALUES ('Acme Builders', 't')")
+        conn.commit()
+        first = app.get_customer_names(conn)
+        assert app.get_customer_names(conn) is first
+        assert app.normalize_customer_name('Acme Builders LLC') == 'Acme Builders'
+
+        conn.execute("UPDATE customers SET notes='x'")   # not a name change: index kept
+        conn.commit()
+        assert app.get_customer_names(conn) is first
+        conn.execute("UPDATE customers SET name='Acme Homes'")
+        conn.commit()
+        conn.close()
+        assert app.normalize_customer_name('Acme Builders LLC') == 'Acme Builders LLC'
+        assert app.normalize_customer_name('acme homes inc') == 'Acme Homes'
@@ -0,0 +1,89 @@
+"""
+Tests for the leader-leased job scheduler (scheduler.py) and the scheduled offering job.
+"""
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from scheduler import SQLiteLease, JobScheduler
+
+DEST = 'Dallas, TX'
+MILLS = {'Canfor - DeQuincy': ('DeQuincy, LA', 310), 'Canfor - Fulton': ('Fulton, AL', 640)}
+
+
+@pytest.fixture
+def dbs(tmp_dbs):
+    today = datetime.now().strftime('%Y-%m-%d')
+    mi = app.get_mi_db()
+    for i, (mill, (origin, miles)) in enumerate(MILLS.items(), 1):
+        mi.execute("INSERT INTO mills (id, name) VALUES (?,?)", (i, mill))
+        mi.execute("INSERT INTO lanes (origin, dest, miles) VALUES (?,?,?)", (origin, DEST, miles))
+        for product, price in (('2x4#2', 400 + i * 10), ('2x6#2', 420 - i * 10)):
+            mi.execute("INSERT INTO mill_quotes (mill_id, mill_name, product, price, date, trader) VALUES (?,?,?,?,?,'t')",
+                       (i, mill, product, price, today))
+    mi.commit()
+    mi.close()
+    crm = app.get_crm_db()
+    crm.execute("INSERT INTO customers (id, name, trader) VALUES (1, 'Acme', 't')")
+    for dow in range(3):
+        crm.execute("""INSERT INTO offering_profiles (customer_id, customer_name, destination, products, frequency,
+                       day_of_week, trader) VALUES (1, 'Acme', ?, '["2x4#2", "2x6#2"]', 'daily', ?, 't')""", (DEST, dow))
+    crm.commit()
+    crm.close()
+    return tmp_dbs
+
+
+class TestJobScheduler:
+
+    def test_lease_has_one_holder_until_released_or_expired(self, dbs):
+        a = SQLiteLease(app.get_crm_db, 'scheduler', 'a', ttl=60)
+        b = SQLiteLease(app.get_crm_db, 'scheduler', 'b', ttl=60)
+        assert a.acquire() and a.acquire()
+        assert not b.acquire()
+        a.release()
+        assert b.acquire() and not a.acquire()
+        expired = SQLiteLease(app.get_crm_db, 'other', 'c', ttl=-1)
+        assert expired.acquire() and SQLiteLease(app.get_crm_db, 'other', 'd').acquire()
+
+    def test_daily_slot_runs_once_across_processes(self, dbs):
+        calls = []
+        schedulers = [JobScheduler(app.get_crm_db, SQLiteLease(app.get_crm_db, 'scheduler', h)) for h in 'ab']
+        for s in schedulers:
+            s.register('job', lambda params: calls.append(params) or {'ok': True}, daily_at=(6, 0))
+        at = datetime.now().replace(hour=6, minute=5)
+        fut = schedulers[0].tick(at)
+        assert fut.result() == 'done'
+        assert schedulers[1].tick(at) is None and not schedulers[1].is_leader
+        assert schedulers[0].tick(at) is None           # slot already run
+        assert schedulers[0].tick(at.replace(hour=8)) is None  # past the misfire grace: nothing new
+        runs = schedulers[0].runs()
+        assert calls == [{}] and len(runs) == 1
+        assert runs[0]['status'] == 'done' and runs[0]['scheduled_for'].endswith('06:00') and runs[0]['result'] == {'ok': True}
+
+
+class TestScheduledOfferings:
+
+    def test_trigger_generates_each_profile_once(self, dbs):
+        client = app.app.test_client()
+        resp = client.post('/api/scheduler/jobs/offerings/run', json={})
+        assert resp.status_code == 202
+        run_id = resp.get_json()['run_id']
+        app._scheduler.tick().result()
+        run = client.get(f'/api/scheduler/runs/{run_id}').get_json()
+        assert run['status'] == 'done' and run['result']['generated'] == 3 and run['result']['lanes'] == 2
+
+        client.post('/api/scheduler/jobs/offerings/run', json={})
+        app._scheduler.tick().result()
+        assert client.get('/api/scheduler/runs?job=offerings').get_json()[0]['result']['generated'] == 0
+
+        offerings = client.get('/api/offerings?limit=10').get_json()
+        assert len(offerings) == 3
+        profile = dict(app.get_crm_db().execute("SELECT * FROM offering_profiles WHERE id=1").fetchone())
+        expected = app._compute_offering_products(profile, DEST)
+        assert [o['products'] for o in offerings] == [expected] * 3
+        assert expected[0]['mill'] == 'Canfor - DeQuincy' and expected[0]['freight'] == round((450 + 310 * 2.25) / 23)
@@ -0,0 +1,76 @@
+"""
+Tests for incremental mill_price_changes maintenance (refresh_price_changes).
+The incremental result must always match the full recompute.
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+def insert_quote(conn, mill_id, mill, product, length, price, date):
+    conn.execute(
+        """INSERT INTO mill_quotes (mill_id, mill_name, product, price, length, date, trader, source)
+           VALUES (?,?,?,?,?,?,?,?)""",
+        (mill_id, mill, product, price, length, date, 'Test', 'test'))
+
+
+def random_batch(conn, rnd, n):
+    mills = [(1, 'Canfor'), (2, 'West Fraser'), (3, 'Interfor')]
+    for _ in range(n):
+        mill_id, mill = rnd.choice(mills)
+        if rnd.random() < 0.3:
+            mill = mill.upper()
+        insert_quote(conn, mill_id, mill, rnd.choice(['2x4#2', '2x6#2', '2x4#2 ']),
+                     rnd.choice(['12', '16', 'RL', None]), rnd.randrange(400, 460, 5),
+                     f"2026-01-{rnd.randrange(1, 28):02d}")
+
+
+class TestRefreshPriceChanges:
+
+    def test_first_refresh_falls_back_to_full(self, mi_conn):
+        insert_quote(mi_conn, 1, 'Canfor', '2x4#2', '16', 400, '2026-01-01')
+        insert_quote(mi_conn, 1, 'Canfor', '2x4#2', '16', 410, '2026-01-02')
+        mi_conn.commit()
+        assert app.refresh_price_changes() == {'mode': 'full'}
+        assert app.verify_price_changes()['actual'] == 1
+        wm = mi_conn.execute("SELECT value FROM settings WHERE key='mpc_watermark'").fetchone()
+        assert wm is not None
+        assert mi_conn.execute("SELECT COUNT(*) FROM mill_quote_touches").fetchone()[0] == 0
+
+    def test_noop_when_nothing_touched(self, mi_conn):
+        app.recompute_price_changes()
+        assert app.refresh_price_changes() == {'mode': 'incremental', 'series': 0, 'changes': 0}
+
+    def test_backdated_insert_rebuilds_from_touched_date(self, mi_conn):
+        for day, price in [(1, 400), (3, 420), (5, 430)]:
+            insert_quote(mi_conn, 1, 'Canfor', '2x4#2', '16', price, f'2026-01-0{day}')
+        mi_conn.commit()
+        app.recompute_price_changes()
+        insert_quote(mi_conn, 1, 'Canfor', '2x4#2', '16', 450, '2026-01-02')
+        mi_conn.commit()
+        result = app.refresh_price_changes()
+        assert result['series'] == 1
+        rows = mi_conn.execute("SELECT old_price, new_price, date FROM mill_price_changes ORDER BY date").fetchall()
+        assert [tuple(r) for r in rows] == [
+            (400, 450, '2026-01-02'), (450, 420, '2026-01-03'), (420, 430, '2026-01-05')]
+        assert app.verify_price_changes()['ok']
+
+    def test_random_edits_match_full_recompute(self, mi_conn):
+        rnd = random.Random(7)
+        random_batch(mi_conn, rnd, 200)
+        mi_conn.commit()
+        app.recompute_price_changes()
+        for _ in range(15):
+            random_batch(mi_conn, rnd, 20)
+            ids = [r[0] for r in mi_conn.execute("SELECT id FROM mill_quotes").fetchall()]
+            mi_conn.executemany("DELETE FROM mill_quotes WHERE id=?", [(i,) for i in rnd.sample(ids, 5)])
+            mi_conn.execute("UPDATE mill_quotes SET price=price+5 WHERE id=?", (rnd.choice(ids),))
+            mi_conn.execute("UPDATE mill_quotes SET mill_name='Interfor' WHERE mill_name='INTERFOR'")
+            mi_conn.commit()
+            app.refresh_price_changes()
+            check = app.verify_price_changes()
+            assert check['ok'], check
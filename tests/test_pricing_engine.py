@@ -0,0 +1,96 @@
+"""
+Tests for the shared landed-cost pricing engine (pricing_engine.py).
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from pricing_engine import OriginIndex
+
+
+def legacy_origin(mill_name):
+    dir_entry = app.MILL_DIRECTORY.get(mill_name)
+    if dir_entry:
+        return f"{dir_entry[0]}, {dir_entry[1]}"
+    for k, v in app.MILL_DIRECTORY.items():
+        if mill_name.startswith(k.split(' - ')[0]):
+            return f"{v[0]}, {v[1]}"
+    return ''
+
+
+@pytest.fixture
+def dbs(tmp_dbs):
+    today = datetime.now().strftime('%Y-%m-%d')
+    mi = app.get_mi_db()
+    rows = [('Canfor - DeQuincy', 'DeQuincy, LA', 300, 400), ('Canfor - Fulton', 'Fulton, AL', 700, 395),
+            ('Bayou Lumber', 'Ruston, LA', 250, 405)]
+    for i, (mill, origin, miles, price) in enumerate(rows, 1):
+        mi.execute("INSERT INTO mills (id, name) VALUES (?,?)", (i, mill))
+        mi.execute("INSERT INTO lanes (origin, dest, miles) VALUES (?,?,?)", (origin, 'Dallas, TX', miles))
+        mi.execute("INSERT INTO mill_quotes (mill_id, mill_name, product, price, date, trader) VALUES (?,?,'2x4#2',?,?,'t')",
+                   (i, mill, price, today))
+    month = datetime.now().replace(day=1)
+    mi.executemany("INSERT INTO rl_prices (date, region, product, length, price) VALUES (?, 'west', '2x4#2', 'RL', ?)",
+                   [((month - timedelta(days=365 * y)).strftime('%Y-%m-%d'), p) for y, p in ((3, 380), (2, 460), (1, 470), (0, 430))])
+    mi.commit()
+    mi.close()
+    crm = app.get_crm_db()
+    crm.execute("""INSERT INTO mills (name, city, state, locations, trader)
+                   VALUES ('Bayou Lumber', '', '', '[{"name": "Bayou Lumber - Ruston", "city": "Ruston", "state": "LA"}]', 't')""")
+    crm.commit()
+    crm.close()
+    app.bump_data_version('rl')
+
+
+class TestPricingEngine:
+
+    def test_origin_index_matches_directory_scan(self):
+        index = OriginIndex(app.MILL_DIRECTORY)
+        companies = {name.split(' - ')[0] for name in app.MILL_DIRECTORY}
+        names = list(app.MILL_DIRECTORY) + [f"{c} Sawmill" for c in companies] + [f"{c}-X" for c in companies]
+        names += ['Nobody Lumber', '', 'C']
+        assert [index.origin(n) for n in names] == [legacy_origin(n) for n in names]
+
+    def test_forecast_pricing_ranks_by_landed_cost(self, dbs):
+        resp = app.app.test_client().post('/api/forecast/pricing', json={
+            'destination': 'Dallas, TX', 'products': ['2x4#2', '2x6#2'], 'targetMargin': 25})
+        body = resp.get_json()
+        rec, missing = body['products']
+        assert missing == {'product': '2x6#2', 'error': 'No mill pricing available within 2 days'}
+        # Bayou Lumber is not in MILL_DIRECTORY: its origin comes from the CRM locations JSON
+        assert rec['bestMill'] == 'Bayou Lumber' and rec['freight'] == round((450 + 250 * 2.25) / 23)
+        assert [a['mill'] for a in rec['alternatives']] == ['Canfor - DeQuincy', 'Canfor - Fulton']
+        # Latest RL (430) sits at the 50th percentile of this month's prices
+        assert rec['seasonalAdj'] == 0 and rec['seasonalNote'].startswith('Near seasonal norm (50th %ile')
+
+    def test_seasonal_percentile_is_memoized_per_rl_version(self, dbs):
+        assert app._pricing.seasonal_percentile('2x4#2') == 50
+        mi = app.get_mi_db()
+        mi.execute("UPDATE rl_prices SET price=500 WHERE date=?", (datetime.now().replace(day=1).strftime('%Y-%m-%d'),))
+        mi.commit()
+        mi.close()
+        assert app._pricing.seasonal_percentile('2x4#2') == 50   # same RL version: memoized
+        app.bump_data_version('rl')
+        assert app._pricing.seasonal_percentile('2x4#2') == 100
+
+    def test_origin_index_rebuilds_only_when_crm_mills_change(self, dbs):
+        index = app.get_origin_index()
+        assert app.get_origin_index() is index
+        assert index.resolve('Bayou Lumber - Ruston') == {'origin': 'Ruston, LA', 'city': 'Ruston', 'state': 'LA',
+                                                          'lat': None, 'lon': None}
+        assert index.resolve('Piney Woods') is None
+
+        crm = app.get_crm_db()
+        crm.execute("""INSERT INTO mills (name, city, state, lat, lon, locations, trader)
+                       VALUES ('Piney Woods', 'Lufkin', 'TX', 31.3, -94.7, '[]', 't')""")
+        crm.commit()
+        crm.close()
+        rebuilt = app.get_origin_index()
+        assert rebuilt is not index and rebuilt.version > index.version
+        assert rebuilt.resolve('Piney Woods') == {'origin': 'Lufkin, TX', 'city': 'Lufkin', 'state': 'TX',
+                                                  'lat': 31.3, 'lon': -94.7}
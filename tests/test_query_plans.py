@@ -0,0 +1,130 @@
+"""
+EXPLAIN QUERY PLAN regression tests for the case-insensitive quote lookups.
+
+The hot paths (quote intake, full-list wipe, incremental price-change refresh,
+latest quotes and the quote matrix) are run against a temp DB with statement tracing on, and every
+statement that reads mill_quotes / mill_price_changes is re-planned to check it
+searches an index instead of scanning the table.
+"""
+import os
+import re
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+# Base tables plus the aliases app.py uses for them
+FULL_SCAN_RE = re.compile(r'^SCAN (mill_quotes|mill_price_changes|q|p|mq)\b')
+
+
+@pytest.fixture
+def traced(tmp_dbs, monkeypatch):
+    monkeypatch.setattr(app, 'mi_geocode_location', lambda loc: None)
+    app.find_or_create_crm_mill('Canfor - Fulton', 'Fulton', 'AL', 'central', 0.0, 0.0, 'Test')
+    app.find_or_create_crm_mill('West Fraser - Huttig', 'Huttig', 'AR', 'west', 0.0, 0.0, 'Test')
+
+    statements = []
+    real_get_mi_db = app.get_mi_db
+
+    def get_mi_db(readonly=False):
+        conn = real_get_mi_db(readonly)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(app, 'get_mi_db', get_mi_db)
+    return statements
+
+
+def batch(date, bump=0):
+    return [{'mill': mill, 'product': product, 'length': length, 'price': 400 + bump + i,
+             'date': date, 'trader': 'Test'}
+            for i, (mill, product, length) in enumerate(
+                (m, p, l) for m in ('Canfor - Fulton', 'West Fraser - Huttig')
+                for p in ('2x4#2', '2x6#2') for l in ('12', '16', 'RL'))]
+
+
+def full_scans(statements):
+    """Re-plan traced statements on a separate connection; return any full table scans."""
+    conn = sqlite3.connect(app.MI_DB_PATH)
+    conn.create_function('py_round', 2, round, deterministic=True)
+    found = []
+    for sql in statements:
+        head = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ''
+        if head == 'CREATE' and 'TEMP TABLE' in sql.upper() or head == 'DROP':
+            conn.execute(sql)
+            continue
+        if head not in ('SELECT', 'DELETE', 'UPDATE', 'INSERT', 'WITH'):
+            continue
+        if not re.search(r'\b(mill_quotes|mill_price_changes)\b', sql) or re.search(r'\bVALUES\s*\(', sql):
+            continue
+        for row in conn.execute('EXPLAIN QUERY PLAN ' + sql):
+            if FULL_SCAN_RE.match(row[3]):
+                found.append((row[3], ' '.join(sql.split())[:120]))
+    conn.close()
+    return found
+
+
+class TestQuoteLookupPlans:
+
+    def test_per_row_intake_and_full_list_wipe(self, traced):
+        with app.app.test_request_context():
+            conn = app.get_mi_db()
+            app._mi_submit_quotes_inner(conn, batch('2026-01-05'))
+            app._mi_submit_quotes_inner(conn, batch('2026-01-06', 5), full_list_mills={'Canfor - Fulton'})
+            conn.close()
+        assert traced
+        assert full_scans(traced) == []
+
+    def test_bulk_intake_and_full_list_wipe(self, traced):
+        with app.app.test_request_context():
+            conn = app.get_mi_db()
+            app._mi_submit_quotes_bulk(conn, batch('2026-01-05'))
+            conn.close()
+            conn = app.get_mi_db()
+            app._mi_submit_quotes_bulk(conn, batch('2026-01-06', 5), full_list_mills={'Canfor - Fulton'})
+            conn.close()
+        assert full_scans(traced) == []
+
+    def test_incremental_price_change_refresh(self, traced):
+        with app.app.test_request_context():
+            conn = app.get_mi_db()
+            app._mi_submit_quotes_bulk(conn, batch('2026-01-05'))
+            conn.close()
+        app.recompute_price_changes()
+        del traced[:]
+        with app.app.test_request_context():
+            conn = app.get_mi_db()
+            app._mi_submit_quotes_bulk(conn, batch('2026-01-06', 5))
+            conn.close()
+        assert app.refresh_price_changes()['mode'] == 'incremental'
+        assert full_scans(traced) == []
+
+    def test_latest_quotes(self, traced):
+        with app.app.test_request_context():
+            conn = app.get_mi_db()
+            app._mi_submit_quotes_bulk(conn, batch('2026-01-05'))
+            conn.close()
+        del traced[:]
+        client = app.app.test_client()
+        assert client.get('/api/mi/quotes/latest?since=2026-01-01').status_code == 200
+        resp = client.get('/api/mi/quotes/latest?since=2026-01-01&product=2x4%232')
+        assert resp.status_code == 200
+        assert {q['product'] for q in resp.get_json()} == {'2x4#2'}
+        assert full_scans(traced) == []
+
+    def test_matrix(self, traced):
+        with app.app.test_request_context():
+            conn = app.get_mi_db()
+            app._mi_submit_quotes_bulk(conn, batch('2026-01-05'))
+            conn.close()
+        del traced[:]
+        client = app.app.test_client()
+        assert client.get('/api/mi/quotes/matrix?since=2026-01-01').status_code == 200
+        assert client.get('/api/mi/quotes/matrix?detail=length&since=2026-01-01').status_code == 200
+        assert client.get('/api/mi/quotes/matrix?detail=length&all=true').status_code == 200
+        assert traced
+        assert full_scans(traced) == []
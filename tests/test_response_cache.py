@@ -0,0 +1,63 @@
+"""
+Tests for the versioned response cache (response_cache.VersionedCache) and its
+SQLite-backed data versions.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from response_cache import VersionedCache
+
+
+class TestVersionedCache:
+
+    def test_lru_eviction_and_counters(self):
+        cache = VersionedCache('t', maxsize=2, ttl=60, version_fn=lambda: 1)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.get('a') == 1      # a is now most recently used
+        cache.set('c', 3)               # evicts b
+        assert cache.get('b') is None
+        assert cache.get('c') == 3
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['evictions'], stats['size']) == (2, 1, 1, 2)
+
+    def test_ttl_expiry(self, monkeypatch):
+        cache = VersionedCache('t', maxsize=5, ttl=10, version_fn=lambda: 1)
+        now = [1000.0]
+        monkeypatch.setattr('response_cache.time.time', lambda: now[0])
+        cache.set('a', 1)
+        now[0] += 11
+        assert cache.get('a') is None
+        assert cache.stats()['expired'] == 1
+
+    def test_value_keeps_version_seen_at_get(self):
+        version = [1]
+        cache = VersionedCache('t', maxsize=5, ttl=60, version_fn=lambda: version[0])
+        assert cache.get('a') is None   # computed under version 1 ...
+        version[0] = 2                  # ... while a write lands
+        cache.set('a', 'old data')
+        assert cache.get('a') is None
+        assert cache.stats()['stale'] == 1
+
+    def test_version_bump_invalidates_other_workers(self, tmp_dbs):
+        def version():
+            return app.get_data_version('quotes')
+        worker_a = VersionedCache('matrix', maxsize=5, ttl=60, version_fn=version)
+        worker_b = VersionedCache('matrix', maxsize=5, ttl=60, version_fn=version)
+        worker_a.set('m', 'a')
+        worker_b.set('m', 'b')
+        assert worker_b.get('m') == 'b'
+        app.bump_data_version('quotes')   # a write handled by worker A
+        assert worker_b.get('m') is None
+        assert app.get_data_version('quotes') == 1
+
+    def test_stats_endpoint(self, tmp_dbs):
+        app.invalidate_rl_cache()
+        resp = app.app.test_client().get('/api/cache/stats')
+        assert resp.status_code == 200
+        body = resp.get_json()
+        assert set(body['caches']) == {'matrix', 'rl'}
+        assert body['data_versions']['rl'] == 1
@@ -0,0 +1,77 @@
+"""
+Tests for the RL bulk loader (iter_rl_csv / bulk_load_rl) and the RL snapshot.
+"""
+import gzip
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+import app
+from build_rl_snapshot import build
+
+CSV = """date,region,product,length,price
+2024-01-05,west,2x4#2,RL,400
+2024-01-05,west,2x4#2,RL,999
+2024-01-05,west,2x6#2,RL,not-a-price
+2024-01-05,central,2x4#2,16,0
+2024-01-12,west,2x4#2,RL,410
+"""
+
+
+@pytest.fixture
+def rl_csv(tmp_path, monkeypatch):
+    path = tmp_path / 'rl_prices.csv.gz'
+    with gzip.open(path, 'wt') as f:
+        f.write(CSV)
+    monkeypatch.setattr(app, 'RL_CSV_PATH', str(path))
+    monkeypatch.setattr(app, 'RL_SNAPSHOT_PATH', str(tmp_path / 'rl_prices.sqlite'))
+    monkeypatch.setattr(app, 'MI_DB_PATH', str(tmp_path / 'mi.db'))
+    return path
+
+
+def rl_rows():
+    conn = app.get_mi_db()
+    rows = [tuple(r) for r in conn.execute("SELECT date, region, product, length, price FROM rl_prices ORDER BY id")]
+    indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE name LIKE 'idx_rl_%'")}
+    conn.close()
+    return rows, indexes
+
+
+class TestRLLoader:
+
+    def test_csv_seed_skips_bad_rows_and_keeps_first_duplicate(self, rl_csv):
+        app.init_mi_db()
+        app.seed_rl_from_csv()
+        rows, indexes = rl_rows()
+        assert rows == [('2024-01-05', 'west', '2x4#2', 'RL', 400.0), ('2024-01-12', 'west', '2x4#2', 'RL', 410.0)]
+        assert indexes == {'idx_rl_date', 'idx_rl_product_region', 'idx_rl_unique'}
+        assert app.get_data_version('rl') == 1
+
+    def test_backfill_into_loaded_table_ignores_existing_keys(self, rl_csv):
+        app.init_mi_db()
+        app.seed_rl_from_csv()
+        conn = app.get_rl_load_db()
+        added = app.bulk_load_rl(conn, [[('2024-01-12', 'west', '2x4#2', 'RL', 1.0),
+                                         ('2024-01-19', 'west', '2x4#2', 'RL', 420.0)]])
+        conn.close()
+        assert added == 1
+        assert rl_rows()[0][-2:] == [('2024-01-12', 'west', '2x4#2', 'RL', 410.0),
+                                     ('2024-01-19', 'west', '2x4#2', 'RL', 420.0)]
+
+    def test_snapshot_restores_fresh_database(self, rl_csv, tmp_path):
+        build(app.RL_SNAPSHOT_PATH)
+        app.MI_DB_PATH = str(tmp_path / 'fresh' / 'mi.db')
+        os.makedirs(os.path.dirname(app.MI_DB_PATH))
+        assert app.restore_mi_from_snapshot()
+        assert not app.restore_mi_from_snapshot()      # never over an existing database
+        app.init_mi_db()
+        assert rl_rows()[0] == [('2024-01-05', 'west', '2x4#2', 'RL', 400.0), ('2024-01-12', 'west', '2x4#2', 'RL', 410.0)]
+
+        with gzip.open(rl_csv, 'at') as f:               # CSV changed after the snapshot was built
+            f.write("2024-01-19,west,2x4#2,RL,420\n")
+        assert app.rl_snapshot_path() is None
@@ -0,0 +1,70 @@
+"""
+Tests for the in-memory RL price store (rl_store.RLPriceStore / app.get_rl_store).
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from rl_store import RLPriceStore
+
+ROWS = [
+    ('west', '2x4#2', 'RL', '2024-01-12', 410.0),
+    ('west', '2x4#2', 'RL', '2024-01-05', 400.0),
+    ('west', '2x4#2', '16', '2024-01-05', 420.0),
+    ('central', '2x4#2', 'RL', '2024-01-05', 395.0),
+    ('west', '2x6#2', 'RL', '2024-01-12', 450.0),
+]
+
+
+@pytest.fixture
+def rl_db(tmp_dbs):
+    app._rl_cache.clear()
+    conn = app.get_mi_db()
+    conn.executemany("INSERT INTO rl_prices (region, product, length, date, price) VALUES (?,?,?,?,?)", ROWS)
+    conn.commit()
+    conn.close()
+    yield
+    app._rl_cache.clear()
+
+
+class TestRLPriceStore:
+
+    def test_series_are_sorted_and_sliceable(self):
+        store = RLPriceStore(ROWS)
+        series = store.get('west', '2x4#2')
+        assert series.dates == ['2024-01-05', '2024-01-12']
+        assert list(series.prices) == [400.0, 410.0]
+        assert series.ords[1] - series.ords[0] == 7
+        assert series.slice('2024-01-06') == [('2024-01-12', 410.0)]
+        assert series.slice(date_to='2024-01-05') == [('2024-01-05', 400.0)]
+        assert store.date_counts('west') == {'2024-01-05': 2, '2024-01-12': 2}
+        assert store.rows_on('2024-01-05', 'west') == [('west', '2x4#2', '16', 420.0), ('west', '2x4#2', 'RL', 400.0)]
+
+    def test_rl_save_reloads_store(self, rl_db):
+        client = app.app.test_client()
+        first = app.get_rl_store()
+        assert app.get_rl_store() is first
+        history = client.get('/api/rl/history?product=2x4%232&region=west&length=RL').get_json()
+        assert [(r['date'], r['price']) for r in history] == [('2024-01-05', 400.0), ('2024-01-12', 410.0)]
+
+        resp = client.post('/api/rl/save', json={'date': '2024-01-19', 'rows': [
+            {'region': 'west', 'product': '2x4#2', 'length': 'RL', 'price': 415}]})
+        assert resp.status_code == 201
+        assert app.get_rl_store() is not first
+        history = client.get('/api/rl/history?product=2x4%232&region=west&length=RL').get_json()
+        assert history[-1] == {'date': '2024-01-19', 'region': 'west', 'product': '2x4#2', 'length': 'RL',
+                               'price': 415.0}
+
+    def test_entry_and_chart_batch_read_the_store(self, rl_db):
+        client = app.app.test_client()
+        entry = client.get('/api/rl/entry?date=2024-01-05').get_json()
+        assert entry['west'] == {'2x4#2': {'RL': 400.0, '16': 420.0}}
+        assert entry['central'] == {'2x4#2': {'RL': 395.0}}
+        chart = client.get('/api/rl/chart-batch?product=2x4%232').get_json()
+        assert chart['west'] == [{'date': '2024-01-05', 'price': 400.0}, {'date': '2024-01-12', 'price': 410.0}]
+        assert chart['spread46'] == [{'date': '2024-01-12', 'spread': 40}]
+        assert chart['spreadWC'] == [{'date': '2024-01-05', 'spread': 5}]
@@ -0,0 +1,60 @@
+"""
+Tests for the shared intel signal snapshot (get_signal_snapshot).
+"""
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+@pytest.fixture
+def mi_db(tmp_dbs, monkeypatch):
+    monkeypatch.setattr(app, '_signal_snapshot', None)
+    conn = app.get_mi_db()
+    conn.execute("INSERT INTO mills (id, name, city, region) VALUES (1, 'Canfor', 'Fulton', 'central')")
+    conn.execute("INSERT INTO mills (id, name, city, region) VALUES (2, 'Interfor', 'Eatonton', 'east')")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def insert_quote(conn, mill_id, mill, product, price):
+    conn.execute(
+        """INSERT INTO mill_quotes (mill_id, mill_name, product, price, date, trader, source)
+           VALUES (?,?,?,?,?,?,?)""",
+        (mill_id, mill, product, price, datetime.now().strftime('%Y-%m-%d'), 'Test', 'test'))
+    conn.commit()
+
+
+class TestSignalSnapshot:
+
+    def test_reused_until_quotes_change(self, mi_db):
+        insert_quote(mi_db, 1, 'Canfor', '2x4#2', 420)
+        first = app.get_signal_snapshot()
+        assert app.get_signal_snapshot() is first
+        assert first['best_source']['2x4#2'] == {
+            'mill_name': 'Canfor', 'price': 420, 'city': 'Fulton', 'region': 'central'}
+
+        insert_quote(mi_db, 2, 'Interfor', '2x4#2', 410)
+        second = app.get_signal_snapshot()
+        assert second is not first
+        assert second['best_source']['2x4#2']['mill_name'] == 'Interfor'
+        assert second['quotes_7d'] == 2 and second['active_mills_7d'] == 2
+
+    def test_routes_read_snapshot(self, mi_db):
+        insert_quote(mi_db, 1, 'Canfor', '2x4#2', 420)
+        insert_quote(mi_db, 2, 'Interfor', '2x6#2', 500)
+        client = app.app.test_client()
+        recs = client.get('/api/mi/intel/recommendations').get_json()
+        assert {r['product'] for r in recs} == {'2x4#2', '2x6#2'}
+        one = client.get('/api/mi/intel/recommendations?product=2x6%232').get_json()
+        assert one == [r for r in recs if r['product'] == '2x6#2']
+        missing = client.get('/api/mi/intel/recommendations?product=2x12%232').get_json()
+        assert missing[0]['best_source'] is None and missing[0]['action'] == 'HOLD / NEUTRAL'
+        signals = client.get('/api/mi/intel/signals').get_json()
+        assert signals == app.compute_intel_signals(mi_db)
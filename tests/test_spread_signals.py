@@ -0,0 +1,59 @@
+"""
+Tests for the spread-signal rank engine (compute_spread_signals), checked
+against the previous quadratic implementation kept in scripts/bench_spread_signals.py.
+"""
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+import app
+from bench_spread_signals import legacy_spread_signals
+
+PRODUCTS = ['2x4#1', '2x4#2', '2x6#1', '2x6#2', '2x8#2', '2x10#2', '2x12#2', '2x4#3', '2x6#3', '2x4 MSR']
+
+
+@pytest.fixture
+def rl_db(tmp_dbs):
+    rnd = random.Random(7)
+    today = datetime.now()
+    rows = []
+    for week in range(120):
+        d = (today - timedelta(days=7 * (120 - week))).strftime('%Y-%m-%d')
+        for region, base in (('west', 400), ('central', 410), ('east', 420)):
+            for i, product in enumerate(PRODUCTS):
+                price = base + i * 15 + rnd.randrange(-30, 30)
+                if week == 119 and product == '2x6#2':
+                    price -= 200      # push the latest 2x6 spreads to an extreme
+                rows.append((d, region, product, 'RL', price))
+                for ln in ('8', '16'):
+                    rows.append((d, region, product, ln, price + (5 if ln == '16' else 0) + rnd.randrange(-3, 3)))
+    conn = app.get_mi_db()
+    conn.executemany("INSERT INTO rl_prices (date, region, product, length, price) VALUES (?,?,?,?,?)", rows)
+    conn.commit()
+    conn.close()
+    yield
+
+
+class TestSpreadSignals:
+
+    def test_identical_to_quadratic_implementation(self, rl_db):
+        for region in ('west', 'central', 'east'):
+            for spread_type in ('all', 'dimension', 'length', 'grade', 'zone'):
+                new = app.compute_spread_signals(region, spread_type)
+                old = legacy_spread_signals(region, spread_type)
+                assert json.dumps(new, sort_keys=True) == json.dumps(old, sort_keys=True)
+        assert app.compute_spread_signals('west', 'all')['signalCount'] > 0
+
+    def test_percentile_rank_counts_ties(self):
+        vals = sorted([3, 1, 2, 2, 5])
+        assert app.percentile_rank(vals, 2) == 60.0
+        assert app.percentile_rank(vals, 0) == 0.0
+        assert app.percentile_rank(vals, 5) == 100.0
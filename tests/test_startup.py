@@ -0,0 +1,85 @@
+"""
+Tests for startup orchestration (migrate_databases, background seeding, /health/ready).
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from startup import StartupTracker, RunOnce, process_lock
+
+
+@pytest.fixture
+def fresh_paths(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'CRM_DB_PATH', str(tmp_path / 'crm.db'))
+    monkeypatch.setattr(app, 'MI_DB_PATH', str(tmp_path / 'mi.db'))
+    monkeypatch.setattr(app, 'RL_SNAPSHOT_PATH', str(tmp_path / 'missing.sqlite'))
+    return tmp_path
+
+
+def user_version(path):
+    conn = sqlite3.connect(path)
+    v = conn.execute("PRAGMA user_version").fetchone()[0]
+    conn.close()
+    return v
+
+
+class TestStartup:
+
+    def test_migration_runs_once_per_schema(self, fresh_paths):
+        assert app.migrate_databases()
+        assert user_version(app.CRM_DB_PATH) == user_version(app.MI_DB_PATH) == app.schema_stamp()
+        assert not app.migrate_databases()
+
+    def test_migration_waits_for_the_startup_lock(self, fresh_paths):
+        result = []
+        with process_lock(f"{app.MI_DB_PATH}.startup.lock"):
+            worker = threading.Thread(target=lambda: result.append(app.migrate_databases()))
+            worker.start()
+            time.sleep(0.2)
+            assert worker.is_alive() and not os.path.exists(app.MI_DB_PATH)
+        worker.join(10)
+        assert result == [True]
+
+    def test_ready_only_after_background_phases(self, monkeypatch):
+        client = app.app.test_client()
+        assert client.get('/health/ready').status_code == 200
+        assert 'migrate' in [p['name'] for p in client.get('/health/ready').get_json()['phases']]
+
+        tracker = StartupTracker()
+        monkeypatch.setattr(app, '_startup', tracker)
+        release = threading.Event()
+        tracker.start_background(lambda: tracker.run('seed', release.wait))
+        resp = client.get('/health/ready')
+        assert resp.status_code == 503 and resp.get_json()['state'] == 'starting'
+        assert client.get('/health/live').status_code == 200
+        release.set()
+        assert tracker.wait(5)
+        assert client.get('/health/ready').get_json()['phases'][0]['status'] == 'done'
+
+        failing = StartupTracker()
+        monkeypatch.setattr(app, '_startup', failing)
+        failing.start_background(lambda: failing.run('seed', lambda: 1 / 0))
+        assert not failing.wait(5)
+        body = client.get('/health/ready')
+        assert body.status_code == 503 and body.get_json()['phases'][0]['error'].startswith('ZeroDivisionError')
+
+    def test_run_once_retries_after_a_failure(self):
+        calls = []
+
+        def warm():
+            calls.append(1)
+            if len(calls) == 1:
+                raise sqlite3.OperationalError('database is locked')
+        once = RunOnce(warm)
+        with pytest.raises(sqlite3.OperationalError):
+            once()
+        assert not once.done
+        assert once() is True and once.done
+        assert once() is False and len(calls) == 2
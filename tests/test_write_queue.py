@@ -0,0 +1,144 @@
+"""
+Tests for the per-database write queue (write_queue.WriteQueue) and the write paths moved onto it.
+"""
+import os
+import sqlite3
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from write_queue import WriteQueue, WriteQueueFull
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / 'wq.db')
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def gate(q):
+    """Park the writer in a unit until the returned event is set."""
+    started, release = threading.Event(), threading.Event()
+
+    def hold(conn):
+        started.set()
+        release.wait(5)
+    fut = q.submit(hold)
+    assert started.wait(5)
+    return fut, release
+
+
+class TestWriteQueue:
+
+    def test_group_commit_isolates_failing_units(self, db):
+        q = WriteQueue(lambda: sqlite3.connect(db), 'test')
+        first, release = gate(q)
+
+        def insert(conn, x):
+            conn.execute("INSERT INTO t VALUES (?)", (x,))
+            if x == 3:
+                raise ValueError('bad row')
+            return x
+        futs = [q.submit(insert, x) for x in range(10)]
+        release.set()
+        first.result(5)
+        assert [f.result(5) for f in futs if f.exception(5) is None] == [0, 1, 2, 4, 5, 6, 7, 8, 9]
+        with pytest.raises(ValueError):
+            futs[3].result()
+
+        conn = sqlite3.connect(db)
+        assert sorted(r[0] for r in conn.execute("SELECT x FROM t")) == [0, 1, 2, 4, 5, 6, 7, 8, 9]
+        conn.close()
+        stats = q.stats()
+        assert stats['batches'] == 2 and stats['max_batch'] == 10
+        assert stats['committed'] == 10 and stats['failed'] == 1 and stats['failed_batches'] == 0
+
+    def test_back_pressure_and_nested_submit(self, db):
+        q = WriteQueue(lambda: sqlite3.connect(db), 'test', max_pending=2, put_timeout=0.05)
+        first, release = gate(q)
+        queued = [q.submit(lambda conn: conn.execute("INSERT INTO t VALUES (1)").rowcount) for _ in range(2)]
+        with pytest.raises(WriteQueueFull):
+            q.submit(lambda conn: None)
+        stats = q.stats()
+        assert stats['depth'] == 2 and stats['rejected'] == 1 and stats['capacity'] == 2
+        release.set()
+        assert [f.result(5) for f in queued] == [1, 1]
+
+        # A unit that submits more work runs it inline, in the same transaction
+        def outer(conn):
+            conn.execute("INSERT INTO t VALUES (2)")
+            return q.execute(lambda c: c.execute("SELECT COUNT(*) FROM t WHERE x=2").fetchone()[0])
+        assert q.execute(outer, timeout=5) == 1
+        stats = q.stats()
+        assert stats['depth'] == 0 and stats['commit_ms']['max'] >= stats['commit_ms']['p50'] > 0
+        assert stats['queue_wait_ms'] is not None and stats['writer_alive']
+
+    @pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+    def test_interrupting_unit_fails_its_whole_batch(self, db):
+        q = WriteQueue(lambda: sqlite3.connect(db), 'test')
+        first, release = gate(q)
+
+        def stop(conn):
+            raise SystemExit('shutting down')
+        ok = q.submit(lambda conn: conn.execute("INSERT INTO t VALUES (1)").rowcount)
+        stopped = q.submit(stop)
+        release.set()
+        first.result(5)
+        assert isinstance(stopped.exception(5), SystemExit)
+        assert isinstance(ok.exception(5), SystemExit)     # rolled back with the batch, not left hanging
+
+        # The next submit starts a new writer
+        assert q.execute(lambda conn: conn.execute("INSERT INTO t VALUES (2)").rowcount, timeout=5) == 1
+        conn = sqlite3.connect(db)
+        assert [r[0] for r in conn.execute("SELECT x FROM t")] == [2]
+        conn.close()
+        assert q.stats()['failed_batches'] == 1
+
+    def test_parallel_writers_through_endpoints(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(app, 'CRM_DB_PATH', str(tmp_path / 'crm.db'))
+        monkeypatch.setattr(app, 'MI_DB_PATH', str(tmp_path / 'mi.db'))
+        app.init_crm_db()
+        app.init_mi_db()
+        mills = ['Canfor', 'West Fraser', 'Interfor', 'Weyerhaeuser', 'Georgia-Pacific']
+        committed = app._mi_writer.stats()['committed']
+        responses = []
+        start = threading.Barrier(50)
+
+        def writer(i):
+            client = app.app.test_client()
+            quotes = [{'mill': mills[i % 5], 'product': f'2x{4 + 2 * (i % 4)}#2', 'length': str(8 + j * 2 + i // 20 * 4),
+                       'price': 400 + i, 'trader': 'Test'} for j in range(2)]
+            start.wait()
+            responses.append(client.post('/api/mi/quotes?wait=true' + ('&bulk=true' if i % 2 else ''), json=quotes))
+            responses.append(client.post('/api/trades/status', json={'trade_id': f'T{i}', 'trade_type': 'buy'}))
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(50)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(60)
+
+        assert len(responses) == 100
+        errors = [r.get_json() for r in responses if r.status_code not in (200, 201)]
+        assert errors == []
+        crm = sqlite3.connect(app.CRM_DB_PATH)
+        mi = sqlite3.connect(app.MI_DB_PATH)
+        # Concurrent intakes for the same company must not create it twice
+        assert crm.execute("SELECT COUNT(*) FROM mills").fetchone()[0] == 5
+        assert crm.execute("SELECT COUNT(*) FROM trade_status").fetchone()[0] == 50
+        assert crm.execute("SELECT COUNT(*) FROM audit_log WHERE action='trade_status_create'").fetchone()[0] == 50
+        keys = {(mills[i % 5], 4 + 2 * (i % 4), 8 + j * 2 + i // 20 * 4) for i in range(50) for j in range(2)}
+        assert mi.execute("SELECT COUNT(*) FROM mill_quotes").fetchone()[0] == len(keys)
+        assert mi.execute("SELECT COUNT(*) FROM mills").fetchone()[0] == 5
+        crm.close()
+        mi.close()
+        assert app._mi_writer.stats()['committed'] - committed >= 50
@@ -0,0 +1,219 @@
+"""
+Write serialization for SYP Analytics
+WriteQueue: one writer thread per database and process. Callers submit write
+units (functions of a connection) and get a Future; the writer runs everything
+queued in one BEGIN IMMEDIATE transaction, each unit under its own savepoint,
+commits once (group commit) and then resolves each unit's Future with its
+return value or exception. Request threads queue up instead of racing each
+other for the SQLite write lock.
+"""
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+class WriteQueueFull(Exception):
+    """The write queue stayed at capacity for put_timeout seconds."""
+
+
+class WriteQueue:
+    """Single writer for one database. connect() -> connection; the writer closes it after each batch.
+    Units run as fn(conn, *args) inside the writer's open transaction while it holds the write
+    lock, so they must be quick (no network calls) and must not commit or roll back themselves.
+    max_pending bounds the queued units: submit() waits up to put_timeout for room, then raises
+    WriteQueueFull. A batch takes at most max_batch units; linger seconds are spent collecting
+    more after the first one arrives."""
+
+    BEGIN_RETRIES = 3
+
+    def __init__(self, connect, name, max_pending=1000, max_batch=100, put_timeout=5.0, linger=0.0):
+        self.connect = connect
+        self.name = name
+        self.max_batch = max_batch
+        self.put_timeout = put_timeout
+        self.linger = linger
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._pid = None
+        self._conn = None            # the writer's connection while a batch runs
+        self._start_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._commit_ms = deque(maxlen=1000)
+        self._wait_ms = deque(maxlen=1000)
+        self.submitted = 0
+        self.committed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.lock_retries = 0
+        self.max_depth = 0
+        self.max_batch_seen = 0
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(conn, *args, **kwargs); the Future resolves once its batch has committed.
+        Called from the writer thread itself (a unit submitting more work), fn runs at once
+        inside the current transaction."""
+        if threading.current_thread() is self._thread and self._conn is not None:
+            fut = Future()
+            fut.set_running_or_notify_cancel()
+            try:
+                fut.set_result(self._run_unit(self._conn, fn, args, kwargs))
+            except Exception as e:
+                fut.set_exception(e)
+            return fut
+        self._ensure_writer()
+        fut = Future()
+        try:
+            self._queue.put((fut, fn, args, kwargs, time.perf_counter()), timeout=self.put_timeout)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise WriteQueueFull(f"{self.name} write queue is full ({self._queue.maxsize} pending)")
+        self._ensure_writer()   # the writer may have stopped (interrupted unit) while this was queued
+        depth = self._queue.qsize()
+        with self._lock:
+            self.submitted += 1
+            self.max_depth = max(self.max_depth, depth)
+        return fut
+
+    def execute(self, fn, *args, timeout=None, **kwargs):
+        """submit() and wait: fn's return value once committed, or its exception."""
+        return self.submit(fn, *args, **kwargs).result(timeout)
+
+    def _ensure_writer(self):
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                # After a fork the parent's writer thread does not exist in this process
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, daemon=True, name=f"{self.name}-writer")
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.linger
+            while len(batch) < self.max_batch:
+                try:
+                    remaining = deadline - time.perf_counter()
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._run_batch(batch)
+            except BaseException:
+                # The batch's callers have their exception; anything still queued goes to a new writer
+                with self._start_lock:
+                    self._thread = None
+                if not self._queue.empty():
+                    self._ensure_writer()
+                raise
+
+    def _run_unit(self, conn, fn, args, kwargs):
+        conn.execute("SAVEPOINT write_unit")
+        try:
+            result = fn(conn, *args, **kwargs)
+        except BaseException:
+            conn.execute("ROLLBACK TO write_unit")
+            conn.execute("RELEASE write_unit")
+            raise
+        conn.execute("RELEASE write_unit")
+        return result
+
+    def _begin(self, conn):
+        for attempt in range(self.BEGIN_RETRIES):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as e:
+                # Another process's writer outlasted busy_timeout; nothing has run yet, so retry
+                if 'locked' not in str(e) or attempt == self.BEGIN_RETRIES - 1:
+                    raise
+                with self._lock:
+                    self.lock_retries += 1
+                time.sleep(0.05 * (attempt + 1))
+
+    def _run_batch(self, batch):
+        started = time.perf_counter()
+        outcomes = []
+        units = [item for item in batch if item[0].set_running_or_notify_cancel()]
+        conn = None
+        try:
+            conn = self.connect()
+            conn.isolation_level = None
+            self._begin(conn)
+            self._conn = conn
+            for fut, fn, args, kwargs, _ in units:
+                try:
+                    outcomes.append((fut, self._run_unit(conn, fn, args, kwargs), None))
+                except Exception as e:
+                    outcomes.append((fut, None, e))
+            conn.execute("COMMIT")
+        except BaseException as e:
+            if conn is not None and conn.in_transaction:
+                try:
+                    conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+            with self._lock:
+                self.failed_batches += 1
+                self.failed += len(units)
+            for fut, *_ in units:
+                fut.set_exception(e)
+            if not isinstance(e, Exception):
+                raise   # KeyboardInterrupt / SystemExit: callers are released, then the writer stops
+            return
+        finally:
+            self._conn = None
+            if conn is not None:
+                conn.close()
+        finished = time.perf_counter()
+        with self._lock:
+            self.batches += 1
+            self.max_batch_seen = max(self.max_batch_seen, len(units))
+            self._commit_ms.append((finished - started) * 1000)
+            self._wait_ms.extend((started - item[4]) * 1000 for item in units)
+            for _, _, error in outcomes:
+                if error is None:
+                    self.committed += 1
+                else:
+                    self.failed += 1
+        for fut, result, error in outcomes:
+            if error is None:
+                fut.set_result(result)
+            else:
+                fut.set_exception(error)
+
+    def stats(self):
+        with self._lock:
+            commit_ms = sorted(self._commit_ms)
+            wait_ms = sorted(self._wait_ms)
+            units = self.committed + self.failed
+            return {
+                'depth': self._queue.qsize(),
+                'max_depth': self.max_depth,
+                'capacity': self._queue.maxsize,
+                'submitted': self.submitted,
+                'committed': self.committed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'batches': self.batches,
+                'failed_batches': self.failed_batches,
+                'lock_retries': self.lock_retries,
+                'avg_batch': round(units / self.batches, 2) if self.batches else None,
+                'max_batch': self.max_batch_seen,
+                'commit_ms': _percentiles(commit_ms),
+                'queue_wait_ms': _percentiles(wait_ms),
+                'writer_alive': bool(self._thread and self._thread.is_alive() and self._pid == os.getpid()),
+            }
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    pick = lambda q: round(values[min(len(values) - 1, int(q * len(values)))], 2)
+    return {'p50': pick(0.5), 'p95': pick(0.95), 'max': round(values[-1], 2)}